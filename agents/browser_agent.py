@@ -7,14 +7,15 @@ import os
 import asyncio
 from typing import Dict, Any, List, Optional
 from playwright.async_api import async_playwright, Page, Browser
-from utils.deepseek_client import DeepSeekClient
+from utils.llm_provider import LLMProvider
+from utils.usage import llm_stage
 
 class BrowserAgent:
     """
     An agent capable of autonomous web navigation using Playwright and DeepSeek.
     """
 
-    def __init__(self, client: DeepSeekClient):
+    def __init__(self, client: LLMProvider):
         self.client = client
         self.browser: Optional[Browser] = None
         self.context: Any = None
@@ -87,7 +88,8 @@ class BrowserAgent:
             What is your next action?
             """
             
-            response = self.client.generate_json(prompt, system_instruction=self.system_instruction)
+            with llm_stage("BrowserAgent"):
+                response = self.client.generate_json(prompt, system_instruction=self.system_instruction)
             action = response.get("action")
             
             print(f"🤖 Browser Agent Step {step+1}: {action}...")
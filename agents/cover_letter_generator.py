@@ -3,17 +3,25 @@ Cover Letter Generator Agent
 Role: Generate personalized, compelling cover letters matching the job and candidate profile.
 """
 
-import json
-from typing import Dict, Any
-from utils.deepseek_client import DeepSeekClient
+from typing import Dict, Any, Optional, AsyncIterator
+from utils.llm_provider import LLMProvider, AsyncLLMProvider
+from utils.prompt_compactor import PromptCompactor, report_compaction
+from utils.usage import llm_stage
 
 class CoverLetterGenerator:
     """
     Agent responsible for writing cover letters.
     """
     
-    def __init__(self, client: DeepSeekClient):
+    def __init__(
+        self,
+        client: LLMProvider,
+        async_client: Optional[AsyncLLMProvider] = None,
+        compactor: Optional[PromptCompactor] = None,
+    ):
         self.client = client
+        self.async_client = async_client
+        self.compactor = compactor or PromptCompactor.from_env()
         self.system_instruction = """
         You are an expert Career Coach and Copywriter specializing in cover letters.
         Your goal is to write compelling, personalized letters that connect the candidate's unique value to the company's needs.
@@ -21,27 +29,26 @@ class CoverLetterGenerator:
         You use a professional yet enthusiastic tone.
         """
 
-    def generate(self, profile: Dict[str, Any], job_analysis: Dict[str, Any]) -> str:
+    def _build_prompt(self, profile: Dict[str, Any], job_analysis: Dict[str, Any]) -> str:
         """
-        Generate a cover letter.
+        Build the cover letter prompt from profile and job analysis.
 
-        Args:
-            profile: Candidate's master profile
-            job_analysis: Analyzed job requirements
-
-        Returns:
-            The body of the cover letter text.
+        Everything before the job analysis is the same for every job (a
+        prefix the provider can cache); the analysis is the per-job suffix.
         """
-        print("✍️  Writing cover letter...")
-        
-        prompt = f"""
+        compacted = self.compactor.compact(profile, job_analysis, stable_profile=True)
+        report_compaction("Cover letter", compacted)
+
+        # Job-relevant entries the token budget cut from the cached profile
+        extra_context = ""
+        if compacted["snippets"]:
+            extra_context = "\nMORE RELEVANT EXPERIENCE (not in the profile above):\n" + compacted["snippets"]
+
+        return f"""
         Create a compelling cover letter for this job application.
 
         CANDIDATE PROFILE:
-        {json.dumps(profile, indent=2)}
-
-        JOB ANALYSIS:
-        {json.dumps(job_analysis, indent=2)}
+        {compacted["profile"]}
 
         STRUCTURE:
         Paragraph 1 (Opening): Strong hook + excitement about the specific role/company.
@@ -55,11 +62,77 @@ class CoverLetterGenerator:
         3. Do NOT include placeholder addresses (header will be handled separately). Just the body.
         4. Use specific keywords from the job analysis.
         5. "Show, don't just tell" - use metrics from the profile.
+
+        JOB ANALYSIS:
+        {compacted["analysis"]}
+        {extra_context}
+        """
+
+    def generate(self, profile: Dict[str, Any], job_analysis: Dict[str, Any]) -> str:
         """
+        Generate a cover letter.
+
+        Args:
+            profile: Candidate's master profile
+            job_analysis: Analyzed job requirements
+
+        Returns:
+            The body of the cover letter text.
+        """
+        print("✍️  Writing cover letter...")
+        prompt = self._build_prompt(profile, job_analysis)
 
         # Temperature 0.7 for creativity/personality
-        return self.client.generate_content(
-            prompt, 
-            system_instruction=self.system_instruction, 
-            config={"temperature": 0.7}
-        )
+        with llm_stage("CoverLetterGenerator"):
+            return self.client.generate_content(
+                prompt,
+                system_instruction=self.system_instruction,
+                config={"temperature": 0.7}
+            )
+
+    async def generate_async(self, profile: Dict[str, Any], job_analysis: Dict[str, Any]) -> str:
+        """
+        Async variant of generate() that does not block the event loop.
+
+        Args:
+            profile: Candidate's master profile
+            job_analysis: Analyzed job requirements
+
+        Returns:
+            The body of the cover letter text.
+        """
+        if self.async_client is None:
+            raise ValueError("CoverLetterGenerator requires an async LLM client for generate_async")
+
+        print("✍️  Writing cover letter...")
+        prompt = self._build_prompt(profile, job_analysis)
+        with llm_stage("CoverLetterGenerator"):
+            return await self.async_client.generate_content(
+                prompt,
+                system_instruction=self.system_instruction,
+                config={"temperature": 0.7}
+            )
+
+    async def stream_async(self, profile: Dict[str, Any], job_analysis: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Stream the cover letter as the model writes it.
+
+        Args:
+            profile: Candidate's master profile
+            job_analysis: Analyzed job requirements
+
+        Yields:
+            Text deltas of the cover letter body.
+        """
+        if self.async_client is None:
+            raise ValueError("CoverLetterGenerator requires an async LLM client for stream_async")
+
+        print("✍️  Writing cover letter (streaming)...")
+        prompt = self._build_prompt(profile, job_analysis)
+        with llm_stage("CoverLetterGenerator"):
+            async for delta in self.async_client.stream_content(
+                prompt,
+                system_instruction=self.system_instruction,
+                config={"temperature": 0.7}
+            ):
+                yield delta
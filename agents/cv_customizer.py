@@ -3,17 +3,25 @@ CV Customizer Agent
 Role: Tailor the master profile to match specific job requirements.
 """
 
-from typing import Dict, Any, List
-from utils.deepseek_client import DeepSeekClient
-import json
+from typing import Dict, Any, List, Optional
+from utils.llm_provider import LLMProvider, AsyncLLMProvider
+from utils.prompt_compactor import PromptCompactor, report_compaction
+from utils.usage import llm_stage
 
 class CVCustomizer:
     """
     Agent responsible for rewriting CV content to target a specific job.
     """
 
-    def __init__(self, client: DeepSeekClient):
+    def __init__(
+        self,
+        client: LLMProvider,
+        async_client: Optional[AsyncLLMProvider] = None,
+        compactor: Optional[PromptCompactor] = None,
+    ):
         self.client = client
+        self.async_client = async_client
+        self.compactor = compactor or PromptCompactor.from_env()
         self.system_instruction = """
         You are an expert Career Coach and Professional Resume Writer.
         Your goal is to rewrite candidate profiles to perfectly align with target job descriptions.
@@ -22,34 +30,30 @@ class CVCustomizer:
         Return raw JSON only.
         """
 
-    def customize(self, profile: Dict[str, Any], job_analysis: Dict[str, Any], relevant_snippets: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def _build_prompt(self, profile: Dict[str, Any], job_analysis: Dict[str, Any], relevant_snippets: List[Dict[str, Any]] = None) -> str:
         """
-        Customize the candidate profile for the analyzed job.
-        
-        Args:
-            profile: Candidates base profile
-            job_analysis: Structured analysis of the target job
-            relevant_snippets: (Optional) High-relevance snippets retrieved via RAG
-            
-        Returns:
-            Customized profile dictionary ready for document generation
+        Build the tailoring prompt from profile, job analysis and RAG snippets.
+
+        The profile and the fixed instructions come first and are identical for
+        every job, so the provider can serve that prefix from its prompt cache;
+        the job analysis and snippets follow as the per-job suffix.
         """
-        print("🎨 Customizing candidate profile using RAG contexts...")
-        
-        # Format snippets for prompt
+        compacted = self.compactor.compact(profile, job_analysis, relevant_snippets, stable_profile=True)
+        report_compaction("CV", compacted)
+
+        # Snippets repeating a profile bullet point to it instead of quoting it again
         rag_context = ""
-        if relevant_snippets:
-            rag_context = "\nPRIORITY CONTEXT (Top Relevant Experience):\n" + json.dumps(relevant_snippets, indent=2)
+        if compacted["snippets"]:
+            rag_context = (
+                "\nPRIORITY CONTEXT (Top Relevant Experience for this job):\n"
+                + compacted["snippets"]
+            )
 
-        prompt = f"""
+        return f"""
         Tailor this candidate's profile to match the job requirements perfectly.
-        {rag_context}
 
         CANDIDATE BASE PROFILE:
-        {json.dumps(profile, indent=2)}
-
-        JOB ANALYSIS:
-        {json.dumps(job_analysis, indent=2)}
+        {compacted["profile"]}
 
         TASK:
         1. Rewrite the "Professional Summary" to highlight relevant experience for THIS job.
@@ -87,7 +91,47 @@ class CVCustomizer:
         2. Use EXACT vocabulary from the job analysis where applicable.
         3. Focus on impact and metrics (STAR method).
         4. Maintain a professional, executive tone.
+
+        JOB ANALYSIS:
+        {compacted["analysis"]}
+        {rag_context}
         """
 
+    def customize(self, profile: Dict[str, Any], job_analysis: Dict[str, Any], relevant_snippets: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Customize the candidate profile for the analyzed job.
+        
+        Args:
+            profile: Candidates base profile
+            job_analysis: Structured analysis of the target job
+            relevant_snippets: (Optional) High-relevance snippets retrieved via RAG
+            
+        Returns:
+            Customized profile dictionary ready for document generation
+        """
+        print("🎨 Customizing candidate profile using RAG contexts...")
+        prompt = self._build_prompt(profile, job_analysis, relevant_snippets)
+
         # Temperature 0.5 for a balance of creativity and adherence to facts
-        return self.client.generate_json(prompt, system_instruction=self.system_instruction, temperature=0.5)
+        with llm_stage("CVCustomizer"):
+            return self.client.generate_json(prompt, system_instruction=self.system_instruction, temperature=0.5)
+
+    async def customize_async(self, profile: Dict[str, Any], job_analysis: Dict[str, Any], relevant_snippets: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Async variant of customize() that does not block the event loop.
+
+        Args:
+            profile: Candidates base profile
+            job_analysis: Structured analysis of the target job
+            relevant_snippets: (Optional) High-relevance snippets retrieved via RAG
+
+        Returns:
+            Customized profile dictionary ready for document generation
+        """
+        if self.async_client is None:
+            raise ValueError("CVCustomizer requires an async LLM client for customize_async")
+
+        print("🎨 Customizing candidate profile using RAG contexts...")
+        prompt = self._build_prompt(profile, job_analysis, relevant_snippets)
+        with llm_stage("CVCustomizer"):
+            return await self.async_client.generate_json(prompt, system_instruction=self.system_instruction, temperature=0.5)
@@ -3,16 +3,60 @@ Job Analyzer Agent
 Role: Analyze job descriptions to extract requirements, skills, and keywords.
 """
 
-from typing import Dict, Any, List
-from utils.deepseek_client import DeepSeekClient
+import asyncio
+import os
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+from utils.analysis_store import AnalysisStore
+from utils.llm_provider import LLMProvider, AsyncLLMProvider
+from utils.hashing import job_text_hash
+from utils.usage import llm_stage, QuotaExceededError
+from agents.local_job_analyzer import LocalJobAnalyzer
+
+ANALYZER_MODES = ("llm", "local")
+ANALYSIS_FIELDS = ("role_info", "requirements", "keywords", "summary")
 
 class JobAnalyzer:
     """
     Agent responsible for breaking down job descriptions into structured data.
+
+    In "llm" mode (default) postings go to DeepSeek; if the API call fails and
+    fallback is enabled, the local extractor answers instead (not for token
+    quota errors, and not once streamed fields have been reported). "local" mode
+    never calls the API (fast bulk triage). Set with JOB_ANALYZER_MODE and
+    JOB_ANALYZER_FALLBACK.
+
+    With a store, LLM analyses are saved under the hash of the normalized job
+    text and reused in every mode, so a posting is only sent to the LLM once.
     """
     
-    def __init__(self, client: DeepSeekClient):
+    def __init__(
+        self,
+        client: Optional[LLMProvider],
+        async_client: Optional[AsyncLLMProvider] = None,
+        mode: Optional[str] = None,
+        fallback: Optional[bool] = None,
+        local_analyzer: Optional[LocalJobAnalyzer] = None,
+        store: Optional[AnalysisStore] = None,
+    ):
+        """
+        Args:
+            client: Sync LLM client (may be None in "local" mode)
+            async_client: Async LLM client for the *_async methods
+            mode: "llm" or "local" (default: JOB_ANALYZER_MODE or "llm")
+            fallback: Use the local extractor when the API fails (default: JOB_ANALYZER_FALLBACK or True)
+            local_analyzer: LLM-free extractor (default: a new LocalJobAnalyzer)
+            store: Persistent analysis store consulted before calling the LLM
+        """
         self.client = client
+        self.async_client = async_client
+        self.mode = (mode or os.getenv("JOB_ANALYZER_MODE", "llm")).lower()
+        if self.mode not in ANALYZER_MODES:
+            raise ValueError(f"Unknown job analyzer mode '{self.mode}' (expected one of {', '.join(ANALYZER_MODES)})")
+        if fallback is None:
+            fallback = os.getenv("JOB_ANALYZER_FALLBACK", "1").lower() not in ("0", "false", "no")
+        self.fallback = fallback
+        self.local_analyzer = local_analyzer or LocalJobAnalyzer()
+        self.store = store
         self.system_instruction = """
         You are an expert Recruitment Analyst with 20 years of experience in Talent Acquisition.
         Your role is to deconstruct job descriptions to understand exactly what the employer is looking for.
@@ -50,19 +94,74 @@ class JobAnalyzer:
             
         return analysis
 
-    def analyze(self, job_description: str) -> Dict[str, Any]:
+    def analyze_local(self, job_description: str) -> Dict[str, Any]:
         """
-        Analyze a job description string.
+        Analyze a job description with the local extractor only (no API call).
 
         Args:
             job_description: The full text of the job posting
 
         Returns:
-            Structured dictionary containing role info, requirements, and keywords.
+            Structured dictionary in the same format as analyze(), with "source": "local"
         """
-        print(f"🔍 Analyzing job description ({len(job_description)} chars)...")
+        print(f"🔍 Analyzing job description locally ({len(job_description)} chars)...")
+        return self.local_analyzer.analyze(job_description)
 
-        prompt = f"""
+    def _lookup(self, job_description: str) -> Optional[Dict[str, Any]]:
+        """Stored analysis of this job text, if any; store errors count as a miss."""
+        if self.store is None:
+            return None
+        try:
+            analysis = self.store.get(job_text_hash(job_description))
+        except Exception as e:
+            print(f"⚠️  Job analysis store lookup failed: {e}")
+            return None
+        if analysis is not None:
+            print(f"🗃️  Reusing stored analysis for job description ({len(job_description)} chars)")
+        return analysis
+
+    def _remember(self, job_description: str, analysis: Dict[str, Any]) -> None:
+        """Save an LLM analysis; store errors never fail the analysis."""
+        if self.store is None:
+            return
+        try:
+            self.store.put(job_text_hash(job_description), analysis)
+        except Exception as e:
+            print(f"⚠️  Could not store job analysis: {e}")
+
+    def stored_analyses(self, job_descriptions: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Bulk lookup of stored analyses.
+
+        Args:
+            job_descriptions: Job posting texts
+
+        Returns:
+            Stored analysis or None for each posting, in input order
+        """
+        if self.store is None:
+            return [None] * len(job_descriptions)
+        hashes = [job_text_hash(jd) for jd in job_descriptions]
+        found = self.store.get_many(hashes)
+        return [found.get(h) for h in hashes]
+
+    def _fall_back(self, job_description: str, error: Exception, emitted: Optional[set] = None) -> Dict[str, Any]:
+        """
+        Answer with the local extractor after an API failure.
+
+        Re-raises when fallback is off, for QuotaExceededError (the user's
+        limit, not an outage), and once fields were streamed to on_field: a
+        local result could contradict them, and an error raised by on_field
+        itself always lands here after its field was recorded.
+        """
+        if not self.fallback or isinstance(error, QuotaExceededError) or emitted:
+            raise error
+        print(f"⚠️  Job analysis API call failed ({error}). Falling back to local extraction.")
+        return self.local_analyzer.analyze(job_description)
+
+    def _build_prompt(self, job_description: str) -> str:
+        """Build the extraction prompt for a job description."""
+        return f"""
         Analyze this job description and extract comprehensive information:
 
         JOB DESCRIPTION:
@@ -98,8 +197,157 @@ class JobAnalyzer:
         6. Return ONLY valid JSON
         """
 
+    def analyze(self, job_description: str) -> Dict[str, Any]:
+        """
+        Analyze a job description string.
+
+        Args:
+            job_description: The full text of the job posting
+
+        Returns:
+            Structured dictionary containing role info, requirements, and keywords.
+        """
+        stored = self._lookup(job_description)
+        if stored is not None:
+            return stored
+        if self.mode == "local":
+            return self.analyze_local(job_description)
+
+        print(f"🔍 Analyzing job description ({len(job_description)} chars)...")
+        prompt = self._build_prompt(job_description)
+
         # Temperature 0.1 for structured extraction
-        result = self.client.generate_json(prompt, system_instruction=self.system_instruction, temperature=0.1)
+        try:
+            with llm_stage("JobAnalyzer"):
+                result = self.client.generate_json(prompt, system_instruction=self.system_instruction, temperature=0.1)
+        except Exception as e:
+            return self._fall_back(job_description, e)
         
         # Apply validation layer
-        return self._validate_analysis(result, job_description)
+        result = self._validate_analysis(result, job_description)
+        self._remember(job_description, result)
+        return result
+
+    async def analyze_async(self, job_description: str) -> Dict[str, Any]:
+        """
+        Async variant of analyze() that does not block the event loop.
+
+        Args:
+            job_description: The full text of the job posting
+
+        Returns:
+            Structured dictionary containing role info, requirements, and keywords.
+        """
+        stored = await asyncio.to_thread(self._lookup, job_description)
+        if stored is not None:
+            return stored
+        if self.mode == "local":
+            return self.analyze_local(job_description)
+        if self.async_client is None:
+            raise ValueError("JobAnalyzer requires an async LLM client for analyze_async")
+
+        print(f"🔍 Analyzing job description ({len(job_description)} chars)...")
+        prompt = self._build_prompt(job_description)
+        try:
+            with llm_stage("JobAnalyzer"):
+                result = await self.async_client.generate_json(prompt, system_instruction=self.system_instruction, temperature=0.1)
+        except Exception as e:
+            return self._fall_back(job_description, e)
+        result = self._validate_analysis(result, job_description)
+        await asyncio.to_thread(self._remember, job_description, result)
+        return result
+
+    def analyze_streaming(self, job_description: str, on_field: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """
+        Analyze a job description while streaming, reporting each top-level field
+        ("role_info", "requirements", "keywords", "summary") as soon as it is complete.
+
+        Args:
+            job_description: The full text of the job posting
+            on_field: Called with (field, value) as fields close, before validation
+
+        Returns:
+            Structured dictionary containing role info, requirements, and keywords.
+        """
+        emitted = set()
+
+        def report(field: str, value: Any) -> None:
+            emitted.add(field)
+            if on_field is not None:
+                on_field(field, value)
+
+        stored = self._lookup(job_description)
+        if stored is not None:
+            result = stored
+        elif self.mode == "local":
+            result = self.analyze_local(job_description)
+        else:
+            print(f"🔍 Analyzing job description ({len(job_description)} chars, streaming)...")
+            prompt = self._build_prompt(job_description)
+            try:
+                with llm_stage("JobAnalyzer"):
+                    result = self.client.generate_json_streaming(
+                        prompt, system_instruction=self.system_instruction, temperature=0.1, on_field=report
+                    )
+            except Exception as e:
+                result = self._fall_back(job_description, e, emitted)
+            else:
+                result = self._validate_analysis(result, job_description)
+                self._remember(job_description, result)
+                return result
+
+        # Stored, local and fallback results arrive all at once (nothing was streamed)
+        for field in ANALYSIS_FIELDS:
+            if field in result:
+                report(field, result[field])
+        return result
+
+    async def analyze_streaming_async(
+        self,
+        job_description: str,
+        on_field: Optional[Callable[[str, Any], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Async variant of analyze_streaming().
+
+        Args:
+            job_description: The full text of the job posting
+            on_field: Awaited with (field, value) as fields close, before validation
+
+        Returns:
+            Structured dictionary containing role info, requirements, and keywords.
+        """
+        emitted = set()
+
+        async def report(field: str, value: Any) -> None:
+            emitted.add(field)
+            if on_field is not None:
+                await on_field(field, value)
+
+        stored = await asyncio.to_thread(self._lookup, job_description)
+        if stored is not None:
+            result = stored
+        elif self.mode == "local":
+            result = self.analyze_local(job_description)
+        else:
+            if self.async_client is None:
+                raise ValueError("JobAnalyzer requires an async LLM client for analyze_streaming_async")
+
+            print(f"🔍 Analyzing job description ({len(job_description)} chars, streaming)...")
+            prompt = self._build_prompt(job_description)
+            try:
+                with llm_stage("JobAnalyzer"):
+                    result = await self.async_client.generate_json_streaming(
+                        prompt, system_instruction=self.system_instruction, temperature=0.1, on_field=report
+                    )
+            except Exception as e:
+                result = self._fall_back(job_description, e, emitted)
+            else:
+                result = self._validate_analysis(result, job_description)
+                await asyncio.to_thread(self._remember, job_description, result)
+                return result
+
+        for field in ANALYSIS_FIELDS:
+            if field in result:
+                await report(field, result[field])
+        return result
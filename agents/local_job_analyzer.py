@@ -0,0 +1,396 @@
+"""
+Local Job Analyzer
+Role: Extract title, skills and keywords from job descriptions without calling an LLM.
+"""
+
+import re
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils.match_calculator import MatchCalculator
+from utils.skill_ontology import SkillOntology, get_skill_ontology
+
+# Section heading -> section kind. A heading is matched on its leading words,
+# so "Requirements & Qualifications:" and "What you'll bring" both classify.
+SECTION_HEADINGS: Dict[str, List[str]] = {
+    "nice_to_have": [
+        "nice to have", "nice-to-have", "preferred", "bonus", "desirable", "pluses", "good to have",
+        "it would be great", "extra credit",
+    ],
+    "requirements": [
+        "requirements", "qualifications", "must have", "must-have", "what you bring", "what you'll bring",
+        "what we're looking for", "what we are looking for", "who you are", "you have", "your profile",
+        "skills", "required", "about you",
+    ],
+    "responsibilities": [
+        "responsibilities", "what you'll do", "what you will do", "the role", "your role", "duties",
+        "key responsibilities", "day to day", "your mission", "job description",
+    ],
+    "about": ["about us", "about the company", "who we are", "company overview", "our mission", "about"],
+    "benefits": ["benefits", "perks", "what we offer", "compensation", "why join"],
+}
+
+# Phrases inside a requirement bullet that demote its skills to nice-to-have
+NICE_TO_HAVE_MARKERS = re.compile(r"\b(plus|bonus|nice to have|preferred|ideally|desirable|advantage|a big plus)\b", re.I)
+
+# Soft skills, reusing the ontology matcher (canonical label -> phrases)
+SOFT_SKILLS: Dict[str, List[str]] = {
+    "Communication": ["communication skills", "communicator", "communicate"],
+    "Collaboration": ["collaborate", "collaborative", "cross-functional", "cross functional"],
+    "Teamwork": ["team player", "team-player"],
+    "Leadership": ["lead a team", "leading teams", "people management"],
+    "Mentoring": ["mentor", "mentorship", "coaching"],
+    "Problem Solving": ["problem-solving", "problem solver", "solve complex problems"],
+    "Ownership": ["take ownership", "end-to-end ownership", "accountability"],
+    "Attention to Detail": ["detail-oriented", "detail oriented"],
+    "Adaptability": ["adaptable", "fast-paced", "fast paced", "ambiguity"],
+    "Critical Thinking": ["analytical thinking", "analytical skills", "analytical"],
+    "Stakeholder Management": ["stakeholders"],
+    "Self-Motivation": ["self-motivated", "self-starter", "self starter", "proactive"],
+    "Time Management": ["prioritize", "prioritise", "multitask", "multi-task"],
+}
+
+# Ambiguous skill aliases (see AMBIGUOUS_ALIASES) that are accepted in free
+# text only with exactly this capitalization, e.g. "SQL" but not "sql".
+CASE_SENSITIVE_SKILLS = {"SQL", "AI", "ML", "NLP", "REST", "Git", "Agile", "Scrum", "Spark", "Rails", "Node", "Go"}
+
+# Uppercase tokens that look like technologies but are not
+NON_SKILL_ACRONYMS = {
+    "US", "USA", "UK", "EU", "EMEA", "APAC", "CEO", "CTO", "CFO", "VP", "HR", "PTO", "OK", "IT", "TBD",
+    "WFH", "EOE", "FAQ", "AM", "PM", "ID", "OR", "AND", "THE", "NOT", "YOU", "WE", "OUR", "BS", "BA",
+    "MS", "MA", "MSC", "BSC", "PHD", "MBA", "CV", "CS", "FTE",
+}
+
+LEVELS: List[Tuple[str, re.Pattern]] = [
+    ("Lead", re.compile(r"\b(lead|principal|staff|head of|architect|director|manager)\b", re.I)),
+    ("Senior", re.compile(r"\b(senior|sr\.?)\b", re.I)),
+    ("Junior", re.compile(r"\b(junior|jr\.?|entry[- ]level|graduate|intern(ship)?|trainee|associate)\b", re.I)),
+    ("Mid", re.compile(r"\b(mid[- ]level|intermediate|mid)\b", re.I)),
+]
+
+YEARS_PATTERN = re.compile(
+    r"(?<![\d.])(\d{1,2})\s*(\+|plus)?\s*(?:(?:-|–|to)\s*(\d{1,2})\s*\+?\s*)?(?:years?|yrs?)\b",
+    re.I,
+)
+DEGREE_PATTERN = re.compile(
+    r"\b(bachelor'?s?|master'?s?|ph\.?d|doctorate|b\.?sc?|m\.?sc?|b\.?eng|m\.?eng|mba|degree|diploma|certification|certified)\b",
+    re.I,
+)
+LABEL_PATTERN = re.compile(
+    r"^\s*(job title|title|position|role|company|employer|organization|location|based in|office)\s*[:\-–]\s*(.+)$",
+    re.I,
+)
+LOOKING_FOR_PATTERN = re.compile(r"\b(?:looking for|hiring|seeking) an? ([A-Z][\w+#./-]*(?: [A-Z][\w+#./-]*){0,5})")
+TECH_TOKEN_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9+#.]*(?:[-/][A-Za-z0-9+#.]+)*")
+BULLET_PATTERN = re.compile(r"^\s*(?:[-*•·▪◦–]|\d+[.)])\s+")
+REMOTE_PATTERN = re.compile(r"\b(fully remote|remote[- ]first|remote|hybrid)\b", re.I)
+
+
+class LocalJobAnalyzer:
+    """
+    Deterministic, LLM-free job description analyzer.
+
+    Splits the posting into sections by their headings, finds skills with the
+    shared skill ontology (one Aho-Corasick pass per section) and reads years
+    of experience, education, title, company and location with regexes.
+    Returns the same structure as JobAnalyzer.analyze() in milliseconds,
+    plus "source": "local".
+
+    Fields it cannot find are "Unknown" (role_info), None or empty lists,
+    never guessed.
+    """
+
+    def __init__(self, ontology: Optional[SkillOntology] = None, max_keywords: int = 25):
+        """
+        Args:
+            ontology: Skill ontology (default: the shared one)
+            max_keywords: Maximum number of ATS keywords returned
+        """
+        self.ontology = ontology or get_skill_ontology()
+        self.soft_skills = SkillOntology(aliases=SOFT_SKILLS, ambiguous=())
+        self.max_keywords = max_keywords
+        self._headings = sorted(
+            ((phrase, kind) for kind, phrases in SECTION_HEADINGS.items() for phrase in phrases),
+            key=lambda item: -len(item[0]),
+        )
+
+    def analyze(self, job_description: str) -> Dict[str, Any]:
+        """
+        Analyze a job description string.
+
+        Args:
+            job_description: The full text of the job posting
+
+        Returns:
+            Structured dictionary containing role info, requirements, and keywords.
+        """
+        lines = [line.rstrip() for line in job_description.splitlines()]
+        labels = self._read_labels(lines)
+        sections = self._split_sections(lines)
+
+        must_have: Dict[str, str] = {}
+        nice_to_have: Dict[str, str] = {}
+        counts: Counter = Counter()
+        first_seen: Dict[str, int] = {}
+        surface: Dict[str, str] = {}
+
+        for kind, section_lines in sections:
+            if kind in ("about", "benefits"):
+                continue
+            for line in section_lines:
+                for key, name in self._find_terms(line):
+                    counts[key] += 1
+                    first_seen.setdefault(key, len(first_seen))
+                    surface.setdefault(key, name)
+                    if kind == "nice_to_have" or (kind == "requirements" and NICE_TO_HAVE_MARKERS.search(line)):
+                        nice_to_have.setdefault(key, name)
+                    elif kind in ("requirements", "responsibilities", "general"):
+                        must_have.setdefault(key, name)
+
+        for key in must_have:
+            nice_to_have.pop(key, None)
+
+        # Most emphasized terms first, ties in order of appearance
+        ranked = sorted(counts, key=lambda key: (-counts[key], first_seen[key]))
+        soft_skills = sorted(
+            (self.soft_skills.names[key] for key in self.soft_skills.find_skills(job_description)),
+            key=str.lower,
+        )
+
+        title = self._find_title(lines, labels)
+        requirement_text = "\n".join(
+            line for kind, section_lines in sections if kind in ("requirements", "general") for line in section_lines
+        )
+
+        return {
+            "role_info": {
+                "title": title,
+                "company": labels.get("company") or "Unknown",
+                "location": labels.get("location") or self._find_remote(job_description),
+                "level": self._find_level(title, requirement_text or job_description),
+            },
+            "requirements": {
+                "must_have_skills": list(must_have.values()),
+                "nice_to_have_skills": list(nice_to_have.values()),
+                "education": self._find_education(sections),
+                "years_experience": self._find_years(requirement_text) or self._find_years(job_description),
+            },
+            "keywords": {
+                "ats_keywords": [surface[key] for key in ranked[:self.max_keywords]],
+                "soft_skills": soft_skills,
+            },
+            "summary": self._summarize(title, labels, sections),
+            "source": "local",
+        }
+
+    def screen(
+        self,
+        profile: Dict[str, Any],
+        job_descriptions: List[str],
+        min_score: float = 0,
+        match_calculator: Optional[MatchCalculator] = None,
+        profile_version: Optional[str] = None,
+        known_analyses: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Prefilter postings before sending them to the LLM: analyze each one
+        locally and score it against the profile.
+
+        Args:
+            profile: Candidate's master profile
+            job_descriptions: Job posting texts
+            min_score: Minimum local overall_score for a posting to pass
+            match_calculator: Calculator used for scoring (default: a new one)
+            profile_version: Optional profile version key for the feature cache
+            known_analyses: Analyses already available (e.g. stored LLM analyses),
+                aligned with job_descriptions; None entries are analyzed locally
+
+        Returns:
+            One entry per posting in input order, with "index", "analysis",
+            "match_score" and "passed"
+        """
+        calculator = match_calculator or MatchCalculator()
+        known_analyses = known_analyses or [None] * len(job_descriptions)
+        analyses = [known or self.analyze(jd) for jd, known in zip(job_descriptions, known_analyses)]
+        ranking = calculator.rank_jobs(profile, analyses, profile_version=profile_version)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(analyses)
+        for entry in ranking:
+            index = entry["index"]
+            results[index] = {
+                "index": index,
+                "analysis": analyses[index],
+                "match_score": entry["match_score"],
+                "passed": entry["match_score"]["overall_score"] >= min_score,
+            }
+        return results
+
+    # ------------------------------------------------------------------ sections
+
+    def _heading_kind(self, line: str) -> Optional[str]:
+        """Section kind when a line is a heading, otherwise None."""
+        stripped = line.strip().strip("#*_ ").rstrip(":").strip()
+        if not stripped or len(stripped) > 60 or BULLET_PATTERN.match(line):
+            return None
+        is_heading_shaped = (
+            line.strip().endswith(":") or line.lstrip().startswith("#") or stripped.isupper() or len(stripped.split()) <= 5
+        )
+        if not is_heading_shaped:
+            return None
+        lowered = stripped.lower().replace("’", "'")
+        for phrase, kind in self._headings:
+            if lowered.startswith(phrase):
+                return kind
+        return None
+
+    def _split_sections(self, lines: List[str]) -> List[Tuple[str, List[str]]]:
+        """Group lines under their headings; text before the first heading is "general"."""
+        sections: List[Tuple[str, List[str]]] = [("general", [])]
+        for line in lines:
+            if not line.strip():
+                continue
+            kind = self._heading_kind(line)
+            if kind is not None:
+                sections.append((kind, []))
+                continue
+            if LABEL_PATTERN.match(line):
+                continue
+            sections[-1][1].append(line)
+        return sections
+
+    @staticmethod
+    def _read_labels(lines: List[str]) -> Dict[str, str]:
+        """Values of "Title:", "Company:" and "Location:" style lines."""
+        labels: Dict[str, str] = {}
+        field_of = {
+            "job title": "title", "title": "title", "position": "title", "role": "title",
+            "company": "company", "employer": "company", "organization": "company",
+            "location": "location", "based in": "location", "office": "location",
+        }
+        for line in lines[:40]:
+            match = LABEL_PATTERN.match(line)
+            if match:
+                value = match.group(2).strip().strip("*_ ")
+                if value and len(value) <= 80:
+                    labels.setdefault(field_of[match.group(1).lower()], value)
+        return labels
+
+    # ------------------------------------------------------------------ terms
+
+    def _find_terms(self, line: str) -> List[Tuple[str, str]]:
+        """
+        Skills and technology terms in one line, in text order.
+
+        Returns:
+            (canonical key, name as written) pairs
+        """
+        found: List[Tuple[int, str, str]] = []
+        covered: List[Tuple[int, int]] = []
+        for start, end, key in self.ontology.find_mentions(line):
+            found.append((start, key, line[start:end]))
+            covered.append((start, end))
+
+        for match in TECH_TOKEN_PATTERN.finditer(line):
+            start, end = match.span()
+            token = match.group().rstrip(".")
+            if any(s <= start < e for s, e in covered):
+                continue
+            if token in CASE_SENSITIVE_SKILLS:
+                # "Go" only mid-sentence, where it can't be the verb starting a bullet
+                if token == "Go" and not line[:start].strip(" -*•·▪◦–\t").rstrip().endswith((",", "/", "(", "and", "or", "in", "with")):
+                    continue
+                found.append((start, self.ontology.canonical_key(token), token))
+            elif self._looks_like_technology(token):
+                found.append((start, self.ontology.canonical_key(token), token))
+
+        found.sort()
+        return [(key, name) for _, key, name in found]
+
+    @staticmethod
+    def _looks_like_technology(token: str) -> bool:
+        """CamelCase names (FastAPI, LangChain) and acronyms (LLM, API), not ordinary words."""
+        if len(token) < 2 or token.upper() in NON_SKILL_ACRONYMS:
+            return False
+        if token.isupper() and token.isalpha():
+            return len(token) <= 6
+        inner = token[1:]
+        return any(ch.isupper() for ch in inner) and any(ch.islower() for ch in token)
+
+    # ------------------------------------------------------------------ fields
+
+    @staticmethod
+    def _find_title(lines: List[str], labels: Dict[str, str]) -> str:
+        if labels.get("title"):
+            return labels["title"]
+        for line in lines:
+            stripped = line.strip().strip("#*_ ")
+            if stripped:
+                # A short first line without sentence punctuation is the title
+                if len(stripped) <= 80 and not stripped.endswith((".", ":", "!", "?")) and len(stripped.split()) <= 10:
+                    return stripped
+                break
+        match = LOOKING_FOR_PATTERN.search("\n".join(lines))
+        return match.group(1).strip() if match else "Unknown"
+
+    @staticmethod
+    def _find_remote(text: str) -> str:
+        match = REMOTE_PATTERN.search(text)
+        return match.group(1).capitalize() if match else "Unknown"
+
+    def _find_level(self, title: str, text: str) -> str:
+        for level, pattern in LEVELS:
+            if pattern.search(title):
+                return level
+        years = self._min_years(text)
+        if years is None:
+            return "Unknown"
+        if years >= 8:
+            return "Lead"
+        if years >= 5:
+            return "Senior"
+        if years >= 2:
+            return "Mid"
+        return "Junior"
+
+    @staticmethod
+    def _min_years(text: str) -> Optional[int]:
+        match = YEARS_PATTERN.search(text)
+        return int(match.group(1)) if match else None
+
+    @staticmethod
+    def _find_years(text: str) -> Optional[str]:
+        """First years-of-experience requirement, e.g. "5+ years" or "3-5 years"."""
+        for match in YEARS_PATTERN.finditer(text):
+            low, plus, high = match.group(1), match.group(2), match.group(3)
+            if int(low) > 40:
+                continue
+            if high:
+                return f"{low}-{high} years"
+            return f"{low}+ years" if plus else f"{low} years"
+        return None
+
+    @staticmethod
+    def _find_education(sections: List[Tuple[str, List[str]]]) -> Optional[str]:
+        for kind, section_lines in sections:
+            if kind in ("about", "benefits"):
+                continue
+            for line in section_lines:
+                if DEGREE_PATTERN.search(line):
+                    return BULLET_PATTERN.sub("", line).strip().rstrip(".")
+        return None
+
+    @staticmethod
+    def _summarize(title: str, labels: Dict[str, str], sections: List[Tuple[str, List[str]]]) -> str:
+        """Title and company, followed by the first responsibility (or first sentence of the posting)."""
+        company = labels.get("company")
+        parts = [f"{title} role at {company}." if company else f"{title} role."]
+        for wanted in ("responsibilities", "general", "about"):
+            for kind, section_lines in sections:
+                if kind != wanted:
+                    continue
+                for line in section_lines:
+                    text = BULLET_PATTERN.sub("", line).strip()
+                    if text and text != title and len(text.split()) >= 4:
+                        sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0].rstrip(".")
+                        parts.append(sentence + ".")
+                        return " ".join(parts)
+        return parts[0]
@@ -4,19 +4,25 @@ Role: Expose the agentic workflow as a scalable API with file downloads.
 """
 
 import os
-import uuid
-from typing import Dict, Any
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+import json
+import asyncio
+from typing import Dict, Any, List, Optional
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 # Import components
-from utils.deepseek_client import DeepSeekClient
-from utils.document_builder import DocumentBuilder
+from utils.llm_router import create_llm_clients
 from utils.rag_engine import RAGEngine
+from utils.rag_registry import RAGRegistry
+from utils.job_dedupe import JobDedupeIndex
+from utils.analysis_store import SQLiteAnalysisStore
+from utils.pipeline import ApplicationPipeline, download_urls
+from utils.job_queue import SQLiteJobQueue, WorkerPool, QueueFullError, STATUS_SUCCEEDED, STATUS_FAILED
+from utils.usage import QuotaExceededError, usage_scope, get_usage_tracker
 from agents.job_analyzer import JobAnalyzer
 from agents.cv_customizer import CVCustomizer
 from agents.cover_letter_generator import CoverLetterGenerator
@@ -40,77 +46,294 @@ OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "output")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # Initialize global engines
-api_key = os.getenv("DEEPSEEK_API_KEY")
-client = DeepSeekClient(api_key=api_key)
-rag_engine = RAGEngine()
-job_analyzer = JobAnalyzer(client)
-cv_customizer = CVCustomizer(client)
-cover_letter_generator = CoverLetterGenerator(client)
-doc_builder = DocumentBuilder()
+client, async_client = create_llm_clients()
+job_analyzer = JobAnalyzer(client, async_client, store=SQLiteAnalysisStore.from_env())
+cv_customizer = CVCustomizer(client, async_client)
+cover_letter_generator = CoverLetterGenerator(client, async_client)
+pipeline = ApplicationPipeline(
+    job_analyzer,
+    cv_customizer,
+    cover_letter_generator,
+    rag_engine=RAGEngine(),
+    output_dir=OUTPUT_DIR,
+    rag_registry=RAGRegistry.from_env(),
+    dedupe_index=JobDedupeIndex.from_env(),
+)
+
+# Background job queue. Set JOB_WORKERS=0 on HTTP replicas when workers run
+# as a separate deployment (python worker.py).
+job_queue = SQLiteJobQueue.from_env()
+worker_pool = WorkerPool(job_queue, pipeline.run_job, concurrency=int(os.getenv("JOB_WORKERS", 2)))
+
+@app.on_event("startup")
+async def start_workers():
+    if worker_pool.concurrency > 0:
+        worker_pool.start()
+
+@app.on_event("shutdown")
+async def close_clients():
+    await worker_pool.stop()
+    await async_client.aclose()
+
+def load_master_profile() -> Dict[str, Any]:
+    """Load the master profile JSON file."""
+    with open("data/master_profile.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+# Addresses of reverse proxies that authenticate callers and forward their identity
+# in X-User-Id (comma-separated). Requests from anywhere else can't pick a user.
+TRUSTED_PROXIES = {host.strip() for host in os.getenv("API_TRUSTED_PROXIES", "").split(",") if host.strip()}
+
+def request_user(http_request: Request) -> Optional[str]:
+    """
+    The user a request is charged to (concurrency limits, token quotas).
+
+    X-User-Id is only honoured from a trusted proxy: any caller can set the
+    header, so trusting it directly would let them dodge their quota or spend
+    someone else's. Without it, the caller's address stands in for the user.
+    """
+    host = http_request.client.host if http_request.client else None
+    if host in TRUSTED_PROXIES:
+        forwarded = http_request.headers.get("X-Forwarded-For", "").split(",")[-1].strip()
+        return http_request.headers.get("X-User-Id") or forwarded or host
+    return host
+
+def quota_exceeded(e: QuotaExceededError) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(int(e.retry_after) + 1)})
 
 class JobRequest(BaseModel):
     job_description: str
 
+class BatchJobRequest(BaseModel):
+    job_descriptions: List[str]
+    max_concurrency: Optional[int] = None
+    min_match_score: Optional[float] = None
+
+# Upper bounds for /apply/batch (items per call, concurrent items)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 50))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", 4))
+
 @app.get("/")
 async def root():
     return {"status": "online", "message": "Agentic AI Job Platform API is healthy"}
 
 @app.post("/apply")
-async def process_application(request: JobRequest):
+async def process_application(request: JobRequest, http_request: Request):
     """
     End-to-end application workflow:
-    Analysis -> RAG Retrieval -> Customization -> Generation
+    Analysis -> (RAG Retrieval -> Customization | Cover Letter | Match Scoring) -> Generation
+
+    The response includes the LLM usage of the run ("usage"); callers over
+    their token quota get a 429.
     """
     try:
-        # 1. Analyze
-        analysis = job_analyzer.analyze(request.job_description)
-        
-        # 2. RAG Retrieval (Strategic Improvement)
-        keywords = analysis.get("keywords", {}).get("ats_keywords", [])
-        relevant_snippets = rag_engine.retrieve_relevant_experience(keywords)
-        
-        # 3. Customize with RAG context
-        import json
-        with open("data/master_profile.json", "r") as f:
-            profile = json.load(f)
-            
-        customized_cv = cv_customizer.customize(profile, analysis, relevant_snippets)
-        cover_letter = cover_letter_generator.generate(profile, analysis)
-
-        # 4. Generate Files with unique ID for download
-        import re
-        def sanitize(name): return re.sub(r'[<>:"/\\|?*]', '', str(name)).strip().replace(' ', '_')
-        
-        role = sanitize(analysis.get('role_info', {}).get('title', 'Job'))
-        company = sanitize(analysis.get('role_info', {}).get('company', 'Company'))
-        
-        # Use unique ID to prevent file conflicts
-        unique_id = str(uuid.uuid4())[:8]
-        
-        cv_filename = f"CV_{company}_{role}_{unique_id}.docx"
-        cl_filename = f"CL_{company}_{role}_{unique_id}.docx"
-        
-        cv_path = os.path.join(OUTPUT_DIR, cv_filename)
-        cl_path = os.path.join(OUTPUT_DIR, cl_filename)
-        
-        doc_builder.create_cv(customized_cv, cv_path)
-        doc_builder.create_cover_letter(cover_letter, profile, cl_path)
+        profile = load_master_profile()
+        result = await pipeline.run(request.job_description, profile, user_id=request_user(http_request))
 
         return {
             "success": True,
-            "analysis": analysis,
-            "files": {
-                "cv": cv_filename,
-                "cover_letter": cl_filename
-            },
-            "download_urls": {
-                "cv": f"/download/{cv_filename}",
-                "cover_letter": f"/download/{cl_filename}"
-            }
+            "analysis": result["analysis"],
+            "match_score": result["match_score"],
+            "files": result["files"],
+            "download_urls": download_urls(result["files"]),
+            "timings": result["timings"],
+            "usage": result["usage"]
         }
+    except QuotaExceededError as e:
+        raise quota_exceeded(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def format_sse(event: str, data: Any) -> str:
+    """Serialize one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/apply/stream")
+async def process_application_stream(request: JobRequest, http_request: Request):
+    """
+    Streaming variant of /apply using Server-Sent Events.
+
+    Emits "analysis_field" (each top-level field of the job analysis as soon as
+    the model closes it), "analysis", "rag_retrieval", "match_score", "cv", "cover_letter_delta"
+    (tokens as DeepSeek produces them), "cover_letter" and "documents" as each
+    stage finishes, then a final "done" event with the full /apply payload
+    (or "error").
+    """
+    try:
+        profile = load_master_profile()
+    except FileNotFoundError:
+        raise HTTPException(status_code=400, detail="No profile found. Please import your LinkedIn profile first.")
+
+    user_id = request_user(http_request)
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def on_event(event: str, data: Any) -> None:
+        await events.put((event, data))
+
+    async def run_pipeline() -> None:
+        try:
+            result = await pipeline.run(request.job_description, profile, on_event=on_event, user_id=user_id)
+            await events.put(("done", {
+                "success": True,
+                **result,
+                "download_urls": download_urls(result["files"])
+            }))
+        except Exception as e:
+            await events.put(("error", {"success": False, "error": str(e)}))
+
+    async def event_stream():
+        task = asyncio.create_task(run_pipeline())
+        try:
+            yield format_sse("started", {"success": True})
+            while True:
+                event, data = await events.get()
+                yield format_sse(event, data)
+                if event in ("done", "error"):
+                    break
+        finally:
+            # Client went away: stop spending tokens on its behalf
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/apply/batch")
+async def process_application_batch(request: BatchJobRequest, http_request: Request):
+    """
+    Apply to many job descriptions in one call.
+
+    The profile is loaded and the RAG index shared once for the whole batch;
+    items run with bounded concurrency. Results stream back as Server-Sent
+    Events: one "item" event per posting as it completes (failed postings
+    carry "success": false and an "error" without affecting the rest), then
+    a "done" summary with the batch's LLM usage. With min_match_score, postings are screened locally
+    first and low matches are reported as skipped without any LLM calls.
+    """
+    job_descriptions = [jd for jd in request.job_descriptions if jd and jd.strip()]
+    if not job_descriptions:
+        raise HTTPException(status_code=400, detail="No job descriptions provided")
+    if len(job_descriptions) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch too large (max {BATCH_MAX_ITEMS} job descriptions)")
+
+    try:
+        profile = load_master_profile()
+    except FileNotFoundError:
+        raise HTTPException(status_code=400, detail="No profile found. Please import your LinkedIn profile first.")
+
+    max_concurrency = min(request.max_concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+    user_id = request_user(http_request)
+
+    async def event_stream():
+        succeeded = 0
+        skipped = 0
+        yield format_sse("started", {"success": True, "total": len(job_descriptions)})
+        with usage_scope(user_id) as usage:
+            async for item in pipeline.run_batch(job_descriptions, profile, max_concurrency, request.min_match_score):
+                succeeded += item["success"]
+                skipped += item.get("skipped", False)
+                yield format_sse("item", item)
+        yield format_sse("done", {
+            "success": True,
+            "total": len(job_descriptions),
+            "succeeded": succeeded,
+            "skipped": skipped,
+            "failed": len(job_descriptions) - succeeded - skipped,
+            "usage": usage.summary()
+        })
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest, http_request: Request):
+    """
+    Queue an application for background processing.
+    Poll /jobs/{job_id} for status and fetch /jobs/{job_id}/result when done.
+    """
+    try:
+        profile = load_master_profile()
+    except FileNotFoundError:
+        raise HTTPException(status_code=400, detail="No profile found. Please import your LinkedIn profile first.")
+
+    user_id = request_user(http_request)
+    payload = {"job_description": request.job_description, "profile": profile, "user_id": user_id}
+
+    try:
+        job_id = await asyncio.to_thread(job_queue.submit, payload, user_id)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    return {
+        "success": True,
+        "job_id": job_id,
+        "status": "pending",
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result"
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Get the status of a queued application."""
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "error": job["error"]
+    }
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Get the result of a finished application (202 while still queued or running)."""
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job["status"] == STATUS_SUCCEEDED:
+        return {"success": True, "job_id": job_id, **job["result"]}
+    if job["status"] == STATUS_FAILED:
+        return {"success": False, "job_id": job_id, "error": job["error"]}
+    return JSONResponse(status_code=202, content={"success": False, "job_id": job_id, "status": job["status"]})
+
+@app.get("/jobs")
+async def job_queue_stats():
+    """Job counts per status."""
+    return await asyncio.to_thread(job_queue.stats)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """LLM response cache hit/miss counters, the latency/tokens saved and coalesced in-flight calls."""
+    flights = getattr(async_client, "flights", None)
+    coalescing = flights.stats() if flights is not None else None
+    if getattr(client, "cache", None) is None:
+        return {"enabled": False, "coalescing": coalescing}
+    return {"enabled": True, **client.cache.stats(), "coalescing": coalescing}
+
+@app.get("/metrics/usage")
+async def usage_metrics():
+    """LLM tokens, cost, latency and retries in total, per stage and per user since startup."""
+    return get_usage_tracker().snapshot()
+
+@app.get("/metrics/providers")
+async def provider_metrics():
+    """Per-provider request/error counts, health and latency histograms (with LLM_PROVIDERS set to several providers)."""
+    if not hasattr(client, "stats"):
+        return {"routing": False}
+    return {"routing": True, "providers": client.stats()}
+
 @app.get("/download/{filename}")
 async def download_file(filename: str):
     """Download generated CV or Cover Letter"""
@@ -137,12 +360,11 @@ async def import_linkedin_profile(request: LinkedInImportRequest):
     try:
         from utils.linkedin_scraper import import_from_linkedin_text
         
-        # Parse and save the profile
-        profile = import_from_linkedin_text(request.profile_text, client)
+        # Parse and save the profile (sync LLM call and file I/O, kept off the event loop)
+        profile = await asyncio.to_thread(import_from_linkedin_text, request.profile_text, client)
         
-        # Reinitialize RAG engine with new profile
-        global rag_engine
-        rag_engine = RAGEngine()
+        # Reinitialize RAG engine with new profile (unchanged snippets are reused from the on-disk index)
+        pipeline.rag_engine = await asyncio.to_thread(RAGEngine)
         
         return {
             "success": True,
@@ -161,9 +383,7 @@ async def import_linkedin_profile(request: LinkedInImportRequest):
 async def get_current_profile():
     """Get the current master profile"""
     try:
-        import json
-        with open("data/master_profile.json", "r") as f:
-            profile = json.load(f)
+        profile = load_master_profile()
         
         return {
             "success": True,
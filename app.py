@@ -7,11 +7,13 @@ import os
 import sys
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from flask import Flask, render_template, request, jsonify, send_file, flash, redirect, url_for
 from dotenv import load_dotenv
 from flask_login import LoginManager, login_user, logout_user, current_user, login_required
 from werkzeug.security import generate_password_hash, check_password_hash
-from models import init_db, Profile, User
+from models import init_db, on_profile_updated, JobAnalysisStore, Profile, User
 
 # Fix Windows console encoding for emojis
 if sys.platform == 'win32':
@@ -22,9 +24,14 @@ if sys.platform == 'win32':
         pass
 
 # Import our modular components
-from utils.deepseek_client import DeepSeekClient
+from utils.llm_router import create_llm_clients
 from utils.document_builder import DocumentBuilder
 from utils.match_calculator import MatchCalculator
+from utils.pipeline import StageTimer
+from utils.rag_registry import RAGRegistry
+from utils.hashing import profile_content_hash
+from utils.job_queue import SQLiteJobQueue, WorkerPool, QueueFullError, STATUS_SUCCEEDED, STATUS_FAILED
+from utils.usage import QuotaExceededError, usage_scope
 from agents.job_analyzer import JobAnalyzer
 from agents.cv_customizer import CVCustomizer
 from agents.cover_letter_generator import CoverLetterGenerator
@@ -60,6 +67,20 @@ job_analyzer = None
 cv_customizer = None
 cover_letter_generator = None
 
+# Background job queue shared with the API server and worker.py
+job_queue = SQLiteJobQueue.from_env()
+
+# Per-user RAG indexes built from each user's stored profile
+rag_registry = RAGRegistry.from_env()
+
+# Job analyses, shared by request handlers and the embedded job workers
+analysis_store = JobAnalysisStore(app=app)
+
+@on_profile_updated
+def invalidate_rag_index(profile_row: Profile) -> None:
+    """Drop the cached RAG index when a user saves their profile."""
+    rag_registry.invalidate(str(profile_row.user_id))
+
 def initialize_components():
     """Initialize all AI components."""
     global client, builder, match_calculator, job_analyzer, cv_customizer, cover_letter_generator
@@ -68,13 +89,19 @@ def initialize_components():
     if not api_key:
         raise ValueError("DEEPSEEK_API_KEY not found in environment variables")
     
-    client = DeepSeekClient(api_key=api_key)
+    client, _ = create_llm_clients()
     builder = DocumentBuilder()
     match_calculator = MatchCalculator()
-    job_analyzer = JobAnalyzer(client)
+    job_analyzer = JobAnalyzer(client, store=analysis_store)
     cv_customizer = CVCustomizer(client)
     cover_letter_generator = CoverLetterGenerator(client)
 
+def current_profile_row() -> Profile:
+    """Profile row of the logged-in user (or the singleton profile)."""
+    if current_user.is_authenticated:
+        return Profile.get_or_create_for_user(current_user.id)
+    return Profile.get_singleton_profile()
+
 def load_profile(path: str = "data/master_profile.json") -> dict:
     """
     Load the master profile.
@@ -84,10 +111,7 @@ def load_profile(path: str = "data/master_profile.json") -> dict:
     - If DB profile is empty but JSON file exists, import it once.
     """
     # 1. Try DB first
-    if current_user.is_authenticated:
-        profile_row = Profile.get_or_create_for_user(current_user.id)
-    else:
-        profile_row = Profile.get_singleton_profile()
+    profile_row = current_profile_row()
     data = profile_row.to_dict()
     if data:
         return data
@@ -133,59 +157,90 @@ def process_job():
     try:
         data = request.json
         job_description = data.get('job_description', '').strip()
-        
+
         if not job_description or len(job_description) < 50:
             return jsonify({
                 'success': False,
                 'error': 'Job description is too short. Please provide at least 50 characters.'
             }), 400
-        
+
         # Initialize components if not already done
         if client is None:
             initialize_components()
-        
-        # Load profile
-        profile = load_profile()
-        
-        # Analyze job
-        analysis = job_analyzer.analyze(job_description)
-        role_title = analysis.get('role_info', {}).get('title', 'Unknown Role')
-        company = analysis.get('role_info', {}).get('company', 'Unknown Company')
-        
-        # Calculate match score
-        match_data = match_calculator.calculate_match_score(profile, analysis)
-        
-        # Customize CV
-        customized_cv = cv_customizer.customize(profile, analysis)
-        
-        # Generate cover letter
-        cover_letter_text = cover_letter_generator.generate(profile, analysis)
-        
-        # Generate documents
-        os.makedirs("output", exist_ok=True)
-        safe_title = sanitize_filename(role_title)
-        safe_company = sanitize_filename(company)
-        
-        cv_filename = f"output/CV_{safe_company}_{safe_title}.docx"
-        cl_filename = f"output/CL_{safe_company}_{safe_title}.docx"
-        
-        # Create documents (reuse builder but create new instances for each)
-        cv_builder = DocumentBuilder()
-        cv_builder.create_cv(customized_cv, cv_filename)
-        
-        cl_builder = DocumentBuilder()
-        cl_builder.create_cover_letter(cover_letter_text, profile, cl_filename)
-        
+
+        with usage_scope(current_user.id) as usage:
+            # Load profile; its content hash keys the cached match-scoring features,
+            # whether it came from the database or the JSON file
+            profile = load_profile()
+            profile_version = profile_content_hash(profile)
+
+            timer = StageTimer()
+
+            # Analyze job
+            with timer.stage("analysis"):
+                analysis = job_analyzer.analyze(job_description)
+            role_title = analysis.get('role_info', {}).get('title', 'Unknown Role')
+            company = analysis.get('role_info', {}).get('company', 'Unknown Company')
+
+            # Match score, CV customization and cover letter only depend on the
+            # profile and the analysis, so run them concurrently
+            def timed(stage, func, *args):
+                with timer.stage(stage):
+                    return func(*args)
+
+            # current_user is request-bound, so resolve the user's index key here
+            user_key = str(current_user.id)
+
+            def tailor_cv():
+                with timer.stage("rag_retrieval"):
+                    keywords = analysis.get('keywords', {}).get('ats_keywords', [])
+                    relevant_snippets = rag_registry.get(user_key, profile).retrieve_relevant_experience(keywords)
+                with timer.stage("cv_customization"):
+                    return cv_customizer.customize(profile, analysis, relevant_snippets)
+
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                # Executor threads don't inherit context variables; copy them so
+                # LLM usage is still attributed to this request and user
+                match_future = executor.submit(copy_context().run, timed, "match_scoring", match_calculator.calculate_match_score, profile, analysis, profile_version)
+                cv_future = executor.submit(copy_context().run, tailor_cv)
+                cl_future = executor.submit(copy_context().run, timed, "cover_letter", cover_letter_generator.generate, profile, analysis)
+                match_data = match_future.result()
+                customized_cv = cv_future.result()
+                cover_letter_text = cl_future.result()
+
+            # Generate documents
+            os.makedirs("output", exist_ok=True)
+            safe_title = sanitize_filename(role_title)
+            safe_company = sanitize_filename(company)
+
+            cv_filename = f"output/CV_{safe_company}_{safe_title}.docx"
+            cl_filename = f"output/CL_{safe_company}_{safe_title}.docx"
+
+            # Create documents (reuse builder but create new instances for each)
+            with timer.stage("documents"):
+                cv_builder = DocumentBuilder()
+                cv_builder.create_cv(customized_cv, cv_filename)
+
+                cl_builder = DocumentBuilder()
+                cl_builder.create_cover_letter(cover_letter_text, profile, cl_filename)
+
+            return jsonify({
+                'success': True,
+                'role_title': role_title,
+                'company': company,
+                'match_score': match_data,
+                'cv_file': cv_filename,
+                'cover_letter_file': cl_filename,
+                'analysis': analysis,
+                'timings': timer.report(),
+                'usage': usage.summary()
+            })
+
+    except QuotaExceededError as e:
         return jsonify({
-            'success': True,
-            'role_title': role_title,
-            'company': company,
-            'match_score': match_data,
-            'cv_file': cv_filename,
-            'cover_letter_file': cl_filename,
-            'analysis': analysis
-        })
-        
+            'success': False,
+            'error': str(e)
+        }), 429
     except ValueError as e:
         return jsonify({
             'success': False,
@@ -197,6 +252,56 @@ def process_job():
             'error': f'Processing error: {str(e)}'
         }), 500
 
+@app.route('/api/jobs', methods=['POST'])
+@login_required
+def submit_job():
+    """Queue a job description for background processing."""
+    data = request.json or {}
+    job_description = data.get('job_description', '').strip()
+
+    if not job_description or len(job_description) < 50:
+        return jsonify({
+            'success': False,
+            'error': 'Job description is too short. Please provide at least 50 characters.'
+        }), 400
+
+    # Snapshot the profile now so workers never need DB access; the worker
+    # retrieves from this user's own RAG index (see ApplicationPipeline.run_job).
+    user_id = str(current_user.id)
+    payload = {'job_description': job_description, 'profile': load_profile(), 'user_id': user_id}
+
+    try:
+        job_id = job_queue.submit(payload, user_id=user_id)
+    except QueueFullError as e:
+        return jsonify({'success': False, 'error': str(e)}), 429
+
+    return jsonify({'success': True, 'job_id': job_id, 'status': 'pending'}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_job(job_id):
+    """Get status (and result once finished) of a queued job."""
+    job = job_queue.get(job_id)
+    if not job or job['user_id'] != str(current_user.id):
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+
+    response = {'success': True, 'job_id': job_id, 'status': job['status']}
+    if job['status'] == STATUS_SUCCEEDED:
+        result = job['result']
+        analysis = result['analysis']
+        response.update({
+            'role_title': analysis.get('role_info', {}).get('title', 'Unknown Role'),
+            'company': analysis.get('role_info', {}).get('company', 'Unknown Company'),
+            'match_score': result['match_score'],
+            'cv_file': f"output/{result['files']['cv']}",
+            'cover_letter_file': f"output/{result['files']['cover_letter']}",
+            'analysis': analysis,
+            'timings': result['timings']
+        })
+    elif job['status'] == STATUS_FAILED:
+        response.update({'success': False, 'error': job['error']})
+    return jsonify(response)
+
 @app.route('/api/download/<path:filename>')
 def download_file(filename):
     """Download generated files."""
@@ -238,11 +343,7 @@ def update_profile():
         if not profile_data.get('personal_info', {}).get('name'):
             return jsonify({'success': False, 'error': 'Name is required'}), 400
 
-        if current_user.is_authenticated:
-            profile_row = Profile.get_or_create_for_user(current_user.id)
-        else:
-            profile_row = Profile.get_singleton_profile()
-        profile_row.update_from_dict(profile_data)
+        current_profile_row().update_from_dict(profile_data)
 
         return jsonify({'success': True, 'message': 'Profile updated successfully'})
     except Exception as e:
@@ -307,6 +408,15 @@ if __name__ == '__main__':
     except Exception as e:
         print(f"⚠️  Warning: Could not initialize components: {e}")
         print("💡 Make sure DEEPSEEK_API_KEY is set in .env file")
+
+    # Optional embedded job workers (otherwise run `python worker.py`).
+    # Only start them in the reloader child so they don't run twice in debug mode.
+    job_workers = int(os.getenv("JOB_WORKERS", 0))
+    if job_workers > 0 and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        from worker import build_pipeline
+        # Share the app's RAG indexes (so profile saves invalidate them) and analysis store
+        embedded_pipeline = build_pipeline(rag_registry=rag_registry, analysis_store=analysis_store)
+        WorkerPool(job_queue, embedded_pipeline.run_job, concurrency=job_workers).start_in_thread()
     
     print("\n🚀 Starting Flask web server...")
     print("📱 Open your browser and go to: http://localhost:5000")
@@ -0,0 +1,118 @@
+"""
+Job Dedupe Benchmark
+Measures near-duplicate lookups in JobDedupeIndex (MinHash + LSH in SQLite)
+with hundreds of thousands of stored postings, and compares them with a
+brute-force scan over all signatures.
+
+Run with: python benchmark_dedupe.py [--postings 200000] [--queries 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from utils.job_dedupe import JobDedupeIndex, shingle_hashes
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+TITLES = ["Backend Engineer", "Data Scientist", "Platform Engineer", "Frontend Developer", "ML Engineer", "SRE"]
+SKILLS = [
+    "Python", "Go", "Java", "Kubernetes", "Docker", "AWS", "GCP", "Terraform", "React", "TypeScript",
+    "PostgreSQL", "Redis", "Kafka", "Spark", "Airflow", "TensorFlow", "PyTorch", "FastAPI", "Django", "GraphQL",
+]
+WORDS = (
+    "build maintain design scalable services teams product customers data platform reliable "
+    "collaborate ownership mentor review code quality deliver features roadmap growth remote hybrid "
+    "office benefits equity salary health learning budget flexible hours mission impact"
+).split()
+
+
+def synthetic_posting(rng: random.Random, n: int) -> str:
+    """A short, unique job posting."""
+    lines = [f"{rng.choice(TITLES)} at Company {n}", f"Location: City {rng.randint(1, 500)}", "Requirements:"]
+    lines += [f"- {rng.randint(2, 8)}+ years with {' and '.join(rng.sample(SKILLS, 2))}" for _ in range(4)]
+    lines.append(" ".join(rng.choice(WORDS) for _ in range(60)))
+    return "\n".join(lines)
+
+
+def role_analysis(text: str) -> dict:
+    """The part of a job analysis near-duplicates are checked against (title and company)."""
+    title, company = text.split("\n", 1)[0].split(" at ")
+    return {"role_info": {"title": title, "company": company}}
+
+
+def reworded(rng: random.Random, text: str, edits: int = 2) -> str:
+    """The same posting as another job board might show it: reformatted with a few words changed (not the role)."""
+    words = text.replace("- ", "* ").split()
+    role_words = len(text.split("\n", 1)[0].split())
+    for i in rng.sample(range(role_words, len(words)), edits):
+        words[i] = rng.choice(WORDS)
+    return " ".join(words).upper()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--postings", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = JobDedupeIndex(os.path.join(tmp, "dedupe.sqlite"))
+        postings = []
+
+        start = time.perf_counter()
+        for chunk_start in range(0, args.postings, 10000):
+            chunk = [synthetic_posting(rng, n) for n in range(chunk_start, min(chunk_start + 10000, args.postings))]
+            postings += rng.sample(chunk, min(len(chunk), args.queries))
+            index.add_many([(text, role_analysis(text)) for text in chunk])
+        build_time = time.perf_counter() - start
+        stats = index.stats()
+        size = os.path.getsize(os.path.join(tmp, "dedupe.sqlite"))
+        print(f"📊 Stored {stats['postings']} postings in {build_time:.1f} s ({size / 1024 / 1024:.0f} MB, "
+              f"{stats['bands']} bands x {stats['rows']} rows)")
+
+        originals = rng.sample(postings, args.queries)
+        duplicates = [reworded(rng, text) for text in originals]
+        above = sum(
+            len(a & b) / len(a | b) >= index.threshold
+            for a, b in ((set(shingle_hashes(o)), set(shingle_hashes(d))) for o, d in zip(originals, duplicates))
+        )
+        fresh = [synthetic_posting(rng, args.postings + n) for n in range(args.queries)]
+
+        start = time.perf_counter()
+        found = sum(index.find(text) is not None for text in duplicates)
+        dup_time = time.perf_counter() - start
+        start = time.perf_counter()
+        false_hits = sum(index.find(text) is not None for text in fresh)
+        fresh_time = time.perf_counter() - start
+
+        print(f"♻️  Near-duplicates found: {found}/{args.queries}, {above} at or above the threshold by exact Jaccard "
+              f"({dup_time / args.queries * 1000:.2f} ms/lookup)")
+        print(f"🆕 New postings flagged:  {false_hits}/{args.queries} ({fresh_time / args.queries * 1000:.2f} ms/lookup)")
+
+        # Brute force: compare against every stored signature
+        conn = index._conn()
+        signatures = np.frombuffer(
+            b"".join(row[0] for row in conn.execute("SELECT signature FROM job_postings")), dtype=np.uint32
+        ).reshape(stats["postings"], -1)
+        queries = [index.hasher.signature(text) for text in duplicates[:20]]
+        start = time.perf_counter()
+        for signature in queries:
+            index.hasher.similarity(signature, signatures).argmax()
+        brute_time = (time.perf_counter() - start) / len(queries)
+        print(f"🐢 Brute-force scan (signatures already in memory): {brute_time * 1000:.2f} ms/lookup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Offline Load Test
+Runs many concurrent applications through the full ApplicationPipeline against
+the local fake LLM server (or any OpenAI-compatible --base-url, e.g. a replay
+server), reporting end-to-end latency, throughput, errors and LLM usage
+including prompt-cache hits. No DeepSeek credits are spent.
+
+Run with: python benchmark_load.py [--requests 200] [--concurrency 20] [--latency lognormal:0.8,0.5]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from utils.fake_llm_server import FakeLLMServer
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+TITLES = ["Backend Engineer", "Platform Engineer", "Data Engineer", "ML Engineer", "Site Reliability Engineer", "Full Stack Developer"]
+COMPANIES = ["TechNova", "Acme Cloud", "DataWorks", "Nimbus Labs", "Orbital AI", "Bluefin Systems"]
+SKILLS = [
+    "Python", "Go", "Java", "Kubernetes", "Docker", "AWS", "GCP", "Terraform", "React", "TypeScript",
+    "PostgreSQL", "Redis", "Kafka", "Spark", "Airflow", "TensorFlow", "PyTorch", "FastAPI", "Django", "GraphQL",
+]
+
+
+def make_postings(count: int, duplicates: float, rng: random.Random) -> list:
+    """Synthetic job postings; a `duplicates` share repeats an earlier posting verbatim."""
+    postings = []
+    for index in range(count):
+        if postings and rng.random() < duplicates:
+            postings.append(rng.choice(postings))
+            continue
+        must, nice = rng.sample(SKILLS, 5), rng.sample(SKILLS, 3)
+        postings.append(
+            f"Job Title: {rng.choice(TITLES)}\n"
+            f"Company: {rng.choice(COMPANIES)}\n"
+            f"Location: Remote\n\n"
+            f"About the role (ref {index}):\n"
+            f"We are looking for a senior engineer with {rng.randint(2, 8)}+ years of experience.\n\n"
+            f"Requirements:\n" + "".join(f"- Experience with {skill}\n" for skill in must) +
+            f"\nNice to have:\n" + "".join(f"- {skill}\n" for skill in nice)
+        )
+    return postings
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+async def run_load(args, base_url: str, output_dir: str) -> dict:
+    os.environ["DEEPSEEK_BASE_URL"] = base_url
+    os.environ.setdefault("DEEPSEEK_API_KEY", "fake-key")
+    os.environ["LLM_PROVIDERS"] = "deepseek"
+    os.environ["LLM_CACHE_BACKEND"] = args.cache
+    os.environ["JOB_ANALYSIS_STORE"] = "none"
+    os.environ["JOB_DEDUPE"] = "0"
+
+    from agents.cover_letter_generator import CoverLetterGenerator
+    from agents.cv_customizer import CVCustomizer
+    from agents.job_analyzer import JobAnalyzer
+    from utils.llm_router import create_llm_clients
+    from utils.pipeline import ApplicationPipeline
+    from utils.rag_engine import RAGEngine
+    from utils.usage import usage_scope
+
+    client, async_client = create_llm_clients()
+    pipeline = ApplicationPipeline(
+        JobAnalyzer(client, async_client, store=None),
+        CVCustomizer(client, async_client),
+        CoverLetterGenerator(client, async_client),
+        rag_engine=RAGEngine(),
+        output_dir=output_dir,
+    )
+    with open("data/master_profile.json", "r", encoding="utf-8") as f:
+        profile = json.load(f)
+
+    postings = make_postings(args.requests, args.duplicates, random.Random(args.seed))
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, errors = [], []
+
+    async def ignore_event(event, data):
+        pass
+
+    async def apply(posting: str) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await pipeline.run(posting, profile, on_event=ignore_event if args.stream else None)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(type(e).__name__)
+
+    started = time.perf_counter()
+    with usage_scope("load-test") as usage:
+        await asyncio.gather(*(apply(posting) for posting in postings))
+    elapsed = time.perf_counter() - started
+    await async_client.aclose()
+    return {"elapsed": elapsed, "latencies": latencies, "errors": errors, "usage": usage.summary()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=100, help="Applications to run")
+    parser.add_argument("--concurrency", type=int, default=10, help="Applications in flight at once")
+    parser.add_argument("--duplicates", type=float, default=0.1, help="Share of postings repeating an earlier one")
+    parser.add_argument("--latency", default="lognormal:0.5,0.4", help="Fake LLM time to first token (see utils/fake_llm_server.py)")
+    parser.add_argument("--chunk-delay", type=float, default=0.002, help="Fake LLM seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake LLM share of HTTP 500s")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fake LLM share of HTTP 429s")
+    parser.add_argument("--cache", default="none", choices=["none", "memory"], help="LLM response cache backend")
+    parser.add_argument("--stream", action="store_true", help="Stream stage events (as /apply/stream does)")
+    parser.add_argument("--base-url", help="Use this OpenAI-compatible server instead of starting a fake one")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own logging")
+    args = parser.parse_args()
+
+    server = None
+    if args.base_url is None:
+        server = FakeLLMServer(
+            latency=args.latency,
+            chunk_delay=args.chunk_delay,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+            retry_after=0.5,
+            seed=args.seed,
+        ).start()
+    base_url = args.base_url or server.url
+    print(f"🧪 {args.requests} applications, {args.concurrency} concurrent, LLM at {base_url}")
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        try:
+            with quiet:
+                result = asyncio.run(run_load(args, base_url, output_dir))
+        finally:
+            if server is not None:
+                server.stop()
+
+    latencies, usage = result["latencies"], result["usage"]
+    print(f"⏱️  Wall time:       {result['elapsed']:8.2f} s  ({len(latencies) / result['elapsed']:.2f} applications/s)")
+    print(f"📈 Latency p50/p95: {percentile(latencies, 0.5):8.2f} / {percentile(latencies, 0.95):.2f} s  (max {max(latencies, default=0):.2f} s)")
+    print(f"❌ Errors:          {len(result['errors'])}" + (f"  {sorted(set(result['errors']))}" if result["errors"] else ""))
+    print(f"🤖 LLM calls:       {usage['calls']} ({usage['cache_hits']} served by cache or coalescing, {usage['retries']} retries)")
+    print(f"🔢 Tokens:          {usage['prompt_tokens']} prompt ({usage['cached_tokens']} prefix-cached, "
+          f"{usage['prompt_cache_hit_rate']:.0%}) + {usage['completion_tokens']} completion")
+    print(f"💵 Estimated cost:  ${usage['cost_usd']:.4f}")
+    if server is not None:
+        stats = server.stats()
+        print(f"🖥️  Fake server:     {stats['requests']} requests, {stats['streams']} streamed, "
+              f"{stats['rate_limited']} rate-limited, {stats['errors_injected']} failed")
+    for stage, totals in sorted(usage["by_stage"].items()):
+        print(f"   • {stage:22s} {totals['calls']:5d} calls  {totals['latency'] / max(totals['calls'], 1):6.2f} s avg  "
+              f"{totals['prompt_cache_hit_rate']:.0%} prefix-cached")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Match Scoring Microbenchmark
+Compares the inverted-index MatchCalculator._count_matches with the original pairwise scan,
+and batch ranking (rank_jobs) with one calculate_match_score call per job.
+
+Run with: python benchmark_match.py [--candidates 5000] [--required 200] [--jobs 5000]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from utils.match_calculator import MatchCalculator, TokenIndex
+from test_match_calculator import legacy_count_matches
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+
+def best_of(repeats: int, func, *args) -> float:
+    """Fastest wall time of several runs, in seconds."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--candidates", type=int, default=5000, help="Candidate skills/keywords in the profile")
+    parser.add_argument("--required", type=int, default=200, help="Required skills/keywords in the job")
+    parser.add_argument("--jobs", type=int, default=5000, help="Job analyses ranked in the batch benchmark")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    vocabulary = [f"term{i}" for i in range(args.candidates * 2)]
+    candidate = {" ".join(rng.sample(vocabulary, rng.randint(1, 3))) for _ in range(args.candidates)}
+    # Mostly misses, the worst case for the pairwise scan
+    required = {" ".join(rng.sample(vocabulary, rng.randint(1, 2))) for _ in range(args.required)}
+
+    calculator = MatchCalculator()
+    assert calculator._count_matches(required, candidate) == legacy_count_matches(required, candidate)
+
+    legacy_time = best_of(args.repeats, legacy_count_matches, required, candidate)
+    indexed_time = best_of(args.repeats, calculator._count_matches, required, candidate)
+    index = TokenIndex(candidate)
+    lookup_time = best_of(args.repeats, calculator._count_matches, required, index)
+
+    print(f"📊 {len(required)} required items vs {len(candidate)} candidate items")
+    print(f"🐢 Pairwise scan:              {legacy_time * 1000:9.2f} ms")
+    print(f"⚡ Token index (incl. build):  {indexed_time * 1000:9.2f} ms  ({legacy_time / indexed_time:.0f}x)")
+    print(f"🎯 Token index (prebuilt):    {lookup_time * 1000:9.2f} ms  ({legacy_time / lookup_time:.0f}x)")
+
+    # Batch ranking of one profile against a feed of analyzed postings
+    with open("data/master_profile.json", "r", encoding="utf-8") as f:
+        profile = json.load(f)
+    skills = [f"skill {i}" for i in range(300)] + ["python", "redis", "cloud architecture", "agile", "java"]
+    analyses = [
+        {
+            "requirements": {
+                "must_have_skills": rng.sample(skills, rng.randint(3, 10)),
+                "nice_to_have_skills": rng.sample(skills, rng.randint(0, 6)),
+            },
+            "keywords": {"ats_keywords": rng.sample(skills, rng.randint(5, 20))},
+        }
+        for _ in range(args.jobs)
+    ]
+
+    def score_each():
+        scores = [calculator.calculate_match_score(profile, a) for a in analyses]
+        return sorted(range(len(scores)), key=lambda i: -scores[i]['overall_score'])
+
+    loop_time = best_of(1, score_each)
+    batch_time = best_of(args.repeats, calculator.rank_jobs, profile, analyses)
+    top_time = best_of(args.repeats, calculator.rank_jobs, profile, analyses, 20)
+
+    print(f"\n📊 Ranking {args.jobs} jobs against one profile")
+    print(f"🐢 calculate_match_score per job: {loop_time * 1000:9.2f} ms")
+    print(f"⚡ rank_jobs (all breakdowns):    {batch_time * 1000:9.2f} ms  ({loop_time / batch_time:.0f}x)")
+    print(f"🎯 rank_jobs (top 20 breakdowns): {top_time * 1000:9.2f} ms  ({loop_time / top_time:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
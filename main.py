@@ -8,7 +8,8 @@ Role: Coordinate the workflow between JobAnalyzer, CVCustomizer, and DocumentBui
 import os
 import sys
 import json
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
 from dotenv import load_dotenv
 
 # Fix Windows console encoding for emojis
@@ -20,13 +21,16 @@ if sys.platform == 'win32':
         pass
 
 # Import our modular components
-from utils.deepseek_client import DeepSeekClient
+from utils.llm_router import create_llm_clients
 from utils.document_builder import DocumentBuilder
 from utils.match_calculator import MatchCalculator
 from agents.job_analyzer import JobAnalyzer
 from agents.cv_customizer import CVCustomizer
 from agents.cover_letter_generator import CoverLetterGenerator
+from utils.analysis_store import SQLiteAnalysisStore
 from utils.rag_engine import RAGEngine
+from utils.pipeline import StageTimer, sanitize_filename
+from utils.skill_ontology import get_skill_ontology
 
 # Load environment variables
 load_dotenv()
@@ -80,17 +84,10 @@ def calculate_match_score(customized_cv: Dict[str, Any], job_keywords: List[str]
         cv_text += f"{role.get('title', '')} "
         cv_text += " ".join(role.get('achievements', [])) + " "
     
-    cv_text = cv_text.lower()
-    
-    # 2. Count matches
-    matched = []
-    missing = []
-    
-    for kw in job_keywords:
-        if kw.lower() in cv_text:
-            matched.append(kw)
-        else:
-            missing.append(kw)
+    # 2. Count matches (skills match through their aliases, other keywords as whole words)
+    found = get_skill_ontology().match_terms(job_keywords, cv_text)
+    matched = [kw for kw in job_keywords if kw in found]
+    missing = [kw for kw in job_keywords if kw not in found]
             
     total = len(job_keywords)
     score = (len(matched) / total * 100) if total > 0 else 0
@@ -134,12 +131,12 @@ def main():
         return
 
     try:
-        client = DeepSeekClient(api_key=api_key)
+        client, _ = create_llm_clients()
         builder = DocumentBuilder()
         match_calculator = MatchCalculator()
         
         # Initialize Agents
-        job_analyzer = JobAnalyzer(client)
+        job_analyzer = JobAnalyzer(client, store=SQLiteAnalysisStore.from_env())
         cv_customizer = CVCustomizer(client)
         cover_letter_generator = CoverLetterGenerator(client)
         rag_engine = RAGEngine()
@@ -155,8 +152,10 @@ def main():
             print("⚠️  Warning: Job description seems too short. Results may be poor.")
 
         # 4. Analyze Job
+        timer = StageTimer()
         print("\n🔍 Phase 1: Analyzing Job Description...")
-        analysis = job_analyzer.analyze(job_description)
+        with timer.stage("analysis"):
+            analysis = job_analyzer.analyze(job_description)
         # Debug print
         # print(json.dumps(analysis, indent=2))
         
@@ -164,36 +163,40 @@ def main():
         company = analysis.get('role_info', {}).get('company', 'Unknown Company')
         print(f"✅ Job Analyzed: {role_title} at {company}")
         
-        # 4.5. RAG Retrieval (New Strategic Improvement)
-        print("\n🔍 Phase 1.5: Retrieving Relevant Contexts (RAG)...")
-        keywords = analysis.get("keywords", {}).get("ats_keywords", [])
-        relevant_snippets = rag_engine.retrieve_relevant_experience(keywords)
-        
-        # 5. Customize CV
-        print("\n🎨 Phase 2: Customizing CV...")
-        customized_cv = cv_customizer.customize(profile, analysis, relevant_snippets)
+        # 4.5 - 6. RAG Retrieval + CV customization and Cover Letter run concurrently,
+        # both only depend on the profile and the analysis
+        def tailor_cv() -> Dict[str, Any]:
+            with timer.stage("rag_retrieval"):
+                keywords = analysis.get("keywords", {}).get("ats_keywords", [])
+                relevant_snippets = rag_engine.retrieve_relevant_experience(keywords)
+            with timer.stage("cv_customization"):
+                return cv_customizer.customize(profile, analysis, relevant_snippets)
+
+        def write_cover_letter() -> str:
+            with timer.stage("cover_letter"):
+                return cover_letter_generator.generate(profile, analysis)
+
+        print("\n🎨 Phase 2: Customizing CV and Writing Cover Letter (in parallel)...")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            cv_future = executor.submit(tailor_cv)
+            cl_future = executor.submit(write_cover_letter)
+            customized_cv = cv_future.result()
+            cover_letter_text = cl_future.result()
         print("✅ CV content customized for ATS optimization.")
+        print("✅ Cover letter written.")
 
         # 5.1 Calculate Match Score (New Validation Step)
-        job_keywords = analysis.get("keywords", {}).get("ats_keywords", [])
-        match_metrics = calculate_match_score(customized_cv, job_keywords)
+        with timer.stage("match_scoring"):
+            job_keywords = analysis.get("keywords", {}).get("ats_keywords", [])
+            match_metrics = calculate_match_score(customized_cv, job_keywords)
         print(f"\n📊 ATS Match Score: {match_metrics['score']}%")
         print(f"   🔑 Keywords Matched: {match_metrics['matched_count']}/{match_metrics['total']}")
         
         if match_metrics['score'] < 70:
             print(f"   ⚠️  Warning: Lower match score. Consider adding more details to your master profile.")
         
-        # 6. Generate Information
-        print("\n✍️  Phase 3: Writing Cover Letter...")
-        cover_letter_text = cover_letter_generator.generate(profile, analysis)
-
         # 7. Generate Documents
-        print("\n📄 Phase 4: Generating Documents...")
-        # Sanitize filename for Windows
-        import re
-        def sanitize_filename(name):
-            return re.sub(r'[<>:"/\\|?*]', '', name).strip().replace(' ', '_')
-
+        print("\n📄 Phase 3: Generating Documents...")
         safe_title = sanitize_filename(role_title)
         safe_company = sanitize_filename(company)
         
@@ -203,15 +206,17 @@ def main():
         cv_filename = f"output/CV_{safe_company}_{safe_title}.docx"
         cl_filename = f"output/CL_{safe_company}_{safe_title}.docx"
         
-        # Save CV
-        builder.create_cv(customized_cv, cv_filename)
-        # Save Cover Letter
-        builder.create_cover_letter(cover_letter_text, profile, cl_filename)
+        with timer.stage("documents"):
+            # Save CV
+            builder.create_cv(customized_cv, cv_filename)
+            # Save Cover Letter
+            builder.create_cover_letter(cover_letter_text, profile, cl_filename)
         
         print(f"\n✨ SUCCESS!")
         print(f"   1. CV: {cv_filename}")
         print(f"   2. Cover Letter: {cl_filename}")
         print("   Good luck with your application! 🚀")
+        print("\n⏱️  Stage timings (s): " + ", ".join(f"{k}={v}" for k, v in timer.report().items()))
 
     except Exception as e:
         print(f"\n❌ An error occurred during the process: {e}")
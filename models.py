@@ -6,14 +6,26 @@ Currently: single-user-friendly (no auth yet), but structured for future multi-u
 from __future__ import annotations
 
 import os
-from datetime import datetime
-from typing import Any, Dict
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 
+from utils.analysis_store import AnalysisStore
+
 db = SQLAlchemy()
 
+# Called with the Profile after update_from_dict commits (e.g. to drop cached RAG indexes)
+_profile_update_listeners: List[Callable[["Profile"], None]] = []
+
+
+def on_profile_updated(listener: Callable[["Profile"], None]) -> Callable[["Profile"], None]:
+    """Register a callback run after a profile update is committed."""
+    _profile_update_listeners.append(listener)
+    return listener
+
 
 class User(UserMixin, db.Model):
     """User account model for authentication."""
@@ -90,6 +102,99 @@ class Profile(db.Model):
         self.data = new_data
         db.session.add(self)
         db.session.commit()
+        for listener in _profile_update_listeners:
+            listener(self)
+
+
+class JobAnalysis(db.Model):
+    """Job analysis keyed by the hash of the normalized job description (see utils.hashing.job_text_hash)."""
+
+    __tablename__ = "job_analyses"
+
+    id = db.Column(db.Integer, primary_key=True)
+    text_hash = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    title = db.Column(db.String(255), nullable=True, index=True)
+    company = db.Column(db.String(255), nullable=True, index=True)
+    data = db.Column(db.JSON, nullable=False, default=dict)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)
+
+    @staticmethod
+    def _live():
+        """Filter for rows that have not expired."""
+        return db.or_(JobAnalysis.expires_at.is_(None), JobAnalysis.expires_at > datetime.utcnow())
+
+    @classmethod
+    def get_many(cls, text_hashes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        text_hashes = list(set(text_hashes))
+        if not text_hashes:
+            return {}
+        rows = cls.query.filter(cls.text_hash.in_(text_hashes), cls._live()).all()
+        return {row.text_hash: row.data for row in rows}
+
+    @classmethod
+    def put(cls, text_hash: str, analysis: Dict[str, Any], ttl: Optional[float] = None) -> "JobAnalysis":
+        role_info = analysis.get("role_info") or {}
+        row = cls.query.filter_by(text_hash=text_hash).first() or cls(text_hash=text_hash)
+        row.title = role_info.get("title") if role_info.get("title") != "Unknown" else None
+        row.company = role_info.get("company") if role_info.get("company") != "Unknown" else None
+        row.data = analysis
+        row.created_at = datetime.utcnow()
+        row.expires_at = row.created_at + timedelta(seconds=ttl) if ttl else None
+        db.session.add(row)
+        db.session.commit()
+        return row
+
+    @classmethod
+    def purge_expired(cls) -> int:
+        removed = cls.query.filter(cls.expires_at.isnot(None), cls.expires_at <= datetime.utcnow()).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+        return removed
+
+
+class JobAnalysisStore(AnalysisStore):
+    """
+    AnalysisStore on the JobAnalysis table, for the Flask app.
+
+    Needs an app context; pass the app to use the store outside requests
+    (e.g. from the embedded job workers' threads).
+    """
+
+    def __init__(self, ttl: Optional[float] = None, app=None):
+        """
+        Args:
+            ttl: Entry lifetime in seconds (default: JOB_ANALYSIS_TTL or 30 days; 0 disables expiry)
+            app: Flask app whose context each call runs in (default: the current one)
+        """
+        self.ttl = ttl if ttl is not None else float(os.getenv("JOB_ANALYSIS_TTL", 30 * 24 * 3600)) or None
+        self.app = app
+
+    def _context(self):
+        return self.app.app_context() if self.app is not None else nullcontext()
+
+    def get_many(self, text_hashes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        with self._context():
+            return JobAnalysis.get_many(text_hashes)
+
+    def put(self, text_hash: str, analysis: Dict[str, Any]) -> None:
+        with self._context():
+            JobAnalysis.put(text_hash, analysis, ttl=self.ttl)
+
+    def find(self, company: Optional[str] = None, title: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._context():
+            query = JobAnalysis.query.filter(JobAnalysis._live())
+            if company is not None:
+                query = query.filter(JobAnalysis.company == company)
+            if title is not None:
+                query = query.filter(JobAnalysis.title == title)
+            return [row.data for row in query.order_by(JobAnalysis.created_at.desc()).limit(limit)]
+
+    def purge_expired(self) -> int:
+        with self._context():
+            return JobAnalysis.purge_expired()
 
 
 def init_db(app) -> None:
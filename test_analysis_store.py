@@ -0,0 +1,160 @@
+"""
+Tests for the job analysis store (SQLite file and JobAnalysis model), its use in
+JobAnalyzer and sharing it with the worker pipeline.
+
+Run with: python -m pytest test_analysis_store.py  (or python test_analysis_store.py)
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from flask import Flask
+
+from agents.job_analyzer import JobAnalyzer
+from models import db, JobAnalysisStore
+from utils.analysis_store import SQLiteAnalysisStore
+from utils.hashing import job_text_hash
+from utils.rag_registry import RAGRegistry
+from worker import build_pipeline
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+ANALYSIS = {
+    "role_info": {"title": "Senior Python Developer", "company": "FutureTech AI", "location": "Remote", "level": "Senior"},
+    "requirements": {"must_have_skills": ["Python"], "nice_to_have_skills": [], "education": None, "years_experience": "5+ years"},
+    "keywords": {"ats_keywords": ["Python", "FastAPI"], "soft_skills": []},
+    "summary": "Backend role.",
+}
+POSTING = "Senior Python Developer\nCompany: FutureTech AI\nBuild REST APIs with FastAPI."
+
+
+class CountingClient:
+    """Stands in for DeepSeekClient and counts API calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_json(self, *args, **kwargs):
+        self.calls += 1
+        return dict(ANALYSIS)
+
+
+def check_store(store):
+    first, second = job_text_hash("Job A"), job_text_hash("Job B")
+    store.put(first, ANALYSIS)
+    assert store.get(first) == ANALYSIS
+    assert store.get(second) is None
+    assert store.get_many([first, second, first]) == {first: ANALYSIS}
+    assert store.find(company="FutureTech AI") == [ANALYSIS]
+    assert store.find(title="Senior Python Developer", company="Other") == []
+
+
+def test_normalized_text_hash():
+    assert job_text_hash("Senior  Python\n\tDeveloper ") == job_text_hash("senior python developer")
+    assert job_text_hash("Senior Python Developer") != job_text_hash("Senior Go Developer")
+
+
+def test_sqlite_store_lookup_and_expiry():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteAnalysisStore(os.path.join(tmp, "analyses.sqlite"))
+        check_store(store)
+        assert store.find(company="futuretech ai") == [ANALYSIS]
+
+        expiring = SQLiteAnalysisStore(os.path.join(tmp, "analyses.sqlite"), ttl=0.05)
+        expiring.put(job_text_hash("Job C"), ANALYSIS)
+        time.sleep(0.1)
+        assert expiring.get(job_text_hash("Job C")) is None
+        assert expiring.purge_expired() == 1
+        assert expiring.size() == 1
+
+
+def test_model_store():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        check_store(JobAnalysisStore(ttl=3600))
+
+        expired = JobAnalysisStore(ttl=-1)
+        expired.put(job_text_hash("Job C"), ANALYSIS)
+        assert expired.get(job_text_hash("Job C")) is None
+        assert expired.purge_expired() == 1
+
+
+def test_model_store_bound_to_an_app_works_from_worker_threads():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(tmp, "app.db")
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+
+        store = JobAnalysisStore(ttl=3600, app=app)
+        # No app context here or in the thread, as in the embedded job workers
+        thread = threading.Thread(target=check_store, args=(store,))
+        thread.start()
+        thread.join()
+        assert store.find(company="FutureTech AI") == [ANALYSIS]
+        with app.app_context():
+            db.engine.dispose()
+
+
+def test_worker_pipeline_shares_the_given_store_and_registry():
+    store, registry = SQLiteAnalysisStore(":memory:"), RAGRegistry()
+    saved = dict(os.environ)
+    os.environ.update({"DEEPSEEK_API_KEY": "fake-key", "LLM_PROVIDERS": "deepseek", "LLM_CACHE_BACKEND": "none", "JOB_DEDUPE": "0"})
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            pipeline = build_pipeline(tmp, rag_registry=registry, analysis_store=store)
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+    assert pipeline.job_analyzer.store is store
+    assert pipeline.rag_registry is registry
+
+
+def test_analyzer_calls_llm_once_per_posting():
+    with tempfile.TemporaryDirectory() as tmp:
+        client = CountingClient()
+        analyzer = JobAnalyzer(client, store=SQLiteAnalysisStore(os.path.join(tmp, "analyses.sqlite")))
+        assert analyzer.analyze(POSTING)["role_info"]["company"] == "FutureTech AI"
+        # Same posting with different case and spacing
+        assert analyzer.analyze("  " + POSTING.upper().replace("\n", "\n\n")) == analyzer.analyze(POSTING)
+        assert client.calls == 1
+
+        fields = []
+        analyzer.analyze_streaming(POSTING, on_field=lambda field, value: fields.append(field))
+        assert fields == ["role_info", "requirements", "keywords", "summary"]
+        assert client.calls == 1
+
+        assert analyzer.stored_analyses([POSTING, "Unknown posting"]) == [analyzer.analyze(POSTING), None]
+
+
+def test_local_analyses_are_not_stored():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteAnalysisStore(os.path.join(tmp, "analyses.sqlite"))
+        JobAnalyzer(None, mode="local", store=store).analyze(POSTING)
+        assert store.size() == 0
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
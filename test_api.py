@@ -1,46 +1,112 @@
 """
-Test script for the Agentic AI API
+End-to-end test of the Agentic AI API against the local fake LLM server.
+
+Starts the fake DeepSeek server and the API (uvicorn) on free ports, so it
+needs no running services and spends no API credits.
+
+Run with: python -m pytest test_api.py  (or python test_api.py)
 """
 
-import requests
 import json
-import time
-import subprocess
 import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
 
-def test_api():
-    print("🚀 Starting API server for testing...")
-    # Start server in background
-    process = subprocess.Popen(["py", "api.py"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    time.sleep(5) # Wait for server to boot
-    
+from utils.fake_llm_server import FakeLLMServer
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
     try:
-        url = "http://127.0.0.1:8000/apply"
-        job_desc = """
-        Job Title: AI Engineer
-        Company: TechNova
-        Requirements:
-        - Proficiency in Python
-        - Experience with LLMs and Agentic Workflows
-        - Knowledge of RAG systems
-        """
-        
-        print(f"📡 Sending application request to {url}...")
-        response = requests.post(url, json={"job_description": job_desc})
-        
-        if response.status_code == 200:
-            data = response.json()
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        pass
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+JOB_DESCRIPTION = """
+Job Title: AI Engineer
+Company: TechNova
+Requirements:
+- Proficiency in Python
+- Experience with LLMs and Agentic Workflows
+- Knowledge of RAG systems
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API server exited: {process.stdout.read().decode(errors='replace')[-2000:]}")
+        try:
+            with urllib.request.urlopen(url, timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"API server did not start at {url}")
+
+
+def post_json(url: str, payload: dict) -> dict:
+    request = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return json.loads(response.read())
+
+
+def test_api():
+    with FakeLLMServer(latency="uniform:0.01,0.05") as llm, tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        env = {
+            **os.environ,
+            "DEEPSEEK_API_KEY": "fake-key",
+            "DEEPSEEK_BASE_URL": llm.url,
+            "LLM_PROVIDERS": "deepseek",
+            "LLM_CACHE_BACKEND": "none",
+            "JOB_ANALYSIS_STORE": "none",
+            "JOB_DEDUPE": "0",
+            "JOB_WORKERS": "0",
+            "JOB_QUEUE_PATH": os.path.join(tmp, "jobs.sqlite"),
+        }
+        print(f"🚀 Starting API server on port {port} (LLM: {llm.url})...")
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(port)],
+            cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        )
+        files = {}
+        try:
+            base = f"http://127.0.0.1:{port}"
+            wait_until_up(base + "/", process)
+
+            print(f"📡 Sending application request to {base}/apply...")
+            data = post_json(base + "/apply", {"job_description": JOB_DESCRIPTION})
+            files = data["files"]
             print("✅ API Response Received Successfully!")
             print(f"🔍 Analysis: {data['analysis']['role_info']['title']} at {data['analysis']['role_info']['company']}")
-            print(f"📄 Generated Files: {data['files']}")
-        else:
-            print(f"❌ API Error: {response.status_code} - {response.text}")
-            
-    except Exception as e:
-        print(f"❌ Test failed: {e}")
-    finally:
-        print("🛑 Terminating API server...")
-        process.terminate()
+            print(f"📄 Generated Files: {files}")
+
+            assert data["success"]
+            assert data["analysis"]["role_info"]["company"] == "TechNova"
+            assert "Python" in data["analysis"]["requirements"]["must_have_skills"]
+            assert data["usage"]["calls"] >= 3
+            assert llm.stats()["requests"] == data["usage"]["calls"]
+        finally:
+            print("🛑 Terminating API server...")
+            process.terminate()
+            process.wait(timeout=10)
+            process.stdout.close()
+            for name in files.values():
+                path = os.path.join(ROOT, "output", os.path.basename(name))
+                if os.path.exists(path):
+                    os.remove(path)
+
 
 if __name__ == "__main__":
     test_api()
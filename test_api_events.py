@@ -0,0 +1,318 @@
+"""
+Tests for the Server-Sent Event endpoints of the API (/apply/stream and
+/apply/batch) and how requests are attributed to users, run
+in-process against stub agents or a stub pipeline: through TestClient, or
+by reading the endpoint's response stream directly where chunk timing or
+disconnects matter.
+
+Run with: python -m pytest test_api_events.py  (or python test_api_events.py)
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from utils.pipeline import ApplicationPipeline
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        pass
+
+# api builds its clients, queue and indexes at import: keep them offline and out of data/
+_saved_environ = dict(os.environ)
+_tmp = tempfile.mkdtemp()
+os.environ.update({
+    "DEEPSEEK_API_KEY": "fake-key",
+    "LLM_PROVIDERS": "deepseek",
+    "LLM_CACHE_BACKEND": "none",
+    "JOB_ANALYSIS_STORE": "none",
+    "JOB_DEDUPE": "0",
+    "JOB_WORKERS": "0",
+    "JOB_QUEUE_PATH": os.path.join(_tmp, "jobs.sqlite"),
+})
+try:
+    import api
+finally:
+    os.environ.clear()
+    os.environ.update(_saved_environ)
+
+PROFILE = {"personal_info": {"name": "Test User"}, "skills": {"Languages": ["Python"]}}
+
+
+def read_events(response):
+    """Parse an SSE response body into (event, data) pairs, as the client reads it."""
+    events, event = [], None
+    for line in response.iter_lines():
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            events.append((event, json.loads(line[len("data: "):])))
+    return events
+
+
+def http_request(host="10.0.0.1", headers=None):
+    """A bare Starlette request, for calling endpoints directly."""
+    raw_headers = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": raw_headers, "client": (host, 1234)})
+
+
+def sse_events(chunks):
+    """Parse streamed SSE chunks into (event, data) pairs."""
+    events = []
+    for chunk in chunks:
+        event, data = chunk.strip().split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_user_header_is_only_trusted_from_configured_proxies():
+    original = api.TRUSTED_PROXIES
+    try:
+        api.TRUSTED_PROXIES = set()
+        assert api.request_user(http_request("10.0.0.1", {"X-User-Id": "alice"})) == "10.0.0.1"
+
+        api.TRUSTED_PROXIES = {"10.0.0.9"}
+        assert api.request_user(http_request("10.0.0.1", {"X-User-Id": "alice"})) == "10.0.0.1"
+        assert api.request_user(http_request("10.0.0.9", {"X-User-Id": "alice"})) == "alice"
+        # Behind the proxy, the address it forwarded stands in for anonymous callers
+        forwarded = {"X-Forwarded-For": "6.6.6.6, 192.0.2.7"}
+        assert api.request_user(http_request("10.0.0.9", forwarded)) == "192.0.2.7"
+        assert api.request_user(http_request("10.0.0.9")) == "10.0.0.9"
+    finally:
+        api.TRUSTED_PROXIES = original
+
+
+class StubPipeline:
+    """Stands in for ApplicationPipeline: yields batch items one by one, each after a gate opens."""
+
+    def __init__(self, items):
+        self.items = items
+        self.gates = [asyncio.Event() for _ in items]
+        self.calls = []
+
+    async def run_batch(self, job_descriptions, profile, max_concurrency=4, min_match_score=None):
+        self.calls.append((job_descriptions, profile, max_concurrency, min_match_score))
+        for gate, item in zip(self.gates, self.items):
+            await gate.wait()
+            yield item
+
+
+def with_stub_api(test):
+    """Run a test with api.pipeline and the profile loader replaced by stubs."""
+    def wrapper():
+        original = api.pipeline, api.load_master_profile
+        api.load_master_profile = lambda: PROFILE
+        try:
+            test()
+        finally:
+            api.pipeline, api.load_master_profile = original
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+
+@with_stub_api
+def test_queued_jobs_carry_the_user_id():
+    response = TestClient(api.app).post("/jobs", json={"job_description": "Backend Engineer at Acme"})
+    assert response.status_code == 202
+    job = api.job_queue.get(response.json()["job_id"])
+    assert job["user_id"] == "testclient"
+    assert job["payload"] == {"job_description": "Backend Engineer at Acme", "profile": PROFILE, "user_id": "testclient"}
+
+
+class StubAnalyzer:
+    def __init__(self, error=None):
+        self.error = error
+
+    async def analyze_streaming_async(self, job_description, on_field=None):
+        analysis = {
+            "role_info": {"title": "Backend Engineer", "company": "Acme"},
+            "requirements": {"must_have_skills": ["Python"]},
+            "keywords": {"ats_keywords": ["Python"]},
+        }
+        for field, value in analysis.items():
+            await on_field(field, value)
+            if self.error is not None:
+                raise self.error
+        return analysis
+
+
+class StubCustomizer:
+    async def customize_async(self, profile, analysis, snippets):
+        return {"personal_info": profile["personal_info"], "professional_summary": "Summary", "experience": []}
+
+
+class StubCoverLetter:
+    async def stream_async(self, profile, analysis):
+        # The match score is local and fast; the letter streams after it
+        await asyncio.sleep(0.05)
+        for delta in ("Dear Hiring Manager,", "\n\nHello.", "\n\nSincerely,"):
+            yield delta
+
+
+def stub_pipeline(output_dir, error=None):
+    return ApplicationPipeline(StubAnalyzer(error), StubCustomizer(), StubCoverLetter(), output_dir=output_dir)
+
+
+@with_stub_api
+def test_stream_emits_stages_in_order():
+    tmp = tempfile.mkdtemp()
+    try:
+        api.pipeline = stub_pipeline(tmp)
+        response = TestClient(api.app).post("/apply/stream", json={"job_description": "Backend Engineer at Acme"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = read_events(response)
+    finally:
+        shutil.rmtree(tmp)
+
+    names = [event for event, _ in events]
+    assert names[0] == "started" and names[-1] == "done"
+    assert names.count("analysis_field") == 3 and names.count("cover_letter_delta") == 3
+    order = ["analysis_field", "analysis", "match_score", "cover_letter_delta", "documents", "done"]
+    firsts = [names.index(name) for name in order]
+    assert firsts == sorted(firsts), names
+    # Every analysis field arrives before the assembled analysis
+    assert max(i for i, name in enumerate(names) if name == "analysis_field") < names.index("analysis")
+
+    deltas = "".join(data["text"] for event, data in events if event == "cover_letter_delta")
+    assert dict(events)["cover_letter"]["text"] == deltas
+    done = events[-1][1]
+    assert done["success"] and done["analysis"]["role_info"]["company"] == "Acme"
+    assert done["download_urls"]["cv"] == f"/download/{done['files']['cv']}"
+    assert "timings" in done and "usage" in done
+
+
+@with_stub_api
+def test_stream_reports_pipeline_errors_as_an_event():
+    api.pipeline = stub_pipeline(tempfile.gettempdir(), error=RuntimeError("analysis failed"))
+    response = TestClient(api.app).post("/apply/stream", json={"job_description": "Backend Engineer at Acme"})
+    assert response.status_code == 200
+    events = read_events(response)
+    assert [event for event, _ in events] == ["started", "analysis_field", "error"]
+    assert events[-1][1] == {"success": False, "error": "analysis failed"}
+
+
+@with_stub_api
+def test_stream_without_profile_is_a_400():
+    def missing_profile():
+        raise FileNotFoundError("data/master_profile.json")
+    api.load_master_profile = missing_profile
+    response = TestClient(api.app).post("/apply/stream", json={"job_description": "Backend Engineer at Acme"})
+    assert response.status_code == 400
+
+
+class HangingPipeline:
+    """Emits one event, then waits until cancelled."""
+
+    def __init__(self):
+        self.cancelled = None
+
+    async def run(self, job_description, profile, on_event=None, user_id=None):
+        self.cancelled = asyncio.Event()
+        await on_event("analysis_field", {"field": "role_info", "value": {}})
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+
+
+@with_stub_api
+def test_client_disconnect_cancels_the_pipeline():
+    api.pipeline = HangingPipeline()
+
+    async def run():
+        request = api.JobRequest(job_description="Backend Engineer at Acme")
+        response = await api.process_application_stream(request, http_request())
+        body = response.body_iterator
+        assert sse_events([await body.__anext__(), await body.__anext__()])[1][0] == "analysis_field"
+        # The server closes the stream when the client goes away
+        await body.aclose()
+        await asyncio.wait_for(api.pipeline.cancelled.wait(), 1)
+
+    asyncio.run(run())
+
+
+ITEMS = [
+    {"index": 1, "success": True, "files": {"cv": "cv.docx", "cover_letter": "cl.docx"}},
+    {"index": 0, "success": False, "error": "analysis failed"},
+    {"index": 2, "success": False, "skipped": True, "error": "Local match score 10 below 50"},
+]
+
+
+@with_stub_api
+def test_batch_streams_each_item_as_it_completes():
+    api.pipeline = StubPipeline(ITEMS)
+
+    async def run():
+        request = api.BatchJobRequest(job_descriptions=["job a", "job b", "job c"])
+        response = await api.process_application_batch(request, http_request())
+        assert response.media_type == "text/event-stream"
+        body = response.body_iterator
+        chunks = [await body.__anext__()]
+        for gate in api.pipeline.gates:
+            # Nothing more is sent until the pipeline finishes the next item
+            pending = asyncio.ensure_future(body.__anext__())
+            await asyncio.sleep(0.05)
+            assert not pending.done()
+            gate.set()
+            chunks.append(await pending)
+        chunks += [chunk async for chunk in body]
+        return sse_events(chunks)
+
+    events = asyncio.run(run())
+    assert [event for event, _ in events] == ["started", "item", "item", "item", "done"]
+    assert [data for event, data in events if event == "item"] == ITEMS
+
+
+@with_stub_api
+def test_batch_summary_over_http():
+    api.pipeline = StubPipeline(ITEMS)
+    for gate in api.pipeline.gates:
+        gate.set()
+
+    request = {"job_descriptions": ["job a", "  ", "job b", "job c"], "max_concurrency": 99, "min_match_score": 50}
+    response = TestClient(api.app).post("/apply/batch", json=request)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = read_events(response)
+    assert [event for event, _ in events] == ["started", "item", "item", "item", "done"]
+    assert events[0][1] == {"success": True, "total": 3}
+    summary = events[-1][1]
+    assert (summary["succeeded"], summary["failed"], summary["skipped"]) == (1, 1, 1)
+    assert "usage" in summary
+    # Blank postings are dropped and concurrency is capped by the server
+    assert api.pipeline.calls == [(["job a", "job b", "job c"], PROFILE, api.BATCH_MAX_CONCURRENCY, 50)]
+
+
+@with_stub_api
+def test_batch_rejects_empty_and_oversized_requests():
+    api.pipeline = StubPipeline([])
+    client = TestClient(api.app)
+    assert client.post("/apply/batch", json={"job_descriptions": [" ", ""]}).status_code == 400
+    too_many = ["job"] * (api.BATCH_MAX_ITEMS + 1)
+    assert client.post("/apply/batch", json={"job_descriptions": too_many}).status_code == 400
+    assert api.pipeline.calls == []
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
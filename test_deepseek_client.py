@@ -0,0 +1,124 @@
+"""
+Tests for the DeepSeek clients against the local fake LLM server: the
+per-event-loop async connection pools and keeping blocking bookkeeping off
+the event loop.
+
+Run with: python -m pytest test_deepseek_client.py  (or python test_deepseek_client.py)
+"""
+
+import asyncio
+import sys
+import threading
+
+import utils.deepseek_client as deepseek_client
+from utils.deepseek_client import AsyncDeepSeekClient
+from utils.fake_llm_server import FakeLLMServer
+from utils.rate_limiter import RateLimiter
+from utils.usage import UsageTracker
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        pass
+
+
+def make_async_client(server):
+    return AsyncDeepSeekClient(api_key="fake-key", cache=None, usage=UsageTracker(), base_url=server.url)
+
+
+def pool_of(client):
+    """The pooled HTTP client an AsyncDeepSeekClient uses on the running loop."""
+    client.client  # created on first use
+    return client._clients[asyncio.get_running_loop()][1]
+
+
+def test_closing_one_async_client_keeps_the_shared_pool_open():
+    rules = [{"match": "ping", "response": "pong"}]
+    with FakeLLMServer(responses=rules) as server:
+        async def run():
+            loop = asyncio.get_running_loop()
+            first, second = make_async_client(server), make_async_client(server)
+            pool = pool_of(first)
+            assert pool_of(second) is pool
+
+            await first.aclose()
+            await first.aclose()  # closing twice releases only once
+            assert not pool.is_closed
+            assert await second.generate_content("ping") == "pong"
+
+            await second.aclose()
+            assert pool.is_closed and loop not in deepseek_client._shared_async_http_clients
+
+            # A client created after shutdown gets a fresh pool
+            third = make_async_client(server)
+            assert pool_of(third) is not pool
+            assert await third.generate_content("ping") == "pong"
+            await third.aclose()
+
+        asyncio.run(run())
+
+
+def test_each_event_loop_gets_its_own_pool():
+    rules = [{"match": "ping", "response": "pong"}]
+    with FakeLLMServer(responses=rules) as server:
+        client = make_async_client(server)
+        pools = []
+
+        async def call():
+            pools.append(pool_of(client))
+            return await client.generate_content("ping")
+
+        # A pool opened on a finished loop must not be reused ("Event loop is closed")
+        assert asyncio.run(call()) == "pong"
+        assert asyncio.run(call()) == "pong"
+        assert pools[0] is not pools[1]
+
+        asyncio.run(client.aclose())
+        assert not any(entry[0] in pools for entry in deepseek_client._shared_async_http_clients.values())
+
+
+def test_cache_and_limiter_bookkeeping_runs_off_the_event_loop():
+    rules = [{"match": "ping", "response": "pong"}]
+    threads = {}
+
+    class RecordingCache:
+        def get(self, key):
+            threads["cache_get"] = threading.current_thread()
+            return None
+
+        def set(self, key, value, **kwargs):
+            threads["cache_set"] = threading.current_thread()
+
+    class RecordingLimiter(RateLimiter):
+        def record(self, prompt_tokens, total_tokens):
+            threads["limiter_record"] = threading.current_thread()
+            super().record(prompt_tokens, total_tokens)
+
+    with FakeLLMServer(responses=rules) as server:
+        client = make_async_client(server)
+        client.cache = RecordingCache()
+        client.limiter = RecordingLimiter(tokens_per_minute=100000)
+
+        async def run():
+            assert await client.generate_content("ping") == "pong"
+            await client.aclose()
+
+        asyncio.run(run())
+    assert set(threads) == {"cache_get", "cache_set", "limiter_record"}
+    assert all(thread is not threading.main_thread() for thread in threads.values())
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,159 @@
+"""
+Tests for local dense retrieval: the randomized-SVD LSA encoder, top-k
+selection, Reciprocal Rank Fusion and RAGEngine's dense/hybrid modes.
+
+Run with: python -m pytest test_dense_retrieval.py  (or python test_dense_retrieval.py)
+"""
+
+import sys
+from array import array
+
+import numpy as np
+
+from utils.dense_retrieval import LSAEncoder, top_k_indices, reciprocal_rank_fusion
+from utils.rag_engine import RAGEngine
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        pass
+
+
+def random_forward_index(n_docs, vocab_size, terms_per_doc, seed):
+    """Random forward index (snippet -> term ids/frequencies) as RAGEngine stores it."""
+    rng = np.random.default_rng(seed)
+    offsets, terms, tfs = array('I', [0]), array('I'), array('I')
+    for _ in range(n_docs):
+        ids = rng.choice(vocab_size, size=terms_per_doc, replace=False)
+        terms.extend(int(t) for t in ids)
+        tfs.extend(int(tf) for tf in rng.integers(1, 4, size=terms_per_doc))
+        offsets.append(len(terms))
+    return offsets, terms, tfs
+
+
+def tfidf_matrix(encoder, offsets, terms, tfs, vocab_size):
+    """The row-normalized TF-IDF matrix the encoder factorizes, built densely."""
+    matrix = np.zeros((len(offsets) - 1, vocab_size))
+    for doc in range(len(offsets) - 1):
+        for i in range(offsets[doc], offsets[doc + 1]):
+            matrix[doc, terms[i]] = (1.0 + np.log(tfs[i])) * encoder.idf[terms[i]]
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def test_full_rank_embeddings_preserve_cosine_similarity():
+    offsets, terms, tfs = random_forward_index(30, 80, 6, seed=1)
+    encoder = LSAEncoder(dim=64).fit(offsets, terms, tfs, 80)
+    matrix = tfidf_matrix(encoder, offsets, terms, tfs, 80)
+    assert encoder.doc_vectors.shape == (30, 30)
+    # With dim >= rank the projection is lossless, so cosine similarities survive exactly
+    assert np.allclose(encoder.doc_vectors @ encoder.doc_vectors.T, matrix @ matrix.T, atol=1e-4)
+
+
+def test_randomized_svd_finds_the_top_singular_subspace():
+    # Low-rank signal plus a little noise gives a clear spectral gap after rank 5
+    rng = np.random.default_rng(2)
+    offsets, terms, tfs = array('I', [0]), array('I'), array('I')
+    topics = [rng.choice(200, size=12, replace=False) for _ in range(5)]
+    for doc in range(120):
+        ids = set(rng.choice(topics[doc % 5], size=8, replace=False)) | {int(rng.integers(200))}
+        terms.extend(int(t) for t in ids)
+        tfs.extend([2] * len(ids))
+        offsets.append(len(terms))
+
+    encoder = LSAEncoder(dim=5, power_iterations=3).fit(offsets, terms, tfs, 200)
+    matrix = tfidf_matrix(encoder, offsets, terms, tfs, 200)
+    exact = np.linalg.svd(matrix, full_matrices=False)[2][:5].T
+    approx = encoder.term_vectors.astype(np.float64)
+    assert approx.shape == (200, 5)
+    assert np.allclose(approx.T @ approx, np.eye(5), atol=1e-4)
+    # Same subspace: projectors agree even if the basis is rotated or sign-flipped
+    assert np.linalg.norm(approx @ approx.T - exact @ exact.T) < 1e-2
+
+
+def test_sparse_and_dense_products_agree_and_are_reproducible():
+    offsets, terms, tfs = random_forward_index(40, 150, 8, seed=3)
+    dense = LSAEncoder(dim=16).fit(offsets, terms, tfs, 150)
+    sparse = LSAEncoder(dim=16, max_dense_cells=0).fit(offsets, terms, tfs, 150)
+    again = LSAEncoder(dim=16).fit(offsets, terms, tfs, 150)
+    assert np.allclose(dense.doc_vectors, sparse.doc_vectors, atol=1e-4)
+    assert np.array_equal(dense.doc_vectors, again.doc_vectors)
+
+
+def test_query_encoding_and_scoring():
+    offsets, terms, tfs = random_forward_index(20, 60, 5, seed=4)
+    encoder = LSAEncoder(dim=32).fit(offsets, terms, tfs, 60)
+    doc = list(terms[offsets[7]:offsets[8]])
+    queries = encoder.encode([doc, [], doc[:2]])
+    assert queries.shape == (3, encoder.term_vectors.shape[1])
+    assert np.allclose(np.linalg.norm(queries[[0, 2]], axis=1), 1.0, atol=1e-5)
+    assert not queries[1].any()  # a query with no known terms embeds to zero
+    scores = encoder.score(queries)
+    assert scores.shape == (3, 20)
+    assert int(scores[0].argmax()) == 7
+
+
+def test_empty_corpus_fits_to_zero_dimensions():
+    encoder = LSAEncoder(dim=8).fit(array('I', [0]), array('I'), array('I'), 0)
+    assert encoder.doc_vectors.shape == (0, 0)
+
+
+def test_top_k_indices_sorts_best_first():
+    rng = np.random.default_rng(5)
+    scores = rng.standard_normal((4, 50)).astype(np.float32)
+    for k in (1, 5, 50, 80):
+        best = top_k_indices(scores, k)
+        expected = np.argsort(-scores, axis=1, kind='stable')[:, :min(k, 50)]
+        assert np.array_equal(best, expected), k
+    assert top_k_indices(scores, 0).shape == (4, 0)
+    assert top_k_indices(np.zeros((2, 0)), 3).shape == (2, 0)
+
+
+def test_top_k_indices_breaks_full_sort_ties_by_index():
+    scores = np.array([[0.5, 0.9, 0.5, 0.9]])
+    assert top_k_indices(scores, 4).tolist() == [[1, 3, 0, 2]]
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]], k=60)
+    assert abs(fused[1] - (1 / 61 + 1 / 62)) < 1e-12
+    assert abs(fused[2] - 1 / 62) < 1e-12
+    assert abs(fused[3] - (1 / 63 + 1 / 61)) < 1e-12
+    # Documents both retrievers like beat one retriever's favourite
+    assert max(fused, key=fused.get) == 1
+    assert reciprocal_rank_fusion([]) == {}
+
+
+def test_dense_and_hybrid_modes_rank_snippets():
+    profile = {
+        "experience": [{"achievements": [
+            "Built Kafka streaming pipelines with Spark",
+            "Scheduled Spark batch jobs in Airflow",
+            "Designed React dashboards in TypeScript",
+            "Wrote TypeScript component tests for React",
+        ]}],
+    }
+    dense = RAGEngine(profile=profile, mode="dense", dense_dim=4)
+    hybrid = RAGEngine(profile=profile, mode="hybrid", dense_dim=4)
+    assert dense.encoder is not None and hybrid.encoder is not None
+
+    ranking = dense.rank([["Kafka"]], top_k=4)[0]
+    # "Spark" links the Kafka snippet to the Airflow one, which shares no query term
+    assert ranking[:2] == [0, 1]
+    assert dense.rank([["Fortran"]], top_k=4) == [[]]
+    assert hybrid.rank([["React", "TypeScript"]], top_k=2)[0] in ([2, 3], [3, 2])
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
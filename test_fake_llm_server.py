@@ -0,0 +1,126 @@
+"""
+Tests for the fake OpenAI-compatible LLM server: canned replies, streaming,
+simulated prefix caching, error injection and record/replay.
+
+Run with: python -m pytest test_fake_llm_server.py  (or python test_fake_llm_server.py)
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import urllib.error
+import urllib.request
+
+from utils.deepseek_client import DeepSeekClient
+from utils.fake_llm_server import FakeLLMServer, parse_latency
+from utils.usage import UsageTracker
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        pass
+
+
+def make_client(server, usage=None):
+    return DeepSeekClient(api_key="fake-key", cache=None, usage=usage or UsageTracker(), base_url=server.url)
+
+
+def test_latency_specs():
+    rng = random.Random(1)
+    assert parse_latency("fixed:0.25")(rng) == 0.25
+    assert all(0.1 <= parse_latency("uniform:0.1,0.2")(rng) <= 0.2 for _ in range(100))
+    assert all(parse_latency("normal:0.1,5")(rng) >= 0 for _ in range(100))
+    samples = sorted(parse_latency("lognormal:0.8,0.5")(rng) for _ in range(2001))
+    assert 0.7 < samples[1000] < 0.9
+    for spec in ("fixed", "uniform:1", "gamma:1,2", "fixed:abc"):
+        try:
+            parse_latency(spec)
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted {spec}")
+
+
+def test_client_talks_to_the_fake_server():
+    rules = [{"match": "favourite colour", "response": "Blue."}, {"match": "as JSON", "response": {"ok": True}}]
+    with FakeLLMServer(responses=rules) as server:
+        client = make_client(server)
+        assert client.generate_content("What is your favourite colour?") == "Blue."
+        assert client.generate_json("Answer as JSON") == {"ok": True}
+        assert "".join(client.stream_content("Write a cover letter")).startswith("Your team's focus")
+        stats = server.stats()
+        assert stats["requests"] == 3 and stats["streams"] == 1
+
+
+def test_canned_job_analysis_reads_the_posting():
+    posting = "Job Title: Data Engineer\nCompany: DataWorks\nRequirements:\n- Python\n- Kafka\n"
+    prompt = f"Analyze this job description\n\nJOB DESCRIPTION:\n{posting}\nExtract and return a JSON object"
+    with FakeLLMServer() as server:
+        analysis = make_client(server).generate_json(prompt)
+    assert analysis["role_info"]["company"] == "DataWorks"
+    assert {"Python", "Kafka"} <= set(analysis["requirements"]["must_have_skills"])
+
+
+def test_repeated_prefixes_are_reported_as_cached():
+    tracker = UsageTracker()
+    profile = "CANDIDATE PROFILE: " + "Built distributed systems. " * 100
+    with FakeLLMServer() as server:
+        client = make_client(server, tracker)
+        client.generate_content(profile + "JOB: Platform Engineer")
+        client.generate_content(profile + "JOB: Data Engineer")
+    snapshot = tracker.snapshot()
+    assert 0 < snapshot["cached_tokens"] < snapshot["prompt_tokens"] / 2
+    assert snapshot["prompt_cache_hit_rate"] > 0.4
+
+
+def test_injected_rate_limits_carry_retry_after():
+    with FakeLLMServer(rate_limit_rate=1.0, retry_after=2.5) as server:
+        request = urllib.request.Request(
+            server.url + "/chat/completions",
+            data=json.dumps({"model": "deepseek-chat", "messages": [{"role": "user", "content": "hi"}]}).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            urllib.request.urlopen(request, timeout=5)
+        except urllib.error.HTTPError as e:
+            assert e.code == 429 and e.headers["Retry-After"] == "2.5"
+        else:
+            raise AssertionError("expected HTTP 429")
+        assert server.stats()["rate_limited"] == 1
+
+
+def test_record_then_replay_without_upstream():
+    with tempfile.TemporaryDirectory() as tmp:
+        recordings = os.path.join(tmp, "recordings.jsonl")
+        upstream = FakeLLMServer(responses=[{"match": "Summarize", "response": "Recorded answer."}]).start()
+        try:
+            with FakeLLMServer(mode="record", recordings=recordings, upstream=upstream.url) as recorder:
+                assert make_client(recorder).generate_content("Summarize this") == "Recorded answer."
+                assert recorder.stats()["recorded"] == 1
+        finally:
+            upstream.stop()
+
+        with FakeLLMServer(mode="replay", recordings=recordings) as replayer:
+            client = make_client(replayer)
+            assert "".join(client.stream_content("Summarize this")) == "Recorded answer."
+            # Unknown requests fall back to canned replies
+            assert client.generate_content("Something else").startswith("Your team's focus")
+            stats = replayer.stats()
+            assert stats["replayed"] == 1 and stats["replay_misses"] == 1
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
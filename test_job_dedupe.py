@@ -0,0 +1,193 @@
+"""
+Tests for MinHash/LSH job posting deduplication and its reuse in the pipeline.
+
+Run with: python -m pytest test_job_dedupe.py  (or python test_job_dedupe.py)
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+
+from utils.job_dedupe import JobDedupeIndex, MinHasher, lsh_parameters, shingle_hashes
+from utils.pipeline import ApplicationPipeline
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+with open("sample_job_description.txt", "r", encoding="utf-8") as f:
+    POSTING = f.read()
+
+OTHER_POSTING = """Registered Nurse - Night Shifts
+St. Mary's Hospital is hiring registered nurses for its cardiology ward.
+Requirements: valid nursing license, BLS certification, two years of acute care experience.
+We offer flexible rotas, tuition support and a pension plan."""
+
+
+ANALYSIS = {"role_info": {"title": "Senior Python Developer", "company": "FutureTech AI"}}
+
+
+def jaccard(a: str, b: str) -> float:
+    x, y = set(shingle_hashes(a)), set(shingle_hashes(b))
+    return len(x & y) / len(x | y)
+
+
+def test_shingles_ignore_case_spacing_and_punctuation():
+    reformatted = POSTING.upper().replace("- ", "* ").replace("\n", "\n\n")
+    assert set(shingle_hashes(reformatted)) == set(shingle_hashes(POSTING))
+    assert shingle_hashes("  ") == []
+    assert len(shingle_hashes("Python")) == 1
+
+
+def test_signature_estimates_jaccard():
+    hasher = MinHasher(num_perm=256)
+    words = POSTING.split()
+    rng = random.Random(5)
+    for edits in (3, 10, 30):
+        changed = list(words)
+        for i in rng.sample(range(len(words)), edits):
+            changed[i] = f"x{i}"
+        variant = " ".join(changed)
+        estimate = float(hasher.similarity(hasher.signature(POSTING), hasher.signature(variant)[None, :])[0])
+        assert abs(estimate - jaccard(POSTING, variant)) < 0.1, edits
+
+
+def test_lsh_parameters_fit_signature():
+    for threshold in (0.5, 0.8, 0.9):
+        bands, rows = lsh_parameters(threshold, 128)
+        assert bands * rows <= 128
+    # Stricter thresholds need more rows per band
+    assert lsh_parameters(0.9, 128)[1] > lsh_parameters(0.5, 128)[1]
+
+
+def test_find_exact_near_and_unrelated():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = JobDedupeIndex(os.path.join(tmp, "dedupe.sqlite"))
+        posting_id = index.add(POSTING, ANALYSIS)
+        index.add(OTHER_POSTING)
+
+        exact = index.find("  " + POSTING.upper())
+        assert exact["posting_id"] == posting_id and exact["similarity"] == 1.0 and exact["exact"]
+        assert exact["analysis"]["role_info"]["title"] == "Senior Python Developer"
+
+        reposted = POSTING.replace("huge plus", "big plus").replace("Open source contributions.", "")
+        near = index.find(reposted)
+        assert near["posting_id"] == posting_id and near["similarity"] >= index.threshold and not near["exact"]
+
+        assert index.find("Pastry chef wanted for a small bakery, early mornings, croissants and sourdough.") is None
+        assert index.stats()["postings"] == 2
+
+
+def test_same_template_from_another_company_is_not_a_duplicate():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = JobDedupeIndex(os.path.join(tmp, "dedupe.sqlite"))
+        index.add(POSTING, ANALYSIS)
+        other_company = POSTING.replace("FutureTech AI", "Globex Corporation")
+        assert jaccard(POSTING, other_company) >= index.threshold
+        assert index.find(other_company) is None
+        assert index.find(POSTING.replace("Senior Python Developer", "Staff Go Developer")) is None
+
+        # Without an analysis there is no role to check, so only exact copies match
+        index.add(OTHER_POSTING)
+        assert index.find(OTHER_POSTING.replace("pension plan", "pension")) is None
+        assert index.find(OTHER_POSTING)["exact"]
+
+
+def test_results_are_stored_per_profile():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = JobDedupeIndex(os.path.join(tmp, "dedupe.sqlite"))
+        posting_id = index.add(POSTING)
+        index.store_result(posting_id, "profile-a", {"files": {"cv": "a.docx"}})
+        assert index.get_result(posting_id, "profile-a") == {"files": {"cv": "a.docx"}}
+        assert index.get_result(posting_id, "profile-b") is None
+
+
+class FakeAnalyzer:
+    def __init__(self):
+        self.calls = 0
+
+    async def analyze_streaming_async(self, job_description, on_field=None):
+        self.calls += 1
+        company = "FutureTech AI" if "FutureTech AI" in job_description else "Globex Corporation"
+        analysis = {
+            "role_info": {"title": "Senior Python Developer", "company": company},
+            "requirements": {"must_have_skills": ["Python"]},
+            "keywords": {"ats_keywords": ["Python"]},
+            "summary": "Backend role.",
+        }
+        for field, value in analysis.items():
+            await on_field(field, value)
+        return analysis
+
+
+class FakeCustomizer:
+    async def customize_async(self, profile, analysis, snippets):
+        return {"personal_info": profile["personal_info"], "professional_summary": "Summary", "experience": []}
+
+
+class FakeCoverLetter:
+    async def generate_async(self, profile, analysis):
+        return "Dear Hiring Manager,\n\nHello.\n\nSincerely,"
+
+
+def test_pipeline_reuses_duplicate_results():
+    profile = {"personal_info": {"name": "Test User"}, "skills": {"languages": ["Python"]}, "experience": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        analyzer = FakeAnalyzer()
+        pipeline = ApplicationPipeline(
+            analyzer, FakeCustomizer(), FakeCoverLetter(),
+            output_dir=tmp,
+            dedupe_index=JobDedupeIndex(os.path.join(tmp, "dedupe.sqlite")),
+        )
+        first = asyncio.run(pipeline.run(POSTING, profile, use_rag=False))
+        second = asyncio.run(pipeline.run("\n" + POSTING.upper(), profile, use_rag=False))
+        assert analyzer.calls == 1
+        assert second["files"] == first["files"]
+        assert second["duplicate_of"]["similarity"] == 1.0
+
+        # A near-duplicate reuses the analysis but renders its own documents
+        third = asyncio.run(pipeline.run(POSTING.replace("huge plus", "big plus"), profile, use_rag=False))
+        assert analyzer.calls == 1
+        assert "duplicate_of" not in third and third["files"] != first["files"]
+
+        # So does a changed profile
+        profile["skills"]["languages"].append("Go")
+        fourth = asyncio.run(pipeline.run(POSTING, profile, use_rag=False))
+        assert analyzer.calls == 1
+        assert "duplicate_of" not in fourth and fourth["files"] != first["files"]
+
+
+def test_pipeline_does_not_reuse_another_companys_posting():
+    profile = {"personal_info": {"name": "Test User"}, "skills": {"languages": ["Python"]}, "experience": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        analyzer = FakeAnalyzer()
+        pipeline = ApplicationPipeline(
+            analyzer, FakeCustomizer(), FakeCoverLetter(),
+            output_dir=tmp,
+            dedupe_index=JobDedupeIndex(os.path.join(tmp, "dedupe.sqlite")),
+        )
+        first = asyncio.run(pipeline.run(POSTING, profile, use_rag=False))
+        other = asyncio.run(pipeline.run(POSTING.replace("FutureTech AI", "Globex Corporation"), profile, use_rag=False))
+        assert analyzer.calls == 2
+        assert "duplicate_of" not in other and other["files"] != first["files"]
+        assert other["analysis"]["role_info"]["company"] == "Globex Corporation"
+        assert "Globex" in other["files"]["cv"]
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
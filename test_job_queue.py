@@ -0,0 +1,202 @@
+"""
+Tests for the SQLite job queue: claim ordering, per-user limits, backpressure,
+leases, heartbeats, requeue after the visibility timeout, the retry cap and
+releasing jobs on shutdown.
+
+Run with: python -m pytest test_job_queue.py  (or python test_job_queue.py)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from utils.job_queue import SQLiteJobQueue, QueueFullError, WorkerPool
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        pass
+
+
+def make_queue(tmp, **kwargs):
+    return SQLiteJobQueue(path=os.path.join(tmp, "jobs.sqlite"), **kwargs)
+
+
+def expire_lease(queue, job_id):
+    """Pretend the job's worker stopped heartbeating long ago."""
+    queue._conn().execute("UPDATE jobs SET heartbeat_at = heartbeat_at - 3600 WHERE id = ?", (job_id,))
+
+
+def test_claims_oldest_job_first():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp)
+        ids = [queue.submit({"n": n}) for n in range(3)]
+        claimed = [queue.claim() for _ in range(3)]
+        assert [job["id"] for job in claimed] == ids
+        assert claimed[0]["payload"] == {"n": 0} and claimed[0]["attempts"] == 1
+        assert all(job["lease"] for job in claimed)
+        assert queue.claim() is None
+
+
+def test_per_user_limit_skips_busy_users():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp, max_per_user=1)
+        first = queue.submit({}, user_id="alice")
+        queue.submit({}, user_id="alice")
+        bob = queue.submit({}, user_id="bob")
+        job = queue.claim()
+        assert job["id"] == first
+        # alice already has a running job, so bob's newer job goes next
+        assert queue.claim()["id"] == bob
+        assert queue.claim() is None
+        queue.complete(first, job["lease"], {"ok": True})
+        assert queue.claim()["user_id"] == "alice"
+
+
+def test_submit_applies_backpressure():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp, max_pending=2)
+        queue.submit({})
+        queue.submit({})
+        try:
+            queue.submit({})
+        except QueueFullError:
+            pass
+        else:
+            raise AssertionError("expected QueueFullError")
+
+
+def test_requeue_after_visibility_timeout():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp)
+        job_id = queue.submit({})
+        first = queue.claim()
+        assert queue.claim() is None
+        expire_lease(queue, job_id)
+        second = queue.claim()
+        assert second["id"] == job_id and second["attempts"] == 2
+        assert second["lease"] != first["lease"]
+
+
+def test_heartbeat_keeps_the_lease():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp)
+        job_id = queue.submit({})
+        job = queue.claim()
+        expire_lease(queue, job_id)
+        assert queue.heartbeat(job_id, job["lease"])
+        assert queue.claim() is None
+        assert not queue.heartbeat(job_id, "stale-lease")
+
+
+def test_stale_lease_completion_is_ignored():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp)
+        job_id = queue.submit({})
+        stale = queue.claim()
+        expire_lease(queue, job_id)
+        current = queue.claim()
+
+        assert not queue.complete(job_id, stale["lease"], {"from": "stale"})
+        assert not queue.fail(job_id, stale["lease"], "stale worker gave up")
+        assert queue.get(job_id)["status"] == "running"
+
+        assert queue.complete(job_id, current["lease"], {"from": "current"})
+        job = queue.get(job_id)
+        assert job["status"] == "succeeded" and job["result"] == {"from": "current"}
+        assert not queue.fail(job_id, current["lease"], "already finished")
+
+
+def test_max_attempts_moves_abandoned_jobs_to_failed():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp, max_attempts=2)
+        job_id = queue.submit({})
+        for _ in range(2):
+            assert queue.claim()["id"] == job_id
+            expire_lease(queue, job_id)
+        assert queue.claim() is None
+        job = queue.get(job_id)
+        assert job["status"] == "failed" and "2 times" in job["error"]
+
+
+def test_worker_pool_heartbeats_long_jobs():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp, visibility_timeout=0.3)
+
+        async def handler(payload):
+            await asyncio.sleep(1.0)
+            return {"echo": payload["n"]}
+
+        async def run():
+            job_id = queue.submit({"n": 7})
+            pool = WorkerPool(queue, handler, concurrency=2, poll_interval=0.05)
+            pool.start()
+            deadline = time.time() + 5
+            while queue.get(job_id)["status"] != "succeeded" and time.time() < deadline:
+                await asyncio.sleep(0.05)
+            await pool.stop()
+            return queue.get(job_id)
+
+        job = asyncio.run(run())
+        # Without heartbeats the second worker would have requeued and rerun it
+        assert job["status"] == "succeeded" and job["attempts"] == 1
+        assert job["result"] == {"echo": 7}
+
+
+def test_release_requeues_without_using_an_attempt():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp)
+        job_id = queue.submit({})
+        job = queue.claim()
+        assert not queue.release(job_id, "stale-lease")
+        assert queue.release(job_id, job["lease"])
+        assert not queue.release(job_id, job["lease"])
+        assert not queue.complete(job_id, job["lease"], {})
+        released = queue.get(job_id)
+        assert released["status"] == "pending" and released["attempts"] == 0 and released["lease"] is None
+        assert queue.claim()["attempts"] == 1
+
+
+def test_worker_pool_stop_releases_running_jobs():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = make_queue(tmp)
+        started = []
+
+        async def handler(payload):
+            started.append(payload["n"])
+            await asyncio.sleep(30)
+
+        async def run():
+            ids = [queue.submit({"n": n}) for n in range(3)]
+            pool = WorkerPool(queue, handler, concurrency=2, poll_interval=0.05)
+            pool.start()
+            deadline = time.time() + 5
+            while len(started) < 2 and time.time() < deadline:
+                await asyncio.sleep(0.01)
+            await pool.stop()
+            return [queue.get(job_id) for job_id in ids]
+
+        jobs = asyncio.run(run())
+        assert len(started) == 2
+        # Back to pending at once, not after the 900 s visibility timeout
+        assert [job["status"] for job in jobs] == ["pending"] * 3
+        assert all(job["attempts"] == 0 for job in jobs)
+        assert queue.stats() == {"pending": 3}
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
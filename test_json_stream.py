@@ -0,0 +1,128 @@
+"""
+Tests for the incremental JSON parser used to stream structured LLM output:
+chunk boundaries, escapes, braces inside strings, code fences, truncated and
+malformed input.
+
+Run with: python -m pytest test_json_stream.py  (or python test_json_stream.py)
+"""
+
+import json
+import sys
+
+from utils.json_stream import IncrementalJSONParser
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        pass
+
+CHUNK_SIZES = (1, 2, 3, 7)
+
+DOCUMENT = json.dumps(
+    {
+        "title": "Senior \"Platform\" Engineer \\ SRE",
+        "summary": "Uses {braces}, [brackets], commas: and \\\"escaped quotes\\\" in text",
+        "unicode": "Zürich \u2013 caf\u00e9 🚀",
+        "skills": ["Python", "Go {1.22}", {"name": "Kubernetes", "years": 4}],
+        "details": {"remote": True, "nested": {"list": [1, 2, [3, "]"]]}},
+        "salary": -125000.5,
+        "score": 1e3,
+        "active": False,
+        "manager": None,
+        "empty_list": [],
+        "empty_object": {},
+    },
+    ensure_ascii=False,
+    indent=2,
+)
+
+
+def feed_in_chunks(text, size):
+    parser = IncrementalJSONParser()
+    completed = []
+    for start in range(0, len(text), size):
+        completed.extend(parser.feed(text[start:start + size]))
+    return parser, completed
+
+
+def test_every_chunk_size_yields_all_fields_in_order():
+    expected = list(json.loads(DOCUMENT).items())
+    for size in CHUNK_SIZES:
+        parser, completed = feed_in_chunks(DOCUMENT, size)
+        assert completed == expected, f"chunk size {size}"
+        assert parser.done and not parser.failed
+        assert parser.fields == dict(expected)
+        assert parser.text == DOCUMENT
+
+
+def test_fields_surface_as_soon_as_their_value_closes():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"a": "x", "b": [1, ') == [("a", "x")]
+    assert parser.feed('2], "c"') == [("b", [1, 2])]
+    assert parser.feed(": 42") == []  # a number only ends at the next delimiter
+    assert parser.feed(" }") == [("c", 42)]
+    assert parser.done
+
+
+def test_compact_literals_and_numbers():
+    text = '{"n":1,"f":-0.5e-2,"t":true,"z":null,"last":false}'
+    for size in CHUNK_SIZES:
+        _, completed = feed_in_chunks(text, size)
+        assert completed == list(json.loads(text).items()), f"chunk size {size}"
+
+
+def test_code_fences_and_surrounding_prose_are_ignored():
+    text = 'Here is the analysis:\n```json\n{"role": "Data Engineer", "level": "senior"}\n```\nLet me know {if} you need more.'
+    for size in CHUNK_SIZES:
+        parser, completed = feed_in_chunks(text, size)
+        assert completed == [("role", "Data Engineer"), ("level", "senior")], f"chunk size {size}"
+        assert parser.done and not parser.failed
+
+
+def test_escaped_backslash_before_closing_quote():
+    text = '{"path": "C:\\\\", "next": "ok"}'
+    assert json.loads(text)["path"] == "C:\\"
+    for size in CHUNK_SIZES:
+        _, completed = feed_in_chunks(text, size)
+        assert completed == [("path", "C:\\"), ("next", "ok")], f"chunk size {size}"
+
+
+def test_truncated_input_keeps_completed_fields():
+    text = DOCUMENT[: DOCUMENT.index('"details"') + 20]
+    for size in CHUNK_SIZES:
+        parser, completed = feed_in_chunks(text, size)
+        assert [key for key, _ in completed] == ["title", "summary", "unicode", "skills"], f"chunk size {size}"
+        assert not parser.done and not parser.failed
+
+
+def test_malformed_input_sets_failed_and_stops():
+    for text in ('{"a": 1, "b": tru, "c": 3}', '{"a": [1, 2}, "b": 2}', '{"a": 01, "b": 2}'):
+        for size in CHUNK_SIZES:
+            parser, completed = feed_in_chunks(text, size)
+            assert parser.failed and not parser.done, f"{text!r} chunk size {size}"
+            assert ("c", 3) not in completed and ("b", 2) not in completed
+            # The raw text is still collected for a full-text fallback
+            assert parser.text == text
+
+
+def test_text_after_the_object_is_ignored():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"a": 1}') == [("a", 1)]
+    assert parser.feed(' {"b": 2}') == []
+    assert parser.done and parser.fields == {"a": 1}
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,199 @@
+"""
+Tests for the LLM response cache: content-addressed keys, TTL expiry, LRU and
+byte-budget eviction in the memory and SQLite backends, and env configuration.
+
+Run with: python -m pytest test_llm_cache.py  (or python test_llm_cache.py)
+"""
+
+import contextlib
+import os
+import sys
+import tempfile
+import time
+
+from utils.llm_cache import (
+    make_cache_key,
+    MemoryCacheBackend,
+    SQLiteCacheBackend,
+    ResponseCache,
+)
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        pass
+
+
+def entry(value, created_at=None):
+    return {"value": value, "created_at": created_at or time.time(), "latency": 1.5, "tokens": 100}
+
+
+@contextlib.contextmanager
+def environ(**values):
+    """Temporarily set (or with None, unset) environment variables."""
+    saved = {name: os.environ.get(name) for name in values}
+    try:
+        for name, value in values.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def test_cache_key_covers_every_request_field():
+    base = make_cache_key("deepseek-chat", "system", "prompt", 0.7)
+    assert base == make_cache_key("deepseek-chat", "system", "prompt", 0.7)
+    assert base == make_cache_key("deepseek-chat", "system", "prompt", 0.70000001)
+    assert len(base) == 64
+    variants = [
+        make_cache_key("deepseek-reasoner", "system", "prompt", 0.7),
+        make_cache_key("deepseek-chat", "other system", "prompt", 0.7),
+        make_cache_key("deepseek-chat", "system", "other prompt", 0.7),
+        make_cache_key("deepseek-chat", "system", "prompt", 0.3),
+    ]
+    assert len({base, *variants}) == 5
+
+
+def test_hits_misses_and_savings():
+    cache = ResponseCache(MemoryCacheBackend())
+    assert cache.get("k") is None
+    cache.set("k", "answer", latency=2.0, tokens=300)
+    assert cache.get("k") == "answer"
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["hit_rate"] == 0.5
+    assert stats["saved_seconds"] == 2.0 and stats["saved_tokens"] == 300
+    assert stats["backend"] == "MemoryCacheBackend" and stats["entries"] == 1
+
+
+def test_ttl_expiry_deletes_stale_entries():
+    backend = MemoryCacheBackend()
+    cache = ResponseCache(backend, ttl=60)
+    backend.set("old", entry("stale", created_at=time.time() - 120))
+    backend.set("new", entry("fresh"))
+    assert cache.get("old") is None
+    assert backend.get("old") is None
+    assert cache.get("new") == "fresh"
+
+    # ttl=None never expires
+    forever = ResponseCache(backend, ttl=None)
+    backend.set("old", entry("stale", created_at=time.time() - 10 ** 8))
+    assert forever.get("old") == "stale"
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("a", entry("1"))
+    backend.set("b", entry("2"))
+    backend.get("a")  # "b" is now least recently used
+    backend.set("c", entry("3"))
+    assert backend.get("b") is None
+    assert backend.get("a")["value"] == "1" and backend.get("c")["value"] == "3"
+    assert backend.size() == 2
+
+
+def test_memory_backend_respects_byte_budget():
+    backend = MemoryCacheBackend(max_entries=100, max_bytes=10)
+    backend.set("a", entry("x" * 4))
+    backend.set("b", entry("y" * 4))
+    backend.set("a", entry("z" * 5))  # replacing updates the byte count and recency
+    assert backend.size() == 2 and backend._bytes == 9
+    backend.set("c", entry("w" * 4))
+    assert backend.get("b") is None and backend.get("a") is not None
+    assert backend._bytes == 9
+    backend.delete("a")
+    assert backend._bytes == 4
+
+
+def test_byte_budgets_count_utf8_bytes():
+    backend = MemoryCacheBackend(max_entries=100, max_bytes=10)
+    backend.set("a", entry("é" * 3))
+    assert backend._bytes == 6
+    backend.set("b", entry("ü" * 3))  # 12 bytes, though only 6 characters
+    assert backend.get("a") is None and backend.size() == 1 and backend._bytes == 6
+
+    with tempfile.TemporaryDirectory() as tmp:
+        small = SQLiteCacheBackend(os.path.join(tmp, "small.sqlite"), max_entries=100, max_bytes=10)
+        small.set("a", entry("é" * 3))
+        time.sleep(0.01)
+        small.set("b", entry("ü" * 3))
+        assert small.get("a") is None and small.size() == 1
+
+
+def test_sqlite_backend_evicts_least_recently_used():
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteCacheBackend(os.path.join(tmp, "cache.sqlite"), max_entries=2)
+        backend.set("a", entry("1"))
+        time.sleep(0.01)
+        backend.set("b", entry("2"))
+        time.sleep(0.01)
+        backend.get("a")
+        time.sleep(0.01)
+        backend.set("c", entry("3"))
+        assert backend.get("b") is None
+        assert backend.get("a")["value"] == "1" and backend.get("c")["value"] == "3"
+
+        small = SQLiteCacheBackend(os.path.join(tmp, "small.sqlite"), max_entries=100, max_bytes=10)
+        small.set("a", entry("x" * 6))
+        time.sleep(0.01)
+        small.set("b", entry("y" * 6))
+        assert small.get("a") is None and small.size() == 1
+
+
+def test_sqlite_backend_persists_across_instances():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "nested", "cache.sqlite")
+        ResponseCache(SQLiteCacheBackend(path)).set("k", "persisted", latency=0.5, tokens=42)
+        reopened = ResponseCache(SQLiteCacheBackend(path))
+        assert reopened.get("k") == "persisted"
+        assert reopened.stats()["saved_tokens"] == 42
+        reopened.backend.clear()
+        assert reopened.backend.size() == 0
+
+
+def test_from_env_selects_backend():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "env.sqlite")
+        with environ(LLM_CACHE_BACKEND=None, LLM_CACHE_PATH=path, LLM_CACHE_TTL=None, LLM_CACHE_MAX_ENTRIES="5"):
+            cache = ResponseCache.from_env()
+            assert isinstance(cache.backend, SQLiteCacheBackend)
+            assert cache.backend.path == path and cache.backend.max_entries == 5
+            assert cache.ttl == 7 * 24 * 3600
+
+        with environ(LLM_CACHE_BACKEND="memory", LLM_CACHE_TTL="0"):
+            cache = ResponseCache.from_env()
+            assert isinstance(cache.backend, MemoryCacheBackend) and cache.ttl is None
+
+        for disabled in ("none", "off", ""):
+            with environ(LLM_CACHE_BACKEND=disabled):
+                assert ResponseCache.from_env() is None
+
+        with environ(LLM_CACHE_BACKEND="memcached"):
+            try:
+                ResponseCache.from_env()
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("expected ValueError for an unknown backend")
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
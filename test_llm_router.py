@@ -0,0 +1,179 @@
+"""
+Tests for the LLM provider interface and router: failover, hedging, latency
+histograms and provider health.
+
+Run with: python -m pytest test_llm_router.py  (or python test_llm_router.py)
+"""
+
+import asyncio
+import sys
+import time
+
+from utils.llm_provider import LLMProvider, AsyncLLMProvider
+from utils.llm_router import LLMRouter, AsyncLLMRouter, LatencyHistogram, ProviderHealth
+from utils.usage import QuotaExceededError
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        pass
+
+
+class FakeProvider(LLMProvider):
+    """Answers with its name after `delay` seconds, or raises `error`."""
+
+    def __init__(self, name, delay=0.0, error=None, reply=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.reply = reply
+        self.calls = 0
+
+    def generate_content(self, prompt, system_instruction="", config=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.reply or self.name
+
+
+class AsyncFakeProvider(AsyncLLMProvider):
+    def __init__(self, name, delay=0.0, error=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.cancelled = False
+
+    async def generate_content(self, prompt, system_instruction="", config=None):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return self.name
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(0.5) is None
+    for seconds in [0.2] * 90 + [3.0] * 10:
+        histogram.observe(seconds)
+    # Bucket upper bounds, capped at the largest observation
+    assert histogram.percentile(0.5) == 0.25
+    assert histogram.percentile(0.95) == 3.0
+    assert histogram.percentile(1.0) == 3.0
+
+
+def test_errors_fail_over_to_the_next_provider():
+    broken = FakeProvider("broken", error=ConnectionError("down"))
+    backup = FakeProvider("backup")
+    router = LLMRouter([broken, backup], hedge=False)
+    assert router.generate_content("Hi") == "backup"
+    stats = router.stats()
+    assert stats["broken"]["errors"] == 1 and stats["backup"]["requests"] == 1
+
+
+def test_last_error_is_raised_when_every_provider_fails():
+    router = LLMRouter([FakeProvider("a", error=ValueError("a")), FakeProvider("b", error=ValueError("b"))], hedge=False)
+    try:
+        router.generate_content("Hi")
+    except ValueError as e:
+        assert str(e) == "b"
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_quota_errors_are_not_failed_over():
+    backup = FakeProvider("backup")
+    router = LLMRouter([FakeProvider("primary", error=QuotaExceededError("u", 10, 10, 60)), backup], hedge=False)
+    try:
+        router.generate_content("Hi")
+    except QuotaExceededError:
+        pass
+    else:
+        raise AssertionError("expected QuotaExceededError")
+    assert backup.calls == 0
+
+
+def test_slow_primary_is_hedged():
+    slow, fast = FakeProvider("slow", delay=0.5), FakeProvider("fast", delay=0.01)
+    router = LLMRouter([slow, fast], hedge_after=0.05)
+    started = time.perf_counter()
+    assert router.generate_content("Hi") == "fast"
+    assert time.perf_counter() - started < 0.4
+    assert router.stats()["fast"]["hedges_won"] == 1
+
+
+def test_async_hedge_cancels_the_loser():
+    async def scenario():
+        slow, fast = AsyncFakeProvider("slow", delay=1.0), AsyncFakeProvider("fast", delay=0.01)
+        router = AsyncLLMRouter([slow, fast], hedge_after=0.05)
+        result = await router.generate_content("Hi")
+        await asyncio.sleep(0)
+        return result, slow.cancelled
+
+    result, cancelled = asyncio.run(scenario())
+    assert result == "fast" and cancelled
+
+
+def test_async_failover():
+    async def scenario():
+        router = AsyncLLMRouter([AsyncFakeProvider("a", error=ConnectionError("down")), AsyncFakeProvider("b")], hedge=False)
+        return await router.generate_content("Hi")
+
+    assert asyncio.run(scenario()) == "b"
+
+
+def test_routes_to_the_fastest_measured_provider():
+    health = ProviderHealth(min_samples=3)
+    first, second = FakeProvider("first"), FakeProvider("second")
+    for _ in range(3):
+        health.observe("first", 2.0)
+        health.observe("second", 0.2)
+    assert health.order([first, second]) == [second, first]
+
+
+def test_failing_provider_is_skipped_during_cooldown():
+    health = ProviderHealth(max_failures=2, cooldown=60)
+    first, second = FakeProvider("first"), FakeProvider("second")
+    for _ in range(2):
+        health.observe("first", 0.1, ConnectionError("down"))
+    assert health.order([first, second]) == [second, first]
+    assert health.snapshot()["first"]["healthy"] is False
+
+
+def test_stream_fails_over_before_the_first_delta():
+    class BrokenStream(FakeProvider):
+        def stream_content(self, prompt, system_instruction="", config=None):
+            raise ConnectionError("reset")
+            yield
+
+    router = LLMRouter([BrokenStream("broken"), FakeProvider("backup")], hedge=False)
+    assert list(router.stream_content("Hi")) == ["backup"]
+
+
+def test_provider_json_defaults_build_on_generate_content():
+    provider = FakeProvider("json", reply='```json\n{"title": "Engineer", "skills": ["Python"]}\n```')
+    assert provider.generate_json("Extract") == {"title": "Engineer", "skills": ["Python"]}
+
+    fields = []
+    result = provider.generate_json_streaming("Extract", on_field=lambda key, value: fields.append(key))
+    assert result["skills"] == ["Python"]
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,219 @@
+"""
+Tests for the LLM-free job analyzer and JobAnalyzer's local mode and fallback.
+
+Run with: python -m pytest test_local_job_analyzer.py  (or python test_local_job_analyzer.py)
+"""
+
+import asyncio
+import json
+import sys
+
+from agents.job_analyzer import JobAnalyzer
+from agents.local_job_analyzer import LocalJobAnalyzer
+from utils.usage import QuotaExceededError
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+POSTING = """## Staff Machine Learning Engineer
+Company: Acme Robotics
+Location: Berlin, Germany
+
+What you'll do
+* Build ML pipelines in PyTorch and Airflow
+* Mentor engineers and collaborate with stakeholders
+
+What we're looking for
+* 3-5 years building data pipelines
+* Experience with Go, SQL and Kubernetes
+* Kafka experience is a plus
+* MSc in Computer Science or equivalent
+
+Benefits
+* Unlimited PTO and Docker stickers
+"""
+
+
+class FailingClient:
+    """Stands in for DeepSeekClient when the API is unavailable."""
+
+    def __init__(self, error=None, fields_before_error=0):
+        self.error = error or ConnectionError("API unavailable")
+        self.fields_before_error = fields_before_error
+
+    def generate_json(self, *args, **kwargs):
+        raise self.error
+
+    def generate_json_streaming(self, *args, on_field=None, **kwargs):
+        for field in ("role_info", "requirements")[:self.fields_before_error]:
+            on_field(field, {"from": "the model"})
+        raise self.error
+
+
+class AsyncFailingClient(FailingClient):
+    async def generate_json(self, *args, **kwargs):
+        raise self.error
+
+    async def generate_json_streaming(self, *args, on_field=None, **kwargs):
+        for field in ("role_info", "requirements")[:self.fields_before_error]:
+            await on_field(field, {"from": "the model"})
+        raise self.error
+
+
+def expect_error(error_type, call):
+    try:
+        call()
+    except error_type as e:
+        return e
+    raise AssertionError(f"expected {error_type.__name__}")
+
+
+def test_schema_matches_llm_analysis():
+    analysis = LocalJobAnalyzer().analyze(POSTING)
+    assert set(analysis["role_info"]) == {"title", "company", "location", "level"}
+    assert set(analysis["requirements"]) == {"must_have_skills", "nice_to_have_skills", "education", "years_experience"}
+    assert set(analysis["keywords"]) == {"ats_keywords", "soft_skills"}
+    assert isinstance(analysis["summary"], str)
+    assert analysis["source"] == "local"
+    json.dumps(analysis)
+
+
+def test_extracts_fields():
+    analysis = LocalJobAnalyzer().analyze(POSTING)
+    assert analysis["role_info"] == {
+        "title": "Staff Machine Learning Engineer",
+        "company": "Acme Robotics",
+        "location": "Berlin, Germany",
+        "level": "Lead",
+    }
+    requirements = analysis["requirements"]
+    assert {"PyTorch", "Airflow", "Go", "SQL", "Kubernetes"} <= set(requirements["must_have_skills"])
+    assert requirements["nice_to_have_skills"] == ["Kafka"]
+    assert requirements["years_experience"] == "3-5 years"
+    assert requirements["education"] == "MSc in Computer Science or equivalent"
+    # Benefits mention Docker, which is not a requirement
+    assert "Docker" not in analysis["keywords"]["ats_keywords"]
+    assert {"Mentoring", "Collaboration"} <= set(analysis["keywords"]["soft_skills"])
+
+
+def test_unknown_fields_are_not_guessed():
+    analysis = LocalJobAnalyzer().analyze("We need someone who writes Python and knows Docker well.")
+    assert analysis["role_info"]["company"] == "Unknown"
+    assert analysis["role_info"]["location"] == "Unknown"
+    assert analysis["requirements"]["years_experience"] is None
+    assert analysis["requirements"]["education"] is None
+    assert analysis["requirements"]["must_have_skills"] == ["Python", "Docker"]
+
+
+def test_years_and_level_patterns():
+    analyzer = LocalJobAnalyzer()
+    assert analyzer._find_years("at least 7+ yrs of backend work") == "7+ years"
+    assert analyzer._find_years("2 to 4 years of experience") == "2-4 years"
+    assert analyzer._find_years("founded 100 years ago; 5 years experience") == "5 years"
+    assert analyzer._find_level("Backend Engineer", "6 years of experience") == "Senior"
+    assert analyzer._find_level("Junior Developer", "6 years of experience") == "Junior"
+
+
+def test_screen_prefilters_by_local_match():
+    profile = {"skills": {"languages": ["Python", "Go", "SQL"], "tools": ["Kubernetes", "PyTorch", "Airflow"]}, "experience": []}
+    postings = [POSTING, "Senior iOS Engineer\nRequirements:\n* Swift and Objective-C\n* 5+ years of experience"]
+    screening = LocalJobAnalyzer().screen(profile, postings, min_score=50)
+    assert [entry["index"] for entry in screening] == [0, 1]
+    assert [entry["passed"] for entry in screening] == [True, False]
+
+
+def test_local_mode_never_calls_the_api():
+    analyzer = JobAnalyzer(None, mode="local")
+    assert analyzer.analyze(POSTING)["source"] == "local"
+    assert asyncio.run(analyzer.analyze_async(POSTING))["source"] == "local"
+
+
+def test_fallback_on_api_failure():
+    analyzer = JobAnalyzer(FailingClient(), AsyncFailingClient(), fallback=True)
+    assert analyzer.analyze(POSTING)["role_info"]["company"] == "Acme Robotics"
+    assert asyncio.run(analyzer.analyze_async(POSTING))["source"] == "local"
+
+    # A stream that fails before any field falls back and reports every local field
+    fields = []
+    result = analyzer.analyze_streaming(POSTING, on_field=lambda field, value: fields.append((field, value)))
+    assert [field for field, _ in fields] == ["role_info", "requirements", "keywords", "summary"]
+    assert result["source"] == "local" and fields[0][1] == result["role_info"]
+
+    async def collect(field, value):
+        fields.append(field)
+
+    fields = []
+    result = asyncio.run(analyzer.analyze_streaming_async(POSTING, on_field=collect))
+    assert fields == ["role_info", "requirements", "keywords", "summary"] and result["source"] == "local"
+
+
+def test_no_fallback_after_fields_were_streamed():
+    # A local result could contradict fields the caller already received
+    analyzer = JobAnalyzer(FailingClient(fields_before_error=1), AsyncFailingClient(fields_before_error=1), fallback=True)
+    fields = []
+    expect_error(ConnectionError, lambda: analyzer.analyze_streaming(POSTING, on_field=lambda f, v: fields.append(f)))
+    assert fields == ["role_info"]
+
+    async def collect(field, value):
+        fields.append(field)
+
+    fields = []
+    expect_error(ConnectionError, lambda: asyncio.run(analyzer.analyze_streaming_async(POSTING, on_field=collect)))
+    assert fields == ["role_info"]
+
+
+def test_on_field_errors_propagate():
+    class Rejected(Exception):
+        pass
+
+    def reject(field, value):
+        raise Rejected(field)
+
+    async def reject_async(field, value):
+        raise Rejected(field)
+
+    streaming = JobAnalyzer(FailingClient(fields_before_error=2), AsyncFailingClient(fields_before_error=2), fallback=True)
+    assert str(expect_error(Rejected, lambda: streaming.analyze_streaming(POSTING, on_field=reject))) == "role_info"
+    expect_error(Rejected, lambda: asyncio.run(streaming.analyze_streaming_async(POSTING, on_field=reject_async)))
+
+    # Also when the fields come from the local fallback
+    failing = JobAnalyzer(FailingClient(), AsyncFailingClient(), fallback=True)
+    expect_error(Rejected, lambda: failing.analyze_streaming(POSTING, on_field=reject))
+    expect_error(Rejected, lambda: asyncio.run(failing.analyze_streaming_async(POSTING, on_field=reject_async)))
+
+
+def test_quota_errors_are_not_masked_by_the_fallback():
+    quota = QuotaExceededError("alice", 1000, 1000, 60)
+    analyzer = JobAnalyzer(FailingClient(quota), AsyncFailingClient(quota), fallback=True)
+    assert expect_error(QuotaExceededError, lambda: analyzer.analyze(POSTING)) is quota
+    expect_error(QuotaExceededError, lambda: asyncio.run(analyzer.analyze_async(POSTING)))
+    expect_error(QuotaExceededError, lambda: analyzer.analyze_streaming(POSTING))
+    expect_error(QuotaExceededError, lambda: asyncio.run(analyzer.analyze_streaming_async(POSTING)))
+
+
+def test_fallback_disabled_raises():
+    analyzer = JobAnalyzer(FailingClient(), fallback=False)
+    try:
+        analyzer.analyze(POSTING)
+    except ConnectionError:
+        pass
+    else:
+        raise AssertionError("expected the API error to propagate")
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,166 @@
+"""
+Tests for MatchCalculator matching semantics.
+Checks the inverted-index matcher against the original pairwise implementation.
+
+Run with: python -m pytest test_match_calculator.py  (or python test_match_calculator.py)
+"""
+
+import json
+import random
+import sys
+from typing import Set
+
+from utils.match_calculator import MatchCalculator, TokenIndex
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+
+def legacy_count_matches(required: Set[str], candidate: Set[str]) -> int:
+    """Original O(required x candidate) implementation, kept as the reference."""
+    matches = 0
+    for req_item in required:
+        if req_item in candidate:
+            matches += 1
+            continue
+        req_words = set(req_item.split())
+        for cand_item in candidate:
+            if req_words & set(cand_item.split()):
+                matches += 1
+                break
+    return matches
+
+
+class LegacyMatchCalculator(MatchCalculator):
+    def _count_matches(self, required, candidate):
+        items = candidate.items if isinstance(candidate, TokenIndex) else candidate
+        return legacy_count_matches(required, items)
+
+
+def random_items(rng: random.Random, words: list, count: int) -> Set[str]:
+    return {" ".join(rng.sample(words, rng.randint(1, 3))) for _ in range(count)}
+
+
+def test_exact_match():
+    assert MatchCalculator()._count_matches({"python", "docker"}, {"python", "docker", "go"}) == 2
+
+
+def test_word_overlap_match():
+    # "machine learning" shares "learning" with "deep learning"
+    assert MatchCalculator()._count_matches({"machine learning"}, {"deep learning"}) == 1
+
+
+def test_substrings_do_not_match():
+    assert MatchCalculator()._count_matches({"java"}, {"javascript"}) == 0
+    assert MatchCalculator()._count_matches({"react native"}, {"reactjs"}) == 0
+
+
+def test_empty_inputs():
+    calculator = MatchCalculator()
+    assert calculator._count_matches(set(), {"python"}) == 0
+    assert calculator._count_matches({"python"}, set()) == 0
+    assert calculator._count_matches({""}, {"python"}) == 0
+    assert calculator._count_matches({""}, {""}) == 1
+
+
+def test_token_index_find():
+    index = TokenIndex({"amazon web services", "python", "data engineering"})
+    assert index.find("python") == "python"
+    assert index.find("aws services") == "amazon web services"
+    assert index.find("kubernetes") is None
+
+
+def test_randomized_equivalence_with_legacy():
+    rng = random.Random(42)
+    words = [f"w{i}" for i in range(60)] + ["python", "go", "c++", "node.js", "ci/cd"]
+    calculator = MatchCalculator()
+    for _ in range(300):
+        required = random_items(rng, words, rng.randint(0, 25))
+        candidate = random_items(rng, words, rng.randint(0, 80))
+        assert calculator._count_matches(required, candidate) == legacy_count_matches(required, candidate)
+
+
+def test_full_score_unchanged_on_sample_profile():
+    with open("data/master_profile.json", "r", encoding="utf-8") as f:
+        profile = json.load(f)
+    analysis = {
+        "requirements": {
+            "must_have_skills": ["Python", "Machine Learning", "Kubernetes", "REST APIs", "Java"],
+            "nice_to_have_skills": ["Redis", "Cloud Architecture", "GraphQL"],
+        },
+        "keywords": {"ats_keywords": ["microservices", "optimization", "leadership", "pricing", "agile"]},
+    }
+    new = MatchCalculator().calculate_match_score(profile, analysis)
+    old = LegacyMatchCalculator().calculate_match_score(profile, analysis)
+    for field in ("overall_score", "required_skills_matched", "nice_to_have_matched", "keywords_matched"):
+        assert new[field] == old[field], field
+    assert set(new["missing_required_skills"]) == set(old["missing_required_skills"])
+
+
+def test_rank_jobs_matches_single_scoring():
+    with open("data/master_profile.json", "r", encoding="utf-8") as f:
+        profile = json.load(f)
+    rng = random.Random(7)
+    skills = ["Python", "Redis", "Kubernetes", "Machine Learning", "Java", "Cloud Architecture", "React",
+              "PostgreSQL", "GraphQL", "Agile", "Docker", "Go"]
+    keywords = ["microservices", "optimization", "leadership", "pricing", "agile", "stakeholder", "scalable"]
+    analyses = [
+        {
+            "requirements": {
+                "must_have_skills": rng.sample(skills, rng.randint(0, 5)),
+                "nice_to_have_skills": rng.sample(skills, rng.randint(0, 4)),
+            },
+            "keywords": {"ats_keywords": rng.sample(keywords, rng.randint(0, 5))},
+        }
+        for _ in range(200)
+    ]
+    calculator = MatchCalculator()
+    ranking = calculator.rank_jobs(profile, analyses)
+
+    assert sorted(entry["index"] for entry in ranking) == list(range(len(analyses)))
+    scores = [entry["match_score"]["overall_score"] for entry in ranking]
+    assert scores == sorted(scores, reverse=True)
+    for entry in ranking:
+        expected = calculator.calculate_match_score(profile, analyses[entry["index"]])
+        assert entry["match_score"] == expected, entry["index"]
+
+    assert [e["index"] for e in calculator.rank_jobs(profile, analyses, top_n=5)] == [e["index"] for e in ranking[:5]]
+    assert calculator.rank_jobs(profile, []) == []
+
+
+def test_profile_features_cached_per_version():
+    profile = {"skills": {"languages": ["Python", "Go"]}, "experience": []}
+    analysis = {"requirements": {"must_have_skills": ["Python", "Rust"]}}
+    calculator = MatchCalculator()
+
+    first = calculator.calculate_match_score(profile, analysis)
+    assert calculator.calculate_match_score(profile, analysis) == first
+    assert (calculator.feature_hits, calculator.feature_misses) == (1, 1)
+
+    # Editing the profile changes its content hash, so features are rebuilt
+    profile["skills"]["languages"].append("Rust")
+    assert calculator.calculate_match_score(profile, analysis)["required_skills_matched"] == 2
+    assert calculator.feature_misses == 2
+
+    # An explicit version (e.g. Profile.updated_at) skips hashing the profile
+    calculator.calculate_match_score(profile, analysis, profile_version="profile:1:v1")
+    calculator.calculate_match_score(profile, analysis, profile_version="profile:1:v1")
+    assert (calculator.feature_hits, calculator.feature_misses) == (2, 3)
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
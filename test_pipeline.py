@@ -0,0 +1,270 @@
+"""
+Tests for the async application pipeline with stub agents (no LLM calls):
+concurrent stages and their timings, cancellation when a stage fails, and
+batch processing with bounded concurrency, failure isolation and the local
+prefilter.
+
+Run with: python -m pytest test_pipeline.py  (or python test_pipeline.py)
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+
+from agents.local_job_analyzer import LocalJobAnalyzer
+from utils.pipeline import ApplicationPipeline, gather_or_cancel
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        pass
+
+PROFILE = {
+    "personal_info": {"name": "Test User"},
+    "skills": {"Languages": ["Python", "Go"], "Tools": ["Docker", "Kubernetes", "PostgreSQL"]},
+    "experience": [{"company": "Tech Corp", "title": "Backend Engineer", "achievements": ["Built Python APIs."]}],
+}
+
+PYTHON_JOB = """Backend Engineer at Acme
+Requirements:
+- Python, Go and PostgreSQL
+- Docker and Kubernetes"""
+
+NURSE_JOB = """Registered Nurse at St. Mary's Hospital
+Requirements:
+- Valid nursing license and BLS certification
+- Two years of acute care experience"""
+
+
+class StubAnalyzer:
+    """Stands in for JobAnalyzer: counts LLM analyses and the most running at once."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self.local_analyzer = LocalJobAnalyzer()
+
+    def stored_analyses(self, job_descriptions):
+        return [None] * len(job_descriptions)
+
+    async def analyze_streaming_async(self, job_description, on_field=None):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if "FAIL" in job_description:
+                raise RuntimeError("analysis failed")
+            title = job_description.split("\n", 1)[0]
+            return {
+                "role_info": {"title": title, "company": "Acme"},
+                "requirements": {"must_have_skills": ["Python"]},
+                "keywords": {"ats_keywords": ["Python"]},
+            }
+        finally:
+            self.active -= 1
+
+
+class StubCustomizer:
+    async def customize_async(self, profile, analysis, snippets):
+        return {"personal_info": profile["personal_info"], "professional_summary": "Summary", "experience": []}
+
+
+class StubCoverLetter:
+    async def generate_async(self, profile, analysis):
+        return "Dear Hiring Manager,\n\nHello.\n\nSincerely,"
+
+
+class Intervals:
+    """Records when each stub stage ran, and which were cancelled."""
+
+    def __init__(self):
+        self.spans = {}
+        self.cancelled = set()
+
+    def overlap(self, a, b):
+        (a_start, a_end), (b_start, b_end) = self.spans[a], self.spans[b]
+        return min(a_end, b_end) - max(a_start, b_start)
+
+
+class SleepingCustomizer:
+    def __init__(self, intervals, delay=0.2):
+        self.intervals = intervals
+        self.delay = delay
+
+    async def customize_async(self, profile, analysis, snippets):
+        start = time.perf_counter()
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.intervals.cancelled.add("cv")
+            raise
+        self.intervals.spans["cv"] = (start, time.perf_counter())
+        return {"personal_info": profile["personal_info"], "professional_summary": "Summary", "experience": []}
+
+
+class SleepingCoverLetter:
+    def __init__(self, intervals, delay=0.2, error=None):
+        self.intervals = intervals
+        self.delay = delay
+        self.error = error
+
+    async def generate_async(self, profile, analysis):
+        start = time.perf_counter()
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        self.intervals.spans["cover_letter"] = (start, time.perf_counter())
+        return "Dear Hiring Manager,\n\nHello.\n\nSincerely,"
+
+
+class SleepingMatchCalculator:
+    """Blocking, like MatchCalculator (the pipeline runs it in a thread)."""
+
+    def __init__(self, intervals, delay=0.2):
+        self.intervals = intervals
+        self.delay = delay
+
+    def calculate_match_score(self, profile, analysis, profile_version=None):
+        start = time.perf_counter()
+        time.sleep(self.delay)
+        self.intervals.spans["match"] = (start, time.perf_counter())
+        return {"overall_score": 80}
+
+
+def test_stages_after_the_analysis_run_concurrently():
+    intervals = Intervals()
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = ApplicationPipeline(
+            StubAnalyzer(), SleepingCustomizer(intervals), SleepingCoverLetter(intervals),
+            match_calculator=SleepingMatchCalculator(intervals), output_dir=tmp,
+        )
+        result = asyncio.run(pipeline.run(PYTHON_JOB, PROFILE, use_rag=False))
+
+    for a, b in (("cv", "cover_letter"), ("cv", "match"), ("cover_letter", "match")):
+        assert intervals.overlap(a, b) > 0.1, (a, b)
+    timings = result["timings"]
+    assert set(timings) == {"analysis", "cv_customization", "cover_letter", "match_scoring", "documents", "total"}
+    for stage in ("cv_customization", "cover_letter", "match_scoring"):
+        assert 0.2 <= timings[stage] < 0.5, stage
+    # Latency is the slowest stage, not the sum of the three
+    assert timings["total"] < 0.6
+
+
+def test_failing_stage_cancels_the_others():
+    intervals = Intervals()
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = ApplicationPipeline(
+            StubAnalyzer(), SleepingCustomizer(intervals, delay=5),
+            SleepingCoverLetter(intervals, delay=0.05, error=RuntimeError("letter failed")),
+            match_calculator=SleepingMatchCalculator(intervals, delay=0), output_dir=tmp,
+        )
+        async def run():
+            try:
+                await pipeline.run(PYTHON_JOB, PROFILE, use_rag=False)
+            except RuntimeError as e:
+                assert str(e) == "letter failed"
+                # Cancelled before the failure reached the caller, not when the loop shut down
+                assert intervals.cancelled == {"cv"}
+            else:
+                raise AssertionError("the run should fail")
+
+        start = time.perf_counter()
+        asyncio.run(run())
+        assert time.perf_counter() - start < 1
+
+
+def test_gather_or_cancel():
+    async def value(v, delay=0.0):
+        await asyncio.sleep(delay)
+        return v
+
+    async def fail(delay):
+        await asyncio.sleep(delay)
+        raise ValueError("boom")
+
+    async def run():
+        assert await gather_or_cancel(value(1, 0.02), value(2), value(3, 0.01)) == [1, 2, 3]
+        slow = asyncio.ensure_future(value(4, 5))
+        try:
+            await gather_or_cancel(slow, fail(0.01))
+        except ValueError:
+            pass
+        assert slow.cancelled()
+
+        # Cancelling the caller cancels the stages too
+        slow = asyncio.ensure_future(value(5, 5))
+        caller = asyncio.ensure_future(gather_or_cancel(slow))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        assert slow.cancelled()
+
+    asyncio.run(run())
+
+
+def make_pipeline(tmp, analyzer):
+    return ApplicationPipeline(analyzer, StubCustomizer(), StubCoverLetter(), output_dir=tmp)
+
+
+def run_batch(pipeline, job_descriptions, **kwargs):
+    async def collect():
+        return [item async for item in pipeline.run_batch(job_descriptions, PROFILE, **kwargs)]
+    return asyncio.run(collect())
+
+
+def test_batch_failure_only_fails_its_own_item():
+    with tempfile.TemporaryDirectory() as tmp:
+        analyzer = StubAnalyzer()
+        items = run_batch(make_pipeline(tmp, analyzer), [PYTHON_JOB, "FAIL " + PYTHON_JOB, PYTHON_JOB])
+        by_index = {item["index"]: item for item in items}
+        assert sorted(by_index) == [0, 1, 2]
+        assert by_index[1] == {"index": 1, "success": False, "error": "analysis failed"}
+        for index in (0, 2):
+            assert by_index[index]["success"]
+            assert by_index[index]["download_urls"]["cv"] == f"/download/{by_index[index]['files']['cv']}"
+        assert analyzer.calls == 3
+
+
+def test_batch_respects_max_concurrency():
+    with tempfile.TemporaryDirectory() as tmp:
+        analyzer = StubAnalyzer(delay=0.05)
+        items = run_batch(make_pipeline(tmp, analyzer), [PYTHON_JOB] * 7, max_concurrency=3)
+        assert len(items) == 7 and all(item["success"] for item in items)
+        assert analyzer.max_active == 3
+
+        analyzer = StubAnalyzer(delay=0.05)
+        run_batch(make_pipeline(tmp, analyzer), [PYTHON_JOB] * 3, max_concurrency=0)
+        assert analyzer.max_active == 1
+
+
+def test_prefilter_skips_low_matches_without_llm_calls():
+    with tempfile.TemporaryDirectory() as tmp:
+        analyzer = StubAnalyzer()
+        items = run_batch(make_pipeline(tmp, analyzer), [NURSE_JOB, PYTHON_JOB], min_match_score=50)
+        by_index = {item["index"]: item for item in items}
+        assert by_index[0]["skipped"] and not by_index[0]["success"]
+        assert by_index[0]["match_score"]["overall_score"] < 50
+        assert "below 50" in by_index[0]["error"]
+        assert by_index[1]["success"] and "skipped" not in by_index[1]
+        # Only the posting that passed reached the (stub) LLM analyzer
+        assert analyzer.calls == 1
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
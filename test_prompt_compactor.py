@@ -0,0 +1,201 @@
+"""
+Tests for prompt compaction of profile, job analysis and RAG snippets.
+
+Run with: python -m pytest test_prompt_compactor.py  (or python test_prompt_compactor.py)
+"""
+
+import json
+import sys
+
+from agents.cover_letter_generator import CoverLetterGenerator
+from agents.cv_customizer import CVCustomizer
+from utils.prompt_compactor import PromptCompactor, compact_json, count_tokens, drop_empty
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+PROFILE = {
+    "personal_info": {"name": "Alex Candidate", "website": "", "github": None},
+    "summary": "Backend engineer.",
+    "skills": {"Languages": ["Python", "Go"], "Other": []},
+    "experience": [
+        {
+            "company": "Tech Corp",
+            "title": "Senior Engineer",
+            "dates": "2020 - Present",
+            "achievements": [
+                "Built Kubernetes operators in Go for 40 services.",
+                "Organized the office book club.",
+                "Cut API latency by 30% with Redis caching.",
+            ],
+        },
+        {
+            "company": "Old Co",
+            "title": "Engineer",
+            "dates": "2014 - 2016",
+            "responsibilities": ["Maintained Perl reports.", "Wrote Python ETL jobs."],
+        },
+    ],
+    "projects": [{"name": "Dotfiles", "description": "Shell configuration."}],
+}
+ANALYSIS = {
+    "role_info": {"title": "Platform Engineer", "company": "Unknown", "location": None},
+    "requirements": {"must_have_skills": ["Kubernetes", "Go", "Python"], "nice_to_have_skills": ["Redis"], "education": None},
+    "keywords": {"ats_keywords": ["Kubernetes", "latency"], "soft_skills": []},
+}
+SNIPPETS = [
+    {"content": "Built Kubernetes operators in Go for 40 services.",
+     "metadata": {"type": "experience", "company": "Tech Corp", "title": "Senior Engineer"}},
+    {"content": "Built Kubernetes operators in Go for 40 services.",
+     "metadata": {"type": "experience", "company": "Tech Corp", "title": "Senior Engineer"}},
+]
+
+
+def test_drop_empty_keeps_falsy_values():
+    assert drop_empty({"a": "", "b": None, "c": [], "d": {"e": []}, "f": 0, "g": False, "h": [" x ", ""]}) == {
+        "f": 0, "g": False, "h": ["x"]
+    }
+
+
+def test_compact_json_has_no_padding():
+    assert compact_json({"a": [1, 2], "b": "é"}) == '{"a":[1,2],"b":"é"}'
+
+
+def test_snippets_are_sent_once():
+    compacted = PromptCompactor().compact(PROFILE, ANALYSIS, SNIPPETS)
+    assert compacted["snippets"] == "P1 (Senior Engineer, Tech Corp): Built Kubernetes operators in Go for 40 services."
+    profile = json.loads(compacted["profile"])
+    assert profile["experience"][0]["achievements"][0] == "P1"
+    assert "Kubernetes operators" not in compacted["profile"]
+    assert "website" not in compacted["profile"] and "Other" not in compacted["profile"]
+    assert "education" not in compacted["analysis"]
+    assert compacted["tokens_after"] < compacted["tokens_before"]
+
+
+def test_budget_drops_least_relevant_bullets():
+    compactor = PromptCompactor()
+    full = compactor.compact(PROFILE, ANALYSIS, SNIPPETS)
+    compactor.max_tokens = full["tokens_after"] - 5
+    compacted = compactor.compact(PROFILE, ANALYSIS, SNIPPETS)
+    assert compacted["tokens_after"] <= compactor.max_tokens
+    # Irrelevant entries go first, oldest first (projects count as oldest)
+    assert compacted["dropped_bullets"] == 1 and "Dotfiles" not in compacted["profile"]
+
+    compactor.max_tokens = full["tokens_after"] - 40
+    compacted = compactor.compact(PROFILE, ANALYSIS, SNIPPETS)
+    assert compacted["tokens_after"] <= compactor.max_tokens
+    assert "Perl" not in compacted["profile"] and "book club" not in compacted["profile"]
+    # Snippet references and bullets matching the job stay
+    assert "P1" in compacted["profile"] and "Redis" in compacted["profile"] and "Python ETL" in compacted["profile"]
+    # The original profile is untouched
+    assert len(PROFILE["experience"][0]["achievements"]) == 3
+
+
+def test_count_tokens_counts_indentation():
+    assert count_tokens(json.dumps(PROFILE, indent=2)) > count_tokens(compact_json(PROFILE))
+
+
+def test_cv_prompt_uses_compacted_payload():
+    prompt = CVCustomizer(None, compactor=PromptCompactor())._build_prompt(PROFILE, ANALYSIS, SNIPPETS)
+    assert prompt.count("Built Kubernetes operators") == 1
+    assert compact_json(drop_empty(ANALYSIS)) in prompt
+
+
+def test_stable_profile_does_not_depend_on_the_job():
+    compactor = PromptCompactor()
+    other_job = {"role_info": {"title": "Data Engineer"}, "requirements": {"must_have_skills": ["Perl"]}}
+    first = compactor.compact(PROFILE, ANALYSIS, SNIPPETS, stable_profile=True)
+    second = compactor.compact(PROFILE, other_job, [], stable_profile=True)
+    assert first["profile"] == second["profile"]
+    # Snippets point to the profile bullet instead of repeating it
+    assert first["snippets"] == "P1 (Senior Engineer, Tech Corp): see profile experience[0].achievements[0]"
+    assert "Kubernetes operators" in first["profile"]
+
+
+def test_stable_budget_drops_by_age_only():
+    compactor = PromptCompactor()
+    profile_tokens = count_tokens(compactor.compact(PROFILE, ANALYSIS, stable_profile=True)["profile"])
+    # The profile gets two thirds of the budget whatever the job
+    compactor.max_tokens = (profile_tokens - 5) * 3 // 2
+    first = compactor.compact(PROFILE, ANALYSIS, SNIPPETS, stable_profile=True)
+    second = compactor.compact(PROFILE, {"requirements": {"must_have_skills": ["Perl"]}}, stable_profile=True)
+    assert first["dropped_bullets"] > 0 and first["profile"] == second["profile"]
+    assert "Dotfiles" not in first["profile"]
+
+
+def long_profile():
+    """PROFILE plus an early role whose many irrelevant bullets leave room for the job analysis."""
+    profile = json.loads(json.dumps(PROFILE))
+    profile["experience"].append({
+        "company": "First Job",
+        "title": "Intern",
+        "dates": "2010 - 2012",
+        "achievements": [f"Filed weekly report number {i}." for i in range(20)] + ["Scripted deployments in Python."],
+    })
+    return profile
+
+
+def trimmed_compactor(profile):
+    """A compactor whose cached profile share forces a few of the oldest bullets out."""
+    compactor = PromptCompactor()
+    profile_tokens = count_tokens(compactor.compact(profile, ANALYSIS, stable_profile=True)["profile"])
+    compactor.max_tokens = (profile_tokens - 40) * 3 // 2
+    return compactor
+
+
+def test_stable_budget_re_adds_job_relevant_bullets_after_the_profile():
+    profile = long_profile()
+    compactor = trimmed_compactor(profile)
+    compacted = compactor.compact(profile, ANALYSIS, SNIPPETS, stable_profile=True)
+    assert compacted["dropped_bullets"] >= 3
+    assert "Scripted deployments" not in compacted["profile"]
+    # The old Python bullet matches the job, so it comes back in the per-job part...
+    assert "P2 (Intern, First Job): Scripted deployments in Python." in compacted["snippets"].split("\n")
+    # ...but not the irrelevant ones dropped with it
+    assert "Filed weekly report" not in compacted["snippets"] and "Dotfiles" not in compacted["snippets"]
+    assert compacted["tokens_after"] <= compactor.max_tokens
+
+    # The cached profile does not depend on the job
+    other = compactor.compact(profile, {"requirements": {"must_have_skills": ["Perl"]}}, stable_profile=True)
+    assert other["profile"] == compacted["profile"]
+    assert "Scripted deployments" not in other["snippets"]
+
+    # When the job analysis already fills the rest of the budget nothing is re-added
+    short = trimmed_compactor(PROFILE).compact(PROFILE, ANALYSIS, SNIPPETS, stable_profile=True)
+    assert "Python ETL" not in short["profile"] and "Python ETL" not in short["snippets"]
+
+
+def test_cover_letter_quotes_re_added_bullets_after_the_analysis():
+    profile = long_profile()
+    prompt = CoverLetterGenerator(None, compactor=trimmed_compactor(profile))._build_prompt(profile, ANALYSIS)
+    assert prompt.index("JOB ANALYSIS:") < prompt.index("Scripted deployments in Python.")
+
+
+def test_prompts_start_with_a_job_independent_prefix():
+    other_job = {"role_info": {"title": "Data Engineer"}, "requirements": {"must_have_skills": ["Perl"]}}
+    for agent, build in (
+        (CVCustomizer(None, compactor=PromptCompactor()), lambda a, job: a._build_prompt(PROFILE, job, SNIPPETS)),
+        (CoverLetterGenerator(None, compactor=PromptCompactor()), lambda a, job: a._build_prompt(PROFILE, job)),
+    ):
+        first, second = build(agent, ANALYSIS), build(agent, other_job)
+        prefix = first[:first.index("JOB ANALYSIS:")]
+        assert second.startswith(prefix) and "Kubernetes operators" in prefix
+        assert "Platform Engineer" not in prefix
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,246 @@
+"""
+Tests for the RAG engine: tokenization, BM25 scoring and ranking over the
+inverted index, and the persisted, incrementally rebuilt on-disk index.
+
+Run with: python -m pytest test_rag_engine.py  (or python test_rag_engine.py)
+"""
+
+import contextlib
+import copy
+import io
+import json
+import math
+import os
+import sys
+import tempfile
+from collections import Counter
+
+import utils.rag_engine as rag_engine
+from utils.rag_engine import RAGEngine, tokenize, index_terms
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        pass
+
+PROFILE = {
+    "experience": [
+        {
+            "company": "DataWorks",
+            "title": "Data Engineer",
+            "achievements": [
+                "Built Kafka streaming pipelines processing 2M events per day",
+                "Migrated batch ETL jobs from cron to Airflow",
+                "Tuned PostgreSQL queries, cutting report latency by 60%",
+            ],
+        },
+        {
+            "company": "TechNova",
+            "title": "Backend Engineer",
+            "achievements": [
+                "Designed REST APIs in Python and FastAPI serving 10k requests per second",
+                "Deployed services to Kubernetes with Helm and ArgoCD",
+                "Mentored three junior engineers on Python testing practices",
+            ],
+        },
+    ],
+    "projects": [
+        {"name": "Resume Bot", "description": "An LLM agent in Python that tailors resumes with RAG"},
+    ],
+}
+
+
+def brute_force_bm25(engine, terms):
+    """Reference BM25 computed directly from the snippets, without the index."""
+    docs = [Counter(index_terms(s["content"])) for s in engine.snippets]
+    avgdl = sum(sum(d.values()) for d in docs) / len(docs)
+    scores = {}
+    for term in set(terms):
+        df = sum(1 for d in docs if term in d)
+        if not df:
+            continue
+        idf = math.log(1.0 + (len(docs) - df + 0.5) / (df + 0.5))
+        for doc_id, d in enumerate(docs):
+            tf = d.get(term, 0)
+            if tf:
+                norm = engine.k1 * (1.0 - engine.b + engine.b * sum(d.values()) / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (engine.k1 + 1.0) / (tf + norm)
+    return scores
+
+
+def test_tokenize_keeps_skill_tokens_intact():
+    assert tokenize("Built C++ and C# services; CI/CD with Node.js in real-time.") == [
+        "built", "c++", "and", "c#", "services", "ci/cd", "with", "node.js", "in", "real-time",
+    ]
+
+
+def test_snippets_cover_achievements_and_projects():
+    engine = RAGEngine(profile=PROFILE, mode="bm25")
+    assert len(engine.snippets) == 7
+    assert engine.snippets[0]["metadata"] == {
+        "type": "experience", "company": "DataWorks", "title": "Data Engineer", "dates": "",
+    }
+    assert engine.snippets[-1]["content"].startswith("Project Resume Bot:")
+    assert engine.index_path == ""
+
+
+def test_index_scores_match_reference_bm25():
+    engine = RAGEngine(profile=PROFILE, mode="bm25")
+    for query in (["python"], ["kafka", "airflow", "python"], ["engineers", "testing", "unknown-term"]):
+        expected = brute_force_bm25(engine, query)
+        actual = engine.score(query)
+        assert actual.keys() == expected.keys(), query
+        for doc_id, score in expected.items():
+            assert abs(actual[doc_id] - score) < 1e-9, query
+
+
+def test_ranking_prefers_rarer_and_repeated_terms():
+    engine = RAGEngine(profile=PROFILE, mode="bm25")
+    ranked = [s["content"] for s in engine.retrieve_relevant_experience(["Kafka", "Python"], top_k=3)]
+    # "kafka" is rarer than "python", so its only snippet wins
+    assert ranked[0].startswith("Built Kafka streaming")
+    assert all("Python" in text for text in ranked[1:])
+    assert len(ranked) == 3
+
+
+def test_ranking_only_returns_matching_snippets():
+    engine = RAGEngine(profile=PROFILE, mode="bm25")
+    assert engine.retrieve_relevant_experience(["Rust", "Haskell"]) == []
+    assert len(engine.retrieve_relevant_experience(["Python"], top_k=15)) == 3
+
+
+def test_ties_keep_profile_order_and_batches_match_single_queries():
+    engine = RAGEngine(profile=PROFILE, mode="bm25")
+    queries = [["Python"], ["Kubernetes"], ["PostgreSQL", "Airflow"]]
+    batch = engine.rank(queries, top_k=5)
+    assert batch == [engine.rank([q], top_k=5)[0] for q in queries]
+
+    twins = RAGEngine(profile={"experience": [{"achievements": ["Wrote Go services", "Wrote Go tooling", "Wrote Go clients"]}]})
+    scores = twins.score(["go"])
+    assert len(set(scores.values())) == 1
+    assert twins.rank([["Go"]], top_k=3) == [[0, 1, 2]]
+
+
+def test_empty_profile_retrieves_nothing():
+    engine = RAGEngine(profile={}, mode="bm25")
+    assert engine.snippets == []
+    assert engine.retrieve_relevant_experience(["Python"]) == []
+
+
+def write_profile(tmp, profile):
+    path = os.path.join(tmp, "master_profile.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile, f)
+    return path
+
+
+def build_quietly(**kwargs):
+    """Build an engine and return it with its log output."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        engine = RAGEngine(mode="bm25", **kwargs)
+    return engine, out.getvalue()
+
+
+def index_contents(engine):
+    """Vocabulary-independent view of the forward index and postings."""
+    terms = list(engine._vocab)
+    forward = [
+        {terms[engine._fwd_terms[i]]: engine._fwd_tfs[i] for i in range(engine._fwd_offsets[d], engine._fwd_offsets[d + 1])}
+        for d in range(len(engine._fwd_offsets) - 1)
+    ]
+    postings = {
+        term: [(engine._post_docs[i], engine._post_tfs[i]) for i in range(engine._post_offsets[t], engine._post_offsets[t + 1])]
+        for term, t in engine._vocab.items()
+    }
+    return forward, postings, list(engine._doc_len), engine._avgdl
+
+
+def test_index_is_saved_and_reloaded_with_mmap():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_profile(tmp, PROFILE)
+        built, _ = build_quietly(profile_path=path)
+        assert os.path.exists(os.path.join(tmp, "master_profile.ragidx"))
+        assert built._mmap is None
+
+        loaded, log = build_quietly(profile_path=path)
+        assert "Loaded index" in log
+        assert loaded._mmap is not None and loaded.profile_hash == built.profile_hash
+        assert index_contents(loaded) == index_contents(built)
+        assert loaded.rank([["Python", "Kafka"]]) == built.rank([["Python", "Kafka"]])
+        loaded._release_index()
+        assert loaded._mmap is None
+
+
+def test_incremental_rebuild_matches_fresh_build():
+    edited = copy.deepcopy(PROFILE)
+    achievements = edited["experience"][0]["achievements"]
+    achievements[1] = "Migrated batch ETL jobs from cron to Airflow and dbt"  # edited
+    del achievements[2]  # removed: its "postgresql" terms must leave the vocabulary
+    edited["experience"][1]["achievements"].append("Ran chaos experiments on Kubernetes")  # added
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_profile(tmp, PROFILE)
+        build_quietly(profile_path=path)
+        write_profile(tmp, edited)
+        incremental, log = build_quietly(profile_path=path)
+        fresh, _ = build_quietly(profile=edited)
+
+        assert "(2 re-indexed)" in log
+        assert "postgresql" not in incremental._vocab
+        assert index_contents(incremental) == index_contents(fresh)
+        for query in (["Airflow"], ["dbt", "Kubernetes"], ["Python", "PostgreSQL"]):
+            assert incremental.score([t for kw in query for t in rag_engine.query_terms(kw)]) == \
+                fresh.score([t for kw in query for t in rag_engine.query_terms(kw)])
+            assert incremental.rank([query]) == fresh.rank([query])
+
+        # The rebuilt index was saved and reloads as-is
+        reloaded, log = build_quietly(profile_path=path)
+        assert "Loaded index" in log and index_contents(reloaded) == index_contents(fresh)
+
+
+def test_index_version_bump_forces_a_rebuild():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_profile(tmp, PROFILE)
+        build_quietly(profile_path=path)
+        original = rag_engine.INDEX_VERSION
+        rag_engine.INDEX_VERSION = original + 1
+        try:
+            rebuilt, log = build_quietly(profile_path=path)
+            assert "incompatible index format" in log
+            assert "(7 re-indexed)" in log and rebuilt._mmap is None
+            # The new format replaced the old file
+            reloaded, log = build_quietly(profile_path=path)
+            assert "Loaded index" in log
+        finally:
+            rag_engine.INDEX_VERSION = original
+        _, log = build_quietly(profile_path=path)
+        assert "incompatible index format" in log
+
+
+def test_corrupt_index_is_ignored():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_profile(tmp, PROFILE)
+        build_quietly(profile_path=path)
+        index_path = os.path.join(tmp, "master_profile.ragidx")
+        with open(index_path, "r+b") as f:
+            f.truncate(os.path.getsize(index_path) - 4)
+        engine, log = build_quietly(profile_path=path)
+        assert "truncated index" in log and "(7 re-indexed)" in log
+        assert len(engine.retrieve_batch([["Python"]])[0]) == 3
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
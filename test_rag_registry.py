@@ -0,0 +1,172 @@
+"""
+Tests for the per-user RAG index registry: LRU and byte-budget eviction,
+invalidation, rebuilds on profile changes and single builds under concurrency.
+
+Run with: python -m pytest test_rag_registry.py  (or python test_rag_registry.py)
+"""
+
+import sys
+import threading
+import time
+
+import utils.rag_registry as rag_registry
+from utils.rag_registry import RAGRegistry
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        pass
+
+
+class FakeEngine:
+    """Stands in for RAGEngine: counts builds, tracks overlap and reports a fixed size."""
+
+    size = 100
+    delay = 0.0
+    builds = 0
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def __init__(self, profile, mode=None):
+        cls = type(self)
+        with cls.lock:
+            cls.builds += 1
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        time.sleep(cls.delay)
+        with cls.lock:
+            cls.active -= 1
+        self.profile = profile
+
+    def memory_bytes(self):
+        return self.size
+
+
+def with_fake_engine(test):
+    """Run a test with RAGEngine replaced by a fresh FakeEngine subclass."""
+    def wrapper():
+        engine = type("Engine", (FakeEngine,), {"builds": 0, "active": 0, "max_active": 0, "lock": threading.Lock()})
+        original = rag_registry.RAGEngine
+        rag_registry.RAGEngine = engine
+        try:
+            test(engine)
+        finally:
+            rag_registry.RAGEngine = original
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+
+def profile(n):
+    return {"personal_info": {"name": f"User {n}"}, "skills": {"technical": [f"skill-{n}"]}}
+
+
+@with_fake_engine
+def test_caches_per_user_and_rebuilds_on_change(engine):
+    registry = RAGRegistry()
+    first = registry.get("alice", profile(1))
+    assert registry.get("alice", profile(1)) is first
+    assert registry.get(42, profile(2)) is registry.get("42", profile(2))
+    changed = registry.get("alice", profile(3))
+    assert changed is not first and changed.profile == profile(3)
+    stats = registry.stats()
+    assert engine.builds == 3 and stats["users"] == 2
+    assert stats["hits"] == 2 and stats["misses"] == 3
+
+
+@with_fake_engine
+def test_lru_eviction_by_user_count(engine):
+    registry = RAGRegistry(max_users=2)
+    a = registry.get("a", profile(1))
+    registry.get("b", profile(2))
+    registry.get("a", profile(1))  # "b" is now least recently used
+    registry.get("c", profile(3))
+    assert registry.stats()["evictions"] == 1
+    assert registry.get("a", profile(1)) is a
+    builds = engine.builds
+    registry.get("b", profile(2))
+    assert engine.builds == builds + 1
+
+
+@with_fake_engine
+def test_byte_budget_keeps_the_newest_index(engine):
+    registry = RAGRegistry(max_bytes=250)
+    for user in ("a", "b", "c"):
+        registry.get(user, profile(user))
+    stats = registry.stats()
+    assert stats["users"] == 2 and stats["bytes"] == 200 and stats["evictions"] == 1
+
+    # An index larger than the whole budget still stays cached on its own
+    engine.size = 1000
+    registry.get("big", profile("big"))
+    stats = registry.stats()
+    assert stats["users"] == 1 and stats["bytes"] == 1000
+
+
+@with_fake_engine
+def test_invalidate_forces_a_rebuild(engine):
+    registry = RAGRegistry()
+    first = registry.get("alice", profile(1))
+    registry.invalidate("alice")
+    registry.invalidate("nobody")
+    assert registry.stats()["users"] == 0 and registry.stats()["bytes"] == 0
+    assert registry.get("alice", profile(1)) is not first
+    assert engine.builds == 2
+
+
+@with_fake_engine
+def test_concurrent_gets_share_one_build(engine):
+    engine.delay = 0.2
+    registry = RAGRegistry()
+    barrier = threading.Barrier(8)
+    results = []
+
+    def request():
+        barrier.wait()
+        results.append(registry.get("alice", profile(1)))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert engine.builds == 1
+    assert len(results) == 8 and all(result is results[0] for result in results)
+    assert registry._build_locks == {}
+
+
+@with_fake_engine
+def test_invalidation_during_a_build_does_not_allow_a_parallel_build(engine):
+    engine.delay = 0.3
+    registry = RAGRegistry()
+    registry.get("alice", profile(1))
+
+    # A profile update starts a rebuild; the old entry is invalidated while it runs
+    rebuild = threading.Thread(target=registry.get, args=("alice", profile(2)))
+    rebuild.start()
+    time.sleep(0.1)
+    registry.invalidate("alice")
+    second = threading.Thread(target=registry.get, args=("alice", profile(2)))
+    second.start()
+    rebuild.join()
+    second.join()
+
+    assert engine.max_active == 1
+    assert engine.builds == 2  # the second request reused the rebuild
+    assert registry._build_locks == {}
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,221 @@
+"""
+Tests for the LLM rate limiter: token buckets, shared backends, Retry-After
+handling and the concurrency cap.
+
+Run with: python -m pytest test_rate_limiter.py  (or python test_rate_limiter.py)
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+
+from utils.deepseek_client import DeepSeekClient
+from utils.rate_limiter import (
+    RateLimiter,
+    MemoryRateLimitBackend,
+    SQLiteRateLimitBackend,
+    retry_after_seconds,
+    wait_retry_after,
+)
+from utils.usage import UsageTracker
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        pass
+
+
+class ClockBackend(MemoryRateLimitBackend):
+    """In-memory backend on a manual clock."""
+
+    def __init__(self):
+        super().__init__()
+        self.now = 1000.0
+
+    def acquire(self, buckets, now=None):
+        return super().acquire(buckets, self.now)
+
+    def adjust(self, bucket, now=None):
+        super().adjust(bucket, self.now)
+
+
+def http_error(headers):
+    error = Exception("429 Too Many Requests")
+    error.response = SimpleNamespace(headers=headers)
+    return error
+
+
+def test_bucket_grants_a_minute_of_requests_then_refills():
+    backend = MemoryRateLimitBackend()
+    bucket = [("requests", 1, 60, 1.0)]
+    for _ in range(60):
+        assert backend.acquire(bucket, now=0.0) == 0
+    assert abs(backend.acquire(bucket, now=0.0) - 1.0) < 1e-9
+    assert backend.acquire(bucket, now=1.0) == 0
+
+
+def test_buckets_are_taken_all_or_nothing():
+    backend = MemoryRateLimitBackend()
+    buckets = [("requests", 1, 10, 1.0), ("tokens", 800, 1000, 10.0)]
+    assert backend.acquire(buckets, now=0.0) == 0
+    # Not enough tokens left: the request bucket must not be charged either
+    assert abs(backend.acquire(buckets, now=0.0) - 60.0) < 1e-9
+    assert backend.acquire([("requests", 9, 10, 1.0)], now=0.0) == 0
+
+    # Refunding the unused estimate makes room immediately
+    backend.adjust(("tokens", -600, 1000, 10.0), now=0.0)
+    assert backend.acquire([("tokens", 800, 1000, 10.0)], now=0.0) == 0
+
+
+def test_sqlite_backend_is_shared_between_instances():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "limits.sqlite")
+        first, second = SQLiteRateLimitBackend(path), SQLiteRateLimitBackend(path)
+        bucket = [("requests", 1, 2, 0.5)]
+        assert first.acquire(bucket, now=0.0) == 0
+        assert second.acquire(bucket, now=0.0) == 0
+        assert abs(first.acquire(bucket, now=0.0) - 2.0) < 1e-9
+
+        second.pause_until(time.time() + 30)
+        assert first.acquire([("other", 1, 10, 1.0)]) > 29
+
+
+def test_retry_after_parsing():
+    assert retry_after_seconds(http_error({"retry-after": "3"})) == 3.0
+    assert retry_after_seconds(http_error({"retry-after-ms": "250"})) == 0.25
+    in_a_minute = retry_after_seconds(http_error({"retry-after": formatdate(time.time() + 60, usegmt=True)}))
+    assert 55 < in_a_minute <= 60
+    assert retry_after_seconds(http_error({})) is None
+    assert retry_after_seconds(ValueError("no response")) is None
+
+
+def test_wait_strategy_honors_retry_after_with_jitter():
+    wait = wait_retry_after(min=2, max=10, jitter=1.0)
+
+    def state(error, attempt=1):
+        return SimpleNamespace(outcome=SimpleNamespace(exception=lambda: error), attempt_number=attempt)
+
+    for _ in range(20):
+        assert 5.0 <= wait(state(http_error({"retry-after": "5"}))) <= 6.0
+        assert 0 <= wait(state(ConnectionError("reset"), attempt=3)) <= 10
+
+
+def test_limiter_sleeps_until_the_bucket_refills():
+    backend = ClockBackend()
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        backend.now += seconds
+
+    limiter = RateLimiter(requests_per_minute=2, backend=backend, sleep=sleep)
+    limiter.wait()
+    limiter.wait()
+    assert slept == []
+    limiter.wait()
+    # One request refills in 30s; jitter adds up to 20% + 50ms
+    assert len(slept) == 1 and 30 <= slept[0] <= 36.05
+
+
+def test_backoff_pauses_every_caller():
+    limiter = RateLimiter(requests_per_minute=1000)
+    limiter.backoff(http_error({"retry-after": "20"}))
+    assert limiter.backend.acquire(limiter._buckets(0)) > 19
+
+
+def test_concurrency_is_capped():
+    limiter = RateLimiter(max_concurrency=2)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def call():
+        with limiter.slot():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2
+
+
+def test_client_charges_actual_usage_to_the_token_bucket():
+    backend = ClockBackend()
+    limiter = RateLimiter(tokens_per_minute=10000, backend=backend, completion_estimate=1000)
+    client = DeepSeekClient(api_key="test", cache=None, usage=UsageTracker(), limiter=limiter)
+    usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20, total_tokens=120)
+    response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))], usage=usage)
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: response)))
+
+    client.generate_content("Hello")
+    # The estimate (prompt + 1000) was charged up front, then corrected to 120 tokens
+    assert backend.acquire([("deepseek:tokens", 9880, 10000, 10000 / 60)]) == 0
+    assert backend.acquire([("deepseek:tokens", 1, 10000, 10000 / 60)]) > 0
+
+
+def test_refund_returns_a_failed_attempts_charge_up_to_capacity():
+    backend = ClockBackend()
+    limiter = RateLimiter(tokens_per_minute=10000, backend=backend, completion_estimate=1000)
+    limiter.wait(500)
+    limiter.refund(500)
+    limiter.refund(500)
+    # Back to a full bucket, never above it
+    assert backend.acquire([("deepseek:tokens", 10000, 10000, 10000 / 60)]) == 0
+    assert backend.acquire([("deepseek:tokens", 1, 10000, 10000 / 60)]) > 0
+
+
+def test_client_retries_are_charged_once():
+    backend = ClockBackend()
+    limiter = RateLimiter(tokens_per_minute=10000, requests_per_minute=60, backend=backend, completion_estimate=1000)
+    client = DeepSeekClient(api_key="test", cache=None, usage=UsageTracker(), limiter=limiter)
+    usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20, total_tokens=120)
+    response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))], usage=usage)
+    attempts = []
+
+    def create(**kwargs):
+        attempts.append(kwargs)
+        if len(attempts) < 3:
+            raise ConnectionError("connection reset")
+        return response
+
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    retrying = DeepSeekClient._create_completion.retry
+    original_sleep, retrying.sleep = retrying.sleep, lambda seconds: None
+    try:
+        assert client.generate_content("Hello") == "ok"
+    finally:
+        retrying.sleep = original_sleep
+
+    assert len(attempts) == 3
+    # Only the successful attempt's 120 tokens stay charged...
+    assert backend.acquire([("deepseek:tokens", 9880, 10000, 10000 / 60)]) == 0
+    assert backend.acquire([("deepseek:tokens", 1, 10000, 10000 / 60)]) > 0
+    # ...while every attempt still counts as a request
+    assert backend.acquire([("deepseek:requests", 57, 60, 1.0)]) == 0
+    assert backend.acquire([("deepseek:requests", 1, 60, 1.0)]) > 0
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
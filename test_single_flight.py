@@ -0,0 +1,155 @@
+"""
+Tests for single-flight coalescing of identical in-flight LLM calls.
+
+Run with: python -m pytest test_single_flight.py  (or python test_single_flight.py)
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+from utils.deepseek_client import DeepSeekClient, AsyncDeepSeekClient
+from utils.single_flight import SingleFlight, AsyncSingleFlight
+from utils.usage import UsageTracker
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        pass
+
+
+def completion(text):
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=usage)
+
+
+def run_threads(count, target):
+    results = [None] * count
+
+    def worker(index):
+        results[index] = target()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_threads_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "result"
+
+    results = run_threads(5, lambda: flights.do("key", slow))
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert all(result == "result" for result, _ in results)
+    assert flights.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4}
+
+
+def test_errors_reach_every_waiter_and_are_not_remembered():
+    flights = SingleFlight()
+
+    def failing():
+        time.sleep(0.05)
+        raise ConnectionError("reset")
+
+    def call():
+        try:
+            flights.do("key", failing)
+        except ConnectionError:
+            return "failed"
+
+    assert run_threads(3, call) == ["failed"] * 3
+    assert flights.do("key", lambda: "recovered") == ("recovered", False)
+
+
+def test_sync_client_coalesces_identical_prompts():
+    client = DeepSeekClient(api_key="test", cache=None, usage=UsageTracker())
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs["messages"][-1]["content"])
+        time.sleep(0.1)
+        return completion("Tailored CV")
+
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    results = run_threads(4, lambda: client.generate_content("Same job"))
+    assert results == ["Tailored CV"] * 4
+    assert calls == ["Same job"]
+    totals = client.usage.snapshot()
+    assert totals["calls"] == 4 and totals["cache_hits"] == 3 and totals["prompt_tokens"] == 10
+
+    # Different prompts are not coalesced
+    run_threads(2, lambda: client.generate_content(f"Job {threading.get_ident()}"))
+    assert len(calls) == 3
+
+
+def test_async_client_coalesces_identical_prompts():
+    client = AsyncDeepSeekClient(api_key="test", cache=None, usage=UsageTracker())
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return completion("Cover letter")
+
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    async def scenario():
+        return await asyncio.gather(*(client.generate_content("Same job") for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["Cover letter"] * 5
+    assert len(calls) == 1
+
+
+def test_async_call_survives_until_the_last_waiter_is_cancelled():
+    flights = AsyncSingleFlight()
+    finished = []
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+        return "done"
+
+    async def scenario():
+        first = asyncio.create_task(flights.do("key", slow))
+        second = asyncio.create_task(flights.do("key", slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result = await second
+
+        third = asyncio.create_task(flights.do("other", slow))
+        await asyncio.sleep(0.01)
+        third.cancel()
+        await asyncio.sleep(0.08)
+        return result
+
+    assert asyncio.run(scenario()) == ("done", True)
+    # "key" finished for the remaining waiter; "other" was cancelled with its only waiter
+    assert finished == [1]
+    assert flights.stats()["in_flight"] == 0
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,94 @@
+"""
+Tests for the skill ontology and its Aho-Corasick matcher.
+
+Run with: python -m pytest test_skill_ontology.py  (or python test_skill_ontology.py)
+"""
+
+import random
+import re
+import sys
+
+from utils.skill_ontology import AhoCorasick, SkillOntology, get_skill_ontology
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+
+def test_automaton_matches_brute_force():
+    rng = random.Random(1)
+    for _ in range(300):
+        patterns = {"".join(rng.choice("ab") for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 8))}
+        text = "".join(rng.choice("abc") for _ in range(40))
+        found = sorted(AhoCorasick({p: p for p in patterns}).iter_matches(text))
+        expected = sorted(
+            (m.start(), m.start() + len(p), p)
+            for p in patterns
+            for m in re.finditer(f"(?={re.escape(p)})", text)
+        )
+        assert found == expected, (patterns, text)
+
+
+def test_aliases_normalize_to_canonical_key():
+    ontology = get_skill_ontology()
+    assert ontology.canonical_key("JS") == "javascript"
+    assert ontology.canonical_key("Postgres") == "postgresql"
+    assert ontology.canonical_key("  K8s ") == "kubernetes"
+    assert ontology.canonical_key("Stakeholder  Management") == "stakeholder management"
+
+
+def test_find_skills_whole_words_only():
+    skills = get_skill_ontology().find_skills("Built JavaScript apps on Postgres, K8s and C++; golang services.")
+    assert {"javascript", "postgresql", "kubernetes", "c++", "go"} <= skills
+    assert "java" not in skills
+
+
+def test_ambiguous_aliases_only_match_whole_items():
+    ontology = get_skill_ontology()
+    assert "go" not in ontology.find_skills("Go to market strategy for a new product")
+    assert ontology.canonical_key("Go") == "go"
+    assert ontology.is_known("Go")
+
+
+def test_related_skills_are_not_aliases():
+    ontology = get_skill_ontology()
+    for related, skill in [
+        ("Scrum", "agile"), ("Kanban", "agile"), ("data pipelines", "etl"), ("ELT", "etl"),
+        ("containers", "docker"), ("ELK", "elasticsearch"), ("Spring", "spring boot"),
+        ("AWS Lambda", "serverless"), ("ASP.NET", ".net"),
+    ]:
+        assert ontology.canonical_key(related) != skill, related
+        assert skill not in ontology.find_skills(f"Experience with {related}"), related
+    assert ontology.find_skills("Scrum master with Kanban boards") == {"kanban"}  # "scrum" only as a whole item
+    assert ontology.canonical_key("Scrum") == "scrum"
+    assert ontology.match_terms(["Agile", "Docker"], "Ran Scrum ceremonies; deployed containers") == set()
+
+
+def test_match_terms():
+    found = get_skill_ontology().match_terms(
+        ["JavaScript", "Java", "Stakeholder Management", "AWS"],
+        "Led stakeholder management; wrote JS on Amazon Web Services",
+    )
+    assert found == {"JavaScript", "Stakeholder Management", "AWS"}
+
+
+def test_custom_ontology():
+    ontology = SkillOntology({"Snowflake": ["snowpark"]}, ambiguous=set())
+    assert ontology.find_skills("Pipelines in Snowpark") == {"snowflake"}
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,205 @@
+"""
+Tests for LLM usage tracking: per-call capture in the DeepSeek clients,
+rollups per stage/request/user, and per-user token quotas.
+
+Run with: python -m pytest test_usage.py  (or python test_usage.py)
+"""
+
+import asyncio
+import sys
+from types import SimpleNamespace
+
+from utils.deepseek_client import DeepSeekClient, AsyncDeepSeekClient
+from utils.llm_cache import ResponseCache, MemoryCacheBackend
+from utils.usage import UsageTracker, QuotaExceededError, llm_stage, usage_scope
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        pass
+
+
+def make_usage(prompt_tokens=100, completion_tokens=20, cached_tokens=60):
+    return SimpleNamespace(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        total_tokens=prompt_tokens + completion_tokens,
+        prompt_cache_hit_tokens=cached_tokens,
+    )
+
+
+def make_response(text, **usage):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+        usage=make_usage(**usage),
+    )
+
+
+def make_stream(parts, **usage):
+    chunks = [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=p))], usage=None) for p in parts]
+    # Final chunk requested with stream_options={"include_usage": True}
+    chunks.append(SimpleNamespace(choices=[], usage=make_usage(**usage)))
+    return chunks
+
+
+class FakeCompletions:
+    """Stands in for client.chat.completions, failing the first `failures` calls."""
+
+    def __init__(self, failures=0):
+        self.calls = []
+        self.failures = failures
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("connection reset")
+        if kwargs.get("stream"):
+            return iter(make_stream(["Hello", " world"]))
+        return make_response('{"ok": true}')
+
+
+def make_client(tracker, completions=None, cache=None):
+    client = DeepSeekClient(api_key="test", cache=cache, usage=tracker)
+    completions = completions or FakeCompletions()
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return client, completions
+
+
+def test_call_usage_is_rolled_up_per_stage_request_and_user():
+    tracker = UsageTracker()
+    client, _ = make_client(tracker)
+
+    with usage_scope("alice") as usage:
+        with llm_stage("JobAnalyzer"):
+            client.generate_json("Analyze this")
+        with llm_stage("CVCustomizer"):
+            client.generate_content("Tailor this")
+
+    summary = usage.summary()
+    assert summary["calls"] == 2
+    assert summary["prompt_tokens"] == 200
+    assert summary["completion_tokens"] == 40
+    assert summary["cached_tokens"] == 120
+    assert summary["prompt_cache_hit_rate"] == 0.6
+    assert set(summary["by_stage"]) == {"JobAnalyzer", "CVCustomizer"}
+    assert summary["by_stage"]["JobAnalyzer"]["total_tokens"] == 120
+
+    snapshot = tracker.snapshot()
+    assert snapshot["by_user"]["alice"]["calls"] == 2
+    assert snapshot["by_stage"]["CVCustomizer"]["calls"] == 1
+    # 40 uncached + 60 cached input tokens and 20 output tokens per call
+    expected_cost = 2 * (40 * 0.27 + 60 * 0.07 + 20 * 1.10) / 1_000_000
+    assert abs(snapshot["cost_usd"] - round(expected_cost, 6)) < 1e-9
+
+
+def test_retries_are_counted():
+    tracker = UsageTracker()
+    client, completions = make_client(tracker, FakeCompletions(failures=1))
+    retrying = DeepSeekClient._create_completion.retry
+    original_sleep = retrying.sleep
+    retrying.sleep = lambda seconds: None
+    try:
+        with usage_scope() as usage:
+            client.generate_content("Hello")
+    finally:
+        retrying.sleep = original_sleep
+
+    assert len(completions.calls) == 2
+    assert usage.summary()["retries"] == 1
+    assert usage.summary()["calls"] == 1
+
+
+def test_stream_usage_comes_from_final_chunk():
+    tracker = UsageTracker()
+    client, completions = make_client(tracker)
+
+    with usage_scope() as usage, llm_stage("CoverLetterGenerator"):
+        text = "".join(client.stream_content("Write a letter"))
+
+    assert text == "Hello world"
+    assert completions.calls[0]["stream_options"] == {"include_usage": True}
+    stage = usage.summary()["by_stage"]["CoverLetterGenerator"]
+    assert stage["prompt_tokens"] == 100 and stage["completion_tokens"] == 20
+
+
+def test_cache_hits_are_counted_without_tokens():
+    tracker = UsageTracker()
+    cache = ResponseCache(MemoryCacheBackend())
+    client, completions = make_client(tracker, cache=cache)
+
+    with usage_scope() as usage:
+        client.generate_content("Same prompt")
+        client.generate_content("Same prompt")
+
+    summary = usage.summary()
+    assert len(completions.calls) == 1
+    assert summary["calls"] == 2 and summary["cache_hits"] == 1
+    assert summary["total_tokens"] == 120
+
+
+def test_quota_is_enforced_before_the_call():
+    tracker = UsageTracker(user_quota=120)
+    client, completions = make_client(tracker)
+
+    with usage_scope("alice"):
+        client.generate_content("First")
+        try:
+            client.generate_content("Second")
+            assert False, "expected QuotaExceededError"
+        except QuotaExceededError as e:
+            assert e.user_id == "alice" and e.used == 120
+            assert e.retry_after > 0
+    assert len(completions.calls) == 1
+    assert tracker.remaining("alice") == 0
+
+    # Other users and calls without a user are not affected
+    with usage_scope("bob"):
+        client.generate_content("First")
+    client.generate_content("Anonymous")
+    assert len(completions.calls) == 3
+
+
+def test_context_follows_asyncio_tasks_and_nested_scopes():
+    tracker = UsageTracker()
+    client = AsyncDeepSeekClient(api_key="test", cache=None, usage=tracker)
+
+    async def create(**kwargs):
+        await asyncio.sleep(0)
+        return make_response("text")
+
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    async def stage(name):
+        with llm_stage(name):
+            await client.generate_content(name)
+
+    async def run():
+        with usage_scope("carol") as batch:
+            with usage_scope() as first:
+                await asyncio.gather(stage("CVCustomizer"), stage("CoverLetterGenerator"))
+            with usage_scope() as second:
+                await stage("JobAnalyzer")
+        return batch, first, second
+
+    batch, first, second = asyncio.run(run())
+    assert set(first.summary()["by_stage"]) == {"CVCustomizer", "CoverLetterGenerator"}
+    assert set(second.summary()["by_stage"]) == {"JobAnalyzer"}
+    assert batch.summary()["calls"] == 3
+    assert tracker.snapshot()["by_user"]["carol"]["calls"] == 3
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  ✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} tests passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,180 @@
+"""
+Job Analysis Store
+Role: Keep job analyses keyed by normalized job text so a posting is only analyzed by the LLM once.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional, Iterable
+
+
+class AnalysisStore:
+    """
+    Storage interface for job analyses, keyed by utils.hashing.job_text_hash().
+
+    Entries expire after a TTL; get()/get_many() never return expired entries
+    and purge_expired() deletes them.
+    """
+
+    def get(self, text_hash: str) -> Optional[Dict[str, Any]]:
+        """Stored analysis for one job text hash, or None."""
+        return self.get_many([text_hash]).get(text_hash)
+
+    def get_many(self, text_hashes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored analyses for many job text hashes (missing ones are absent)."""
+        raise NotImplementedError
+
+    def put(self, text_hash: str, analysis: Dict[str, Any]) -> None:
+        """Store (or replace) the analysis of a job text."""
+        raise NotImplementedError
+
+    def find(self, company: Optional[str] = None, title: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent analyses for a company and/or title."""
+        raise NotImplementedError
+
+    def purge_expired(self) -> int:
+        """Delete expired entries; returns how many were removed."""
+        raise NotImplementedError
+
+
+def _role_field(analysis: Dict[str, Any], field: str) -> Optional[str]:
+    """Title or company from an analysis, None when unknown."""
+    value = (analysis.get("role_info") or {}).get(field)
+    return value if isinstance(value, str) and value and value != "Unknown" else None
+
+
+class SQLiteAnalysisStore(AnalysisStore):
+    """
+    Persistent analysis store in a SQLite file, for the FastAPI server and
+    workers (the Flask app uses the JobAnalysis model instead).
+
+    Company and title are indexed case-insensitively for find().
+    """
+
+    # Bound parameters per query in get_many (SQLite's default limit is 999)
+    _BATCH = 500
+
+    def __init__(self, path: str = "data/job_analyses.sqlite", ttl: Optional[float] = 30 * 24 * 3600):
+        """
+        Args:
+            path: SQLite file shared by API processes and workers
+            ttl: Entry lifetime in seconds; None disables expiry
+        """
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_analyses (
+                text_hash TEXT PRIMARY KEY,
+                title TEXT COLLATE NOCASE,
+                company TEXT COLLATE NOCASE,
+                analysis TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_job_analyses_company ON job_analyses (company, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_job_analyses_title ON job_analyses (title, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_job_analyses_expires ON job_analyses (expires_at)")
+
+    @classmethod
+    def from_env(cls) -> Optional["SQLiteAnalysisStore"]:
+        """
+        Build a store from environment variables, or None if disabled.
+
+        JOB_ANALYSIS_STORE: "sqlite" (default) or "none"
+        JOB_ANALYSIS_STORE_PATH: SQLite file (default: data/job_analyses.sqlite)
+        JOB_ANALYSIS_TTL: Entry lifetime in seconds (default: 30 days, 0 disables expiry)
+        """
+        backend_name = os.getenv("JOB_ANALYSIS_STORE", "sqlite").lower()
+        if backend_name in ("none", "off", "disabled", ""):
+            return None
+        if backend_name != "sqlite":
+            raise ValueError(f"Unknown JOB_ANALYSIS_STORE: {backend_name}")
+        return cls(
+            path=os.getenv("JOB_ANALYSIS_STORE_PATH", "data/job_analyses.sqlite"),
+            ttl=float(os.getenv("JOB_ANALYSIS_TTL", 30 * 24 * 3600)) or None,
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; SQLite handles cross-process locking."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, text_hashes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        text_hashes = list(dict.fromkeys(text_hashes))
+        now = time.time()
+        found: Dict[str, Dict[str, Any]] = {}
+        conn = self._conn()
+        for start in range(0, len(text_hashes), self._BATCH):
+            chunk = text_hashes[start:start + self._BATCH]
+            rows = conn.execute(
+                f"""
+                SELECT text_hash, analysis FROM job_analyses
+                WHERE text_hash IN ({','.join('?' * len(chunk))}) AND (expires_at IS NULL OR expires_at > ?)
+                """,
+                (*chunk, now),
+            )
+            for text_hash, analysis in rows:
+                found[text_hash] = json.loads(analysis)
+        return found
+
+    def put(self, text_hash: str, analysis: Dict[str, Any]) -> None:
+        now = time.time()
+        self._conn().execute(
+            """
+            INSERT OR REPLACE INTO job_analyses (text_hash, title, company, analysis, created_at, expires_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
+                text_hash,
+                _role_field(analysis, "title"),
+                _role_field(analysis, "company"),
+                json.dumps(analysis),
+                now,
+                now + self.ttl if self.ttl else None,
+            ),
+        )
+        # Expired rows are cleaned up at most once an hour
+        if now - self._last_purge > 3600:
+            self._last_purge = now
+            self.purge_expired()
+
+    def find(self, company: Optional[str] = None, title: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        clauses, params = ["(expires_at IS NULL OR expires_at > ?)"], [time.time()]
+        if company is not None:
+            clauses.append("company = ?")
+            params.append(company)
+        if title is not None:
+            clauses.append("title = ?")
+            params.append(title)
+        rows = self._conn().execute(
+            f"SELECT analysis FROM job_analyses WHERE {' AND '.join(clauses)} ORDER BY created_at DESC LIMIT ?",
+            (*params, limit),
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    def purge_expired(self) -> int:
+        cursor = self._conn().execute(
+            "DELETE FROM job_analyses WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        )
+        return cursor.rowcount
+
+    def size(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM job_analyses").fetchone()[0]
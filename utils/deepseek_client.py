@@ -3,38 +3,197 @@ DeepSeek API Client Wrapper
 Role: Handle all interactions with DeepSeek API via OpenAI client with robust error handling.
 """
 
-from typing import Dict, Any, Optional
-import json
+from typing import Dict, Any, Optional, List, Tuple, Iterator, AsyncIterator, Callable, Awaitable
+import asyncio
 import os
-from openai import OpenAI, APIError, RateLimitError
-from tenacity import retry, stop_after_attempt, wait_exponential
+import threading
+import time
+import weakref
+from openai import OpenAI, AsyncOpenAI, DefaultAsyncHttpxClient, APIError, RateLimitError
+from tenacity import retry, stop_after_attempt
+from utils.llm_cache import ResponseCache, make_cache_key
+from utils.json_stream import IncrementalJSONParser
+from utils.llm_provider import ProviderBase, LLMProvider, AsyncLLMProvider
+from utils.prompt_compactor import count_tokens
+from utils.rate_limiter import RateLimiter, get_rate_limiter, wait_retry_after
+from utils.single_flight import SingleFlight, AsyncSingleFlight
+from utils.usage import UsageTracker, QuotaExceededError, current_user, get_usage_tracker, usage_from_response
 
-class DeepSeekClient:
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+
+
+def deepseek_base_url() -> str:
+    """API base URL: DEEPSEEK_BASE_URL from the environment (e.g. a local fake server) or the public API."""
+    return os.getenv("DEEPSEEK_BASE_URL") or DEEPSEEK_BASE_URL
+
+# Sentinel so callers can pass cache=None to disable caching explicitly
+_CACHE_FROM_ENV = object()
+
+# One pooled HTTP connection per event loop, shared by every AsyncDeepSeekClient
+# used on that loop. Connections belong to the loop that opened them, so a pool
+# is never reused on another loop (e.g. one per request under a test client).
+# Each pool is closed when the last client using it is closed.
+_shared_async_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, List[Any]]" = weakref.WeakKeyDictionary()
+_shared_async_http_lock = threading.Lock()
+
+
+def _acquire_shared_async_http_client(loop: asyncio.AbstractEventLoop):
+    """Return the pooled async HTTP client of an event loop, creating it on first use."""
+    with _shared_async_http_lock:
+        entry = _shared_async_http_clients.get(loop)
+        if entry is None or entry[0].is_closed:
+            entry = _shared_async_http_clients[loop] = [DefaultAsyncHttpxClient(), 0]
+        entry[1] += 1
+        return entry[0]
+
+
+async def _release_shared_async_http_client(loop: asyncio.AbstractEventLoop, http_client) -> None:
     """
-    Wrapper for DeepSeek API (OpenAI-compatible) to handle configuration, generation, and error handling.
+    Drop one user of a loop's pooled client; the last user closes it.
+
+    A pool can only be closed on its own loop: pools of loops that have
+    already finished are just forgotten (their connections went with the loop).
+    """
+    with _shared_async_http_lock:
+        entry = _shared_async_http_clients.get(loop)
+        if entry is None or entry[0] is not http_client:
+            return
+        entry[1] -= 1
+        if entry[1] > 0:
+            return
+        del _shared_async_http_clients[loop]
+    if loop is asyncio.get_running_loop():
+        await http_client.aclose()
+
+
+class _DeepSeekBase(ProviderBase):
+    """
+    Configuration, caching, usage tracking and rate limiting shared by the sync and async clients.
     """
-    
-    def __init__(self, api_key: str, model_name: str = "deepseek-chat"):
+
+    name = "deepseek"
+
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = "deepseek-chat",
+        cache: Optional[ResponseCache] = _CACHE_FROM_ENV,
+        usage: Optional[UsageTracker] = None,
+        limiter: Optional[RateLimiter] = None,
+    ):
         """
         Initialize the DeepSeek client.
 
         Args:
             api_key: DeepSeek API Key
             model_name: Model version to use (default: deepseek-chat)
+            cache: Response cache (default: configured from LLM_CACHE_* env vars, None disables)
+            usage: Usage tracker (default: the shared tracker configured from LLM_* env vars)
+            limiter: Rate limiter (default: the shared limiter configured from LLM_RATE_LIMIT_* env vars)
         """
         if not api_key:
-            raise ValueError("API key is required for DeepSeekClient")
-            
+            raise ValueError(f"API key is required for {type(self).__name__}")
+
+        self.model_name = model_name
+        self.cache = ResponseCache.from_env() if cache is _CACHE_FROM_ENV else cache
+        self.usage = usage or get_usage_tracker()
+        self.limiter = limiter or get_rate_limiter()
+
+    def _build_messages(self, prompt: str, system_instruction: str) -> List[Dict[str, str]]:
+        messages = []
+        if system_instruction:
+            messages.append({"role": "system", "content": system_instruction})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def _cache_lookup(self, prompt: str, system_instruction: str, temperature: float) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Check the response cache.
+
+        Returns:
+            Tuple of (cache key, also used to coalesce identical in-flight calls; cached text or None)
+        """
+        cache_key = make_cache_key(self.model_name, system_instruction, prompt, temperature)
+        if self.cache is None:
+            return cache_key, None
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            print(f"⚡ Cache hit for DeepSeek ({self.model_name})")
+            self.usage.record(cache_hit=True, model=self.model_name)
+        return cache_key, cached
+
+    def _joined(self) -> None:
+        """Record a call answered by an identical call already in flight."""
+        print(f"🔗 Joined in-flight DeepSeek call ({self.model_name})")
+        self.usage.record(cache_hit=True, model=self.model_name)
+
+    @staticmethod
+    def _rerun_after(error: Exception) -> bool:
+        """Whether a caller that joined a failed call should make its own (another user's quota ran out)."""
+        return isinstance(error, QuotaExceededError) and error.user_id != current_user()
+
+    def _start_call(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """
+        Check the user's token quota before an API call.
+
+        Returns:
+            Call state: estimated "prompt_tokens", "attempts" (incremented by
+            _create_completion) and the "started" time
+
+        Raises:
+            QuotaExceededError: When the current user has no quota left for the prompt
+        """
+        prompt_tokens = sum(count_tokens(m["content"]) for m in messages)
+        self.usage.check_quota(prompt_tokens)
+        return {"prompt_tokens": prompt_tokens, "attempts": 0, "started": time.perf_counter()}
+
+    def _record_usage(self, usage: Any, call: Dict[str, Any], error: bool = False) -> None:
+        """Record a finished API call and correct the rate limiter's token estimate."""
+        counts = usage_from_response(usage)
+        if counts["cached_tokens"]:
+            print(f"💾 Prompt cache hit: {counts['cached_tokens']}/{counts['prompt_tokens']} prompt tokens")
+        self.usage.record(
+            **counts,
+            latency=time.perf_counter() - call["started"],
+            retries=max(0, call["attempts"] - 1),
+            error=error,
+            model=self.model_name,
+        )
+        self.limiter.record(call["prompt_tokens"], counts["prompt_tokens"] + counts["completion_tokens"])
+
+    def _cache_store(self, cache_key: Optional[str], content: str, response: Any, started: float) -> None:
+        if self.cache is None or not content:
+            return
+        usage = getattr(response, "usage", None)
+        tokens = getattr(usage, "total_tokens", 0) or 0
+        self.cache.set(cache_key, content, latency=time.perf_counter() - started, tokens=tokens)
+
+    def _cache_invalidate(self, prompt: str, system_instruction: str, temperature: float) -> None:
+        if self.cache is not None:
+            self.cache.backend.delete(make_cache_key(self.model_name, system_instruction, prompt, temperature))
+
+
+class DeepSeekClient(_DeepSeekBase, LLMProvider):
+    """
+    Wrapper for DeepSeek API (OpenAI-compatible) to handle configuration, generation, and error handling.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = "deepseek-chat",
+        cache: Optional[ResponseCache] = _CACHE_FROM_ENV,
+        usage: Optional[UsageTracker] = None,
+        limiter: Optional[RateLimiter] = None,
+        base_url: Optional[str] = None,
+    ):
+        super().__init__(api_key, model_name, cache, usage, limiter)
+        self.flights = SingleFlight()
         self.client = OpenAI(
             api_key=api_key,
-            base_url="https://api.deepseek.com"
+            base_url=base_url or deepseek_base_url()
         )
-        self.model_name = model_name
 
-    @retry(
-        stop=stop_after_attempt(3), 
-        wait=wait_exponential(multiplier=1, min=2, max=10)
-    )
     def generate_content(self, prompt: str, system_instruction: str = "", config: Optional[Dict[str, Any]] = None) -> str:
         """
         Generate text content from DeepSeek with retry logic.
@@ -47,28 +206,81 @@ class DeepSeekClient:
         Returns:
             Generated text string
         """
+        temperature = config.get("temperature", 0.7) if config else 0.7
+
+        cache_key, cached = self._cache_lookup(prompt, system_instruction, temperature)
+        if cached is not None:
+            return cached
+
+        # Concurrent identical calls (double submits, repeated batch items) share one request
+        try:
+            content, shared = self.flights.do(cache_key, lambda: self._complete(prompt, system_instruction, temperature, cache_key))
+        except QuotaExceededError as e:
+            if not self._rerun_after(e):
+                raise
+            content, shared = self._complete(prompt, system_instruction, temperature, cache_key), False
+        if shared:
+            self._joined()
+        return content
+
+    def _complete(self, prompt: str, system_instruction: str, temperature: float, cache_key: str) -> str:
+        messages = self._build_messages(prompt, system_instruction)
+        call = self._start_call(messages)
+        try:
+            with self.limiter.slot():
+                response = self._create_completion(messages, temperature, call=call)
+        except Exception:
+            self._record_usage(None, call, error=True)
+            raise
+        self._record_usage(response.usage, call)
+        content = response.choices[0].message.content
+        self._cache_store(cache_key, content, response, call["started"])
+        return content
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_retry_after(min=2, max=10)
+    )
+    def _create_completion(self, messages: list, temperature: float, stream: bool = False, call: Optional[Dict[str, Any]] = None):
+        """
+        Call the chat completions endpoint with retry logic.
+
+        Args:
+            messages: Chat messages
+            temperature: Sampling temperature
+            stream: Return a chunk stream instead of a full response
+            call: Call state from _start_call (attempts are counted, the prompt size is rate limited;
+                a failed attempt's token charge is refunded so retries don't pay for it again)
+
+        Returns:
+            Raw completion response (or chunk stream when stream=True)
+        """
+        prompt_tokens = 0
+        if call is not None:
+            call["attempts"] += 1
+            prompt_tokens = call["prompt_tokens"]
+        self.limiter.wait(prompt_tokens)
+        if call is not None and call["attempts"] == 1:
+            # Latency is measured from the first attempt, not from the wait for a slot
+            call["started"] = time.perf_counter()
         try:
             print(f"🤖 User: Calling DeepSeek ({self.model_name})...")
-            temperature = config.get("temperature", 0.7) if config else 0.7
-            
-            messages = []
-            if system_instruction:
-                messages.append({"role": "system", "content": system_instruction})
-            messages.append({"role": "user", "content": prompt})
-
-            response = self.client.chat.completions.create(
+            return self.client.chat.completions.create(
                 model=self.model_name,
                 messages=messages,
                 temperature=temperature,
-                stream=False
+                stream=stream,
+                **({"stream_options": {"include_usage": True}} if stream else {})
             )
-            return response.choices[0].message.content
-            
-        except RateLimitError:
+
+        except RateLimitError as e:
             print("⚠️  Rate limit exceeded. Retrying...")
+            self.limiter.refund(prompt_tokens)
+            self.limiter.backoff(e)
             raise
         except Exception as e:
             print(f"❌ DeepSeek API Error: {e}")
+            self.limiter.refund(prompt_tokens)
             raise
 
     def generate_json(self, prompt: str, system_instruction: str = "", temperature: float = 0.0) -> Dict[str, Any]:
@@ -84,51 +296,359 @@ class DeepSeekClient:
             Parsed JSON dictionary
         """
         config = {"temperature": temperature}
-        
+
         try:
-            # Force JSON structure in prompt if not present
-            if "JSON" not in prompt:
-                prompt += "\n\nReturn the result as a valid JSON object."
-            if "JSON" not in system_instruction:
-                system_instruction += "\nProvide output in JSON format."
+            prompt, system_instruction = self._prepare_json_request(prompt, system_instruction)
 
             response_text = self.generate_content(prompt, system_instruction, config)
-            return self._parse_json_safe(response_text)
-            
+            try:
+                return self._parse_json_safe(response_text)
+            except ValueError:
+                # Never serve an unparseable response from cache on the next attempt
+                self._cache_invalidate(prompt, system_instruction, temperature)
+                raise
+
         except Exception as e:
             print(f"❌ Failed to generate/parse JSON: {e}")
             raise
 
-    def _parse_json_safe(self, text: str) -> Dict[str, Any]:
+
+    def stream_content(self, prompt: str, system_instruction: str = "", config: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Generate text content from DeepSeek, yielding text deltas as they arrive.
+
+        Only opening the stream is retried; a cached response is yielded as a single delta.
+
+        Args:
+            prompt: The input prompt string
+            system_instruction: System prompt/role definition
+            config: Optional generation config (temperature, etc.)
+
+        Yields:
+            Text deltas in generation order
+        """
+        temperature = config.get("temperature", 0.7) if config else 0.7
+
+        cache_key, cached = self._cache_lookup(prompt, system_instruction, temperature)
+        if cached is not None:
+            yield cached
+            return
+
+        messages = self._build_messages(prompt, system_instruction)
+        call = self._start_call(messages)
+        parts = []
+        # The concurrency slot is held until the stream is drained
+        with self.limiter.slot():
+            try:
+                stream = self._create_completion(messages, temperature, stream=True, call=call)
+            except Exception:
+                self._record_usage(None, call, error=True)
+                raise
+
+            usage = None
+            try:
+                for chunk in stream:
+                    # With include_usage the last chunk carries the usage and no choices
+                    usage = getattr(chunk, "usage", None) or usage
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+            finally:
+                self._record_usage(usage, call)
+
+        self._cache_store(cache_key, "".join(parts), None, call["started"])
+
+    def generate_json_streaming(
+        self,
+        prompt: str,
+        system_instruction: str = "",
+        temperature: float = 0.0,
+        on_field: Optional[Callable[[str, Any], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Stream a JSON object, reporting each top-level field as soon as it closes.
+
+        Args:
+            prompt: Input prompt requesting JSON
+            system_instruction: System role
+            temperature: Lower temperature for structured data (default 0.0)
+            on_field: Called with (key, value) for every completed top-level field
+
+        Returns:
+            Parsed JSON dictionary
+        """
+        prompt, system_instruction = self._prepare_json_request(prompt, system_instruction)
+        parser = IncrementalJSONParser()
+
+        for delta in self.stream_content(prompt, system_instruction, {"temperature": temperature}):
+            for key, value in parser.feed(delta):
+                if on_field is not None:
+                    on_field(key, value)
+
+        if parser.done:
+            return parser.fields
+        try:
+            return self._parse_json_safe(parser.text)
+        except ValueError:
+            self._cache_invalidate(prompt, system_instruction, temperature)
+            raise
+
+
+class AsyncDeepSeekClient(_DeepSeekBase, AsyncLLMProvider):
+    """
+    Asyncio variant of DeepSeekClient for use inside FastAPI handlers.
+
+    All instances used on an event loop share that loop's pooled HTTP
+    connection, so many requests can be in flight on it without blocking it.
+    A pool is closed when the last open client using it is closed. Cache and
+    rate-limiter bookkeeping (SQLite) runs in worker threads, off the loop.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = "deepseek-chat",
+        cache: Optional[ResponseCache] = _CACHE_FROM_ENV,
+        usage: Optional[UsageTracker] = None,
+        limiter: Optional[RateLimiter] = None,
+        base_url: Optional[str] = None,
+    ):
+        super().__init__(api_key, model_name, cache, usage, limiter)
+        self.flights = AsyncSingleFlight()
+        self.api_key = api_key
+        self.base_url = base_url or deepseek_base_url()
+        # (OpenAI client, pooled HTTP client) per event loop, created on first use there
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[AsyncOpenAI, Any]]" = weakref.WeakKeyDictionary()
+        self._client_override = None
+        self._closed = False
+
+    @property
+    def client(self):
+        """The OpenAI client for the running event loop (or the one assigned to this attribute)."""
+        if self._client_override is not None:
+            return self._client_override
+        if self._closed:
+            raise RuntimeError(f"{type(self).__name__} is closed")
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(loop)
+        if entry is None:
+            http_client = _acquire_shared_async_http_client(loop)
+            client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, http_client=http_client)
+            entry = self._clients[loop] = (client, http_client)
+        return entry[0]
+
+    @client.setter
+    def client(self, client) -> None:
+        self._client_override = client
+
+    async def generate_content(self, prompt: str, system_instruction: str = "", config: Optional[Dict[str, Any]] = None) -> str:
         """
-        Safely parse JSON string, handling Markdown fences and common errors.
+        Generate text content from DeepSeek with retry logic.
 
         Args:
-            text: Raw string from LLM
+            prompt: The input prompt string
+            system_instruction: System prompt/role definition
+            config: Optional generation config (temperature, etc.)
 
         Returns:
-            Parsed dictionary
+            Generated text string
         """
+        temperature = config.get("temperature", 0.7) if config else 0.7
+
+        cache_key, cached = await asyncio.to_thread(self._cache_lookup, prompt, system_instruction, temperature)
+        if cached is not None:
+            return cached
+
+        # Concurrent identical calls (double submits, repeated batch items) share one request
         try:
-            cleaned = text.strip()
-            # Remove markdown code fences
-            if cleaned.startswith("```json"):
-                cleaned = cleaned[7:]
-            elif cleaned.startswith("```"):
-                cleaned = cleaned[3:]
-            if cleaned.endswith("```"):
-                cleaned = cleaned[:-3]
-            
-            return json.loads(cleaned.strip())
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON Decode Error: {e}")
-            print(f"Raw text start: {text[:100]}")
-            # Try to extract JSON from text if it's embedded
+            content, shared = await self.flights.do(cache_key, lambda: self._complete(prompt, system_instruction, temperature, cache_key))
+        except QuotaExceededError as e:
+            if not self._rerun_after(e):
+                raise
+            content, shared = await self._complete(prompt, system_instruction, temperature, cache_key), False
+        if shared:
+            self._joined()
+        return content
+
+    async def _complete(self, prompt: str, system_instruction: str, temperature: float, cache_key: str) -> str:
+        messages = self._build_messages(prompt, system_instruction)
+        call = self._start_call(messages)
+        try:
+            async with self.limiter.slot_async():
+                response = await self._create_completion(messages, temperature, call=call)
+        except Exception:
+            await asyncio.to_thread(self._record_usage, None, call, error=True)
+            raise
+        await asyncio.to_thread(self._record_usage, response.usage, call)
+        content = response.choices[0].message.content
+        await asyncio.to_thread(self._cache_store, cache_key, content, response, call["started"])
+        return content
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_retry_after(min=2, max=10)
+    )
+    async def _create_completion(self, messages: list, temperature: float, stream: bool = False, call: Optional[Dict[str, Any]] = None):
+        """
+        Call the chat completions endpoint with retry logic.
+
+        Args:
+            messages: Chat messages
+            temperature: Sampling temperature
+            stream: Return an async chunk stream instead of a full response
+            call: Call state from _start_call (attempts are counted, the prompt size is rate limited;
+                a failed attempt's token charge is refunded so retries don't pay for it again)
+
+        Returns:
+            Raw completion response (or chunk stream when stream=True)
+        """
+        prompt_tokens = 0
+        if call is not None:
+            call["attempts"] += 1
+            prompt_tokens = call["prompt_tokens"]
+        await self.limiter.wait_async(prompt_tokens)
+        if call is not None and call["attempts"] == 1:
+            # Latency is measured from the first attempt, not from the wait for a slot
+            call["started"] = time.perf_counter()
+        try:
+            print(f"🤖 User: Calling DeepSeek async ({self.model_name})...")
+            return await self.client.chat.completions.create(
+                model=self.model_name,
+                messages=messages,
+                temperature=temperature,
+                stream=stream,
+                **({"stream_options": {"include_usage": True}} if stream else {})
+            )
+
+        except RateLimitError as e:
+            print("⚠️  Rate limit exceeded. Retrying...")
+            await asyncio.to_thread(self.limiter.refund, prompt_tokens)
+            await asyncio.to_thread(self.limiter.backoff, e)
+            raise
+        except Exception as e:
+            print(f"❌ DeepSeek API Error: {e}")
+            await asyncio.to_thread(self.limiter.refund, prompt_tokens)
+            raise
+
+    async def stream_content(self, prompt: str, system_instruction: str = "", config: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Generate text content from DeepSeek, yielding text deltas as they arrive.
+
+        Only opening the stream is retried; a cached response is yielded as a single delta.
+
+        Args:
+            prompt: The input prompt string
+            system_instruction: System prompt/role definition
+            config: Optional generation config (temperature, etc.)
+
+        Yields:
+            Text deltas in generation order
+        """
+        temperature = config.get("temperature", 0.7) if config else 0.7
+
+        cache_key, cached = await asyncio.to_thread(self._cache_lookup, prompt, system_instruction, temperature)
+        if cached is not None:
+            yield cached
+            return
+
+        messages = self._build_messages(prompt, system_instruction)
+        call = self._start_call(messages)
+        parts = []
+        # The concurrency slot is held until the stream is drained
+        async with self.limiter.slot_async():
+            try:
+                stream = await self._create_completion(messages, temperature, stream=True, call=call)
+            except Exception:
+                await asyncio.to_thread(self._record_usage, None, call, error=True)
+                raise
+
+            usage = None
+            try:
+                async for chunk in stream:
+                    # With include_usage the last chunk carries the usage and no choices
+                    usage = getattr(chunk, "usage", None) or usage
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+            finally:
+                await asyncio.to_thread(self._record_usage, usage, call)
+
+        await asyncio.to_thread(self._cache_store, cache_key, "".join(parts), None, call["started"])
+
+    async def generate_json_streaming(
+        self,
+        prompt: str,
+        system_instruction: str = "",
+        temperature: float = 0.0,
+        on_field: Optional[Callable[[str, Any], Awaitable[None]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Stream a JSON object, reporting each top-level field as soon as it closes.
+
+        Args:
+            prompt: Input prompt requesting JSON
+            system_instruction: System role
+            temperature: Lower temperature for structured data (default 0.0)
+            on_field: Awaited with (key, value) for every completed top-level field
+
+        Returns:
+            Parsed JSON dictionary
+        """
+        prompt, system_instruction = self._prepare_json_request(prompt, system_instruction)
+        parser = IncrementalJSONParser()
+
+        async for delta in self.stream_content(prompt, system_instruction, {"temperature": temperature}):
+            for key, value in parser.feed(delta):
+                if on_field is not None:
+                    await on_field(key, value)
+
+        if parser.done:
+            return parser.fields
+        try:
+            return self._parse_json_safe(parser.text)
+        except ValueError:
+            await asyncio.to_thread(self._cache_invalidate, prompt, system_instruction, temperature)
+            raise
+
+    async def generate_json(self, prompt: str, system_instruction: str = "", temperature: float = 0.0) -> Dict[str, Any]:
+        """
+        Generate and parse JSON content.
+
+        Args:
+            prompt: Input prompt requesting JSON
+            system_instruction: System role
+            temperature: Lower temperature for structured data (default 0.0)
+
+        Returns:
+            Parsed JSON dictionary
+        """
+        config = {"temperature": temperature}
+
+        try:
+            prompt, system_instruction = self._prepare_json_request(prompt, system_instruction)
+
+            response_text = await self.generate_content(prompt, system_instruction, config)
             try:
-                start = text.find('{')
-                end = text.rfind('}') + 1
-                if start != -1 and end != -1:
-                    return json.loads(text[start:end])
-            except:
-                pass
-            raise ValueError(f"Invalid JSON response: {e}")
+                return self._parse_json_safe(response_text)
+            except ValueError:
+                await asyncio.to_thread(self._cache_invalidate, prompt, system_instruction, temperature)
+                raise
+
+        except Exception as e:
+            print(f"❌ Failed to generate/parse JSON: {e}")
+            raise
+
+    async def aclose(self) -> None:
+        """Release this client's share of the HTTP connection pools (call on application shutdown)."""
+        if self._closed:
+            return
+        self._closed = True
+        clients, self._clients = list(self._clients.items()), weakref.WeakKeyDictionary()
+        for loop, (_, http_client) in clients:
+            await _release_shared_async_http_client(loop, http_client)
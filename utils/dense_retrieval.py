@@ -0,0 +1,201 @@
+"""
+Dense Retrieval
+Role: Embed experience snippets locally (TF-IDF + truncated SVD, i.e. LSA) so related terms match without an embedding API.
+"""
+
+from typing import List, Dict, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _sparse_matmul(indptr, indices, data, dense, n_rows: int):
+    """
+    Multiply a CSR matrix (indptr, indices, data) by a dense matrix.
+
+    Rows are contiguous in `indices`, so each row's contribution is one
+    np.add.reduceat segment; empty rows stay zero.
+    """
+    out = np.zeros((n_rows, dense.shape[1]), dtype=np.float32)
+    if len(indices) == 0:
+        return out
+    nonempty = np.flatnonzero(indptr[1:] > indptr[:-1])
+    out[nonempty] = np.add.reduceat(data[:, None] * dense[indices], indptr[:-1][nonempty], axis=0)
+    return out
+
+
+def top_k_indices(scores, k: int):
+    """
+    Indices of the k highest scores per row, best first.
+
+    Uses argpartition to select the k candidates and only sorts those.
+
+    Args:
+        scores: (n_queries, n_docs) score matrix
+        k: Number of results per row
+
+    Returns:
+        (n_queries, min(k, n_docs)) index matrix
+    """
+    n_docs = scores.shape[1]
+    k = min(k, n_docs)
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if k < n_docs:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(n_docs), (scores.shape[0], 1))
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> Dict[int, float]:
+    """
+    Fuse several ranked lists of document ids with Reciprocal Rank Fusion.
+
+    Args:
+        rankings: Ranked document id lists, best first
+        k: RRF damping constant (60 in the original paper)
+
+    Returns:
+        Mapping of document id to fused score
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return fused
+
+
+class LSAEncoder:
+    """
+    Offline dense encoder: TF-IDF weighting over an existing term vocabulary,
+    projected onto the top singular vectors of the snippet-term matrix
+    (randomized SVD). Terms that occur in similar snippets end up close
+    together, so a query can match snippets that don't share its exact words.
+
+    Document embeddings are stored as one L2-normalized float32 matrix and a
+    batch of queries is scored with a single matrix multiply.
+    """
+
+    def __init__(self, dim: int = 128, power_iterations: int = 3, seed: int = 0, max_dense_cells: int = 1 << 24):
+        """
+        Args:
+            dim: Embedding dimensions (capped by the corpus size)
+            power_iterations: Randomized SVD power iterations (accuracy vs. fit time)
+            seed: Random seed so embeddings are reproducible across processes
+            max_dense_cells: Snippet-term matrices up to this many cells are
+                materialized densely for BLAS products; larger ones stay sparse
+        """
+        if np is None:
+            raise ImportError("The 'numpy' package is required for dense retrieval (pip install numpy)")
+        self.dim = dim
+        self.power_iterations = power_iterations
+        self.seed = seed
+        self.max_dense_cells = max_dense_cells
+        self.idf = None
+        self.term_vectors = None
+        self.doc_vectors = None
+
+    def fit(self, fwd_offsets, fwd_terms, fwd_tfs, vocab_size: int) -> "LSAEncoder":
+        """
+        Fit on a forward index (snippet -> term ids/frequencies) and embed its snippets.
+
+        Args:
+            fwd_offsets: Per-snippet offsets into fwd_terms/fwd_tfs (length n_docs + 1)
+            fwd_terms: Term ids
+            fwd_tfs: Term frequencies
+            vocab_size: Number of term ids
+
+        Returns:
+            self
+        """
+        indptr = np.asarray(fwd_offsets, dtype=np.int64)
+        indices = np.asarray(fwd_terms, dtype=np.int64)
+        tfs = np.asarray(fwd_tfs, dtype=np.float32)
+        n_docs = len(indptr) - 1
+
+        doc_freq = np.bincount(indices, minlength=vocab_size).astype(np.float32)
+        self.idf = (np.log((1.0 + n_docs) / (1.0 + doc_freq)) + 1.0).astype(np.float32)
+        data = self._normalize_rows(indptr, (1.0 + np.log(np.maximum(tfs, 1.0))) * self.idf[indices])
+
+        row_of = np.repeat(np.arange(n_docs), np.diff(indptr))
+        if n_docs * vocab_size <= self.max_dense_cells:
+            matrix = np.zeros((n_docs, vocab_size), dtype=np.float32)
+            matrix[row_of, indices] = data
+
+            def mul(dense):
+                return matrix @ dense
+
+            def mul_t(dense):
+                return matrix.T @ dense
+        else:
+            # Transposed copy (term -> snippet) for X^T products
+            order = np.argsort(indices, kind='stable')
+            t_indptr = np.concatenate(([0], np.cumsum(np.bincount(indices, minlength=vocab_size))))
+            t_indices = row_of[order]
+            t_data = data[order]
+
+            def mul(dense):
+                return _sparse_matmul(indptr, indices, data, dense, n_docs)
+
+            def mul_t(dense):
+                return _sparse_matmul(t_indptr, t_indices, t_data, dense, vocab_size)
+
+        rank = min(self.dim, n_docs, vocab_size)
+        if rank == 0:
+            self.term_vectors = np.zeros((vocab_size, 0), dtype=np.float32)
+            self.doc_vectors = np.zeros((n_docs, 0), dtype=np.float32)
+            return self
+
+        # Randomized range finder (Halko et al.) with power iterations
+        rng = np.random.default_rng(self.seed)
+        sketch = min(rank + 10, n_docs, vocab_size)
+        omega = rng.standard_normal((vocab_size, sketch)).astype(np.float32)
+        q, _ = np.linalg.qr(mul(omega))
+        for _ in range(self.power_iterations):
+            z, _ = np.linalg.qr(mul_t(q))
+            q, _ = np.linalg.qr(mul(z))
+
+        _, _, vt = np.linalg.svd(mul_t(q).T, full_matrices=False)
+        self.term_vectors = np.ascontiguousarray(vt[:rank].T, dtype=np.float32)
+        self.doc_vectors = self._unit(mul(self.term_vectors))
+        return self
+
+    def encode(self, queries: List[List[int]]):
+        """
+        Embed a batch of queries given as lists of term ids (unknown terms already dropped).
+
+        Returns:
+            (n_queries, dim) L2-normalized float32 matrix
+        """
+        lengths = [len(q) for q in queries]
+        indptr = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        indices = np.fromiter((t for q in queries for t in q), dtype=np.int64, count=sum(lengths))
+        data = self._normalize_rows(indptr, self.idf[indices])
+        return self._unit(_sparse_matmul(indptr, indices, data, self.term_vectors, len(queries)))
+
+    def score(self, query_vectors):
+        """Cosine similarity of each query against every snippet: one (n_queries x n_docs) matmul."""
+        return query_vectors @ self.doc_vectors.T
+
+    @staticmethod
+    def _normalize_rows(indptr, data):
+        """L2-normalize the values of each CSR row."""
+        if len(data) == 0:
+            return data.astype(np.float32)
+        row_of = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        norms = np.sqrt(np.bincount(row_of, weights=data * data, minlength=len(indptr) - 1))
+        return (data / np.maximum(norms[row_of], 1e-12)).astype(np.float32)
+
+    @staticmethod
+    def _unit(matrix):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return (matrix / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+def dense_available() -> bool:
+    """Whether NumPy is installed for dense retrieval."""
+    return np is not None
@@ -0,0 +1,496 @@
+"""
+Fake LLM Server
+Role: OpenAI-compatible local stand-in for DeepSeek (latency, errors, canned or recorded replies) for offline tests and load tests.
+
+Point the app at it with DEEPSEEK_BASE_URL=http://127.0.0.1:8089 (any DEEPSEEK_API_KEY works).
+
+Run with: python -m utils.fake_llm_server [--latency lognormal:0.8,0.5] [--error-rate 0.02]
+          python -m utils.fake_llm_server --mode record   (proxy to DeepSeek and save the replies)
+          python -m utils.fake_llm_server --mode replay   (serve the saved replies)
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from utils.prompt_compactor import count_tokens
+
+MODES = ("canned", "record", "replay")
+
+# Granularity (characters) of the simulated provider-side prompt prefix cache
+PREFIX_BLOCK = 256
+
+CANNED_COVER_LETTER = (
+    "Your team's focus on reliable, well-engineered products is exactly the kind of work I want to do next.\n\n"
+    "Over the past years I have built and operated production services end to end, from design reviews to on-call, "
+    "and I care about measurable results: faster releases, fewer incidents and happier users.\n\n"
+    "In my current role I led a migration that cut API latency by 30% while traffic doubled, which maps directly "
+    "to the scale challenges described in your posting.\n\n"
+    "I would welcome the chance to discuss how I can contribute. Thank you for your consideration."
+)
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parse a latency distribution (seconds).
+
+    Args:
+        spec: "fixed:S", "uniform:LOW,HIGH", "normal:MEAN,STD", "lognormal:MEDIAN,SIGMA" or "exp:MEAN"
+
+    Returns:
+        Function drawing a non-negative latency from a random generator
+    """
+    kind, _, params = spec.partition(":")
+    try:
+        values = [float(v) for v in params.split(",")] if params else []
+    except ValueError:
+        raise ValueError(f"Invalid latency spec: {spec}")
+    kind = kind.strip().lower()
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    if kind == "exp" and len(values) == 1:
+        return lambda rng: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    raise ValueError(f"Invalid latency spec: {spec}")
+
+
+def request_key(model: str, messages: List[Dict[str, Any]], temperature: float) -> str:
+    """Identity of a chat completion request for recording and replay."""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": round(float(temperature), 4)},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _section(text: str, start: str, end: str) -> Optional[str]:
+    match = re.search(re.escape(start) + r"\s*(.*?)\s*" + re.escape(end), text, re.S)
+    return match.group(1) if match else None
+
+
+def canned_reply(system: str, prompt: str) -> str:
+    """
+    Plausible reply for the app's own prompts: a job analysis (built by the
+    local analyzer from the posting in the prompt), a tailored CV echoing the
+    profile in the prompt, a cover letter, or an empty JSON object.
+    """
+    if "Analyze this job description" in prompt:
+        # Imported lazily: only this reply needs the skill ontology
+        from agents.local_job_analyzer import LocalJobAnalyzer
+        posting = _section(prompt, "JOB DESCRIPTION:", "Extract and return") or prompt
+        analysis = LocalJobAnalyzer().analyze(posting)
+        analysis.pop("source", None)
+        return json.dumps(analysis)
+
+    if "Tailor this candidate's profile" in prompt:
+        try:
+            profile = json.loads(_section(prompt, "CANDIDATE BASE PROFILE:", "TASK:") or "{}")
+        except json.JSONDecodeError:
+            profile = {}
+        experience = [
+            {
+                "company": role.get("company", ""),
+                "title": role.get("title", ""),
+                "dates": role.get("dates", ""),
+                "achievements": (role.get("achievements") or role.get("responsibilities") or [])[:4],
+            }
+            for role in (profile.get("experience") or [])[:4]
+        ]
+        return json.dumps({
+            "personal_info": profile.get("personal_info", {}),
+            "summary": profile.get("summary", "Engineer with a track record of shipping reliable systems."),
+            "skills": {"Technical": [s for values in (profile.get("skills") or {}).values() for s in values][:12], "Soft Skills": ["Communication"]},
+            "experience": experience,
+            "education": profile.get("education", []),
+        })
+
+    if "JSON" in prompt or "JSON" in system:
+        return "{}"
+    return CANNED_COVER_LETTER
+
+
+class _PrefixCache:
+    """Simulates the provider's prompt prefix cache: prompt prefixes seen before count as cached tokens."""
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def cached_tokens(self, text: str) -> int:
+        digest = hashlib.sha1()
+        hashes = []
+        for start in range(0, len(text) - len(text) % PREFIX_BLOCK, PREFIX_BLOCK):
+            digest.update(text[start:start + PREFIX_BLOCK].encode("utf-8"))
+            hashes.append(digest.hexdigest())
+        with self._lock:
+            hit = 0
+            while hit < len(hashes) and hashes[hit] in self._seen:
+                hit += 1
+            if len(self._seen) + len(hashes) > self.max_entries:
+                self._seen.clear()
+            self._seen.update(hashes)
+        return count_tokens(text[:hit * PREFIX_BLOCK]) if hit else 0
+
+
+class FakeLLMServer:
+    """
+    Threaded HTTP server speaking the OpenAI chat completions protocol
+    (POST /chat/completions or /v1/chat/completions, streaming included).
+
+    GET /health answers {"status": "ok"}; GET /stats returns request counters.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: str = "fixed:0",
+        chunk_delay: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1.0,
+        responses: Optional[List[Dict[str, Any]]] = None,
+        mode: str = "canned",
+        recordings: str = "data/llm_recordings.jsonl",
+        upstream: str = "https://api.deepseek.com",
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            host: Interface to listen on
+            port: Port (0 picks a free one; see .url)
+            latency: Time-to-first-token distribution (see parse_latency)
+            chunk_delay: Seconds between streamed chunks
+            error_rate: Share of requests answered with HTTP 500
+            rate_limit_rate: Share of requests answered with HTTP 429 and a Retry-After header
+            retry_after: Retry-After seconds sent with 429s
+            responses: Rules [{"match": substring of system + prompt, "response": text or JSON value}], checked first
+            mode: "canned" (rules and built-in replies), "record" (forward to upstream and save
+                the replies) or "replay" (saved replies, canned ones for unknown requests)
+            recordings: JSONL file of recorded replies
+            upstream: Base URL of the real API in record mode
+            seed: Random seed for reproducible latencies and errors
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown fake LLM server mode: {mode}")
+        self.latency = parse_latency(latency)
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.responses = responses or []
+        self.mode = mode
+        self.recordings_path = recordings
+        self.upstream = upstream.rstrip("/")
+        self.prefix_cache = _PrefixCache()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recordings: Dict[str, Dict[str, Any]] = self._load_recordings() if mode != "canned" else {}
+        self.counters = {
+            "requests": 0,
+            "streams": 0,
+            "errors_injected": 0,
+            "rate_limited": 0,
+            "replayed": 0,
+            "replay_misses": 0,
+            "recorded": 0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "completion_tokens": 0,
+        }
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeLLMServer":
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-llm-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, "mode": self.mode, "recordings": len(self._recordings)}
+
+    def _count(self, **increments: int) -> None:
+        with self._lock:
+            for name, value in increments.items():
+                self.counters[name] += value
+
+    def _draw(self) -> Tuple[float, float]:
+        """Random latency and a uniform draw for error injection (one lock for reproducibility)."""
+        with self._lock:
+            return self.latency(self._rng), self._rng.random()
+
+    def _load_recordings(self) -> Dict[str, Dict[str, Any]]:
+        recordings = {}
+        if os.path.exists(self.recordings_path):
+            with open(self.recordings_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        recordings[entry["key"]] = entry
+        return recordings
+
+    def _save_recording(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._recordings[entry["key"]] = entry
+            os.makedirs(os.path.dirname(self.recordings_path) or ".", exist_ok=True)
+            with open(self.recordings_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _forward(self, body: Dict[str, Any], authorization: str) -> Dict[str, Any]:
+        """Send the request (unstreamed) to the upstream API."""
+        payload = {key: value for key, value in body.items() if key not in ("stream", "stream_options")}
+        request = urllib.request.Request(
+            self.upstream + "/chat/completions",
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json", "Authorization": authorization},
+        )
+        with urllib.request.urlopen(request, timeout=300) as response:
+            return json.loads(response.read())
+
+    def _reply(self, body: Dict[str, Any], authorization: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Reply text for a request and, for recorded replies, the upstream usage.
+        """
+        messages = body.get("messages") or []
+        system = "\n".join(m.get("content") or "" for m in messages if m.get("role") == "system")
+        prompt = "\n".join(m.get("content") or "" for m in messages if m.get("role") != "system")
+        key = request_key(body.get("model", ""), messages, body.get("temperature", 1.0))
+
+        if self.mode == "replay":
+            entry = self._recordings.get(key)
+            if entry is not None:
+                self._count(replayed=1)
+                return entry["content"], entry.get("usage")
+            self._count(replay_misses=1)
+        elif self.mode == "record":
+            response = self._forward(body, authorization)
+            content = response["choices"][0]["message"]["content"]
+            self._save_recording({"key": key, "model": body.get("model"), "content": content, "usage": response.get("usage")})
+            self._count(recorded=1)
+            return content, response.get("usage")
+
+        for rule in self.responses:
+            if rule.get("match", "") in system + "\n" + prompt:
+                reply = rule.get("response", "")
+                return (reply if isinstance(reply, str) else json.dumps(reply)), None
+        return canned_reply(system, prompt), None
+
+    def _usage(self, body: Dict[str, Any], content: str, recorded: Optional[Dict[str, Any]]) -> Dict[str, int]:
+        if recorded:
+            usage = dict(recorded)
+        else:
+            text = "".join(f"{m.get('role')}:{m.get('content') or ''}\n" for m in body.get("messages") or [])
+            prompt_tokens = count_tokens(text)
+            completion_tokens = count_tokens(content)
+            cached = min(self.prefix_cache.cached_tokens(text), prompt_tokens)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_cache_hit_tokens": cached,
+                "prompt_cache_miss_tokens": prompt_tokens - cached,
+            }
+        self._count(
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            cached_tokens=usage.get("prompt_cache_hit_tokens", 0),
+        )
+        return usage
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.rstrip("/") in ("", "/health"):
+                    self._send_json(200, {"status": "ok"})
+                elif self.path.rstrip("/") == "/stats":
+                    self._send_json(200, server.stats())
+                else:
+                    self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+            def do_POST(self):
+                if self.path.rstrip("/") not in ("/chat/completions", "/v1/chat/completions"):
+                    self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+                    return
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                except json.JSONDecodeError:
+                    self._send_json(400, {"error": {"message": "Invalid JSON body", "type": "invalid_request_error"}})
+                    return
+
+                server._count(requests=1)
+                latency, draw = server._draw()
+                if draw < server.rate_limit_rate:
+                    server._count(rate_limited=1)
+                    self._send_json(
+                        429,
+                        {"error": {"message": "Rate limit reached (injected)", "type": "rate_limit_error"}},
+                        {"Retry-After": f"{server.retry_after:g}"},
+                    )
+                    return
+                if draw < server.rate_limit_rate + server.error_rate:
+                    server._count(errors_injected=1)
+                    self._send_json(500, {"error": {"message": "Internal server error (injected)", "type": "server_error"}})
+                    return
+
+                time.sleep(latency)
+                try:
+                    content, recorded_usage = server._reply(body, self.headers.get("Authorization", ""))
+                except urllib.error.HTTPError as e:
+                    self._send_json(e.code, json.loads(e.read() or b"{}"))
+                    return
+                usage = server._usage(body, content, recorded_usage)
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+                model = body.get("model", "deepseek-chat")
+                if body.get("stream"):
+                    server._count(streams=1)
+                    self._stream(completion_id, model, content, usage, (body.get("stream_options") or {}).get("include_usage"))
+                    return
+                self._send_json(200, {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+
+            def _stream(self, completion_id: str, model: str, content: str, usage: Dict[str, int], include_usage: bool) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                def event(choices: List[Dict[str, Any]], **extra: Any) -> None:
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": choices, **extra}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+
+                # Word-sized deltas, like a tokenizer would produce
+                pieces = re.findall(r"\s*\S+", content) or [content]
+                for index, piece in enumerate(pieces):
+                    if index and server.chunk_delay:
+                        time.sleep(server.chunk_delay)
+                    delta = {"role": "assistant", "content": piece} if index == 0 else {"content": piece}
+                    event([{"index": 0, "delta": delta, "finish_reason": None}])
+                event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+                if include_usage:
+                    event([], usage=usage)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible fake LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="fixed:0", help='Time to first token, e.g. "lognormal:0.8,0.5" (median, sigma)')
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests failing with HTTP 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--responses", help='JSON file with [{"match": "...", "response": ...}] rules')
+    parser.add_argument("--mode", choices=MODES, default="canned")
+    parser.add_argument("--recordings", default="data/llm_recordings.jsonl")
+    parser.add_argument("--upstream", default="https://api.deepseek.com")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    responses = None
+    if args.responses:
+        with open(args.responses, "r", encoding="utf-8") as f:
+            responses = json.load(f)
+
+    server = FakeLLMServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        chunk_delay=args.chunk_delay,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        responses=responses,
+        mode=args.mode,
+        recordings=args.recordings,
+        upstream=args.upstream,
+        seed=args.seed,
+    )
+    print(f"🧪 Fake LLM server ({args.mode}) listening on {server.url}")
+    print(f"   Point the app at it with DEEPSEEK_BASE_URL={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping fake LLM server")
+
+
+if __name__ == "__main__":
+    # Fix Windows console encoding for emojis
+    if sys.platform == 'win32':
+        try:
+            sys.stdout.reconfigure(encoding='utf-8')
+        except AttributeError:
+            pass
+    main()
@@ -3,42 +3,91 @@ Gemini API Client Wrapper
 Role: Handle all interactions with Google Gemini API with robust error handling and retry logic.
 """
 
-from typing import Dict, Any, Optional
-import json
-import google.generativeai as genai
-from google.api_core import exceptions as google_exceptions
-from tenacity import retry, stop_after_attempt, wait_exponential
+from typing import Dict, Any, Optional, Iterator, AsyncIterator
+import time
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_exponential
+from utils.llm_provider import LLMProvider, AsyncLLMProvider
+from utils.prompt_compactor import count_tokens
+from utils.usage import UsageTracker, QuotaExceededError, get_usage_tracker
 
-class GeminiClient:
+try:
+    import google.generativeai as genai
+    from google.api_core import exceptions as google_exceptions
+except ImportError:
+    genai = None
+    google_exceptions = None
+
+
+class _GeminiBase:
     """
-    Wrapper for Google Gemini API to handle configuration, generation, and error handling.
+    Configuration, model handles and usage tracking shared by the sync and async clients.
     """
-    
-    def __init__(self, api_key: str, model_name: str = "gemini-1.5-flash"):
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str = "gemini-1.5-flash", usage: Optional[UsageTracker] = None):
         """
         Initialize the Gemini client.
 
         Args:
             api_key: Google API Key
             model_name: Model version to use (default: gemini-1.5-flash)
+            usage: Usage tracker (default: the shared tracker configured from LLM_* env vars)
         """
         if not api_key:
-            raise ValueError("API key is required for GeminiClient")
-            
+            raise ValueError(f"API key is required for {type(self).__name__}")
+        if genai is None:
+            raise ImportError("Gemini support requires google-generativeai: pip install google-generativeai")
+
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(model_name)
         self.model_name = model_name
+        self.usage = usage or get_usage_tracker()
+        # Gemini takes the system instruction per model, so keep one model per instruction
+        self._models: Dict[str, Any] = {}
+
+    def _model(self, system_instruction: str):
+        model = self._models.get(system_instruction)
+        if model is None:
+            model = genai.GenerativeModel(self.model_name, system_instruction=system_instruction or None)
+            self._models[system_instruction] = model
+        return model
+
+    @staticmethod
+    def _generation_config(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return config or {"temperature": 0.7}
+
+    def _record_usage(self, response: Any, started: float, error: bool = False) -> None:
+        metadata = getattr(response, "usage_metadata", None)
+        self.usage.record(
+            prompt_tokens=getattr(metadata, "prompt_token_count", 0) or 0,
+            completion_tokens=getattr(metadata, "candidates_token_count", 0) or 0,
+            cached_tokens=getattr(metadata, "cached_content_token_count", 0) or 0,
+            latency=time.perf_counter() - started,
+            error=error,
+            model=self.model_name,
+        )
+
+    def _is_rate_limit(self, error: Exception) -> bool:
+        return google_exceptions is not None and isinstance(error, google_exceptions.ResourceExhausted)
+
+
+class GeminiClient(_GeminiBase, LLMProvider):
+    """
+    Wrapper for Google Gemini API to handle configuration, generation, and error handling.
+    """
 
     @retry(
-        stop=stop_after_attempt(3), 
-        wait=wait_exponential(multiplier=1, min=2, max=10)
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        retry=retry_if_not_exception_type(QuotaExceededError)
     )
-    def generate_content(self, prompt: str, config: Optional[Dict[str, Any]] = None) -> str:
+    def generate_content(self, prompt: str, system_instruction: str = "", config: Optional[Dict[str, Any]] = None) -> str:
         """
         Generate text content from Gemini with retry logic.
 
         Args:
             prompt: The input prompt string
+            system_instruction: System prompt/role definition
             config: Optional generation config (temperature, tokens, etc.)
 
         Returns:
@@ -48,70 +97,163 @@ class GeminiClient:
             google_exceptions.ResourceExhausted: If rate limit exceeded
             ValueError: If generation fails
         """
+        self.usage.check_quota(count_tokens(prompt) + count_tokens(system_instruction))
+        started = time.perf_counter()
         try:
             print(f"🤖 User: Calling Gemini ({self.model_name})...")
-            generation_config = config or {"temperature": 0.7}
-            
-            response = self.model.generate_content(
-                prompt, 
-                generation_config=generation_config
+            response = self._model(system_instruction).generate_content(
+                prompt,
+                generation_config=self._generation_config(config)
             )
+            self._record_usage(response, started)
             return response.text
-            
-        except google_exceptions.ResourceExhausted:
-            print("⚠️  Rate limit exceeded. Retrying...")
-            raise
+
         except Exception as e:
-            print(f"❌ Gemini API Error: {e}")
+            self._record_usage(None, started, error=True)
+            if self._is_rate_limit(e):
+                print("⚠️  Rate limit exceeded. Retrying...")
+            else:
+                print(f"❌ Gemini API Error: {e}")
             raise
 
-    def generate_json(self, prompt: str, temperature: float = 0.0) -> Dict[str, Any]:
+    def stream_content(self, prompt: str, system_instruction: str = "", config: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Generate text content from Gemini, yielding text deltas as they arrive.
+
+        Args:
+            prompt: The input prompt string
+            system_instruction: System prompt/role definition
+            config: Optional generation config (temperature, etc.)
+
+        Yields:
+            Text deltas in generation order
+        """
+        self.usage.check_quota(count_tokens(prompt) + count_tokens(system_instruction))
+        started = time.perf_counter()
+        print(f"🤖 User: Streaming from Gemini ({self.model_name})...")
+        response = self._model(system_instruction).generate_content(
+            prompt,
+            generation_config=self._generation_config(config),
+            stream=True
+        )
+        try:
+            for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+        finally:
+            self._record_usage(response, started)
+
+    def generate_json(self, prompt: str, system_instruction: str = "", temperature: float = 0.0) -> Dict[str, Any]:
         """
         Generate and parse JSON content.
 
         Args:
             prompt: Input prompt requesting JSON
+            system_instruction: System role
             temperature: Lower temperature for structured data (default 0.0)
 
         Returns:
             Parsed JSON dictionary
         """
         config = {"temperature": temperature, "response_mime_type": "application/json"}
-        
-        try:
-            # Force JSON structure in prompt if not present
-            if "JSON" not in prompt:
-                prompt += "\n\nReturn the result as a valid JSON object."
 
-            response_text = self.generate_content(prompt, config)
+        try:
+            prompt, system_instruction = self._prepare_json_request(prompt, system_instruction)
+            response_text = self.generate_content(prompt, system_instruction, config)
             return self._parse_json_safe(response_text)
-            
+
         except Exception as e:
             print(f"❌ Failed to generate/parse JSON: {e}")
             raise
 
-    def _parse_json_safe(self, text: str) -> Dict[str, Any]:
+
+class AsyncGeminiClient(_GeminiBase, AsyncLLMProvider):
+    """
+    Asyncio variant of GeminiClient for use inside FastAPI handlers.
+    """
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        retry=retry_if_not_exception_type(QuotaExceededError)
+    )
+    async def generate_content(self, prompt: str, system_instruction: str = "", config: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate text content from Gemini with retry logic.
+
+        Args:
+            prompt: The input prompt string
+            system_instruction: System prompt/role definition
+            config: Optional generation config (temperature, tokens, etc.)
+
+        Returns:
+            Generated text string
+        """
+        self.usage.check_quota(count_tokens(prompt) + count_tokens(system_instruction))
+        started = time.perf_counter()
+        try:
+            print(f"🤖 User: Calling Gemini async ({self.model_name})...")
+            response = await self._model(system_instruction).generate_content_async(
+                prompt,
+                generation_config=self._generation_config(config)
+            )
+            self._record_usage(response, started)
+            return response.text
+
+        except Exception as e:
+            self._record_usage(None, started, error=True)
+            if self._is_rate_limit(e):
+                print("⚠️  Rate limit exceeded. Retrying...")
+            else:
+                print(f"❌ Gemini API Error: {e}")
+            raise
+
+    async def stream_content(self, prompt: str, system_instruction: str = "", config: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
         """
-        Safely parse JSON string, handling Markdown fences and common errors.
+        Generate text content from Gemini, yielding text deltas as they arrive.
 
         Args:
-            text: Raw string from LLM
+            prompt: The input prompt string
+            system_instruction: System prompt/role definition
+            config: Optional generation config (temperature, etc.)
+
+        Yields:
+            Text deltas in generation order
+        """
+        self.usage.check_quota(count_tokens(prompt) + count_tokens(system_instruction))
+        started = time.perf_counter()
+        print(f"🤖 User: Streaming from Gemini async ({self.model_name})...")
+        response = await self._model(system_instruction).generate_content_async(
+            prompt,
+            generation_config=self._generation_config(config),
+            stream=True
+        )
+        try:
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+        finally:
+            self._record_usage(response, started)
+
+    async def generate_json(self, prompt: str, system_instruction: str = "", temperature: float = 0.0) -> Dict[str, Any]:
+        """
+        Generate and parse JSON content.
+
+        Args:
+            prompt: Input prompt requesting JSON
+            system_instruction: System role
+            temperature: Lower temperature for structured data (default 0.0)
 
         Returns:
-            Parsed dictionary
+            Parsed JSON dictionary
         """
+        config = {"temperature": temperature, "response_mime_type": "application/json"}
+
         try:
-            cleaned = text.strip()
-            # Remove markdown code fences
-            if cleaned.startswith("```json"):
-                cleaned = cleaned[7:]
-            elif cleaned.startswith("```"):
-                cleaned = cleaned[3:]
-            if cleaned.endswith("```"):
-                cleaned = cleaned[:-3]
-            
-            return json.loads(cleaned.strip())
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON Decode Error: {e}")
-            print(f"Raw text start: {text[:100]}")
-            raise ValueError(f"Invalid JSON response: {e}")
+            prompt, system_instruction = self._prepare_json_request(prompt, system_instruction)
+            response_text = await self.generate_content(prompt, system_instruction, config)
+            return self._parse_json_safe(response_text)
+
+        except Exception as e:
+            print(f"❌ Failed to generate/parse JSON: {e}")
+            raise
@@ -0,0 +1,24 @@
+"""
+Content Hashing Utilities
+Role: Stable fingerprints of profiles and other JSON data for cache keys and invalidation.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict
+
+
+def profile_content_hash(profile: Dict[str, Any]) -> str:
+    """Stable hash of a profile dictionary, used to detect stale derived data."""
+    payload = json.dumps(profile, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def normalize_job_text(text: str) -> str:
+    """Case- and whitespace-normalized job description, so reformatted copies compare equal."""
+    return " ".join(text.casefold().split())
+
+
+def job_text_hash(text: str) -> str:
+    """Hash of the normalized job description text."""
+    return hashlib.sha256(normalize_job_text(text).encode("utf-8")).hexdigest()
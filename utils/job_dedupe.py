@@ -0,0 +1,390 @@
+"""
+Job Posting Deduplication
+Role: Detect near-duplicate job postings (MinHash + LSH) so their analysis and documents are reused.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils.hashing import normalize_job_text, job_text_hash
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def shingle_hashes(text: str, size: int = 3) -> List[int]:
+    """
+    32-bit hashes of the word n-grams ("shingles") of a normalized job text.
+
+    Punctuation and formatting are ignored, so the same posting copied to
+    another board with different bullets or spacing shingles identically.
+    Texts shorter than one shingle hash as a single shingle.
+    """
+    words = _WORD_PATTERN.findall(normalize_job_text(text))
+    if not words:
+        return []
+    if len(words) <= size:
+        return [zlib.crc32(" ".join(words).encode("utf-8"))]
+    return list({zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)})
+
+
+def lsh_parameters(threshold: float, num_perm: int, false_negative_weight: float = 0.9) -> Tuple[int, int]:
+    """
+    Choose (bands, rows) for LSH banding with bands * rows <= num_perm.
+
+    Minimizes the weighted probability of missing a pair above the threshold
+    plus retrieving a pair below it, integrated over similarity. Misses are
+    weighted higher by default: retrieved candidates are verified against
+    their signatures anyway, so a false positive only costs a row read.
+    """
+    def probability(s: float, bands: int, rows: int) -> float:
+        return 1.0 - (1.0 - s ** rows) ** bands
+
+    def integrate(func, low: float, high: float, steps: int = 200) -> float:
+        width = (high - low) / steps
+        return sum(func(low + (i + 0.5) * width) for i in range(steps)) * width
+
+    best, best_error = (1, num_perm), float("inf")
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        false_positive = integrate(lambda s: probability(s, bands, rows), 0.0, threshold)
+        false_negative = integrate(lambda s: 1.0 - probability(s, bands, rows), threshold, 1.0)
+        error = (1.0 - false_negative_weight) * false_positive + false_negative_weight * false_negative
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+def same_role(analysis: Optional[Dict[str, Any]], normalized_text: str) -> bool:
+    """
+    Whether the company and title of a stored analysis both appear in a
+    (normalized) job text.
+
+    Shingle similarity alone cannot tell a posting from the same template
+    published by another company, and that posting's analysis and documents
+    name the wrong employer. Without an analysis to check, nothing matches.
+    """
+    role_info = (analysis or {}).get("role_info") or {}
+    values = [role_info.get("company"), role_info.get("title")]
+    return all(
+        isinstance(value, str)
+        and value.strip()
+        and re.search(r"(?<!\w)" + re.escape(normalize_job_text(value)) + r"(?!\w)", normalized_text) is not None
+        for value in values
+    )
+
+
+class MinHasher:
+    """
+    MinHash signatures: for each of num_perm seeded hash functions, the
+    minimum over the text's shingle hashes. The share of equal positions in
+    two signatures estimates the Jaccard similarity of the shingle sets.
+
+    Each hash function is the splitmix64 finalizer applied to shingle XOR
+    seed, computed for all shingles and seeds in one vectorized step
+    (uint64 arithmetic wraps, as the finalizer expects).
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        """
+        Args:
+            num_perm: Signature length (accuracy vs. size)
+            shingle_size: Words per shingle
+            seed: Seed for the hash functions (must match across processes sharing an index)
+        """
+        if np is None:
+            raise ImportError("The 'numpy' package is required for job deduplication (pip install numpy)")
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._seeds = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True)
+
+    def signature(self, text: str):
+        """
+        MinHash signature of a job text.
+
+        Returns:
+            (num_perm,) uint32 array, or None if the text has no words
+        """
+        hashes = shingle_hashes(text, self.shingle_size)
+        if not hashes:
+            return None
+        z = np.asarray(hashes, dtype=np.uint64)[:, None] ^ self._seeds
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z ^= z >> np.uint64(31)
+        return (z.min(axis=0) >> np.uint64(32)).astype(np.uint32)
+
+    @staticmethod
+    def similarity(signature, others):
+        """Estimated Jaccard similarity of one signature against a (n, num_perm) matrix of signatures."""
+        return (others == signature).mean(axis=1)
+
+
+class JobDedupeIndex:
+    """
+    Persistent near-duplicate index over job postings, stored in SQLite.
+
+    Each posting keeps its MinHash signature and analysis; its signature is
+    split into LSH bands and every band is hashed into one indexed bucket
+    row, so a lookup reads a handful of B-tree entries instead of scanning
+    all postings. Candidates from the buckets are verified against their
+    signatures before they count as duplicates, and only while the company
+    and title of their stored analysis still appear in the new text (the
+    same posting re-used by another employer is not a duplicate). Exact
+    copies (same normalized text) are found by hash without any MinHash work.
+
+    Generated documents are stored per (posting, profile content hash), so
+    they are only reused for an unchanged profile.
+    """
+
+    def __init__(
+        self,
+        path: str = "data/job_dedupe.sqlite",
+        threshold: float = 0.85,
+        num_perm: int = 128,
+        shingle_size: int = 3,
+    ):
+        """
+        Args:
+            path: SQLite file shared by API processes and workers
+            threshold: Minimum estimated Jaccard similarity for a duplicate
+            num_perm: MinHash signature length
+            shingle_size: Words per shingle
+        """
+        self.path = path
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+        self.bands, self.rows = lsh_parameters(threshold, num_perm)
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_postings (
+                id INTEGER PRIMARY KEY,
+                text_hash TEXT NOT NULL UNIQUE,
+                signature BLOB NOT NULL,
+                analysis TEXT,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_lsh (
+                bucket INTEGER NOT NULL,
+                posting_id INTEGER NOT NULL,
+                PRIMARY KEY (bucket, posting_id)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_documents (
+                posting_id INTEGER NOT NULL,
+                profile_hash TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (posting_id, profile_hash)
+            )
+            """
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional["JobDedupeIndex"]:
+        """
+        Build an index from environment variables, or None if disabled.
+
+        JOB_DEDUPE: Set to 0 to disable deduplication (default: 1)
+        JOB_DEDUPE_PATH: SQLite file (default: data/job_dedupe.sqlite)
+        JOB_DEDUPE_THRESHOLD: Minimum Jaccard similarity (default: 0.85)
+        """
+        if os.getenv("JOB_DEDUPE", "1").lower() in ("0", "false", "no"):
+            return None
+        if np is None:
+            print("⚠️  numpy not installed; job deduplication disabled.")
+            return None
+        return cls(
+            path=os.getenv("JOB_DEDUPE_PATH", "data/job_dedupe.sqlite"),
+            threshold=float(os.getenv("JOB_DEDUPE_THRESHOLD", 0.85)),
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; SQLite handles cross-process locking."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _buckets(self, signature) -> List[int]:
+        """One signed 64-bit bucket key per LSH band (band number mixed into the hash)."""
+        data = signature.tobytes()
+        width = self.rows * 4
+        return [
+            int.from_bytes(
+                hashlib.blake2b(data[band * width:(band + 1) * width], digest_size=8, salt=band.to_bytes(8, "little")).digest(),
+                "little",
+                signed=True,
+            )
+            for band in range(self.bands)
+        ]
+
+    def find(self, job_description: str) -> Optional[Dict[str, Any]]:
+        """
+        Find a stored posting that duplicates this one.
+
+        Args:
+            job_description: The full text of the job posting
+
+        Returns:
+            {"posting_id", "similarity", "analysis", "exact"} for the most similar
+            stored posting at or above the threshold whose role matches, or None;
+            "exact" is True for a copy of the same normalized text
+        """
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT id, analysis FROM job_postings WHERE text_hash = ?", (job_text_hash(job_description),)
+        ).fetchone()
+        if row is not None:
+            return {
+                "posting_id": row[0],
+                "similarity": 1.0,
+                "analysis": json.loads(row[1]) if row[1] else None,
+                "exact": True,
+            }
+
+        signature = self.hasher.signature(job_description)
+        if signature is None:
+            return None
+        buckets = self._buckets(signature)
+        placeholders = ",".join("?" * len(buckets))
+        candidate_ids = [
+            r[0] for r in conn.execute(f"SELECT DISTINCT posting_id FROM job_lsh WHERE bucket IN ({placeholders})", buckets)
+        ]
+        if not candidate_ids:
+            return None
+
+        rows = []
+        for start in range(0, len(candidate_ids), 500):
+            chunk = candidate_ids[start:start + 500]
+            rows += conn.execute(
+                f"SELECT id, signature, analysis FROM job_postings WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+        if not rows:
+            return None
+
+        signatures = np.frombuffer(b"".join(r[1] for r in rows), dtype=np.uint32).reshape(len(rows), -1)
+        similarities = self.hasher.similarity(signature, signatures)
+        text = normalize_job_text(job_description)
+        for best in np.argsort(-similarities, kind="stable"):
+            if similarities[best] < self.threshold:
+                break
+            posting_id, _, analysis = rows[best]
+            analysis = json.loads(analysis) if analysis else None
+            if same_role(analysis, text):
+                return {
+                    "posting_id": posting_id,
+                    "similarity": round(float(similarities[best]), 4),
+                    "analysis": analysis,
+                    "exact": False,
+                }
+        return None
+
+    def add(self, job_description: str, analysis: Optional[Dict[str, Any]] = None) -> Optional[int]:
+        """
+        Store a posting (or update the analysis of an exact copy already stored).
+
+        Args:
+            job_description: The full text of the job posting
+            analysis: Its job analysis
+
+        Returns:
+            The posting ID, or None if the text has no words
+        """
+        return self.add_many([(job_description, analysis)])[0]
+
+    def add_many(self, postings: List[Tuple[str, Optional[Dict[str, Any]]]]) -> List[Optional[int]]:
+        """
+        Store many postings in one transaction (bulk import).
+
+        Args:
+            postings: (job description, analysis) pairs
+
+        Returns:
+            Posting IDs in input order (None for texts without words)
+        """
+        now = time.time()
+        conn = self._conn()
+        ids: List[Optional[int]] = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for job_description, analysis in postings:
+                signature = self.hasher.signature(job_description)
+                if signature is None:
+                    ids.append(None)
+                    continue
+                text_hash = job_text_hash(job_description)
+                analysis_json = json.dumps(analysis) if analysis is not None else None
+                row = conn.execute("SELECT id FROM job_postings WHERE text_hash = ?", (text_hash,)).fetchone()
+                if row is not None:
+                    if analysis_json is not None:
+                        conn.execute("UPDATE job_postings SET analysis = ? WHERE id = ?", (analysis_json, row[0]))
+                    ids.append(row[0])
+                    continue
+                posting_id = conn.execute(
+                    "INSERT INTO job_postings (text_hash, signature, analysis, created_at) VALUES (?, ?, ?, ?)",
+                    (text_hash, signature.tobytes(), analysis_json, now),
+                ).lastrowid
+                conn.executemany(
+                    "INSERT OR IGNORE INTO job_lsh (bucket, posting_id) VALUES (?, ?)",
+                    [(bucket, posting_id) for bucket in self._buckets(signature)],
+                )
+                ids.append(posting_id)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return ids
+
+    def get_result(self, posting_id: int, profile_hash: str) -> Optional[Dict[str, Any]]:
+        """Stored pipeline result (files, match score) for a posting and profile, if any."""
+        row = self._conn().execute(
+            "SELECT result FROM job_documents WHERE posting_id = ? AND profile_hash = ?", (posting_id, profile_hash)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def store_result(self, posting_id: int, profile_hash: str, result: Dict[str, Any]) -> None:
+        """Remember the documents generated for a posting and profile."""
+        self._conn().execute(
+            "INSERT OR REPLACE INTO job_documents (posting_id, profile_hash, result, created_at) VALUES (?, ?, ?, ?)",
+            (posting_id, profile_hash, json.dumps(result), time.time()),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Index statistics."""
+        conn = self._conn()
+        return {
+            "postings": conn.execute("SELECT COUNT(*) FROM job_postings").fetchone()[0],
+            "documents": conn.execute("SELECT COUNT(*) FROM job_documents").fetchone()[0],
+            "threshold": self.threshold,
+            "bands": self.bands,
+            "rows": self.rows,
+        }
@@ -0,0 +1,395 @@
+"""
+Background Job Queue
+Role: Bounded, persistent queue plus worker pool so long LLM pipelines run outside the HTTP request.
+
+The SQLite-backed queue is a local stand-in for a real broker: it is safe across
+threads and processes sharing the same file, which is enough for one host or a
+shared volume. Swap SQLiteJobQueue for a broker-backed implementation with the
+same methods when scaling beyond that.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+from utils.usage import usage_scope
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when the queue has reached its pending-job limit (backpressure)."""
+
+
+class SQLiteJobQueue:
+    """
+    Persistent FIFO job queue with backpressure and per-user concurrency limits.
+
+    claim() hands out a lease token. complete(), fail() and heartbeat() only
+    act while that lease is current, so a worker whose job was requeued after
+    missing heartbeats cannot overwrite the result of the job's next run.
+    """
+
+    def __init__(
+        self,
+        path: str = "data/jobs.sqlite",
+        max_pending: int = 500,
+        max_per_user: int = 2,
+        visibility_timeout: float = 900,
+        max_attempts: int = 3,
+    ):
+        """
+        Initialize the queue.
+
+        Args:
+            path: SQLite file shared by producers and workers
+            max_pending: Pending jobs allowed before submit() raises QueueFullError
+            max_per_user: Jobs a single user may have running at once
+            visibility_timeout: Seconds without a heartbeat after which a running job is considered abandoned and requeued
+            max_attempts: Claims per job; an abandoned job that reached it is failed instead of requeued
+        """
+        self.path = path
+        self.max_pending = max_pending
+        self.max_per_user = max_per_user
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                lease TEXT,
+                heartbeat_at REAL
+            )
+            """
+        )
+        # Queues created before leases were added
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("lease", "TEXT"), ("heartbeat_at", "REAL")):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_user_status ON jobs (user_id, status)")
+        conn.commit()
+
+    @classmethod
+    def from_env(cls) -> "SQLiteJobQueue":
+        """
+        Build a queue from JOB_QUEUE_PATH, JOB_QUEUE_MAX_PENDING, JOB_MAX_PER_USER,
+        JOB_VISIBILITY_TIMEOUT and JOB_MAX_ATTEMPTS environment variables.
+        """
+        return cls(
+            path=os.getenv("JOB_QUEUE_PATH", "data/jobs.sqlite"),
+            max_pending=int(os.getenv("JOB_QUEUE_MAX_PENDING", 500)),
+            max_per_user=int(os.getenv("JOB_MAX_PER_USER", 2)),
+            visibility_timeout=float(os.getenv("JOB_VISIBILITY_TIMEOUT", 900)),
+            max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", 3)),
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; SQLite handles cross-process locking."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def submit(self, payload: Dict[str, Any], user_id: Optional[str] = None) -> str:
+        """
+        Enqueue a job.
+
+        Args:
+            payload: JSON-serializable job input
+            user_id: Owner used for per-user concurrency limits
+
+        Returns:
+            The new job ID
+
+        Raises:
+            QueueFullError: If max_pending jobs are already waiting
+        """
+        job_id = uuid.uuid4().hex
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            pending = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (STATUS_PENDING,)).fetchone()[0]
+            if pending >= self.max_pending:
+                raise QueueFullError(f"Job queue is full ({pending} pending jobs)")
+            conn.execute(
+                "INSERT INTO jobs (id, user_id, status, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, user_id, STATUS_PENDING, json.dumps(payload), time.time()),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Atomically take the oldest runnable job and mark it running.
+
+        Jobs whose owner already has max_per_user running jobs are skipped.
+        Running jobs without a heartbeat for visibility_timeout seconds are
+        requeued first, or failed once they were claimed max_attempts times.
+
+        Returns:
+            Job dictionary with decoded payload and its "lease" token, or None if nothing is runnable
+        """
+        now = time.time()
+        lease = uuid.uuid4().hex
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = now - self.visibility_timeout
+            conn.execute(
+                """
+                UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease = NULL
+                WHERE status = ? AND COALESCE(heartbeat_at, started_at) < ? AND attempts >= ?
+                """,
+                (STATUS_FAILED, f"Abandoned by its worker {self.max_attempts} times", now,
+                 STATUS_RUNNING, expired, self.max_attempts),
+            )
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, lease = NULL WHERE status = ? AND COALESCE(heartbeat_at, started_at) < ?",
+                (STATUS_PENDING, STATUS_RUNNING, expired),
+            )
+            row = conn.execute(
+                """
+                SELECT * FROM jobs
+                WHERE status = ?
+                  AND (user_id IS NULL OR user_id NOT IN (
+                      SELECT user_id FROM jobs
+                      WHERE status = ? AND user_id IS NOT NULL
+                      GROUP BY user_id HAVING COUNT(*) >= ?
+                  ))
+                ORDER BY created_at, rowid
+                LIMIT 1
+                """,
+                (STATUS_PENDING, STATUS_RUNNING, self.max_per_user),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ?, lease = ?, attempts = attempts + 1 WHERE id = ?",
+                (STATUS_RUNNING, now, now, lease, row["id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        job = self._row_to_dict(row)
+        job.update(status=STATUS_RUNNING, started_at=now, heartbeat_at=now, lease=lease, attempts=row["attempts"] + 1)
+        return job
+
+    def _update_leased(self, job_id: str, lease: str, assignments: str, values: tuple) -> bool:
+        cursor = self._conn().execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ? AND lease = ? AND status = ?",
+            (*values, job_id, lease, STATUS_RUNNING),
+        )
+        return cursor.rowcount > 0
+
+    def heartbeat(self, job_id: str, lease: str) -> bool:
+        """
+        Extend a running job's visibility timeout.
+
+        Returns:
+            False if the lease was lost (the job was requeued or finished elsewhere)
+        """
+        return self._update_leased(job_id, lease, "heartbeat_at = ?", (time.time(),))
+
+    def complete(self, job_id: str, lease: str, result: Dict[str, Any]) -> bool:
+        """
+        Mark a job as succeeded and store its result.
+
+        Returns:
+            False (and nothing is written) if the lease is no longer current
+        """
+        return self._update_leased(
+            job_id, lease, "status = ?, result = ?, finished_at = ?, lease = NULL",
+            (STATUS_SUCCEEDED, json.dumps(result), time.time()),
+        )
+
+    def fail(self, job_id: str, lease: str, error: str) -> bool:
+        """
+        Mark a job as failed with an error message.
+
+        Returns:
+            False (and nothing is written) if the lease is no longer current
+        """
+        return self._update_leased(
+            job_id, lease, "status = ?, error = ?, finished_at = ?, lease = NULL",
+            (STATUS_FAILED, error, time.time()),
+        )
+
+    def release(self, job_id: str, lease: str) -> bool:
+        """
+        Hand an unfinished job back to the queue (graceful worker shutdown).
+
+        The job becomes pending again right away instead of waiting out the
+        visibility timeout, and the interrupted run does not count towards
+        max_attempts.
+
+        Returns:
+            False (and nothing is written) if the lease is no longer current
+        """
+        return self._update_leased(
+            job_id, lease,
+            "status = ?, started_at = NULL, heartbeat_at = NULL, lease = NULL, attempts = MAX(attempts - 1, 0)",
+            (STATUS_PENDING,),
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job with decoded payload/result, or None if unknown."""
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def stats(self) -> Dict[str, int]:
+        """Return job counts per status."""
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def _row_to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+class WorkerPool:
+    """
+    Pool of asyncio workers pulling jobs from a queue and running an async handler.
+
+    Run it embedded in the API process (start/stop), in a background thread for
+    sync servers (start_in_thread), or standalone via worker.py (run_forever).
+    """
+
+    def __init__(
+        self,
+        queue: SQLiteJobQueue,
+        handler: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        concurrency: int = 4,
+        poll_interval: float = 0.5,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            queue: Job queue to consume
+            handler: Async callable turning a job payload into a JSON-serializable result
+            concurrency: Number of jobs processed at once
+            poll_interval: Seconds to wait when the queue is empty
+        """
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._tasks = []
+        self._stopping = False
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        """Claim a job; when cancelled meanwhile, hand back whatever the claim took."""
+        claim = asyncio.ensure_future(asyncio.to_thread(self.queue.claim))
+        try:
+            return await asyncio.shield(claim)
+        except asyncio.CancelledError:
+            # The claim finishes in its thread regardless
+            job = await claim
+            if job is not None:
+                await asyncio.to_thread(self.queue.release, job["id"], job["lease"])
+            raise
+
+    async def _worker(self, index: int) -> None:
+        while not self._stopping:
+            job = await self._claim()
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            print(f"🛠️  Worker {index}: processing job {job['id']}")
+            heartbeat = asyncio.create_task(self._heartbeat(job))
+            try:
+                # LLM usage (and token quotas) are charged to the job's owner
+                with usage_scope(job.get("user_id")):
+                    result = await self.handler(job["payload"])
+                recorded = await asyncio.to_thread(self.queue.complete, job["id"], job["lease"], result)
+                outcome = "succeeded"
+            except asyncio.CancelledError:
+                # Shutting down: requeue the job now rather than after the visibility timeout
+                if await asyncio.to_thread(self.queue.release, job["id"], job["lease"]):
+                    print(f"↩️  Worker {index}: job {job['id']} returned to the queue")
+                raise
+            except Exception as e:
+                recorded = await asyncio.to_thread(self.queue.fail, job["id"], job["lease"], str(e))
+                outcome = f"failed: {e}"
+            finally:
+                heartbeat.cancel()
+
+            if recorded:
+                print(f"{'✅' if outcome == 'succeeded' else '❌'} Worker {index}: job {job['id']} {outcome}")
+            else:
+                print(f"⚠️  Worker {index}: job {job['id']} {outcome} after its lease was lost; outcome discarded")
+
+    async def _heartbeat(self, job: Dict[str, Any]) -> None:
+        """Keep the job's lease alive while the handler runs."""
+        interval = max(self.queue.visibility_timeout / 3, 0.01)
+        while True:
+            await asyncio.sleep(interval)
+            if not await asyncio.to_thread(self.queue.heartbeat, job["id"], job["lease"]):
+                print(f"⚠️  Job {job['id']}: lease lost (requeued after missed heartbeats)")
+                return
+
+    def start(self) -> None:
+        """Start the workers on the running event loop."""
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+        print(f"🚦 Job queue: started {self.concurrency} workers")
+
+    async def stop(self) -> None:
+        """Stop the workers; in-flight jobs are cancelled and released back to the queue as pending."""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run_forever(self) -> None:
+        """Run the workers until cancelled (standalone worker process)."""
+        self.start()
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.stop()
+
+    def start_in_thread(self) -> threading.Thread:
+        """Run the pool on its own event loop in a daemon thread (for sync servers like Flask)."""
+        thread = threading.Thread(target=lambda: asyncio.run(self.run_forever()), daemon=True, name="job-workers")
+        thread.start()
+        return thread
@@ -0,0 +1,129 @@
+"""
+Incremental JSON Parser
+Role: Surface completed top-level fields of a JSON object while the LLM is still writing it.
+"""
+
+import json
+from typing import Dict, Any, List, Tuple
+
+
+class IncrementalJSONParser:
+    """
+    Feed text chunks of a single JSON object; each call to feed() returns the
+    (key, value) pairs of top-level fields whose values closed in that chunk.
+
+    Text before the opening brace (e.g. a ```json fence) and after the closing
+    brace is ignored. Only top-level fields are parsed eagerly; nested values are
+    decoded once their enclosing top-level value closes. Malformed input sets
+    `failed` and stops incremental parsing so callers can fall back to parsing
+    the full text.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self.failed = False
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        # Top-level state: key -> key_end -> colon -> value -> value_end -> comma -> key ...
+        self._expect = "key"
+        self._token_start = 0
+        self._key = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Consume the next chunk of text.
+
+        Args:
+            chunk: Next piece of the streamed response
+
+        Returns:
+            List of (key, value) pairs completed by this chunk, in document order
+        """
+        self._buffer += chunk
+        completed = []
+        if self.done or self.failed:
+            return completed
+        try:
+            self._scan(completed)
+        except ValueError:
+            self.failed = True
+        return completed
+
+    def _scan(self, completed: List[Tuple[str, Any]]) -> None:
+        buf = self._buffer
+        i = self._pos
+
+        while i < len(buf) and not self.done:
+            ch = buf[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect == "key_end":
+                        self._key = json.loads(buf[self._token_start:i + 1])
+                        self._expect = "colon"
+                    elif self._depth == 1 and self._expect == "value_end":
+                        self._emit(buf[self._token_start:i + 1], completed)
+                i += 1
+                continue
+
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                i += 1
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect in ("key", "value"):
+                    self._token_start = i
+                    self._expect = "key_end" if self._expect == "key" else "value_end"
+            elif ch in "{[":
+                if self._depth == 1 and self._expect == "value":
+                    self._token_start = i
+                    self._expect = "value_end"
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._expect == "value_end":
+                    self._emit(buf[self._token_start:i + 1], completed)
+                elif self._depth == 0:
+                    # Closing the top-level object also terminates a trailing number/literal
+                    if self._expect == "value_end":
+                        self._emit(buf[self._token_start:i], completed)
+                    self.done = True
+            elif self._depth == 1:
+                if ch == ":" and self._expect == "colon":
+                    self._expect = "value"
+                elif ch == ",":
+                    if self._expect == "value_end":
+                        self._emit(buf[self._token_start:i], completed)
+                    self._expect = "key"
+                elif not ch.isspace() and self._expect == "value":
+                    # Start of a number, true, false or null
+                    self._token_start = i
+                    self._expect = "value_end"
+            i += 1
+
+        self._pos = i
+
+    def _emit(self, raw: str, completed: List[Tuple[str, Any]]) -> None:
+        value = json.loads(raw.strip())
+        self.fields[self._key] = value
+        completed.append((self._key, value))
+        self._expect = "comma"
+
+    @property
+    def text(self) -> str:
+        """All text fed so far."""
+        return self._buffer
@@ -8,6 +8,7 @@ import os
 import json
 import re
 from typing import Dict, Any, Optional
+from utils.usage import llm_stage
 
 class LinkedInScraper:
     """
@@ -80,7 +81,8 @@ class LinkedInScraper:
         5. Return ONLY valid JSON
         """
         
-        return self.llm_client.generate_json(prompt, temperature=0.2)
+        with llm_stage("LinkedInScraper"):
+            return self.llm_client.generate_json(prompt, temperature=0.2)
     
     def create_master_profile(self, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
         """
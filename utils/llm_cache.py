@@ -0,0 +1,359 @@
+"""
+LLM Response Cache
+Role: Content-addressed cache for LLM responses so repeated prompts skip the API round-trip.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+def make_cache_key(model: str, system_instruction: str, prompt: str, temperature: float) -> str:
+    """
+    Build a content-addressed key for an LLM call.
+
+    Args:
+        model: Model name
+        system_instruction: System prompt
+        prompt: User prompt
+        temperature: Sampling temperature
+
+    Returns:
+        Hex SHA-256 digest identifying the request
+    """
+    payload = json.dumps(
+        {
+            "model": model,
+            "system": system_instruction,
+            "prompt": prompt,
+            "temperature": round(float(temperature), 4),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _value_bytes(entry: Dict[str, Any]) -> int:
+    """Size of a cached response in UTF-8 bytes, as counted against max_bytes."""
+    return len(entry["value"].encode("utf-8"))
+
+
+class CacheBackend:
+    """
+    Storage interface for cached responses.
+
+    Entries are dictionaries with at least "value", "created_at", "latency" and "tokens".
+    Backends are responsible for LRU ordering and size-based eviction.
+    """
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU cache bounded by entry count and total bytes."""
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 50 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= _value_bytes(self._entries.pop(key))
+            self._entries[key] = entry
+            self._bytes += _value_bytes(entry)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= _value_bytes(evicted)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= _value_bytes(entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Persistent cache stored in a SQLite file.
+
+    LRU order is tracked with an "accessed_at" column; eviction removes the
+    least recently used rows once the entry or byte budget is exceeded.
+    """
+
+    def __init__(self, path: str = "data/llm_cache.sqlite", max_entries: int = 10000, max_bytes: int = 200 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                latency REAL NOT NULL DEFAULT 0,
+                tokens INTEGER NOT NULL DEFAULT 0,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at, latency, tokens FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return {"value": row[0], "created_at": row[1], "latency": row[2], "tokens": row[3]}
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at, latency, tokens, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    key,
+                    entry["value"],
+                    entry["created_at"],
+                    time.time(),
+                    entry.get("latency", 0.0),
+                    entry.get("tokens", 0),
+                    _value_bytes(entry),
+                ),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop least recently used rows until both budgets are respected."""
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at ASC").fetchall()
+        doomed = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", doomed)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Shared cache backed by Redis so several replicas reuse each other's responses.
+
+    Redis handles eviction itself (configure `maxmemory-policy allkeys-lru` on the server);
+    TTL is enforced with key expiry in addition to the ResponseCache check.
+    """
+
+    def __init__(self, url: str, ttl: Optional[int] = None, prefix: str = "llm_cache:"):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("The 'redis' package is required for RedisCacheBackend (pip install redis)")
+
+        self._redis = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self._redis.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        self._redis.set(self.prefix + key, json.dumps(entry), ex=self.ttl)
+
+    def delete(self, key: str) -> None:
+        self._redis.delete(self.prefix + key)
+
+    def clear(self) -> None:
+        for key in self._redis.scan_iter(match=self.prefix + "*"):
+            self._redis.delete(key)
+
+    def size(self) -> int:
+        return sum(1 for _ in self._redis.scan_iter(match=self.prefix + "*"))
+
+
+class ResponseCache:
+    """
+    TTL-aware response cache in front of a pluggable backend.
+
+    Tracks hits and misses along with the API latency and tokens that cache hits avoided.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl: Optional[float] = 7 * 24 * 3600):
+        """
+        Initialize the cache.
+
+        Args:
+            backend: Storage backend (default: in-process MemoryCacheBackend)
+            ttl: Entry lifetime in seconds; None disables expiry
+        """
+        self.backend = backend or MemoryCacheBackend()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.saved_tokens = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["ResponseCache"]:
+        """
+        Build a cache from environment variables.
+
+        LLM_CACHE_BACKEND: "sqlite" (default), "memory", "redis" or "none"
+        LLM_CACHE_PATH: SQLite file path (default: data/llm_cache.sqlite)
+        LLM_CACHE_URL: Redis URL for the shared backend
+        LLM_CACHE_TTL: Entry lifetime in seconds (default: 7 days, 0 disables expiry)
+        LLM_CACHE_MAX_ENTRIES: LRU entry budget
+
+        Returns:
+            Configured ResponseCache, or None when caching is disabled
+        """
+        backend_name = os.getenv("LLM_CACHE_BACKEND", "sqlite").lower()
+        if backend_name in ("none", "off", "disabled", ""):
+            return None
+
+        ttl = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600)) or None
+        max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 10000))
+
+        if backend_name == "memory":
+            backend = MemoryCacheBackend(max_entries=max_entries)
+        elif backend_name == "redis":
+            backend = RedisCacheBackend(os.getenv("LLM_CACHE_URL", "redis://localhost:6379/0"), ttl=int(ttl) if ttl else None)
+        elif backend_name == "sqlite":
+            backend = SQLiteCacheBackend(os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite"), max_entries=max_entries)
+        else:
+            raise ValueError(f"Unknown LLM_CACHE_BACKEND: {backend_name}")
+
+        return cls(backend=backend, ttl=ttl)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Key produced by make_cache_key
+
+        Returns:
+            Cached response text, or None on miss/expiry
+        """
+        try:
+            entry = self.backend.get(key)
+        except Exception as e:
+            print(f"⚠️  LLM cache read failed: {e}")
+            entry = None
+
+        if entry is not None and self.ttl and time.time() - entry["created_at"] > self.ttl:
+            self.backend.delete(key)
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += entry.get("latency", 0.0)
+            self.saved_tokens += entry.get("tokens", 0)
+        return entry["value"]
+
+    def set(self, key: str, value: str, latency: float = 0.0, tokens: int = 0) -> None:
+        """
+        Store a response.
+
+        Args:
+            key: Key produced by make_cache_key
+            value: Response text
+            latency: Seconds the original API call took
+            tokens: Total tokens the original API call consumed
+        """
+        entry = {"value": value, "created_at": time.time(), "latency": latency, "tokens": tokens}
+        try:
+            self.backend.set(key, entry)
+        except Exception as e:
+            print(f"⚠️  LLM cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the latency/tokens saved by hits."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "entries": self.backend.size(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 2),
+                "saved_tokens": self.saved_tokens,
+            }
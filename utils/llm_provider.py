@@ -0,0 +1,166 @@
+"""
+LLM Provider Interface
+Role: Common interface for LLM backends (DeepSeek, Gemini, routers, fakes) used by every agent.
+"""
+
+import json
+from typing import Dict, Any, Optional, Tuple, Iterator, AsyncIterator, Callable, Awaitable
+
+from utils.json_stream import IncrementalJSONParser
+
+
+class ProviderBase:
+    """
+    Prompt and JSON handling shared by sync and async providers.
+
+    Subclasses set `name` (used in logs, routing and metrics).
+    """
+
+    name = "llm"
+
+    def _prepare_json_request(self, prompt: str, system_instruction: str) -> Tuple[str, str]:
+        """Force JSON structure in prompt and system instruction if not present."""
+        if "JSON" not in prompt:
+            prompt += "\n\nReturn the result as a valid JSON object."
+        if "JSON" not in system_instruction:
+            system_instruction += "\nProvide output in JSON format."
+        return prompt, system_instruction
+
+    def _parse_json_safe(self, text: str) -> Dict[str, Any]:
+        """
+        Safely parse JSON string, handling Markdown fences and common errors.
+
+        Args:
+            text: Raw string from LLM
+
+        Returns:
+            Parsed dictionary
+        """
+        try:
+            cleaned = text.strip()
+            # Remove markdown code fences
+            if cleaned.startswith("```json"):
+                cleaned = cleaned[7:]
+            elif cleaned.startswith("```"):
+                cleaned = cleaned[3:]
+            if cleaned.endswith("```"):
+                cleaned = cleaned[:-3]
+
+            return json.loads(cleaned.strip())
+        except json.JSONDecodeError as e:
+            print(f"❌ JSON Decode Error: {e}")
+            print(f"Raw text start: {text[:100]}")
+            # Try to extract JSON from text if it's embedded
+            try:
+                start = text.find('{')
+                end = text.rfind('}') + 1
+                if start != -1 and end != -1:
+                    return json.loads(text[start:end])
+            except:
+                pass
+            raise ValueError(f"Invalid JSON response: {e}")
+
+
+class LLMProvider(ProviderBase):
+    """
+    Synchronous LLM provider.
+
+    Only generate_content() is required; streaming falls back to a single
+    delta and the JSON helpers are built on the text methods.
+    """
+
+    def generate_content(self, prompt: str, system_instruction: str = "", config: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate text.
+
+        Args:
+            prompt: The input prompt string
+            system_instruction: System prompt/role definition
+            config: Optional generation config (temperature, etc.)
+
+        Returns:
+            Generated text string
+        """
+        raise NotImplementedError
+
+    def stream_content(self, prompt: str, system_instruction: str = "", config: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Generate text, yielding deltas as they arrive."""
+        yield self.generate_content(prompt, system_instruction, config)
+
+    def generate_json(self, prompt: str, system_instruction: str = "", temperature: float = 0.0) -> Dict[str, Any]:
+        """
+        Generate and parse JSON content.
+
+        Args:
+            prompt: Input prompt requesting JSON
+            system_instruction: System role
+            temperature: Lower temperature for structured data (default 0.0)
+
+        Returns:
+            Parsed JSON dictionary
+        """
+        prompt, system_instruction = self._prepare_json_request(prompt, system_instruction)
+        return self._parse_json_safe(self.generate_content(prompt, system_instruction, {"temperature": temperature}))
+
+    def generate_json_streaming(
+        self,
+        prompt: str,
+        system_instruction: str = "",
+        temperature: float = 0.0,
+        on_field: Optional[Callable[[str, Any], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Stream a JSON object, reporting each top-level field as soon as it closes.
+
+        Args:
+            prompt: Input prompt requesting JSON
+            system_instruction: System role
+            temperature: Lower temperature for structured data (default 0.0)
+            on_field: Called with (key, value) for every completed top-level field
+
+        Returns:
+            Parsed JSON dictionary
+        """
+        prompt, system_instruction = self._prepare_json_request(prompt, system_instruction)
+        parser = IncrementalJSONParser()
+        for delta in self.stream_content(prompt, system_instruction, {"temperature": temperature}):
+            for key, value in parser.feed(delta):
+                if on_field is not None:
+                    on_field(key, value)
+        return parser.fields if parser.done else self._parse_json_safe(parser.text)
+
+
+class AsyncLLMProvider(ProviderBase):
+    """Asyncio counterpart of LLMProvider."""
+
+    async def generate_content(self, prompt: str, system_instruction: str = "", config: Optional[Dict[str, Any]] = None) -> str:
+        """Generate text (see LLMProvider.generate_content)."""
+        raise NotImplementedError
+
+    async def stream_content(self, prompt: str, system_instruction: str = "", config: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Generate text, yielding deltas as they arrive."""
+        yield await self.generate_content(prompt, system_instruction, config)
+
+    async def generate_json(self, prompt: str, system_instruction: str = "", temperature: float = 0.0) -> Dict[str, Any]:
+        """Generate and parse JSON content (see LLMProvider.generate_json)."""
+        prompt, system_instruction = self._prepare_json_request(prompt, system_instruction)
+        return self._parse_json_safe(await self.generate_content(prompt, system_instruction, {"temperature": temperature}))
+
+    async def generate_json_streaming(
+        self,
+        prompt: str,
+        system_instruction: str = "",
+        temperature: float = 0.0,
+        on_field: Optional[Callable[[str, Any], Awaitable[None]]] = None,
+    ) -> Dict[str, Any]:
+        """Stream a JSON object; on_field is awaited for every completed top-level field."""
+        prompt, system_instruction = self._prepare_json_request(prompt, system_instruction)
+        parser = IncrementalJSONParser()
+        async for delta in self.stream_content(prompt, system_instruction, {"temperature": temperature}):
+            for key, value in parser.feed(delta):
+                if on_field is not None:
+                    await on_field(key, value)
+        return parser.fields if parser.done else self._parse_json_safe(parser.text)
+
+    async def aclose(self) -> None:
+        """Release network resources (call on application shutdown)."""
@@ -0,0 +1,478 @@
+"""
+LLM Router
+Role: Spread calls over several LLM providers: route to the fastest healthy one, hedge slow requests and fail over on errors.
+"""
+
+import asyncio
+import bisect
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextvars import copy_context
+from typing import Dict, Any, List, Optional, Tuple, Iterator, AsyncIterator, Callable, Awaitable
+
+from utils.deepseek_client import DeepSeekClient, AsyncDeepSeekClient
+from utils.gemini_client import GeminiClient, AsyncGeminiClient
+from utils.llm_provider import LLMProvider, AsyncLLMProvider
+from utils.usage import QuotaExceededError
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with percentile estimates."""
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Upper bound of the bucket holding the q-th quantile (capped at the
+        largest observation), or None without observations.
+        """
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                bound = self.bounds[index] if index < len(self.bounds) else self.max
+                return min(bound, self.max)
+        return self.max
+
+
+class ProviderHealth:
+    """
+    Latency histograms and error streaks per provider, shared by the sync
+    and async routers of a process.
+
+    A provider failing max_failures times in a row is skipped for `cooldown`
+    seconds (unless every provider is unhealthy).
+    """
+
+    def __init__(self, max_failures: int = 3, cooldown: float = 30.0, min_samples: int = 20):
+        """
+        Args:
+            max_failures: Consecutive errors before a provider is taken out of rotation
+            cooldown: Seconds an unhealthy provider is skipped
+            min_samples: Observations needed before a provider's latency is trusted for routing and hedging
+        """
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, name: str) -> Dict[str, Any]:
+        entry = self._stats.get(name)
+        if entry is None:
+            entry = self._stats[name] = {
+                "latency": LatencyHistogram(),
+                "requests": 0,
+                "errors": 0,
+                "failure_streak": 0,
+                "unhealthy_until": 0.0,
+                "hedges_won": 0,
+            }
+        return entry
+
+    def observe(self, name: str, latency: float, error: Optional[Exception] = None) -> None:
+        with self._lock:
+            entry = self._entry(name)
+            entry["requests"] += 1
+            if error is None:
+                entry["latency"].observe(latency)
+                entry["failure_streak"] = 0
+                return
+            entry["errors"] += 1
+            entry["failure_streak"] += 1
+            if entry["failure_streak"] >= self.max_failures:
+                entry["unhealthy_until"] = time.time() + self.cooldown
+                print(f"🩺 LLM provider {name} failed {entry['failure_streak']} times; skipping it for {self.cooldown:.0f}s")
+
+    def hedge_won(self, name: str) -> None:
+        with self._lock:
+            self._entry(name)["hedges_won"] += 1
+
+    def latency(self, name: str, q: float) -> Optional[float]:
+        """The provider's q-th latency quantile, or None until min_samples successes were seen."""
+        with self._lock:
+            histogram = self._entry(name)["latency"]
+            return histogram.percentile(q) if histogram.count >= self.min_samples else None
+
+    def order(self, providers: List[Any]) -> List[Any]:
+        """
+        Providers in routing order: healthy before unhealthy, then by median
+        latency (providers without enough samples after measured ones), then
+        in the configured order.
+        """
+        now = time.time()
+
+        def key(item):
+            index, provider = item
+            median = self.latency(provider.name, 0.5)
+            with self._lock:
+                unhealthy = self._entry(provider.name)["unhealthy_until"] > now
+            return (unhealthy, median is None, median or 0.0, index)
+
+        return [provider for _, provider in sorted(enumerate(providers), key=key)]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Per-provider request/error counts, health and latency percentiles."""
+        now = time.time()
+        with self._lock:
+            return {
+                name: {
+                    "requests": entry["requests"],
+                    "errors": entry["errors"],
+                    "healthy": entry["unhealthy_until"] <= now,
+                    "hedges_won": entry["hedges_won"],
+                    "p50": entry["latency"].percentile(0.5),
+                    "p95": entry["latency"].percentile(0.95),
+                    "histogram": dict(zip([*map(str, entry["latency"].bounds), "inf"], entry["latency"].counts)),
+                }
+                for name, entry in self._stats.items()
+            }
+
+
+class _RouterBase:
+    """Configuration shared by the sync and async routers."""
+
+    name = "router"
+
+    def __init__(
+        self,
+        providers: List[Any],
+        hedge: bool = True,
+        hedge_after: Optional[float] = 10.0,
+        hedge_percentile: float = 0.95,
+        health: Optional[ProviderHealth] = None,
+    ):
+        """
+        Args:
+            providers: Providers in preference order (each needs a distinct `name`)
+            hedge: Send a second request to the next provider when the first is slow
+            hedge_after: Hedge delay in seconds until the provider has enough latency samples (None: don't hedge then)
+            hedge_percentile: Latency quantile of the provider after which a request counts as slow
+            health: Shared provider health (default: a new one)
+        """
+        if not providers:
+            raise ValueError("LLM router needs at least one provider")
+        self.providers = list(providers)
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.hedge_percentile = hedge_percentile
+        self.health = health or ProviderHealth()
+        # Response cache of the first caching provider, for cache statistics
+        self.cache = next((p.cache for p in self.providers if getattr(p, "cache", None) is not None), None)
+
+    @classmethod
+    def from_env(cls, providers: List[Any], health: Optional[ProviderHealth] = None):
+        """
+        Build a router from environment variables.
+
+        LLM_HEDGE: Send hedged requests (default: 1)
+        LLM_HEDGE_AFTER: Hedge delay in seconds before latency samples exist (default: 10)
+        LLM_HEDGE_PERCENTILE: Latency quantile that triggers a hedge (default: 0.95)
+        """
+        return cls(
+            providers,
+            hedge=os.getenv("LLM_HEDGE", "1").lower() not in ("0", "false", "no", "off"),
+            hedge_after=float(os.getenv("LLM_HEDGE_AFTER", 10)) or None,
+            hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", 0.95)),
+            health=health,
+        )
+
+    def _hedge_delay(self, provider: Any) -> Optional[float]:
+        """Seconds to wait for a provider before hedging, or None to never hedge."""
+        if not self.hedge:
+            return None
+        observed = self.health.latency(provider.name, self.hedge_percentile)
+        return observed if observed is not None else self.hedge_after
+
+    def stats(self) -> Dict[str, Any]:
+        return self.health.snapshot()
+
+
+class LLMRouter(_RouterBase, LLMProvider):
+    """
+    Synchronous router over several LLMProviders.
+
+    generate_content() and generate_json() are hedged: when the preferred
+    provider hasn't answered within its p95 latency, the request is also sent
+    to the next provider and the first answer wins (the slower call runs to
+    completion in the background; its result is discarded). Errors fail over
+    to the next provider. Streams fail over only before their first delta.
+    """
+
+    def __init__(self, providers: List[LLMProvider], **kwargs):
+        super().__init__(providers, **kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=4 * len(self.providers), thread_name_prefix="llm-router")
+
+    def _timed(self, provider: LLMProvider, method: str, args: tuple, kwargs: dict) -> Any:
+        started = time.perf_counter()
+        try:
+            result = getattr(provider, method)(*args, **kwargs)
+        except QuotaExceededError:
+            raise
+        except Exception as e:
+            self.health.observe(provider.name, time.perf_counter() - started, e)
+            raise
+        self.health.observe(provider.name, time.perf_counter() - started)
+        return result
+
+    def _call(self, method: str, *args, **kwargs) -> Any:
+        """Run a provider method with hedging and failover."""
+        queue = self.health.order(self.providers)
+        primary = queue[0]
+        pending = {}
+        last_error: Optional[Exception] = None
+        hedged = False
+
+        def launch() -> None:
+            provider = queue.pop(0)
+            # Executor threads don't inherit context variables (usage stage, user)
+            future = self._executor.submit(copy_context().run, self._timed, provider, method, args, kwargs)
+            pending[future] = provider
+
+        launch()
+        while pending:
+            timeout = self._hedge_delay(primary) if queue and not hedged else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                print(f"🏇 {primary.name} slower than {timeout:.1f}s; hedging with {queue[0].name}")
+                hedged = True
+                launch()
+                continue
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    result = future.result()
+                except QuotaExceededError:
+                    raise
+                except Exception as e:
+                    last_error = e
+                    if queue and not pending:
+                        print(f"🔀 {provider.name} failed ({e}); failing over to {queue[0].name}")
+                        launch()
+                    continue
+                if provider is not primary:
+                    self.health.hedge_won(provider.name)
+                return result
+        raise last_error
+
+    def generate_content(self, prompt: str, system_instruction: str = "", config: Optional[Dict[str, Any]] = None) -> str:
+        return self._call("generate_content", prompt, system_instruction, config)
+
+    def generate_json(self, prompt: str, system_instruction: str = "", temperature: float = 0.0) -> Dict[str, Any]:
+        return self._call("generate_json", prompt, system_instruction, temperature)
+
+    def stream_content(self, prompt: str, system_instruction: str = "", config: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        last_error: Optional[Exception] = None
+        for provider in self.health.order(self.providers):
+            started = time.perf_counter()
+            emitted = False
+            try:
+                for delta in provider.stream_content(prompt, system_instruction, config):
+                    emitted = True
+                    yield delta
+            except QuotaExceededError:
+                raise
+            except Exception as e:
+                self.health.observe(provider.name, time.perf_counter() - started, e)
+                if emitted:
+                    raise
+                print(f"🔀 {provider.name} failed ({e}); failing over")
+                last_error = e
+                continue
+            self.health.observe(provider.name, time.perf_counter() - started)
+            return
+        raise last_error
+
+    def generate_json_streaming(
+        self,
+        prompt: str,
+        system_instruction: str = "",
+        temperature: float = 0.0,
+        on_field: Optional[Callable[[str, Any], None]] = None,
+    ) -> Dict[str, Any]:
+        last_error: Optional[Exception] = None
+        for provider in self.health.order(self.providers):
+            emitted = []
+
+            def report(key: str, value: Any) -> None:
+                emitted.append(key)
+                if on_field is not None:
+                    on_field(key, value)
+
+            try:
+                return self._timed(provider, "generate_json_streaming", (prompt, system_instruction, temperature, report), {})
+            except QuotaExceededError:
+                raise
+            except Exception as e:
+                if emitted:
+                    raise
+                print(f"🔀 {provider.name} failed ({e}); failing over")
+                last_error = e
+        raise last_error
+
+
+class AsyncLLMRouter(_RouterBase, AsyncLLMProvider):
+    """
+    Asyncio counterpart of LLMRouter; the losing request of a hedge is cancelled.
+    """
+
+    async def _timed(self, provider: AsyncLLMProvider, method: str, args: tuple, kwargs: dict) -> Any:
+        started = time.perf_counter()
+        try:
+            result = await getattr(provider, method)(*args, **kwargs)
+        except (QuotaExceededError, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            self.health.observe(provider.name, time.perf_counter() - started, e)
+            raise
+        self.health.observe(provider.name, time.perf_counter() - started)
+        return result
+
+    async def _call(self, method: str, *args, **kwargs) -> Any:
+        """Run a provider method with hedging and failover."""
+        queue = self.health.order(self.providers)
+        primary = queue[0]
+        pending = {}
+        last_error: Optional[Exception] = None
+        hedged = False
+
+        def launch() -> None:
+            provider = queue.pop(0)
+            pending[asyncio.create_task(self._timed(provider, method, args, kwargs))] = provider
+
+        launch()
+        try:
+            while pending:
+                timeout = self._hedge_delay(primary) if queue and not hedged else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    print(f"🏇 {primary.name} slower than {timeout:.1f}s; hedging with {queue[0].name}")
+                    hedged = True
+                    launch()
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except QuotaExceededError:
+                        raise
+                    except Exception as e:
+                        last_error = e
+                        if queue and not pending:
+                            print(f"🔀 {provider.name} failed ({e}); failing over to {queue[0].name}")
+                            launch()
+                        continue
+                    if provider is not primary:
+                        self.health.hedge_won(provider.name)
+                    return result
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def generate_content(self, prompt: str, system_instruction: str = "", config: Optional[Dict[str, Any]] = None) -> str:
+        return await self._call("generate_content", prompt, system_instruction, config)
+
+    async def generate_json(self, prompt: str, system_instruction: str = "", temperature: float = 0.0) -> Dict[str, Any]:
+        return await self._call("generate_json", prompt, system_instruction, temperature)
+
+    async def stream_content(self, prompt: str, system_instruction: str = "", config: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        last_error: Optional[Exception] = None
+        for provider in self.health.order(self.providers):
+            started = time.perf_counter()
+            emitted = False
+            try:
+                async for delta in provider.stream_content(prompt, system_instruction, config):
+                    emitted = True
+                    yield delta
+            except QuotaExceededError:
+                raise
+            except Exception as e:
+                self.health.observe(provider.name, time.perf_counter() - started, e)
+                if emitted:
+                    raise
+                print(f"🔀 {provider.name} failed ({e}); failing over")
+                last_error = e
+                continue
+            self.health.observe(provider.name, time.perf_counter() - started)
+            return
+        raise last_error
+
+    async def generate_json_streaming(
+        self,
+        prompt: str,
+        system_instruction: str = "",
+        temperature: float = 0.0,
+        on_field: Optional[Callable[[str, Any], Awaitable[None]]] = None,
+    ) -> Dict[str, Any]:
+        last_error: Optional[Exception] = None
+        for provider in self.health.order(self.providers):
+            emitted = []
+
+            async def report(key: str, value: Any) -> None:
+                emitted.append(key)
+                if on_field is not None:
+                    await on_field(key, value)
+
+            try:
+                return await self._timed(provider, "generate_json_streaming", (prompt, system_instruction, temperature, report), {})
+            except QuotaExceededError:
+                raise
+            except Exception as e:
+                if emitted:
+                    raise
+                print(f"🔀 {provider.name} failed ({e}); failing over")
+                last_error = e
+        raise last_error
+
+    async def aclose(self) -> None:
+        for provider in self.providers:
+            await provider.aclose()
+
+
+def create_llm_clients() -> Tuple[LLMProvider, AsyncLLMProvider]:
+    """
+    Build the sync and async LLM clients from environment variables.
+
+    LLM_PROVIDERS: Comma-separated providers in preference order, from
+        "deepseek" (DEEPSEEK_API_KEY) and "gemini" (GEMINI_API_KEY); default: deepseek.
+        With several providers, routers (configured by LLM_HEDGE*) are returned.
+
+    Returns:
+        Tuple of (sync client, async client)
+    """
+    names = [name.strip().lower() for name in os.getenv("LLM_PROVIDERS", "deepseek").split(",") if name.strip()]
+    sync_clients: List[LLMProvider] = []
+    async_clients: List[AsyncLLMProvider] = []
+    for name in names:
+        if name == "deepseek":
+            client = DeepSeekClient(api_key=os.getenv("DEEPSEEK_API_KEY"))
+            sync_clients.append(client)
+            async_clients.append(AsyncDeepSeekClient(api_key=os.getenv("DEEPSEEK_API_KEY"), cache=client.cache))
+        elif name == "gemini":
+            sync_clients.append(GeminiClient(api_key=os.getenv("GEMINI_API_KEY")))
+            async_clients.append(AsyncGeminiClient(api_key=os.getenv("GEMINI_API_KEY")))
+        else:
+            raise ValueError(f"Unknown LLM provider in LLM_PROVIDERS: {name}")
+
+    if len(sync_clients) == 1:
+        return sync_clients[0], async_clients[0]
+    health = ProviderHealth()
+    return LLMRouter.from_env(sync_clients, health), AsyncLLMRouter.from_env(async_clients, health)
@@ -3,22 +3,129 @@ Match Score Calculator Utility
 Role: Calculate how well a candidate profile matches a job description.
 """
 
-from typing import Dict, Any, List, Set
+from typing import Dict, Any, List, Set, Iterable, Optional, Union, Tuple
+from collections import OrderedDict
 import re
+import threading
+
+from utils.hashing import profile_content_hash
+from utils.skill_ontology import SkillOntology, get_skill_ontology
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class TokenIndex:
+    """
+    Token -> items inverted index over candidate skills or keywords.
+
+    A required item matches when it equals a candidate item or shares a
+    whitespace-separated word with one, so each requirement costs one set
+    lookup plus one dict lookup per word instead of a scan over every
+    candidate item.
+    """
+
+    def __init__(self, items: Iterable[str]):
+        self.items = set(items)
+        self.postings: Dict[str, List[str]] = {}
+        for item in sorted(self.items):
+            for token in set(item.split()):
+                self.postings.setdefault(token, []).append(item)
+
+    def find(self, required_item: str) -> Optional[str]:
+        """Return the candidate item matching required_item (exact first, then word overlap), or None."""
+        if required_item in self.items:
+            return required_item
+        for token in required_item.split():
+            items = self.postings.get(token)
+            if items:
+                return items[0]
+        return None
+
+
+class ProfileFeatures:
+    """
+    Candidate-side matching features of one profile version: the extracted
+    skill and keyword sets and their token indexes.
+    """
+
+    def __init__(self, skills: Set[str], keywords: Set[str]):
+        self.skills = skills
+        self.keywords = keywords
+        self.skills_index = TokenIndex(skills)
+        self.keywords_index = TokenIndex(keywords)
+
 
 class MatchCalculator:
     """
     Calculates match scores between candidate profiles and job requirements.
+    
+    Candidate-side features are extracted once per profile version and kept in
+    a small LRU, so repeated scoring against the same profile only does
+    job-side work. A version is the profile's content hash, or a caller-supplied
+    key such as the DB row's updated_at; either changes when the profile does.
+    
+    Skill names on both sides are normalized through the skill ontology, so
+    aliases such as "JS"/"JavaScript" or "Postgres"/"PostgreSQL" match.
     """
     
-    def __init__(self):
-        """Initialize the match calculator."""
-        pass
+    def __init__(self, max_cached_profiles: int = 256, ontology: Optional[SkillOntology] = None):
+        """
+        Initialize the match calculator.
+        
+        Args:
+            max_cached_profiles: Profile versions whose features are kept in memory
+            ontology: Skill vocabulary used for normalization (default: shared ontology)
+        """
+        self.ontology = ontology or get_skill_ontology()
+        self.max_cached_profiles = max_cached_profiles
+        self._features: "OrderedDict[str, ProfileFeatures]" = OrderedDict()
+        self._features_lock = threading.Lock()
+        self.feature_hits = 0
+        self.feature_misses = 0
+    
+    def profile_features(self, profile: Dict[str, Any], profile_version: Optional[str] = None) -> ProfileFeatures:
+        """
+        Get the candidate-side features for a profile, extracting them on first use.
+        
+        Args:
+            profile: Candidate's master profile
+            profile_version: Cache key identifying this profile version (default: content hash)
+            
+        Returns:
+            ProfileFeatures for the profile
+        """
+        key = profile_version or profile_content_hash(profile)
+        with self._features_lock:
+            features = self._features.get(key)
+            if features is not None:
+                self._features.move_to_end(key)
+                self.feature_hits += 1
+                return features
+            self.feature_misses += 1
+        
+        features = ProfileFeatures(
+            self._extract_candidate_skills(profile),
+            self._extract_keywords_from_profile(profile)
+        )
+        with self._features_lock:
+            self._features[key] = features
+            while len(self._features) > self.max_cached_profiles:
+                self._features.popitem(last=False)
+        return features
+    
+    def clear_profile_features(self) -> None:
+        """Drop all cached profile features."""
+        with self._features_lock:
+            self._features.clear()
     
     def calculate_match_score(
         self, 
         profile: Dict[str, Any], 
-        job_analysis: Dict[str, Any]
+        job_analysis: Dict[str, Any],
+        profile_version: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Calculate comprehensive match score between profile and job.
@@ -26,33 +133,137 @@ class MatchCalculator:
         Args:
             profile: Candidate's master profile
             job_analysis: Analyzed job requirements
+            profile_version: Cache key for the profile's features (default: content hash)
             
         Returns:
             Dictionary with match scores and detailed breakdown
         """
-        # Extract data
+        required_skills, nice_to_have_skills, ats_keywords = self._job_requirements(job_analysis)
+        
+        # Candidate skills and keywords (cached per profile version)
+        features = self.profile_features(profile, profile_version)
+        
+        # Calculate matches
+        required_matches = self._count_matches(required_skills, features.skills_index)
+        nice_to_have_matches = self._count_matches(nice_to_have_skills, features.skills_index)
+        keyword_matches = self._count_matches(ats_keywords, features.keywords_index)
+        
+        return self._build_breakdown(
+            required_skills, nice_to_have_skills, ats_keywords, features.skills,
+            required_matches, nice_to_have_matches, keyword_matches
+        )
+    
+    def rank_jobs(
+        self,
+        profile: Dict[str, Any],
+        job_analyses: List[Dict[str, Any]],
+        top_n: Optional[int] = None,
+        profile_version: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Score one profile against many analyzed jobs and rank them by fit.
+        
+        Each distinct requirement string is matched against the profile once;
+        per-job match counts and scores are then computed for all jobs in one
+        vectorized pass over a sparse job x requirement incidence list.
+        
+        Args:
+            profile: Candidate's master profile
+            job_analyses: Analyzed job requirements, one per posting
+            top_n: Only build breakdowns for the best top_n jobs (default: all)
+            profile_version: Cache key for the profile's features (default: content hash)
+            
+        Returns:
+            List of {"index", "match_score"} sorted by overall score (ties keep input order),
+            where match_score is the same breakdown calculate_match_score returns
+        """
+        if np is None:
+            raise ImportError("The 'numpy' package is required for batch ranking (pip install numpy)")
+        
+        features = self.profile_features(profile, profile_version)
+        candidate_skills = features.skills
+        
+        # Sparse incidence per section: requirement columns of each job, back to back
+        vocab: Dict[str, int] = {}
+        jobs = []
+        columns = ([], [], [])
+        lengths = ([], [], [])
+        for job_analysis in job_analyses:
+            job_sets = self._job_requirements(job_analysis)
+            jobs.append(job_sets)
+            for section_columns, section_lengths, items in zip(columns, lengths, job_sets):
+                section_columns.extend([vocab.setdefault(item, len(vocab)) for item in items])
+                section_lengths.append(len(items))
+        
+        # Resolve every distinct requirement once
+        terms = list(vocab)
+        skill_hit = np.fromiter((features.skills_index.find(t) is not None for t in terms), dtype=np.float64, count=len(terms))
+        keyword_hit = np.fromiter((features.keywords_index.find(t) is not None for t in terms), dtype=np.float64, count=len(terms))
+        
+        (req_matched, req_total), (nice_matched, nice_total), (kw_matched, kw_total) = (
+            self._section_counts(section_columns, section_lengths, hits)
+            for section_columns, section_lengths, hits in zip(columns, lengths, (skill_hit, skill_hit, keyword_hit))
+        )
+        
+        # Same arithmetic as _build_breakdown, for every job at once
+        with np.errstate(divide='ignore', invalid='ignore'):
+            required_score = np.where(req_total > 0, req_matched / req_total * 100, 100)
+            nice_to_have_score = np.where(nice_total > 0, nice_matched / nice_total * 50, 0)
+            keyword_score = np.where(kw_total > 0, kw_matched / kw_total * 30, 0)
+        overall = np.minimum(100, required_score + nice_to_have_score + keyword_score)
+        
+        order = np.argsort(-overall, kind='stable')
+        if top_n is not None:
+            order = order[:top_n]
+        
+        return [
+            {
+                "index": int(i),
+                "match_score": self._build_breakdown(
+                    *jobs[i], candidate_skills,
+                    int(req_matched[i]), int(nice_matched[i]), int(kw_matched[i])
+                )
+            }
+            for i in order
+        ]
+    
+    @staticmethod
+    def _section_counts(columns: List[int], lengths: List[int], hits):
+        """Per-job (matched, total) counts for one requirement section."""
+        total = np.array(lengths, dtype=np.float64)
+        rows = np.repeat(np.arange(len(lengths)), lengths)
+        cols = np.array(columns, dtype=np.int64)
+        matched = np.bincount(rows, weights=hits[cols], minlength=len(lengths))
+        return matched, total
+    
+    def _job_requirements(self, job_analysis: Dict[str, Any]) -> Tuple[Set[str], Set[str], Set[str]]:
+        """Canonical (lowercase) required skills, nice-to-have skills and ATS keywords of a job."""
+        canonical_key = self.ontology.canonical_key
         required_skills = set(
-            skill.lower() 
+            canonical_key(skill) 
             for skill in job_analysis.get('requirements', {}).get('must_have_skills', [])
         )
         nice_to_have_skills = set(
-            skill.lower() 
+            canonical_key(skill) 
             for skill in job_analysis.get('requirements', {}).get('nice_to_have_skills', [])
         )
         ats_keywords = set(
-            keyword.lower() 
+            canonical_key(keyword) 
             for keyword in job_analysis.get('keywords', {}).get('ats_keywords', [])
         )
-        
-        # Extract candidate skills
-        candidate_skills = self._extract_candidate_skills(profile)
-        candidate_keywords = self._extract_keywords_from_profile(profile)
-        
-        # Calculate matches
-        required_matches = self._count_matches(required_skills, candidate_skills)
-        nice_to_have_matches = self._count_matches(nice_to_have_skills, candidate_skills)
-        keyword_matches = self._count_matches(ats_keywords, candidate_keywords)
-        
+        return required_skills, nice_to_have_skills, ats_keywords
+    
+    def _build_breakdown(
+        self,
+        required_skills: Set[str],
+        nice_to_have_skills: Set[str],
+        ats_keywords: Set[str],
+        candidate_skills: Set[str],
+        required_matches: int,
+        nice_to_have_matches: int,
+        keyword_matches: int
+    ) -> Dict[str, Any]:
+        """Turn match counts into the scored breakdown returned to callers."""
         # Calculate scores
         required_score = (
             (required_matches / len(required_skills) * 100) 
@@ -103,18 +314,23 @@ class MatchCalculator:
         if isinstance(skills_data, dict):
             for category, skill_list in skills_data.items():
                 if isinstance(skill_list, list):
-                    skills_set.update(skill.lower() for skill in skill_list)
+                    skills_set.update(self.ontology.canonical_key(skill) for skill in skill_list)
         elif isinstance(skills_data, list):
-            skills_set.update(skill.lower() for skill in skills_data)
+            skills_set.update(self.ontology.canonical_key(skill) for skill in skills_data)
         
         # From experience descriptions
+        bullets = []
         for exp in profile.get('experience', []):
             responsibilities = exp.get('responsibilities', []) + exp.get('achievements', [])
+            bullets.extend(responsibilities)
             for resp in responsibilities:
                 # Extract potential skills (simple keyword extraction)
                 words = re.findall(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b', resp)
                 skills_set.update(word.lower() for word in words if len(word) > 3)
         
+        # Known skills mentioned anywhere in the experience (one pass)
+        skills_set.update(self.ontology.find_skills('\n'.join(bullets)))
+        
         return skills_set
     
     def _extract_keywords_from_profile(self, profile: Dict[str, Any]) -> Set[str]:
@@ -124,34 +340,23 @@ class MatchCalculator:
         # From summary
         summary = profile.get('summary', '')
         keywords.update(word.lower() for word in summary.split() if len(word) > 4)
+        texts = [summary]
         
         # From experience
         for exp in profile.get('experience', []):
             text = ' '.join(exp.get('responsibilities', []) + exp.get('achievements', []))
             keywords.update(word.lower() for word in text.split() if len(word) > 4)
+            texts.append(text)
+        
+        # Canonical names of skills mentioned in the text, so ATS keywords match their aliases
+        keywords.update(self.ontology.find_skills('\n'.join(texts)))
         
         return keywords
     
-    def _count_matches(self, required: Set[str], candidate: Set[str]) -> int:
-        """Count how many required items match candidate items (fuzzy matching)."""
-        matches = 0
-        
-        for req_item in required:
-            # Exact match
-            if req_item in candidate:
-                matches += 1
-                continue
-            
-            # Partial match (word-level)
-            req_words = set(req_item.split())
-            for cand_item in candidate:
-                cand_words = set(cand_item.split())
-                # If significant overlap
-                if req_words & cand_words:
-                    matches += 1
-                    break
-        
-        return matches
+    def _count_matches(self, required: Set[str], candidate: Union[Set[str], TokenIndex]) -> int:
+        """Count how many required items match candidate items (exact or word-level overlap)."""
+        index = candidate if isinstance(candidate, TokenIndex) else TokenIndex(candidate)
+        return sum(1 for req_item in required if index.find(req_item) is not None)
     
     def _generate_recommendations(
         self, 
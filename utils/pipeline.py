@@ -0,0 +1,423 @@
+"""
+Application Pipeline
+Role: Orchestrate analysis, retrieval, tailoring and document generation with per-stage timings.
+"""
+
+import asyncio
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Callable, Awaitable, List, AsyncIterator
+
+from utils.document_builder import DocumentBuilder
+from utils.hashing import profile_content_hash
+from utils.job_dedupe import JobDedupeIndex
+from utils.match_calculator import MatchCalculator
+from utils.rag_engine import RAGEngine
+from utils.rag_registry import RAGRegistry
+from utils.usage import usage_scope
+from agents.job_analyzer import JobAnalyzer
+from agents.cv_customizer import CVCustomizer
+from agents.cover_letter_generator import CoverLetterGenerator
+
+
+# Async callback receiving (event name, JSON-serializable data) as stages finish
+EventCallback = Callable[[str, Any], Awaitable[None]]
+
+
+def sanitize_filename(name: str) -> str:
+    """Sanitize filename for Windows."""
+    return re.sub(r'[<>:"/\\|?*]', '', str(name)).strip().replace(' ', '_')
+
+
+def download_urls(files: Dict[str, str]) -> Dict[str, str]:
+    """Map generated file names to the API download routes."""
+    return {
+        "cv": f"/download/{files['cv']}",
+        "cover_letter": f"/download/{files['cover_letter']}",
+    }
+
+
+async def gather_or_cancel(*aws: Awaitable[Any]) -> List[Any]:
+    """
+    Like asyncio.gather, but the first failure (or cancellation of the caller)
+    cancels the other awaitables instead of leaving them running, so a failed
+    run stops spending tokens on stages whose result will be thrown away.
+
+    Returns:
+        Results in argument order
+
+    Raises:
+        The exception of the first awaitable that failed
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        # Let cancelled stages unwind before reporting
+        await asyncio.gather(*tasks, return_exceptions=True)
+    for task in tasks:
+        if task in done and not task.cancelled() and task.exception() is not None:
+            raise task.exception()
+    return [task.result() for task in tasks]
+
+
+class StageTimer:
+    """
+    Records wall-clock duration per pipeline stage.
+
+    Safe to use from several threads or concurrent asyncio tasks at once.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block and record it under `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.timings[name] = round(time.perf_counter() - start, 3)
+
+    def report(self) -> Dict[str, float]:
+        """Return stage timings plus the total elapsed time."""
+        with self._lock:
+            return {**self.timings, "total": round(time.perf_counter() - self._started, 3)}
+
+
+class ApplicationPipeline:
+    """
+    Async end-to-end workflow used by the FastAPI server:
+    Analysis -> (RAG Retrieval -> CV Customization | Cover Letter | Match Scoring) -> Documents
+
+    Everything after the analysis depends only on the profile and the analysis,
+    so those stages run concurrently and latency becomes
+    analysis + max(customize, cover letter) instead of the sum.
+    """
+
+    def __init__(
+        self,
+        job_analyzer: JobAnalyzer,
+        cv_customizer: CVCustomizer,
+        cover_letter_generator: CoverLetterGenerator,
+        rag_engine: Optional[RAGEngine] = None,
+        match_calculator: Optional[MatchCalculator] = None,
+        output_dir: str = "output",
+        rag_registry: Optional[RAGRegistry] = None,
+        dedupe_index: Optional[JobDedupeIndex] = None,
+    ):
+        self.job_analyzer = job_analyzer
+        self.cv_customizer = cv_customizer
+        self.cover_letter_generator = cover_letter_generator
+        self.rag_engine = rag_engine
+        self.rag_registry = rag_registry
+        self.dedupe_index = dedupe_index
+        self.match_calculator = match_calculator or MatchCalculator()
+        self.output_dir = output_dir
+
+    async def run(
+        self,
+        job_description: str,
+        profile: Dict[str, Any],
+        use_rag: bool = True,
+        on_event: Optional[EventCallback] = None,
+        rag_engine: Optional[RAGEngine] = None,
+        user_id: Optional[Any] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run the full workflow for one job description.
+
+        With a dedupe_index, a near-duplicate of an earlier posting for the same
+        company and role reuses its analysis. An exact copy also reuses its
+        documents when the profile is unchanged (the result then carries
+        "duplicate_of"); near-duplicates always get documents of their own.
+
+        Args:
+            job_description: The full text of the job posting
+            profile: Candidate's master profile
+            use_rag: Retrieve snippets from the RAG index (only valid when it indexes this profile)
+            on_event: Optional async callback notified as each stage finishes; when set,
+                the cover letter is streamed and reported as "cover_letter_delta" events
+            rag_engine: Index of this profile, overriding the pipeline's shared rag_engine
+            user_id: User the LLM calls are charged to (per-user token quotas apply)
+
+        Returns:
+            Dictionary with analysis, match score, generated file names, stage timings
+            and the run's LLM usage ("usage", per stage under "by_stage")
+
+        Raises:
+            QuotaExceededError: When the user's token quota is used up
+        """
+        with usage_scope(user_id) as usage:
+            result = await self._run(job_description, profile, use_rag, on_event, rag_engine)
+        return {**result, "usage": usage.summary()}
+
+    async def _run(
+        self,
+        job_description: str,
+        profile: Dict[str, Any],
+        use_rag: bool,
+        on_event: Optional[EventCallback],
+        rag_engine: Optional[RAGEngine],
+    ) -> Dict[str, Any]:
+        timer = StageTimer()
+        rag_engine = rag_engine or self.rag_engine
+
+        async def emit(event: str, data: Any) -> None:
+            if on_event is not None:
+                await on_event(event, data)
+
+        async def retrieve(keywords: Any) -> list:
+            with timer.stage("rag_retrieval"):
+                keywords = keywords if isinstance(keywords, list) else []
+                snippets = await asyncio.to_thread(rag_engine.retrieve_relevant_experience, keywords)
+            await emit("rag_retrieval", {"snippets": snippets})
+            return snippets
+
+        # RAG retrieval starts as soon as the "keywords" field has been streamed,
+        # while the model is still writing the summary
+        rag_task = None
+
+        async def on_field(field: str, value: Any) -> None:
+            nonlocal rag_task
+            await emit("analysis_field", {"field": field, "value": value})
+            if field == "keywords" and use_rag and rag_engine is not None and isinstance(value, dict):
+                rag_task = asyncio.create_task(retrieve(value.get("ats_keywords", [])))
+
+        # 0. Near-duplicate of a posting we already processed?
+        duplicate = None
+        profile_key = None
+        if self.dedupe_index is not None:
+            with timer.stage("dedupe"):
+                duplicate = await asyncio.to_thread(self.dedupe_index.find, job_description)
+            profile_key = profile_content_hash(profile) + ("" if use_rag else ":no-rag")
+            if duplicate is not None:
+                print(f"♻️  Near-duplicate of posting {duplicate['posting_id']} (similarity {duplicate['similarity']})")
+            # Documents quote the posting, so only an exact copy may reuse them
+            if duplicate is not None and duplicate["exact"]:
+                reused = await asyncio.to_thread(self.dedupe_index.get_result, duplicate["posting_id"], profile_key)
+                if reused is not None and all(
+                    os.path.exists(os.path.join(self.output_dir, name)) for name in reused["files"].values()
+                ):
+                    for event in ("analysis", "match_score"):
+                        await emit(event, reused[event])
+                    await emit("documents", {"files": reused["files"], "download_urls": download_urls(reused["files"])})
+                    return {**reused, "duplicate_of": duplicate, "timings": timer.report()}
+
+        # 1. Analyze (everything else depends on it)
+        try:
+            with timer.stage("analysis"):
+                if duplicate is not None and duplicate["analysis"] is not None:
+                    analysis = duplicate["analysis"]
+                    for field in ("role_info", "requirements", "keywords", "summary"):
+                        if field in analysis:
+                            await on_field(field, analysis[field])
+                else:
+                    analysis = await self.job_analyzer.analyze_streaming_async(job_description, on_field=on_field)
+        except BaseException:
+            if rag_task is not None:
+                rag_task.cancel()
+            raise
+        await emit("analysis", analysis)
+
+        # 2. Fan out the independent stages
+        async def tailor_cv() -> Dict[str, Any]:
+            relevant_snippets = []
+            if rag_task is not None:
+                relevant_snippets = await rag_task
+            elif use_rag and rag_engine is not None:
+                relevant_snippets = await retrieve(analysis.get("keywords", {}).get("ats_keywords", []))
+            with timer.stage("cv_customization"):
+                customized_cv = await self.cv_customizer.customize_async(profile, analysis, relevant_snippets)
+            await emit("cv", customized_cv)
+            return customized_cv
+
+        async def write_cover_letter() -> str:
+            with timer.stage("cover_letter"):
+                if on_event is None:
+                    cover_letter = await self.cover_letter_generator.generate_async(profile, analysis)
+                else:
+                    parts = []
+                    async for delta in self.cover_letter_generator.stream_async(profile, analysis):
+                        parts.append(delta)
+                        await emit("cover_letter_delta", {"text": delta})
+                    cover_letter = "".join(parts)
+            await emit("cover_letter", {"text": cover_letter})
+            return cover_letter
+
+        async def score_match() -> Dict[str, Any]:
+            with timer.stage("match_scoring"):
+                match_score = await asyncio.to_thread(self.match_calculator.calculate_match_score, profile, analysis)
+            await emit("match_score", match_score)
+            return match_score
+
+        # A failing stage cancels the others (e.g. the cover letter stops streaming)
+        try:
+            customized_cv, cover_letter, match_score = await gather_or_cancel(
+                tailor_cv(), write_cover_letter(), score_match()
+            )
+        except BaseException:
+            if rag_task is not None:
+                rag_task.cancel()
+            raise
+
+        # 3. Generate Files
+        with timer.stage("documents"):
+            files = await self.write_documents(analysis, customized_cv, cover_letter, profile)
+        await emit("documents", {"files": files, "download_urls": download_urls(files)})
+
+        result = {
+            "analysis": analysis,
+            "match_score": match_score,
+            "files": files,
+        }
+        # Local fallback analyses are not worth reusing for later duplicates
+        if self.dedupe_index is not None and analysis.get("source") != "local":
+            await asyncio.to_thread(self._remember, job_description, analysis, profile_key, result)
+        return {**result, "timings": timer.report()}
+
+    def _remember(self, job_description: str, analysis: Dict[str, Any], profile_key: str, result: Dict[str, Any]) -> None:
+        """Store a finished posting in the dedupe index; failures never fail the run."""
+        try:
+            posting_id = self.dedupe_index.add(job_description, analysis)
+            if posting_id is not None:
+                self.dedupe_index.store_result(posting_id, profile_key, result)
+        except Exception as e:
+            print(f"⚠️  Could not record posting for deduplication: {e}")
+
+    async def run_batch(
+        self,
+        job_descriptions: List[str],
+        profile: Dict[str, Any],
+        max_concurrency: int = 4,
+        min_match_score: Optional[float] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run the workflow for many job descriptions against one profile.
+
+        The profile and RAG index are shared by every item, at most
+        max_concurrency items are processed at once, and a failing posting
+        only fails its own item.
+
+        Args:
+            job_descriptions: Job posting texts
+            profile: Candidate's master profile (loaded once by the caller)
+            max_concurrency: Items processed concurrently
+            min_match_score: When set, postings are first analyzed locally (no LLM)
+                and those scoring below this are skipped
+
+        Yields:
+            Per-item results in completion order, each with "index" and "success";
+            skipped postings carry "skipped": true and their local match score
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        selected = list(enumerate(job_descriptions))
+        if min_match_score is not None:
+            # Postings analyzed before are screened on their stored LLM analysis
+            known = await asyncio.to_thread(self.job_analyzer.stored_analyses, job_descriptions)
+            screening = await asyncio.to_thread(
+                self.job_analyzer.local_analyzer.screen,
+                profile, job_descriptions, min_match_score, self.match_calculator, None, known,
+            )
+            selected = [(entry["index"], job_descriptions[entry["index"]]) for entry in screening if entry["passed"]]
+            print(f"🔎 Prefilter: {len(selected)}/{len(job_descriptions)} postings scored >= {min_match_score}")
+            for entry in screening:
+                if not entry["passed"]:
+                    yield {
+                        "index": entry["index"],
+                        "success": False,
+                        "skipped": True,
+                        "match_score": entry["match_score"],
+                        "error": f"Local match score {entry['match_score']['overall_score']} below {min_match_score}",
+                    }
+
+        async def run_item(index: int, job_description: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    result = await self.run(job_description, profile)
+                    return {
+                        "index": index,
+                        "success": True,
+                        **result,
+                        "download_urls": download_urls(result["files"]),
+                    }
+                except Exception as e:
+                    print(f"❌ Batch item {index} failed: {e}")
+                    return {"index": index, "success": False, "error": str(e)}
+
+        tasks = [asyncio.create_task(run_item(i, jd)) for i, jd in selected]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Consumer stopped early (e.g. client disconnected): stop remaining items
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def write_documents(
+        self,
+        analysis: Dict[str, Any],
+        customized_cv: Dict[str, Any],
+        cover_letter: str,
+        profile: Dict[str, Any],
+    ) -> Dict[str, str]:
+        """
+        Render the CV and cover letter DOCX files with a unique ID to prevent conflicts.
+
+        Returns:
+            Dictionary with "cv" and "cover_letter" file names (relative to output_dir)
+        """
+        role = sanitize_filename(analysis.get('role_info', {}).get('title', 'Job'))
+        company = sanitize_filename(analysis.get('role_info', {}).get('company', 'Company'))
+        unique_id = str(uuid.uuid4())[:8]
+
+        cv_filename = f"CV_{company}_{role}_{unique_id}.docx"
+        cl_filename = f"CL_{company}_{role}_{unique_id}.docx"
+
+        # DOCX rendering is blocking I/O, keep it off the event loop.
+        # DocumentBuilder holds per-document state, so each file gets its own instance.
+        await asyncio.gather(
+            asyncio.to_thread(DocumentBuilder().create_cv, customized_cv, os.path.join(self.output_dir, cv_filename)),
+            asyncio.to_thread(
+                DocumentBuilder().create_cover_letter, cover_letter, profile, os.path.join(self.output_dir, cl_filename)
+            ),
+        )
+        return {"cv": cv_filename, "cover_letter": cl_filename}
+
+    async def run_job(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Job queue handler: run the workflow for a queued payload.
+
+        Payloads carrying a "user_id" are matched against an index of their own
+        profile snapshot (cached per user in rag_registry); others use the shared rag_engine.
+
+        Args:
+            payload: Dictionary with "job_description", "profile" and optional "use_rag" and "user_id"
+
+        Returns:
+            JSON-serializable result stored on the job
+        """
+        use_rag = payload.get("use_rag", True)
+        rag_engine = None
+        if use_rag and payload.get("user_id") is not None:
+            if self.rag_registry is not None:
+                rag_engine = await asyncio.to_thread(self.rag_registry.get, payload["user_id"], payload["profile"])
+            else:
+                rag_engine = await asyncio.to_thread(RAGEngine, profile=payload["profile"])
+
+        result = await self.run(payload["job_description"], payload["profile"], use_rag, rag_engine=rag_engine)
+        result["download_urls"] = download_urls(result["files"])
+        return result
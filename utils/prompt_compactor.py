@@ -0,0 +1,378 @@
+"""
+Prompt Compactor
+Role: Shrink the profile, job analysis and RAG snippets embedded in prompts to fewer input tokens.
+"""
+
+import copy
+import json
+import os
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils.skill_ontology import get_skill_ontology
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]|\n[ \t]*")
+_encoding = None
+
+# Profile lists holding bullet points that may be dropped to meet the budget
+BULLET_FIELDS = ("achievements", "responsibilities", "highlights")
+
+# Share of the token budget a stable (job-independent) profile may use; the
+# rest is left for the per-job analysis and snippets
+STABLE_PROFILE_SHARE = 2 / 3
+
+
+def count_tokens(text: str) -> int:
+    """
+    Number of tokens in text.
+
+    Uses tiktoken's cl100k_base encoding when installed, otherwise an
+    estimate: one token per punctuation mark, per line break with its
+    indentation, and per 4 characters of a word.
+    """
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text))
+    return sum(1 + (len(piece) - 1) // 4 for piece in _TOKEN_PATTERN.findall(text))
+
+
+def compact_json(data: Any, sort_keys: bool = False) -> str:
+    """JSON without indentation or spaces after separators."""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, sort_keys=sort_keys)
+
+
+def drop_empty(data: Any) -> Any:
+    """Recursively remove None, empty strings, empty lists and empty dicts (0 and False are kept)."""
+    if isinstance(data, dict):
+        cleaned = {key: drop_empty(value) for key, value in data.items()}
+        return {key: value for key, value in cleaned.items() if value not in (None, "", [], {})}
+    if isinstance(data, list):
+        cleaned = [drop_empty(value) for value in data]
+        return [value for value in cleaned if value not in (None, "", [], {})]
+    if isinstance(data, str):
+        return data.strip()
+    return data
+
+
+def _job_terms(job_analysis: Dict[str, Any]) -> List[str]:
+    """Skills and keywords the job asks for, used to rank profile bullets."""
+    requirements = job_analysis.get("requirements") or {}
+    keywords = job_analysis.get("keywords") or {}
+    terms = []
+    for values in (
+        requirements.get("must_have_skills"),
+        requirements.get("nice_to_have_skills"),
+        keywords.get("ats_keywords"),
+    ):
+        if isinstance(values, list):
+            terms += [v for v in values if isinstance(v, str) and v]
+    return list(dict.fromkeys(terms))
+
+
+class PromptCompactor:
+    """
+    Prepares profile, job analysis and RAG snippets for a prompt:
+
+    - compact JSON (no indentation) with empty fields removed
+    - each RAG snippet is sent once: profile bullets that repeat a snippet
+      are replaced by its reference ("P1", "P2", ...)
+    - when a token budget is set, the bullets least relevant to the job
+      (fewest matching skills/keywords, oldest roles first) are dropped until
+      the payload fits; snippet bullets are always kept
+
+    With stable_profile=True the profile text depends on the profile alone,
+    so prompts that start with it share a prefix the provider can cache
+    across jobs: keys are sorted, bullets are kept verbatim (snippets point
+    to them by location instead) and the budget drops bullets by age only.
+    The dropped bullets that match the job most are then quoted with the
+    snippets, in the per-job part of the prompt, as far as the rest of the
+    budget allows.
+
+    Token counts before (indented JSON, as previously sent) and after are
+    returned with every compaction.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None):
+        """
+        Args:
+            max_tokens: Token budget for profile + analysis + snippets (None: no limit)
+        """
+        self.max_tokens = max_tokens
+        self.ontology = get_skill_ontology()
+
+    @classmethod
+    def from_env(cls) -> "PromptCompactor":
+        """
+        Build a compactor from PROMPT_TOKEN_BUDGET (tokens for the embedded
+        profile, analysis and snippets; default 6000, 0 disables the budget).
+        """
+        return cls(max_tokens=int(os.getenv("PROMPT_TOKEN_BUDGET", 6000)) or None)
+
+    def compact(
+        self,
+        profile: Dict[str, Any],
+        job_analysis: Dict[str, Any],
+        snippets: Optional[List[Dict[str, Any]]] = None,
+        stable_profile: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Compact the prompt payload.
+
+        Args:
+            profile: Candidate's profile
+            job_analysis: Structured job analysis
+            snippets: RAG snippets ({"content", "metadata"}), most relevant first
+            stable_profile: Make the profile text independent of the job and snippets (for prompt prefix caching)
+
+        Returns:
+            Dictionary with "profile", "analysis" and "snippets" (prompt-ready
+            strings; "snippets" is empty without snippets), "tokens_before",
+            "tokens_after" and "dropped_bullets"
+        """
+        snippets = snippets or []
+        tokens_before = count_tokens(json.dumps(profile, indent=2)) + count_tokens(json.dumps(job_analysis, indent=2))
+        if snippets:
+            tokens_before += count_tokens(json.dumps(snippets, indent=2))
+
+        analysis_text = compact_json(drop_empty(job_analysis))
+        compact_profile = drop_empty(copy.deepcopy(profile))
+        if stable_profile:
+            return self._compact_stable(compact_profile, job_analysis, analysis_text, snippets, tokens_before)
+        snippet_text, refs = self._reference_snippets(compact_profile, snippets)
+
+        fixed_tokens = count_tokens(analysis_text) + count_tokens(snippet_text)
+        profile_text = compact_json(compact_profile)
+        dropped = 0
+        if self.max_tokens is not None and fixed_tokens + count_tokens(profile_text) > self.max_tokens:
+            dropped = len(self._fit_budget(compact_profile, job_analysis, refs, self.max_tokens - fixed_tokens))
+            profile_text = compact_json(drop_empty(compact_profile))
+
+        tokens_after = fixed_tokens + count_tokens(profile_text)
+        return {
+            "profile": profile_text,
+            "analysis": analysis_text,
+            "snippets": snippet_text,
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "dropped_bullets": dropped,
+        }
+
+    def _compact_stable(
+        self,
+        profile: Dict[str, Any],
+        job_analysis: Dict[str, Any],
+        analysis_text: str,
+        snippets: List[Dict[str, Any]],
+        tokens_before: int,
+    ) -> Dict[str, Any]:
+        """
+        compact() with stable_profile=True: fit the profile on its own share of
+        the budget by age, locate the snippets, then re-add the dropped bullets
+        most relevant to the job after them.
+        """
+        profile_text = compact_json(profile, sort_keys=True)
+        dropped: List[Dict[str, Any]] = []
+        if self.max_tokens is not None:
+            budget = int(self.max_tokens * STABLE_PROFILE_SHARE)
+            if count_tokens(profile_text) > budget:
+                dropped = self._fit_budget(profile, {}, {}, budget)
+                profile = drop_empty(profile)
+                profile_text = compact_json(profile, sort_keys=True)
+
+        snippet_text = self._locate_snippets(profile, snippets)
+        fixed_tokens = count_tokens(profile_text) + count_tokens(analysis_text)
+        if dropped:
+            recovered = self._relevant_dropped(
+                dropped, job_analysis, snippets, self.max_tokens - fixed_tokens - count_tokens(snippet_text)
+            )
+            if recovered:
+                snippet_text = self._locate_snippets(profile, snippets + recovered)
+                print(f"🎯 Prompt budget: re-added {len(recovered)} job-relevant entries after the cached profile")
+        return {
+            "profile": profile_text,
+            "analysis": analysis_text,
+            "snippets": snippet_text,
+            "tokens_before": tokens_before,
+            "tokens_after": fixed_tokens + count_tokens(snippet_text),
+            "dropped_bullets": len(dropped),
+        }
+
+    def _relevant_dropped(
+        self,
+        dropped: List[Dict[str, Any]],
+        job_analysis: Dict[str, Any],
+        snippets: List[Dict[str, Any]],
+        budget: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Dropped profile entries matching the job, most matching skills/keywords
+        first (newer roles first among equals), that fit the token budget.
+
+        Returns:
+            Entries in snippet form, to be quoted after the snippets
+        """
+        terms = _job_terms(job_analysis)
+        if not terms or budget <= 0:
+            return []
+        quoted = {(snippet.get("content") or "").strip() for snippet in snippets}
+        ranked = []
+        for order, entry in enumerate(dropped):
+            if entry["content"] in quoted:
+                continue
+            relevance = len(self.ontology.match_terms(terms, entry["content"]))
+            if relevance:
+                ranked.append((-relevance, entry["age"], order, entry))
+        ranked.sort(key=lambda r: r[:3])
+
+        recovered = []
+        for *_, entry in ranked:
+            # Content plus the "Pn (title, company): " prefix and line break
+            cost = count_tokens(entry["content"]) + 12
+            if cost <= budget:
+                recovered.append({"content": entry["content"], "metadata": entry["metadata"]})
+                budget -= cost
+        return recovered
+
+    def _locate_snippets(self, profile: Dict[str, Any], snippets: List[Dict[str, Any]]) -> str:
+        """
+        Number the snippets, pointing to the profile entry each one repeats
+        (e.g. "experience[0].achievements[2]") and quoting only those not found.
+
+        Returns:
+            Snippet lines for the prompt
+        """
+        locations: Dict[str, str] = {}
+        for role_index, role in enumerate(profile.get("experience") or []):
+            for field in BULLET_FIELDS:
+                for bullet_index, bullet in enumerate(role.get(field) or []):
+                    if isinstance(bullet, str):
+                        locations.setdefault(bullet, f"experience[{role_index}].{field}[{bullet_index}]")
+        for project_index, project in enumerate(profile.get("projects") or []):
+            key = f"Project {project.get('name')}: {project.get('description')}"
+            locations.setdefault(key, f"projects[{project_index}]")
+
+        seen = set()
+        lines = []
+        for snippet in snippets:
+            content = (snippet.get("content") or "").strip()
+            if not content or content in seen:
+                continue
+            seen.add(content)
+            ref = f"P{len(seen)}"
+            metadata = snippet.get("metadata") or {}
+            source = ", ".join(v for v in (metadata.get("title"), metadata.get("company"), metadata.get("name")) if v)
+            text = f"see profile {locations[content]}" if content in locations else content
+            lines.append(f"{ref} ({source}): {text}" if source else f"{ref}: {text}")
+        return "\n".join(lines)
+
+    def _reference_snippets(self, profile: Dict[str, Any], snippets: List[Dict[str, Any]]) -> Tuple[str, Dict[str, str]]:
+        """
+        Number the snippets and replace their copies in the profile with the reference.
+
+        Returns:
+            Snippet lines for the prompt and a content -> reference mapping
+        """
+        refs: Dict[str, str] = {}
+        lines = []
+        for snippet in snippets:
+            content = (snippet.get("content") or "").strip()
+            if not content or content in refs:
+                continue
+            ref = f"P{len(refs) + 1}"
+            refs[content] = ref
+            metadata = snippet.get("metadata") or {}
+            source = ", ".join(v for v in (metadata.get("title"), metadata.get("company"), metadata.get("name")) if v)
+            lines.append(f"{ref} ({source}): {content}" if source else f"{ref}: {content}")
+
+        for role in profile.get("experience") or []:
+            for field in BULLET_FIELDS:
+                if isinstance(role.get(field), list):
+                    role[field] = [refs.get(b, b) if isinstance(b, str) else b for b in role[field]]
+        for project in profile.get("projects") or []:
+            key = f"Project {project.get('name')}: {project.get('description')}"
+            if key in refs:
+                project["description"] = refs[key]
+        return "\n".join(lines), refs
+
+    def _fit_budget(
+        self,
+        profile: Dict[str, Any],
+        job_analysis: Dict[str, Any],
+        refs: Dict[str, str],
+        budget: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Drop low-relevance bullets (in place) until the profile fits the budget.
+
+        Returns:
+            The dropped entries in snippet form, {"content", "metadata", "age"}:
+            the bullet text (or "Project <name>: <description>"), where it came
+            from, and its role's age rank (0 is the newest role; projects rank
+            after every role). Empty when nothing had to go.
+        """
+        ref_ids = set(refs.values())
+        terms = _job_terms(job_analysis)
+        candidates = []
+        roles = profile.get("experience") or []
+        for role_index, role in enumerate(roles):
+            for field in BULLET_FIELDS:
+                bullets = role.get(field)
+                if not isinstance(bullets, list):
+                    continue
+                for bullet_index, bullet in enumerate(bullets):
+                    if not isinstance(bullet, str) or bullet in ref_ids:
+                        continue
+                    relevance = len(self.ontology.match_terms(terms, bullet)) if terms else 0
+                    # Least relevant first; among equals, older roles and later bullets first
+                    candidates.append((relevance, -role_index, -bullet_index, role_index, field, bullet_index, bullet))
+        for project_index, project in enumerate(profile.get("projects") or []):
+            text = compact_json(project)
+            if project.get("description") in ref_ids:
+                continue
+            relevance = len(self.ontology.match_terms(terms, text)) if terms else 0
+            candidates.append((relevance, -len(roles) - project_index, 0, None, "projects", project_index, text))
+        candidates.sort(key=lambda c: c[:3])
+
+        excess = count_tokens(compact_json(profile)) - budget
+        doomed = []
+        for candidate in candidates:
+            if excess <= 0:
+                break
+            doomed.append(candidate)
+            excess -= count_tokens(candidate[-1]) + 1
+
+        entries = []
+        for _, age, _, role_index, field, index, text in doomed:
+            if field == "projects":
+                project = profile["projects"][index]
+                content = f"Project {project.get('name')}: {project.get('description')}"
+                metadata = {"type": "project", "name": project.get("name")}
+            else:
+                role = roles[role_index]
+                content = text
+                metadata = {"type": "experience", "company": role.get("company"), "title": role.get("title")}
+            entries.append({"content": content, "metadata": metadata, "age": -age})
+
+        # Delete from the highest index down so earlier indexes stay valid
+        for _, _, _, role_index, field, index, _ in sorted(doomed, key=lambda c: (c[4], c[3] or 0, c[5]), reverse=True):
+            if field == "projects":
+                del profile["projects"][index]
+            else:
+                del roles[role_index][field][index]
+        if doomed:
+            print(f"✂️  Prompt budget: dropped {len(doomed)} low-relevance profile entries")
+        return entries
+
+
+def report_compaction(name: str, compacted: Dict[str, Any]) -> None:
+    """Log prompt token counts before and after compaction."""
+    before, after = compacted["tokens_before"], compacted["tokens_after"]
+    saved = 100 * (before - after) / before if before else 0.0
+    print(f"🗜️  {name} prompt payload: {before} → {after} tokens ({saved:.0f}% smaller)")
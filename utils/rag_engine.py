@@ -3,81 +3,452 @@ RAG Engine (Retrieval-Augmented Generation)
 Role: Store and retrieve relevant "experience snippets" to improve LLM precision and save tokens.
 """
 
+import hashlib
+import heapq
 import json
+import math
+import mmap
+import os
 import re
-from typing import List, Dict, Any
+import struct
+import sys
+from array import array
+from collections import Counter
+from itertools import accumulate, repeat
+from typing import List, Dict, Any, Optional, Tuple
+
+from utils.dense_retrieval import LSAEncoder, top_k_indices, reciprocal_rank_fusion
+from utils.skill_ontology import get_skill_ontology
+
+# Keeps skill-style tokens intact: "c++", "c#", "node.js", "ci/cd", "real-time"
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[./\-][a-z0-9+#]+)*")
+
+# On-disk index: magic, uint32 header length, JSON header (space-padded to a
+# 4-byte boundary), then the uint32 arrays below back to back.
+INDEX_MAGIC = b"RAGIDX\x00\x01"
+INDEX_VERSION = 2
+_INDEX_ARRAYS = ("post_offsets", "post_docs", "post_tfs", "doc_len", "fwd_offsets", "fwd_terms", "fwd_tfs")
+
+RETRIEVAL_MODES = ("bm25", "dense", "hybrid")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into index terms."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def index_terms(text: str) -> List[str]:
+    """Snippet terms: word tokens plus "@<canonical skill>" for every skill mentioned (any alias)."""
+    return tokenize(text) + [f"@{key}" for key in get_skill_ontology().find_skills(text)]
+
+
+def query_terms(keyword: str) -> List[str]:
+    """Query terms for one job keyword; a known skill also matches snippets naming any of its aliases."""
+    ontology = get_skill_ontology()
+    skills = {ontology.canonical_key(keyword)} if ontology.is_known(keyword) else ontology.find_skills(keyword)
+    return tokenize(keyword) + [f"@{key}" for key in skills]
+
+
+def snippet_hash(content: str) -> str:
+    """Short content hash identifying a snippet's tokens in the on-disk index."""
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=8).hexdigest()
+
 
 class RAGEngine:
     """
-    A lightweight Retrieval Engine that breaks down the master profile into 
+    A lightweight Retrieval Engine that breaks down the master profile into
     searchable snippets and retrieves the most relevant ones.
+
+    Snippets are indexed once into an inverted index (term -> postings of
+    snippet id and term frequency) stored in flat arrays, and queries are
+    scored with Okapi BM25. Only snippets sharing at least one term with the
+    query are touched, so retrieval is sub-linear in the number of snippets.
+
+    When the profile comes from disk, the index is saved next to it
+    (e.g. data/master_profile.ragidx) tagged with the profile's content hash.
+    A later start memory-maps that file instead of rebuilding; if the profile
+    changed, term counts of unchanged snippets are reused from the stored
+    forward index and only new or edited snippets are re-tokenized.
+
+    With NumPy installed, "dense" mode ranks snippets by cosine similarity of
+    local LSA embeddings (see utils.dense_retrieval) and "hybrid" fuses the
+    BM25 and dense rankings with Reciprocal Rank Fusion.
     """
 
-    def __init__(self, profile_path: str = "data/master_profile.json"):
+    def __init__(
+        self,
+        profile_path: str = "data/master_profile.json",
+        profile: Optional[Dict[str, Any]] = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+        index_path: Optional[str] = None,
+        mode: Optional[str] = None,
+        dense_dim: Optional[int] = None,
+    ):
+        """
+        Initialize the engine and build the index.
+
+        Args:
+            profile_path: Master profile JSON file to index
+            profile: Profile dictionary to index instead of reading profile_path
+            k1: BM25 term-frequency saturation
+            b: BM25 document-length normalization
+            index_path: On-disk index file. Defaults to profile_path with a
+                .ragidx suffix when reading from profile_path; "" disables persistence.
+            mode: "bm25", "dense" or "hybrid" (default: RAG_RETRIEVAL_MODE or "bm25")
+            dense_dim: Embedding dimensions for dense/hybrid mode (default: RAG_DENSE_DIM or 128)
+        """
         self.profile_path = profile_path
+        if index_path is None:
+            index_path = os.path.splitext(profile_path)[0] + ".ragidx" if profile is None else ""
+        self.index_path = index_path
+        self.k1 = k1
+        self.b = b
+        self.mode = (mode or os.getenv("RAG_RETRIEVAL_MODE", "bm25")).lower()
+        if self.mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown RAG retrieval mode: {self.mode}")
+        self.dense_dim = dense_dim or int(os.getenv("RAG_DENSE_DIM", 128))
+        self.encoder: Optional[LSAEncoder] = None
         self.snippets = []
-        self._initialize_snippets()
+        self.profile_hash = ""
+
+        # Inverted index: postings of term id t live in
+        # _post_docs/_post_tfs[_post_offsets[t]:_post_offsets[t + 1]]
+        self._vocab: Dict[str, int] = {}
+        self._post_offsets = array('I', [0])
+        self._post_docs = array('I')
+        self._post_tfs = array('I')
+        self._doc_len = array('I')
+        self._avgdl = 0.0
 
-    def _initialize_snippets(self):
-        """Parse the profile into discrete experience snippets."""
+        # Forward index (snippet -> term ids/frequencies) for incremental rebuilds
+        self._doc_hashes: List[str] = []
+        self._fwd_offsets = array('I', [0])
+        self._fwd_terms = array('I')
+        self._fwd_tfs = array('I')
+        self._mmap = None
+
+        self._initialize_snippets(profile)
+
+    def _initialize_snippets(self, profile: Optional[Dict[str, Any]] = None):
+        """Parse the profile into discrete experience snippets and index them."""
         try:
-            with open(self.profile_path, 'r', encoding='utf-8') as f:
-                profile = json.load(f)
-            
-            # 1. Standardize Experience Snippets
-            for role in profile.get('experience', []):
-                company = role.get('company', 'Unknown')
-                title = role.get('title', 'Position')
-                
-                # Create a snippet for each achievement to allow granular retrieval
-                for ach in role.get('achievements', role.get('responsibilities', [])):
-                    self.snippets.append({
-                        "content": ach,
-                        "metadata": {
-                            "type": "experience",
-                            "company": company,
-                            "title": title,
-                            "dates": role.get('dates', '')
-                        }
-                    })
-            
-            # 2. Project Snippets
-            for project in profile.get('projects', []):
-                self.snippets.append({
-                    "content": f"Project {project.get('name')}: {project.get('description')}",
-                    "metadata": {"type": "project", "name": project.get('name')}
-                })
-                
-            print(f"📊 RAG: Initialized with {len(self.snippets)} experience snippets.")
-            
+            if profile is None:
+                with open(self.profile_path, 'r', encoding='utf-8') as f:
+                    profile = json.load(f)
+
+            self.snippets = self._build_snippets(profile)
+            doc_hashes = [snippet_hash(s['content']) for s in self.snippets]
+            profile_hash = hashlib.sha256(f"v{INDEX_VERSION}:{','.join(doc_hashes)}".encode('utf-8')).hexdigest()
+
+            if self.index_path and not self._doc_hashes:
+                self._load_index()
+
+            if self.profile_hash == profile_hash:
+                print(f"📊 RAG: Loaded index for {len(self.snippets)} experience snippets from {self.index_path}.")
+            else:
+                vocab, fwd_offsets, fwd_terms, fwd_tfs, reindexed = self._forward_index(doc_hashes)
+                self._release_index()
+                self._build_index(vocab, fwd_offsets, fwd_terms, fwd_tfs)
+                self._doc_hashes = doc_hashes
+                self.profile_hash = profile_hash
+                if self.index_path:
+                    self._save_index()
+                print(f"📊 RAG: Initialized with {len(self.snippets)} experience snippets ({reindexed} re-indexed).")
+
+            if self.mode != "bm25":
+                self._fit_encoder()
+
         except Exception as e:
             print(f"⚠️ RAG Initialization failed: {e}")
 
+    def _fit_encoder(self) -> None:
+        """Embed snippets for dense/hybrid retrieval, falling back to BM25 without NumPy."""
+        try:
+            self.encoder = LSAEncoder(dim=self.dense_dim).fit(
+                self._fwd_offsets, self._fwd_terms, self._fwd_tfs, len(self._vocab)
+            )
+        except ImportError as e:
+            print(f"⚠️ RAG: {e}; falling back to BM25 retrieval.")
+            self.mode = "bm25"
+            self.encoder = None
+
+    def _build_snippets(self, profile: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Break a profile into retrievable snippets."""
+        snippets = []
+
+        # 1. Standardize Experience Snippets
+        for role in profile.get('experience', []):
+            company = role.get('company', 'Unknown')
+            title = role.get('title', 'Position')
+
+            # Create a snippet for each achievement to allow granular retrieval
+            for ach in role.get('achievements', role.get('responsibilities', [])):
+                snippets.append({
+                    "content": ach,
+                    "metadata": {
+                        "type": "experience",
+                        "company": company,
+                        "title": title,
+                        "dates": role.get('dates', '')
+                    }
+                })
+
+        # 2. Project Snippets
+        for project in profile.get('projects', []):
+            snippets.append({
+                "content": f"Project {project.get('name')}: {project.get('description')}",
+                "metadata": {"type": "project", "name": project.get('name')}
+            })
+
+        return snippets
+
+    def _forward_index(self, doc_hashes: List[str]) -> Tuple[Dict[str, int], array, array, array, int]:
+        """
+        Per-snippet term ids and frequencies. Snippets whose content hash is in the
+        current index are copied from its forward arrays; only the rest are tokenized.
+
+        Returns:
+            vocab, fwd_offsets, fwd_terms, fwd_tfs and the number of snippets re-tokenized
+        """
+        vocab = dict(self._vocab)
+        previous = {h: doc_id for doc_id, h in enumerate(self._doc_hashes)}
+        old_offsets, old_terms, old_tfs = self._fwd_offsets, self._fwd_terms, self._fwd_tfs
+
+        fwd_offsets = array('I', [0])
+        fwd_terms = array('I')
+        fwd_tfs = array('I')
+        reindexed = 0
+        for snippet, h in zip(self.snippets, doc_hashes):
+            doc_id = previous.get(h)
+            if doc_id is not None:
+                start, end = old_offsets[doc_id], old_offsets[doc_id + 1]
+                fwd_terms.extend(old_terms[start:end])
+                fwd_tfs.extend(old_tfs[start:end])
+            else:
+                for term, tf in Counter(index_terms(snippet['content'])).items():
+                    fwd_terms.append(vocab.setdefault(term, len(vocab)))
+                    fwd_tfs.append(tf)
+                reindexed += 1
+            fwd_offsets.append(len(fwd_terms))
+        return vocab, fwd_offsets, fwd_terms, fwd_tfs, reindexed
+
+    def _build_index(self, vocab: Dict[str, int], fwd_offsets: array, fwd_terms: array, fwd_tfs: array) -> None:
+        """Invert the forward index into flat-array postings."""
+        doc_freq = Counter(fwd_terms)
+
+        # Drop terms no snippet uses any more (left behind by an incremental rebuild)
+        if len(doc_freq) < len(vocab):
+            terms = list(vocab)
+            live = sorted(doc_freq)
+            remap = {old: new for new, old in enumerate(live)}
+            vocab = {terms[old]: new for new, old in enumerate(live)}
+            fwd_terms = array('I', map(remap.__getitem__, fwd_terms))
+            doc_freq = Counter({remap[old]: n for old, n in doc_freq.items()})
+
+        doc_len = array('I')
+        doc_of = array('I')
+        for doc_id in range(len(fwd_offsets) - 1):
+            start, end = fwd_offsets[doc_id], fwd_offsets[doc_id + 1]
+            doc_len.append(sum(fwd_tfs[start:end]))
+            doc_of.extend(repeat(doc_id, end - start))
+
+        # Stable sort by term id keeps each posting list in snippet order
+        order = sorted(range(len(fwd_terms)), key=fwd_terms.__getitem__)
+        offsets = array('I', [0])
+        offsets.extend(accumulate(doc_freq[term_id] for term_id in range(len(vocab))))
+
+        self._vocab = vocab
+        self._post_offsets = offsets
+        self._post_docs = array('I', map(doc_of.__getitem__, order))
+        self._post_tfs = array('I', map(fwd_tfs.__getitem__, order))
+        self._doc_len = doc_len
+        self._avgdl = (sum(doc_len) / len(doc_len)) if doc_len else 0.0
+        self._fwd_offsets = fwd_offsets
+        self._fwd_terms = fwd_terms
+        self._fwd_tfs = fwd_tfs
+
+    def _save_index(self) -> None:
+        """Write the index to index_path atomically."""
+        header = {
+            "version": INDEX_VERSION,
+            "byteorder": sys.byteorder,
+            "profile_hash": self.profile_hash,
+            "avgdl": self._avgdl,
+            "doc_hashes": self._doc_hashes,
+            "vocab": list(self._vocab),
+            "arrays": {name: len(getattr(self, f"_{name}")) for name in _INDEX_ARRAYS},
+        }
+        raw = json.dumps(header, separators=(',', ':')).encode('utf-8')
+        raw += b" " * (-(len(INDEX_MAGIC) + 4 + len(raw)) % 4)
+
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(INDEX_MAGIC)
+                f.write(struct.pack('<I', len(raw)))
+                f.write(raw)
+                for name in _INDEX_ARRAYS:
+                    getattr(self, f"_{name}").tofile(f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"⚠️ RAG: Could not save index to {self.index_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _load_index(self) -> bool:
+        """
+        Memory-map index_path and use its arrays in place.
+
+        Returns:
+            True if a compatible index was loaded
+        """
+        try:
+            with open(self.index_path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+
+        try:
+            start = len(INDEX_MAGIC) + 4
+            if mm[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+                raise ValueError("not a RAG index")
+            (header_len,) = struct.unpack_from('<I', mm, len(INDEX_MAGIC))
+            header = json.loads(mm[start:start + header_len])
+            if header.get('version') != INDEX_VERSION or header.get('byteorder') != sys.byteorder:
+                raise ValueError("incompatible index format")
+            sizes = [header['arrays'][name] for name in _INDEX_ARRAYS]
+            if start + header_len + 4 * sum(sizes) != len(mm):
+                raise ValueError("truncated index")
+        except (ValueError, KeyError, struct.error) as e:
+            print(f"⚠️ RAG: Ignoring index {self.index_path}: {e}")
+            mm.close()
+            return False
+
+        view = memoryview(mm)
+        pos = start + header_len
+        for name, size in zip(_INDEX_ARRAYS, sizes):
+            setattr(self, f"_{name}", view[pos:pos + 4 * size].cast('I'))
+            pos += 4 * size
+        view.release()
+
+        self._mmap = mm
+        self._vocab = {term: i for i, term in enumerate(header['vocab'])}
+        self._avgdl = header['avgdl']
+        self._doc_hashes = header['doc_hashes']
+        self.profile_hash = header['profile_hash']
+        return True
+
+    def _release_index(self) -> None:
+        """Drop views into a memory-mapped index so the mapping can be closed."""
+        if self._mmap is None:
+            return
+        for name in _INDEX_ARRAYS:
+            getattr(self, f"_{name}").release()
+        self._mmap.close()
+        self._mmap = None
+
+    def memory_bytes(self) -> int:
+        """Approximate resident size of the snippets, index and embeddings (for cache budgets)."""
+        size = sum(len(getattr(self, f"_{name}")) * 4 for name in _INDEX_ARRAYS)
+        size += sum(len(term) + 80 for term in self._vocab)
+        size += sum(len(s['content']) + 400 for s in self.snippets)
+        if self.encoder is not None:
+            size += self.encoder.term_vectors.nbytes + self.encoder.doc_vectors.nbytes
+        return size
+
+    def _idf(self, doc_freq: int) -> float:
+        """BM25 inverse document frequency (non-negative variant)."""
+        n = len(self._doc_len)
+        return math.log(1.0 + (n - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def score(self, query_terms: List[str]) -> Dict[int, float]:
+        """
+        BM25 scores for every snippet sharing at least one term with the query.
+
+        Args:
+            query_terms: Tokenized query (duplicates are ignored)
+
+        Returns:
+            Mapping of snippet index to score
+        """
+        scores: Dict[int, float] = {}
+        if not self._doc_len:
+            return scores
+
+        k1, b, avgdl = self.k1, self.b, self._avgdl or 1.0
+        offsets, post_docs, post_tfs, doc_len = self._post_offsets, self._post_docs, self._post_tfs, self._doc_len
+
+        for term in dict.fromkeys(query_terms):
+            term_id = self._vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = offsets[term_id], offsets[term_id + 1]
+            idf = self._idf(end - start)
+            for i in range(start, end):
+                doc_id = post_docs[i]
+                tf = post_tfs[i]
+                norm = k1 * (1.0 - b + b * doc_len[doc_id] / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1.0) / (tf + norm)
+
+        return scores
+
+    def _rank_bm25(self, query_terms: List[str], limit: int) -> List[int]:
+        """Snippet ids of the best BM25 matches; ties keep profile order."""
+        scores = self.score(query_terms)
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [doc_id for doc_id, _ in best]
+
+    def _rank_dense(self, queries: List[List[str]], limit: int) -> List[List[int]]:
+        """Snippet ids of the most similar embeddings for a batch of queries."""
+        term_ids = [[self._vocab[t] for t in terms if t in self._vocab] for terms in queries]
+        scores = self.encoder.score(self.encoder.encode(term_ids))
+        best = top_k_indices(scores, limit)
+        # Queries with no known terms embed to zero and match nothing
+        return [
+            [int(doc_id) for doc_id in row if scores[i, doc_id] > 0.0]
+            for i, row in enumerate(best)
+        ]
+
+    def rank(self, queries: List[List[str]], top_k: int = 15) -> List[List[int]]:
+        """
+        Rank snippets for a batch of keyword queries in the configured mode.
+
+        Dense scoring embeds the whole batch and scores it with one matrix multiply.
+
+        Args:
+            queries: One list of job keywords per query
+            top_k: Results per query
+
+        Returns:
+            Snippet indices per query, best first
+        """
+        tokenized = [[term for kw in keywords for term in query_terms(kw)] for keywords in queries]
+        if self.mode == "bm25" or self.encoder is None or not self.snippets:
+            return [self._rank_bm25(terms, top_k) for terms in tokenized]
+        if self.mode == "dense":
+            return self._rank_dense(tokenized, top_k)
+
+        # Hybrid: fuse deeper candidate lists from both retrievers
+        depth = max(4 * top_k, 50)
+        dense_rankings = self._rank_dense(tokenized, depth)
+        results = []
+        for terms, dense_ranking in zip(tokenized, dense_rankings):
+            fused = reciprocal_rank_fusion([self._rank_bm25(terms, depth), dense_ranking])
+            best = heapq.nlargest(top_k, fused.items(), key=lambda item: (item[1], -item[0]))
+            results.append([doc_id for doc_id, _ in best])
+        return results
+
+    def retrieve_batch(self, queries: List[List[str]], top_k: int = 15) -> List[List[Dict[str, Any]]]:
+        """Retrieve snippets for several keyword lists at once (see rank)."""
+        return [[self.snippets[doc_id] for doc_id in ranking] for ranking in self.rank(queries, top_k)]
+
     def retrieve_relevant_experience(self, job_keywords: List[str], top_k: int = 15) -> List[Dict[str, Any]]:
         """
         Retrieve segments that match high-priority job keywords.
-        Uses a frequency-based scoring (BM25 variant logic) for precision.
+        Ranks snippets with Okapi BM25 over the inverted index, dense embeddings, or both.
         """
-        scored_snippets = []
-        
-        for snippet in self.snippets:
-            score = 0
-            content_lower = snippet['content'].lower()
-            
-            for kw in job_keywords:
-                # Weighted score: exact matches in snippets are high value
-                if re.search(rf'\b{re.escape(kw.lower())}\b', content_lower):
-                    score += 2
-                elif kw.lower() in content_lower:
-                    score += 1
-            
-            if score > 0:
-                scored_snippets.append((score, snippet))
-        
-        # Sort by score descending
-        scored_snippets.sort(key=lambda x: x[0], reverse=True)
-        
         # Return top K
-        results = [s[1] for s in scored_snippets[:top_k]]
+        results = self.retrieve_batch([job_keywords], top_k)[0]
         print(f"🎯 RAG: Retrieved {len(results)} relevant snippets for customization.")
         return results
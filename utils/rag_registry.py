@@ -0,0 +1,143 @@
+"""
+RAG Index Registry
+Role: Serve one RAG index per user from a single process, built lazily from stored profiles.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from utils.hashing import profile_content_hash
+from utils.rag_engine import RAGEngine
+
+
+class RAGRegistry:
+    """
+    LRU cache of per-user RAGEngine instances with a memory budget.
+
+    Each entry remembers the content hash of the profile it was built from,
+    so a stale index is rebuilt even when the update happened in another
+    process. invalidate() drops an entry eagerly (e.g. from a profile-update
+    listener). Concurrent requests for the same user share a single build;
+    per-user build locks live only while a request holds or waits on them,
+    independently of the cached entries.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, max_users: int = 10000, mode: Optional[str] = None):
+        """
+        Args:
+            max_bytes: Approximate memory budget for all cached indexes
+            max_users: Maximum number of cached indexes
+            mode: Retrieval mode passed to each RAGEngine (default: RAG_RETRIEVAL_MODE)
+        """
+        self.max_bytes = max_bytes
+        self.max_users = max_users
+        self.mode = mode
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._build_locks: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "RAGRegistry":
+        """
+        Build a registry from environment variables.
+
+        RAG_REGISTRY_MAX_MB: Memory budget in megabytes (default: 256)
+        RAG_REGISTRY_MAX_USERS: Maximum cached indexes (default: 10000)
+        """
+        return cls(
+            max_bytes=int(float(os.getenv("RAG_REGISTRY_MAX_MB", 256)) * 1024 * 1024),
+            max_users=int(os.getenv("RAG_REGISTRY_MAX_USERS", 10000)),
+        )
+
+    def get(self, user_id: str, profile: Dict[str, Any]) -> RAGEngine:
+        """
+        Return the index for a user's profile, building it on first use or when the profile changed.
+
+        Args:
+            user_id: Tenant key
+            profile: The user's current profile data
+
+        Returns:
+            RAGEngine indexing this profile
+        """
+        user_id = str(user_id)
+        content_hash = profile_content_hash(profile)
+
+        entry = self._lookup(user_id, content_hash)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            build = self._build_locks.setdefault(user_id, {"lock": threading.Lock(), "waiters": 0})
+            build["waiters"] += 1
+        try:
+            with build["lock"]:
+                # Another request may have built it while we waited
+                entry = self._lookup(user_id, content_hash, count=False)
+                if entry is not None:
+                    return entry
+
+                engine = RAGEngine(profile=profile, mode=self.mode)
+                self._store(user_id, content_hash, engine)
+                return engine
+        finally:
+            with self._lock:
+                build["waiters"] -= 1
+                if build["waiters"] == 0:
+                    del self._build_locks[user_id]
+
+    def _lookup(self, user_id: str, content_hash: str, count: bool = True) -> Optional[RAGEngine]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry["hash"] == content_hash:
+                self._entries.move_to_end(user_id)
+                if count:
+                    self.hits += 1
+                return entry["engine"]
+            if count:
+                self.misses += 1
+            return None
+
+    def _store(self, user_id: str, content_hash: str, engine: RAGEngine) -> None:
+        size = engine.memory_bytes()
+        with self._lock:
+            self._discard(user_id)
+            self._entries[user_id] = {"hash": content_hash, "engine": engine, "bytes": size}
+            self._bytes += size
+
+            # Evict least recently used indexes, always keeping the newest one
+            while len(self._entries) > 1 and (self._bytes > self.max_bytes or len(self._entries) > self.max_users):
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def _discard(self, user_id: str) -> None:
+        """Remove an entry; caller holds the lock."""
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._bytes -= entry["bytes"]
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user's cached index so the next request rebuilds it."""
+        with self._lock:
+            self._discard(str(user_id))
+
+    def stats(self) -> Dict[str, Any]:
+        """Registry statistics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "users": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
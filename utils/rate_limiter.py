@@ -0,0 +1,404 @@
+"""
+LLM Rate Limiter
+Role: Keep LLM calls under requests/tokens-per-minute limits and a concurrency cap, and back off together on 429s.
+"""
+
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager, asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple, Callable
+
+from tenacity import wait_random_exponential
+
+# (bucket key, amount to take, capacity, refill per second)
+BucketRequest = Tuple[str, float, float, float]
+
+# Key under which a shared "everyone pause until" timestamp is kept
+_PAUSE_KEY = "__pause__"
+
+
+def _refill(tokens: float, updated: float, now: float, capacity: float, rate: float) -> float:
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+def _take(state: Dict[str, Tuple[float, float]], buckets: List[BucketRequest], now: float) -> float:
+    """
+    Take from every bucket or from none.
+
+    Args:
+        state: Bucket key -> (tokens, last update); updated in place when granted
+
+    Returns:
+        0 when granted, otherwise seconds until all buckets could grant
+    """
+    levels = {}
+    wait = 0.0
+    for key, amount, capacity, rate in buckets:
+        tokens, updated = state.get(key, (capacity, now))
+        level = _refill(tokens, updated, now, capacity, rate)
+        levels[key] = level
+        # A request larger than the bucket waits for a full bucket instead of forever
+        needed = min(amount, capacity)
+        if level < needed:
+            wait = max(wait, (needed - level) / rate)
+    if wait > 0:
+        return wait
+    for key, amount, capacity, rate in buckets:
+        state[key] = (levels[key] - min(amount, capacity), now)
+    return 0.0
+
+
+class RateLimitBackend:
+    """
+    Storage for token buckets and the shared backoff pause.
+
+    All methods are atomic with respect to other users of the same backend.
+    """
+
+    def acquire(self, buckets: List[BucketRequest], now: Optional[float] = None) -> float:
+        """
+        Take the amounts from all buckets at once.
+
+        Returns:
+            0 when granted, otherwise seconds to wait before trying again
+            (including any pause set by pause_until)
+        """
+        raise NotImplementedError
+
+    def adjust(self, bucket: BucketRequest, now: Optional[float] = None) -> None:
+        """Take an extra amount from one bucket (negative refunds, up to capacity); the level may go below zero."""
+        raise NotImplementedError
+
+    def pause_until(self, until: float) -> None:
+        """Make every acquire() wait until the given time (e.g. after a 429 with Retry-After)."""
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Buckets in process memory, shared by the threads and event loops of one process."""
+
+    def __init__(self):
+        self._state: Dict[str, Tuple[float, float]] = {}
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, buckets: List[BucketRequest], now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        with self._lock:
+            if self._paused_until > now:
+                return self._paused_until - now
+            return _take(self._state, buckets, now)
+
+    def adjust(self, bucket: BucketRequest, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        key, amount, capacity, rate = bucket
+        with self._lock:
+            tokens, updated = self._state.get(key, (capacity, now))
+            self._state[key] = (min(capacity, _refill(tokens, updated, now, capacity, rate) - amount), now)
+
+    def pause_until(self, until: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, until)
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """
+    Buckets in a SQLite file, shared by every process (API replicas, workers)
+    that can reach the file, e.g. on the shared data volume.
+
+    Like the job queue, this is a local stand-in for a networked store such as Redis.
+    """
+
+    def __init__(self, path: str = "data/rate_limits.sqlite"):
+        """
+        Args:
+            path: SQLite file shared by all processes
+        """
+        self.path = path
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rate_buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; SQLite handles cross-process locking."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self, keys: List[str]):
+        """Exclusive transaction yielding the current state of the given keys."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                f"SELECT key, tokens, updated FROM rate_buckets WHERE key IN ({','.join('?' * len(keys))})", keys
+            ).fetchall()
+            state = {key: (tokens, updated) for key, tokens, updated in rows}
+            before = dict(state)
+            yield state
+            changed = [(key, *value) for key, value in state.items() if before.get(key) != value]
+            if changed:
+                conn.executemany("INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)", changed)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def acquire(self, buckets: List[BucketRequest], now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        with self._transaction([_PAUSE_KEY, *(b[0] for b in buckets)]) as state:
+            paused_until = state.pop(_PAUSE_KEY, (0.0, 0.0))[0]
+            if paused_until > now:
+                return paused_until - now
+            return _take(state, buckets, now)
+
+    def adjust(self, bucket: BucketRequest, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        key, amount, capacity, rate = bucket
+        with self._transaction([key]) as state:
+            tokens, updated = state.get(key, (capacity, now))
+            state[key] = (min(capacity, _refill(tokens, updated, now, capacity, rate) - amount), now)
+
+    def pause_until(self, until: float) -> None:
+        with self._transaction([_PAUSE_KEY]) as state:
+            state[_PAUSE_KEY] = (max(state.get(_PAUSE_KEY, (0.0, 0.0))[0], until), time.time())
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    Delay requested by a 429/503 response's Retry-After (or retry-after-ms) header.
+
+    Returns:
+        Seconds to wait, or None when the error carries no such header
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class wait_retry_after:
+    """
+    Tenacity wait strategy: the server's Retry-After plus jitter when given,
+    otherwise randomized exponential backoff, so clients don't retry in lockstep.
+    """
+
+    def __init__(self, min: float = 1, max: float = 10, jitter: float = 1.0):
+        """
+        Args:
+            min: Smallest exponential backoff in seconds
+            max: Largest exponential backoff in seconds
+            jitter: Up to this many seconds are added to a Retry-After delay
+        """
+        self.jitter = jitter
+        self.fallback = wait_random_exponential(multiplier=1, min=min, max=max)
+
+    def __call__(self, retry_state) -> float:
+        error = retry_state.outcome.exception() if retry_state.outcome else None
+        delay = retry_after_seconds(error) if error is not None else None
+        if delay is None:
+            return self.fallback(retry_state)
+        return delay + random.uniform(0, self.jitter)
+
+
+class RateLimiter:
+    """
+    Client-side limits for LLM calls:
+
+    - token buckets for requests per minute and tokens per minute (prompt
+      estimate plus expected completion, corrected with the actual usage)
+    - a cap on concurrent calls per process (separately for threads and for
+      each event loop)
+    - a shared pause after a 429, so every client backs off until Retry-After
+
+    Waits get random jitter so blocked callers don't all wake at once. Limits
+    of 0/None are not enforced.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        backend: Optional[RateLimitBackend] = None,
+        completion_estimate: int = 1000,
+        name: str = "deepseek",
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Args:
+            requests_per_minute: Request limit (bucket capacity = one minute of requests)
+            tokens_per_minute: Token limit (bucket capacity = one minute of tokens)
+            max_concurrency: Concurrent calls per process
+            backend: Bucket storage (default: in-memory)
+            completion_estimate: Completion tokens assumed before the actual usage is known
+            name: Bucket key prefix, one set of limits per provider/account
+            sleep: Blocking sleep function (injectable for tests)
+        """
+        self.requests_per_minute = requests_per_minute or None
+        self.tokens_per_minute = tokens_per_minute or None
+        self.max_concurrency = max_concurrency or None
+        self.backend = backend or MemoryRateLimitBackend()
+        self.completion_estimate = completion_estimate
+        self.name = name
+        self._sleep = sleep
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency) if self.max_concurrency else None
+        self._async_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """
+        Build a limiter from environment variables.
+
+        LLM_RATE_LIMIT_RPM: Requests per minute (default: 0, unlimited)
+        LLM_RATE_LIMIT_TPM: Tokens per minute (default: 0, unlimited)
+        LLM_MAX_CONCURRENCY: Concurrent calls per process (default: 8, 0 = unlimited)
+        LLM_RATE_LIMIT_BACKEND: "memory" (default, per process) or "sqlite" (shared through a file)
+        LLM_RATE_LIMIT_PATH: SQLite file (default: data/rate_limits.sqlite)
+        """
+        backend_name = os.getenv("LLM_RATE_LIMIT_BACKEND", "memory").lower()
+        if backend_name == "memory":
+            backend = MemoryRateLimitBackend()
+        elif backend_name == "sqlite":
+            backend = SQLiteRateLimitBackend(os.getenv("LLM_RATE_LIMIT_PATH", "data/rate_limits.sqlite"))
+        else:
+            raise ValueError(f"Unknown LLM_RATE_LIMIT_BACKEND: {backend_name}")
+        return cls(
+            requests_per_minute=float(os.getenv("LLM_RATE_LIMIT_RPM", 0)),
+            tokens_per_minute=float(os.getenv("LLM_RATE_LIMIT_TPM", 0)),
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", 8)),
+            backend=backend,
+        )
+
+    def _buckets(self, tokens: int) -> List[BucketRequest]:
+        buckets = []
+        if self.requests_per_minute:
+            rpm = self.requests_per_minute
+            buckets.append((f"{self.name}:requests", 1, rpm, rpm / 60))
+        if self.tokens_per_minute:
+            tpm = self.tokens_per_minute
+            buckets.append((f"{self.name}:tokens", tokens, tpm, tpm / 60))
+        return buckets
+
+    def _next_wait(self, buckets: List[BucketRequest]) -> float:
+        """0 when the buckets granted the request, otherwise a jittered wait."""
+        wait = self.backend.acquire(buckets)
+        if wait <= 0:
+            return 0.0
+        return wait * random.uniform(1.0, 1.2) + random.uniform(0, 0.05)
+
+    def estimate(self, prompt_tokens: int) -> int:
+        """Tokens charged up front for a call with this many prompt tokens."""
+        return prompt_tokens + self.completion_estimate
+
+    def wait(self, prompt_tokens: int = 0) -> None:
+        """Block until one request with the given prompt size fits the limits."""
+        buckets = self._buckets(self.estimate(prompt_tokens))
+        while True:
+            delay = self._next_wait(buckets)
+            if delay <= 0:
+                return
+            self._sleep(delay)
+
+    async def wait_async(self, prompt_tokens: int = 0) -> None:
+        """Async variant of wait(); the backend is queried off the event loop."""
+        buckets = self._buckets(self.estimate(prompt_tokens))
+        while True:
+            delay = await asyncio.to_thread(self._next_wait, buckets)
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def record(self, prompt_tokens: int, total_tokens: int) -> None:
+        """Correct the tokens-per-minute bucket with a call's actual usage."""
+        if self.tokens_per_minute and total_tokens:
+            tpm = self.tokens_per_minute
+            self.backend.adjust((f"{self.name}:tokens", total_tokens - self.estimate(prompt_tokens), tpm, tpm / 60))
+
+    def refund(self, prompt_tokens: int) -> None:
+        """
+        Return the tokens charged by wait() for an attempt that failed before
+        using any, so a retried call is charged once. The request itself stays
+        counted: providers count rejected requests too.
+        """
+        if self.tokens_per_minute:
+            tpm = self.tokens_per_minute
+            self.backend.adjust((f"{self.name}:tokens", -self.estimate(prompt_tokens), tpm, tpm / 60))
+
+    def backoff(self, error: BaseException) -> None:
+        """After a rate-limit error, pause every client sharing the backend for the Retry-After delay."""
+        delay = retry_after_seconds(error)
+        if delay:
+            print(f"⏳ Rate limited: all DeepSeek calls pause for {delay:.1f}s")
+            self.backend.pause_until(time.time() + delay)
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the max_concurrency call slots (threads)."""
+        if self._semaphore is None:
+            yield
+            return
+        with self._semaphore:
+            yield
+
+    @asynccontextmanager
+    async def slot_async(self):
+        """Hold one of the max_concurrency call slots of the running event loop."""
+        if self.max_concurrency is None:
+            yield
+            return
+        loop = asyncio.get_running_loop()
+        semaphore = self._async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._async_semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        async with semaphore:
+            yield
+
+
+_default_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Shared limiter configured from environment variables (created on first use)."""
+    global _default_limiter
+    if _default_limiter is None:
+        _default_limiter = RateLimiter.from_env()
+    return _default_limiter
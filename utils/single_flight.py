@@ -0,0 +1,114 @@
+"""
+Single-Flight Call Coalescing
+Role: Let concurrent identical LLM calls share one in-flight request instead of paying for each.
+"""
+
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Awaitable, Tuple
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key across threads.
+
+    The first caller (the leader) runs the function; callers arriving while it
+    is in flight wait for the leader and receive its result or exception.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn() once per key among concurrent callers.
+
+        Args:
+            key: Call identity (e.g. the response cache key)
+            fn: The call to run when no identical call is in flight
+
+        Returns:
+            Tuple of (result, shared) where shared is True for callers that
+            joined another caller's call
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._calls), "leaders": self.leaders, "coalesced": self.followers}
+
+
+class AsyncSingleFlight:
+    """
+    Coalesce concurrent calls with the same key within each event loop.
+
+    The call runs in its own task; it is cancelled only when every caller
+    waiting for it has been cancelled.
+    """
+
+    def __init__(self):
+        self._calls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Dict[str, Any]]]" = weakref.WeakKeyDictionary()
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Await fn() once per key among concurrent callers (see SingleFlight.do).
+
+        Returns:
+            Tuple of (result, shared)
+        """
+        calls = self._calls.setdefault(asyncio.get_running_loop(), {})
+        flight = calls.get(key)
+        shared = flight is not None
+        if shared:
+            self.followers += 1
+        else:
+            self.leaders += 1
+            flight = calls[key] = {"task": asyncio.ensure_future(fn()), "waiters": 0}
+
+            def forget(_task: asyncio.Future) -> None:
+                if calls.get(key) is flight:
+                    del calls[key]
+
+            flight["task"].add_done_callback(forget)
+
+        flight["waiters"] += 1
+        try:
+            return await asyncio.shield(flight["task"]), shared
+        except asyncio.CancelledError:
+            if not flight["task"].done() and flight["waiters"] == 1:
+                flight["task"].cancel()
+            raise
+        finally:
+            flight["waiters"] -= 1
+
+    def stats(self) -> Dict[str, int]:
+        in_flight = sum(len(calls) for calls in list(self._calls.values()))
+        return {"in_flight": in_flight, "leaders": self.leaders, "coalesced": self.followers}
@@ -0,0 +1,280 @@
+"""
+Skill Ontology
+Role: Normalize skill names and aliases, and find every skill mention in a text in one pass.
+"""
+
+from collections import deque
+from typing import Dict, Any, List, Set, Tuple, Iterable, Iterator, Optional
+
+# Canonical skill name -> aliases (matched case-insensitively, whole words only).
+# Aliases are other spellings and abbreviations of the same skill only; related
+# but distinct skills (Scrum vs. Agile, AWS Lambda vs. Serverless) get their own
+# entries so one never earns credit for the other.
+SKILL_ALIASES: Dict[str, List[str]] = {
+    # Languages
+    "Python": ["python3", "py"],
+    "JavaScript": ["js", "ecmascript", "es6"],
+    "TypeScript": ["ts"],
+    "Java": [],
+    "Go": ["golang"],
+    "Rust": [],
+    "C++": ["cpp", "c plus plus"],
+    "C#": ["csharp", "c sharp"],
+    "C": [],
+    "Ruby": [],
+    "PHP": [],
+    "Kotlin": [],
+    "Swift": [],
+    "Scala": [],
+    "R": [],
+    "SQL": [],
+    "Bash": ["shell scripting", "shell script"],
+    # Web & frameworks
+    "React": ["react.js", "reactjs"],
+    "Angular": ["angularjs", "angular.js"],
+    "Vue.js": ["vue", "vuejs"],
+    "Next.js": ["nextjs"],
+    "Node.js": ["node", "nodejs"],
+    "Express.js": ["express", "expressjs"],
+    "Django": [],
+    "Flask": [],
+    "FastAPI": [],
+    "Spring": ["spring framework"],
+    "Spring Boot": [],
+    "Ruby on Rails": ["rails", "ror"],
+    ".NET": ["dotnet"],
+    "ASP.NET": [],
+    "GraphQL": [],
+    "REST APIs": ["rest", "rest api", "restful", "restful apis", "restful api"],
+    "HTML": ["html5"],
+    "CSS": ["css3"],
+    # Data stores
+    "PostgreSQL": ["postgres", "psql"],
+    "MySQL": [],
+    "SQLite": [],
+    "MongoDB": ["mongo"],
+    "Redis": [],
+    "Elasticsearch": ["elastic search"],
+    "DynamoDB": ["dynamo"],
+    "Cassandra": [],
+    "Snowflake": [],
+    "BigQuery": ["big query"],
+    # Cloud & infrastructure
+    "Amazon Web Services": ["aws"],
+    "Google Cloud Platform": ["gcp", "google cloud"],
+    "Microsoft Azure": ["azure"],
+    "Docker": [],
+    "Kubernetes": ["k8s"],
+    "Terraform": [],
+    "Ansible": [],
+    "CI/CD": ["ci cd", "continuous integration", "continuous delivery", "continuous deployment"],
+    "Jenkins": [],
+    "GitHub Actions": [],
+    "Git": [],
+    "Linux": [],
+    "Microservices": ["microservice", "micro-services", "microservices architecture"],
+    "Serverless": [],
+    "AWS Lambda": [],
+    # Data & ML
+    "Machine Learning": ["ml"],
+    "Deep Learning": ["dl"],
+    "Artificial Intelligence": ["ai"],
+    "Natural Language Processing": ["nlp"],
+    "Computer Vision": ["cv"],
+    "Large Language Models": ["llm", "llms"],
+    "Retrieval-Augmented Generation": ["rag"],
+    "TensorFlow": ["tf"],
+    "PyTorch": ["torch"],
+    "scikit-learn": ["sklearn", "scikit learn"],
+    "Pandas": [],
+    "NumPy": [],
+    "Apache Spark": ["spark", "pyspark"],
+    "Apache Kafka": ["kafka"],
+    "Apache Airflow": ["airflow"],
+    "dbt": [],
+    "Data Engineering": [],
+    "ETL": [],
+    "ELT": [],
+    "Data Pipelines": ["data pipeline"],
+    # Practices
+    "Agile": [],
+    "Scrum": [],
+    "Kanban": [],
+    "Test-Driven Development": ["tdd"],
+    "System Design": [],
+    "Distributed Systems": [],
+}
+
+# Aliases that are ordinary English words or single letters. They only count
+# when a whole skill item equals them (e.g. a "Go" entry in a skills list),
+# never when scanning free text.
+AMBIGUOUS_ALIASES: Set[str] = {
+    "go", "c", "r", "py", "ts", "tf", "cv", "dl", "node", "express", "spring", "rails", "rest", "swift",
+    "vue", "dynamo", "torch", "spark", "ai", "ml", "sql", "git", "agile", "scrum",
+}
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton: finds all occurrences of many patterns in one
+    left-to-right pass over the text, independent of the number of patterns.
+    """
+
+    def __init__(self, patterns: Dict[str, Any]):
+        """
+        Args:
+            patterns: Mapping of pattern string to the value reported when it matches
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+
+        for pattern, value in patterns.items():
+            if pattern:
+                self._add(pattern, value)
+        self._link()
+
+    def _add(self, pattern: str, value: Any) -> None:
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append((len(pattern), value))
+
+    def _link(self) -> None:
+        """Compute failure links breadth-first and merge outputs along them."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """
+        Yield (start, end, value) for every pattern occurrence, including overlapping ones.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, value in out[state]:
+                yield i + 1 - length, i + 1, value
+
+
+def _is_boundary(text: str, start: int, end: int) -> bool:
+    """True when text[start:end] is not part of a longer word."""
+    return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+
+class SkillOntology:
+    """
+    Skill vocabulary with canonical names and aliases.
+
+    canonical_key() normalizes a single skill name ("Postgres" -> "postgresql");
+    find_skills() returns the canonical keys of all skills mentioned in a text,
+    using one Aho-Corasick pass with whole-word matching.
+    """
+
+    def __init__(
+        self,
+        aliases: Optional[Dict[str, List[str]]] = None,
+        ambiguous: Optional[Iterable[str]] = None,
+    ):
+        """
+        Args:
+            aliases: Canonical name -> aliases (default: SKILL_ALIASES)
+            ambiguous: Aliases matched only as whole skill items (default: AMBIGUOUS_ALIASES)
+        """
+        aliases = SKILL_ALIASES if aliases is None else aliases
+        ambiguous = AMBIGUOUS_ALIASES if ambiguous is None else set(ambiguous)
+
+        self.names: Dict[str, str] = {}
+        self._aliases: Dict[str, str] = {}
+        text_patterns: Dict[str, str] = {}
+        for canonical, names in aliases.items():
+            key = canonical.lower()
+            self.names[key] = canonical
+            for alias in [canonical, *names]:
+                alias = alias.lower()
+                self._aliases[alias] = key
+                if alias not in ambiguous:
+                    text_patterns[alias] = key
+        self._matcher = AhoCorasick(text_patterns)
+
+    def canonical_key(self, skill: str) -> str:
+        """Lowercase canonical key for a skill name; unknown names are just lowercased."""
+        skill = " ".join(skill.lower().split())
+        return self._aliases.get(skill, skill)
+
+    def is_known(self, skill: str) -> bool:
+        """Whether a skill name maps to a canonical skill."""
+        return " ".join(skill.lower().split()) in self._aliases
+
+    def find_mentions(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        All whole-word skill mentions in text.
+
+        Returns:
+            (start, end, canonical key) for each mention, in text order
+        """
+        lowered = text.lower()
+        return [
+            (start, end, key)
+            for start, end, key in self._matcher.iter_matches(lowered)
+            if _is_boundary(lowered, start, end)
+        ]
+
+    def find_skills(self, text: str) -> Set[str]:
+        """Canonical keys of all skills mentioned in text."""
+        return {key for _, _, key in self.find_mentions(text)}
+
+    def match_terms(self, terms: Iterable[str], text: str) -> Set[str]:
+        """
+        Which of the given terms a text mentions.
+
+        Known skills match through any of their aliases; other terms match as
+        whole-word phrases. The text is scanned once for skills and once for
+        the remaining terms.
+
+        Returns:
+            Subset of terms found in text
+        """
+        mentioned = self.find_skills(text)
+        found = set()
+        other: Dict[str, List[str]] = {}
+        for term in terms:
+            if self.is_known(term) and self.canonical_key(term) in mentioned:
+                found.add(term)
+            else:
+                other.setdefault(" ".join(term.lower().split()), []).append(term)
+
+        if other:
+            lowered = text.lower()
+            for start, end, phrase in AhoCorasick({p: p for p in other}).iter_matches(lowered):
+                if _is_boundary(lowered, start, end):
+                    found.update(other[phrase])
+        return found
+
+
+_default_ontology: Optional[SkillOntology] = None
+
+
+def get_skill_ontology() -> SkillOntology:
+    """Shared ontology built from SKILL_ALIASES (compiled on first use)."""
+    global _default_ontology
+    if _default_ontology is None:
+        _default_ontology = SkillOntology()
+    return _default_ontology
@@ -0,0 +1,331 @@
+"""
+LLM Usage Tracking
+Role: Record tokens, latency and retries of every LLM call, roll them up per stage, request and user, and enforce per-user token quotas.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Iterator
+
+# Stage attributed to calls without an llm_stage() around them
+UNATTRIBUTED = "unattributed"
+
+# Default prices in USD per million tokens (deepseek-chat list prices)
+DEFAULT_PRICES = {"input": 0.27, "cached_input": 0.07, "output": 1.10}
+
+_stage: ContextVar[Optional[str]] = ContextVar("llm_stage", default=None)
+_user: ContextVar[Optional[str]] = ContextVar("llm_user", default=None)
+_request: ContextVar[Optional["RequestUsage"]] = ContextVar("llm_request", default=None)
+
+
+class QuotaExceededError(Exception):
+    """Raised before an LLM call when the user has used up their token quota."""
+
+    def __init__(self, user_id: str, used: int, quota: int, retry_after: float):
+        super().__init__(f"Token quota exceeded for user {user_id}: {used}/{quota} tokens used")
+        self.user_id = user_id
+        self.used = used
+        self.quota = quota
+        self.retry_after = retry_after
+
+
+@contextmanager
+def _bind(var: ContextVar, value: Any):
+    token = var.set(value)
+    try:
+        yield
+    finally:
+        try:
+            var.reset(token)
+        except ValueError:
+            # An async generator closed from another context (e.g. garbage collected)
+            pass
+
+
+@contextmanager
+def llm_stage(name: str):
+    """Attribute the LLM calls made inside the block (and tasks/threads started from it) to a stage."""
+    with _bind(_stage, name):
+        yield
+
+
+@contextmanager
+def usage_scope(user_id: Optional[Any] = None) -> Iterator["RequestUsage"]:
+    """
+    Collect the usage of every LLM call made inside the block into one RequestUsage.
+
+    Scopes nest: calls also count towards the enclosing scope (e.g. a batch
+    and each of its runs).
+
+    Args:
+        user_id: User the calls are charged to (quotas apply); None keeps the enclosing user
+
+    Yields:
+        The RequestUsage being filled
+    """
+    usage = RequestUsage(parent=_request.get())
+    user = str(user_id) if user_id is not None else _user.get()
+    with _bind(_user, user), _bind(_request, usage):
+        yield usage
+
+
+def current_stage() -> str:
+    return _stage.get() or UNATTRIBUTED
+
+
+def current_user() -> Optional[str]:
+    return _user.get()
+
+
+def usage_from_response(usage: Any) -> Dict[str, int]:
+    """
+    Token counts from an OpenAI-compatible `usage` object.
+
+    Cached prompt tokens are read from DeepSeek's prompt_cache_hit_tokens or
+    OpenAI's prompt_tokens_details.cached_tokens.
+    """
+    if usage is None:
+        return {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+    cached = getattr(usage, "prompt_cache_hit_tokens", None)
+    if cached is None:
+        cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "cached_tokens": cached or 0,
+    }
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {
+        "calls": 0,
+        "cache_hits": 0,
+        "errors": 0,
+        "retries": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cached_tokens": 0,
+        "total_tokens": 0,
+        "latency": 0.0,
+        "cost_usd": 0.0,
+    }
+
+
+def _add(totals: Dict[str, Any], call: Dict[str, Any]) -> None:
+    totals["calls"] += 1
+    totals["cache_hits"] += int(call["cache_hit"])
+    totals["errors"] += int(call["error"])
+    totals["retries"] += call["retries"]
+    for field in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+        totals[field] += call[field]
+    totals["total_tokens"] += call["prompt_tokens"] + call["completion_tokens"]
+    totals["latency"] += call["latency"]
+    totals["cost_usd"] += call["cost_usd"]
+
+
+def _rounded(totals: Dict[str, Any]) -> Dict[str, Any]:
+    # Share of prompt tokens served from the provider's prefix cache
+    hit_rate = totals["cached_tokens"] / totals["prompt_tokens"] if totals["prompt_tokens"] else 0.0
+    return {
+        **totals,
+        "latency": round(totals["latency"], 3),
+        "cost_usd": round(totals["cost_usd"], 6),
+        "prompt_cache_hit_rate": round(hit_rate, 4),
+    }
+
+
+class RequestUsage:
+    """
+    LLM usage of one request (one pipeline run), in total and per stage.
+
+    Shared by every task and thread the request fans out to.
+    """
+
+    def __init__(self, parent: Optional["RequestUsage"] = None):
+        """
+        Args:
+            parent: Enclosing request usage that every call is also added to
+        """
+        self.parent = parent
+        self.total = _empty_totals()
+        self.by_stage: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, call: Dict[str, Any]) -> None:
+        with self._lock:
+            _add(self.total, call)
+            _add(self.by_stage.setdefault(call["stage"], _empty_totals()), call)
+        if self.parent is not None:
+            self.parent.add(call)
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-serializable totals, e.g. for API responses."""
+        with self._lock:
+            return {
+                **_rounded(self.total),
+                "by_stage": {stage: _rounded(totals) for stage, totals in self.by_stage.items()},
+            }
+
+
+class UsageTracker:
+    """
+    Process-wide LLM usage: running totals per stage and per user, and
+    per-user token quotas over a fixed window.
+
+    Quota accounting is kept in memory, so each process (API server, worker)
+    enforces the quota on the calls it makes itself.
+    """
+
+    def __init__(
+        self,
+        user_quota: Optional[int] = None,
+        quota_window: float = 24 * 3600,
+        prices: Optional[Dict[str, float]] = None,
+    ):
+        """
+        Args:
+            user_quota: Tokens (prompt + completion) a user may spend per window; None disables quotas
+            quota_window: Quota window in seconds
+            prices: USD per million tokens for "input", "cached_input" and "output"
+        """
+        self.user_quota = user_quota
+        self.quota_window = quota_window
+        self.prices = {**DEFAULT_PRICES, **(prices or {})}
+        self.total = _empty_totals()
+        self.by_stage: Dict[str, Dict[str, Any]] = {}
+        self.by_user: Dict[str, Dict[str, Any]] = {}
+        self._windows: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "UsageTracker":
+        """
+        Build a tracker from environment variables.
+
+        LLM_USER_TOKEN_QUOTA: Tokens per user per window (default: 0, unlimited)
+        LLM_QUOTA_WINDOW: Quota window in seconds (default: 86400)
+        LLM_PRICE_INPUT / LLM_PRICE_CACHED_INPUT / LLM_PRICE_OUTPUT: USD per million tokens
+        """
+        prices = {
+            name: float(os.environ[env])
+            for name, env in (
+                ("input", "LLM_PRICE_INPUT"),
+                ("cached_input", "LLM_PRICE_CACHED_INPUT"),
+                ("output", "LLM_PRICE_OUTPUT"),
+            )
+            if os.getenv(env)
+        }
+        return cls(
+            user_quota=int(os.getenv("LLM_USER_TOKEN_QUOTA", 0)) or None,
+            quota_window=float(os.getenv("LLM_QUOTA_WINDOW", 24 * 3600)),
+            prices=prices,
+        )
+
+    def cost(self, prompt_tokens: int, completion_tokens: int, cached_tokens: int) -> float:
+        """Estimated price of a call in USD."""
+        return (
+            (prompt_tokens - cached_tokens) * self.prices["input"]
+            + cached_tokens * self.prices["cached_input"]
+            + completion_tokens * self.prices["output"]
+        ) / 1_000_000
+
+    def _window(self, user_id: str, now: float) -> list:
+        """[window start, tokens used] for a user, starting a new window when the old one ended."""
+        window = self._windows.get(user_id)
+        if window is None or now - window[0] >= self.quota_window:
+            window = self._windows[user_id] = [now, 0]
+        return window
+
+    def check_quota(self, estimated_tokens: int = 0) -> None:
+        """
+        Refuse a call that would take the current user over their quota.
+
+        Args:
+            estimated_tokens: Prompt tokens the call is about to send
+
+        Raises:
+            QuotaExceededError: When the user has no quota left for the call
+        """
+        user_id = current_user()
+        if self.user_quota is None or user_id is None:
+            return
+        now = time.time()
+        with self._lock:
+            window_start, used = self._window(user_id, now)
+        if used + estimated_tokens > self.user_quota:
+            print(f"🚫 Token quota exceeded for user {user_id} ({used}/{self.user_quota})")
+            raise QuotaExceededError(user_id, used, self.user_quota, window_start + self.quota_window - now)
+
+    def record(
+        self,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cached_tokens: int = 0,
+        latency: float = 0.0,
+        retries: int = 0,
+        cache_hit: bool = False,
+        error: bool = False,
+        model: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Record one LLM call under the current stage, request and user.
+
+        Returns:
+            The recorded call
+        """
+        call = {
+            "stage": current_stage(),
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached_tokens,
+            "latency": latency,
+            "retries": retries,
+            "cache_hit": cache_hit,
+            "error": error,
+            "cost_usd": self.cost(prompt_tokens, completion_tokens, cached_tokens),
+        }
+        user_id = current_user()
+        with self._lock:
+            _add(self.total, call)
+            _add(self.by_stage.setdefault(call["stage"], _empty_totals()), call)
+            if user_id is not None:
+                _add(self.by_user.setdefault(user_id, _empty_totals()), call)
+                self._window(user_id, time.time())[1] += prompt_tokens + completion_tokens
+
+        request = _request.get()
+        if request is not None:
+            request.add(call)
+        return call
+
+    def remaining(self, user_id: Any) -> Optional[int]:
+        """Tokens left in the user's current quota window (None without quotas)."""
+        if self.user_quota is None:
+            return None
+        with self._lock:
+            used = self._window(str(user_id), time.time())[1]
+        return max(0, self.user_quota - used)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serializable totals overall, per stage and per user, plus quota settings."""
+        with self._lock:
+            return {
+                **_rounded(self.total),
+                "by_stage": {stage: _rounded(totals) for stage, totals in self.by_stage.items()},
+                "by_user": {user: _rounded(totals) for user, totals in self.by_user.items()},
+                "quota": {"tokens_per_user": self.user_quota, "window_seconds": self.quota_window},
+            }
+
+
+_default_tracker: Optional[UsageTracker] = None
+
+
+def get_usage_tracker() -> UsageTracker:
+    """Shared tracker configured from environment variables (created on first use)."""
+    global _default_tracker
+    if _default_tracker is None:
+        _default_tracker = UsageTracker.from_env()
+    return _default_tracker
@@ -1,70 +1,145 @@
 """
 Quick verification script to test if all services are running correctly
+
+Checks the running API and web interface (API_URL / WEB_URL, default
+localhost:8000 / localhost:3000). With --offline it first starts its own
+API against the local fake LLM server and serves web/ itself, so the check
+needs no running services and spends no API credits.
+
+Run with: python verify_services.py [--offline]
 """
-import requests
+import argparse
+import functools
+import os
+import subprocess
 import sys
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 
-def test_api_health():
-    """Test if the FastAPI server is running"""
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
     try:
-        response = requests.get('http://localhost:8000/', timeout=5)
-        if response.status_code == 200:
-            print("✅ API Server (Port 8000): ONLINE")
-            return True
-        else:
-            print(f"⚠️  API Server: Unexpected status {response.status_code}")
-            return False
-    except requests.exceptions.RequestException as e:
-        print(f"❌ API Server (Port 8000): OFFLINE - {e}")
-        return False
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        pass
 
-def test_web_interface():
-    """Test if the web interface is accessible"""
+
+def get_status(url):
+    """HTTP status of a GET request (raises OSError when unreachable)"""
     try:
-        response = requests.get('http://localhost:3000/', timeout=5)
-        if response.status_code == 200:
-            print("✅ Web Interface (Port 3000): ONLINE")
-            return True
-        else:
-            print(f"⚠️  Web Interface: Unexpected status {response.status_code}")
-            return False
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Web Interface (Port 3000): OFFLINE - {e}")
-        return False
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
 
-def test_api_docs():
-    """Test if API documentation is accessible"""
+def check(url, online_message, name):
     try:
-        response = requests.get('http://localhost:8000/docs', timeout=5)
-        if response.status_code == 200:
-            print("✅ API Documentation (/docs): ACCESSIBLE")
+        status = get_status(url)
+        if status == 200:
+            print(f"✅ {online_message}")
             return True
         else:
-            print(f"⚠️  API Docs: Unexpected status {response.status_code}")
+            print(f"⚠️  {name}: Unexpected status {status}")
             return False
-    except requests.exceptions.RequestException as e:
-        print(f"❌ API Documentation: NOT ACCESSIBLE - {e}")
+    except OSError as e:
+        print(f"❌ {name}: OFFLINE - {e}")
         return False
 
+def test_api_health(api_url):
+    """Test if the FastAPI server is running"""
+    return check(f"{api_url}/", f"API Server ({api_url}): ONLINE", "API Server")
+
+def test_web_interface(web_url):
+    """Test if the web interface is accessible"""
+    return check(f"{web_url}/", f"Web Interface ({web_url}): ONLINE", "Web Interface")
+
+def test_api_docs(api_url):
+    """Test if API documentation is accessible"""
+    return check(f"{api_url}/docs", "API Documentation (/docs): ACCESSIBLE", "API Documentation")
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+def start_offline_services(tmp):
+    """Start the fake LLM server, the API and a static server for web/ on free ports"""
+    from utils.fake_llm_server import FakeLLMServer
+    from test_api import free_port, wait_until_up
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    llm = FakeLLMServer().start()
+    port = free_port()
+    env = {
+        **os.environ,
+        "DEEPSEEK_API_KEY": "fake-key",
+        "DEEPSEEK_BASE_URL": llm.url,
+        "LLM_PROVIDERS": "deepseek",
+        "JOB_WORKERS": "0",
+        "JOB_QUEUE_PATH": os.path.join(tmp, "jobs.sqlite"),
+    }
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=root, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+    )
+    api_url = f"http://127.0.0.1:{port}"
+    wait_until_up(api_url + "/", api)
+
+    web = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=os.path.join(root, "web")))
+    threading.Thread(target=web.serve_forever, daemon=True).start()
+    web_url = f"http://127.0.0.1:{web.server_address[1]}"
+
+    def stop():
+        api.terminate()
+        api.wait(timeout=10)
+        api.stdout.close()
+        web.shutdown()
+        web.server_close()
+        llm.stop()
+
+    return api_url, web_url, stop
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify the API and web interface")
+    parser.add_argument("--offline", action="store_true", help="Start the services against the fake LLM server first")
+    args = parser.parse_args()
+
     print("🔍 Testing AI Job Application Agent Services...\n")
-    
-    results = []
-    results.append(test_api_health())
-    results.append(test_web_interface())
-    results.append(test_api_docs())
-    
+
+    stop = None
+    tmp = tempfile.TemporaryDirectory()
+    if args.offline:
+        print("🧪 Offline mode: starting the API against the fake LLM server...\n")
+        api_url, web_url, stop = start_offline_services(tmp.name)
+    else:
+        api_url = os.getenv("API_URL", "http://localhost:8000").rstrip("/")
+        web_url = os.getenv("WEB_URL", "http://localhost:3000").rstrip("/")
+
+    try:
+        results = []
+        results.append(test_api_health(api_url))
+        results.append(test_web_interface(web_url))
+        results.append(test_api_docs(api_url))
+    finally:
+        if stop is not None:
+            stop()
+        tmp.cleanup()
+
     print("\n" + "="*50)
     if all(results):
         print("✅ ALL SERVICES RUNNING SUCCESSFULLY!")
-        print("\n📍 Access Points:")
-        print("   • Web Interface: http://localhost:3000")
-        print("   • API Server: http://localhost:8000")
-        print("   • API Docs: http://localhost:8000/docs")
+        if not args.offline:
+            print("\n📍 Access Points:")
+            print(f"   • Web Interface: {web_url}")
+            print(f"   • API Server: {api_url}")
+            print(f"   • API Docs: {api_url}/docs")
         sys.exit(0)
     else:
         print("⚠️  SOME SERVICES ARE NOT RUNNING")
         print("\n💡 Make sure to start:")
         print("   1. python api.py")
         print("   2. cd web && python -m http.server 3000")
+        print("   (or run python verify_services.py --offline)")
         sys.exit(1)
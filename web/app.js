@@ -135,31 +135,33 @@ async function processJob() {
     document.getElementById('progressArea').style.display = 'block';
     document.getElementById('resultArea').style.display = 'none';
 
-    // Simulate progress steps
+    // Progress is driven by Server-Sent Events emitted as each stage finishes
     const steps = ['step1', 'step2', 'step3', 'step4'];
-    const statuses = [
-        'Analyzing job requirements...',
-        'Retrieving relevant experience via RAG...',
-        'Customizing CV with STAR method...',
-        'Generating documents...'
-    ];
-
-    let currentStep = 0;
-    const progressInterval = setInterval(() => {
-        if (currentStep < steps.length) {
-            document.getElementById(steps[currentStep]).classList.add('active');
-            document.getElementById('progressStatus').textContent = statuses[currentStep];
-            document.getElementById('progressFill').style.width = `${((currentStep + 1) / steps.length) * 100}%`;
-            currentStep++;
+    const stageSteps = {
+        analysis: { step: 0, status: 'Job analyzed. Retrieving relevant experience via RAG...' },
+        rag_retrieval: { step: 1, status: 'Customizing CV with STAR method...' },
+        cv: { step: 2, status: 'CV tailored. Finishing cover letter...' },
+        documents: { step: 3, status: 'Documents generated!' }
+    };
+    const preview = document.getElementById('letterPreview');
+    preview.textContent = '';
+    preview.style.display = 'none';
+    document.getElementById('progressStatus').textContent = 'Analyzing job requirements...';
+
+    const markStep = (index) => {
+        for (let i = 0; i <= index; i++) {
+            document.getElementById(steps[i]).classList.add('active');
         }
-    }, 1500);
+        document.getElementById('progressFill').style.width = `${((index + 1) / steps.length) * 100}%`;
+    };
 
     try {
-        // Call the API
-        const response = await fetch('http://127.0.0.1:8000/apply', {
+        // Call the streaming API
+        const response = await fetch('http://127.0.0.1:8000/apply/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
             },
             body: JSON.stringify({
                 job_description: jobDescription
@@ -170,14 +172,32 @@ async function processJob() {
             throw new Error(`API Error: ${response.status}`);
         }
 
-        const data = await response.json();
+        let data = null;
+        await readEventStream(response, (event, payload) => {
+            if (stageSteps[event]) {
+                markStep(stageSteps[event].step);
+                document.getElementById('progressStatus').textContent = stageSteps[event].status;
+            } else if (event === 'analysis_field' && payload.field === 'role_info') {
+                const role = payload.value || {};
+                document.getElementById('progressStatus').textContent =
+                    `Analyzing ${role.title || 'role'} at ${role.company || 'company'}...`;
+            } else if (event === 'cover_letter_delta') {
+                preview.style.display = 'block';
+                preview.textContent += payload.text;
+                preview.scrollTop = preview.scrollHeight;
+            } else if (event === 'done') {
+                data = payload;
+            } else if (event === 'error') {
+                throw new Error(payload.error);
+            }
+        });
 
-        // Stop progress animation
-        clearInterval(progressInterval);
+        if (!data) {
+            throw new Error('Connection closed before the application was generated');
+        }
 
         // Mark all steps complete
-        steps.forEach(step => document.getElementById(step).classList.add('active'));
-        document.getElementById('progressFill').style.width = '100%';
+        markStep(steps.length - 1);
 
         // Wait a moment then show results
         setTimeout(() => {
@@ -185,12 +205,40 @@ async function processJob() {
         }, 1000);
 
     } catch (error) {
-        clearInterval(progressInterval);
         alert(`Error: ${error.message}\n\nMake sure the API server is running on http://127.0.0.1:8000`);
         resetForm();
     }
 }
 
+// Parse a text/event-stream response body, calling onEvent(event, data) per event
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let dataLines = [];
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+            });
+            if (dataLines.length) {
+                onEvent(event, JSON.parse(dataLines.join('\n')));
+            }
+        }
+    }
+}
+
 function showResults(data) {
     document.getElementById('progressArea').style.display = 'none';
     document.getElementById('resultArea').style.display = 'block';
@@ -265,6 +313,7 @@ function resetForm() {
     const steps = ['step1', 'step2', 'step3', 'step4'];
     steps.forEach(step => document.getElementById(step).classList.remove('active'));
     document.getElementById('progressFill').style.width = '0%';
+    document.getElementById('letterPreview').textContent = '';
 
     // Clear input
     jobInput.value = '';
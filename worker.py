@@ -0,0 +1,92 @@
+"""
+Background Job Worker
+Role: Consume queued application jobs so workers scale independently of HTTP replicas.
+
+Run with: python worker.py
+"""
+
+import os
+import sys
+import asyncio
+from typing import Optional
+from dotenv import load_dotenv
+
+# Fix Windows console encoding for emojis
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+        sys.stderr.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+from utils.llm_router import create_llm_clients
+from utils.rag_engine import RAGEngine
+from utils.rag_registry import RAGRegistry
+from utils.job_dedupe import JobDedupeIndex
+from utils.analysis_store import AnalysisStore, SQLiteAnalysisStore
+from utils.pipeline import ApplicationPipeline
+from utils.job_queue import SQLiteJobQueue, WorkerPool
+from agents.job_analyzer import JobAnalyzer
+from agents.cv_customizer import CVCustomizer
+from agents.cover_letter_generator import CoverLetterGenerator
+
+# Load environment variables
+load_dotenv()
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output")
+
+
+def build_pipeline(
+    output_dir: str = OUTPUT_DIR,
+    rag_registry: Optional[RAGRegistry] = None,
+    analysis_store: Optional[AnalysisStore] = None,
+) -> ApplicationPipeline:
+    """
+    Initialize clients and agents for a worker process.
+
+    Args:
+        output_dir: Where generated documents are saved
+        rag_registry: Per-user RAG indexes to share (default: a new one from the environment);
+            pass the host app's registry so its profile-update invalidation reaches queued jobs
+        analysis_store: Job analysis store to share (default: SQLiteAnalysisStore.from_env())
+
+    Returns:
+        ApplicationPipeline ready to process queued jobs
+    """
+    api_key = os.getenv("DEEPSEEK_API_KEY")
+    if not api_key:
+        raise ValueError("DEEPSEEK_API_KEY not found in environment variables")
+
+    client, async_client = create_llm_clients()
+    os.makedirs(output_dir, exist_ok=True)
+    if rag_registry is None:
+        rag_registry = RAGRegistry.from_env()
+    if analysis_store is None:
+        analysis_store = SQLiteAnalysisStore.from_env()
+
+    return ApplicationPipeline(
+        JobAnalyzer(client, async_client, store=analysis_store),
+        CVCustomizer(client, async_client),
+        CoverLetterGenerator(client, async_client),
+        rag_engine=RAGEngine(),
+        output_dir=output_dir,
+        rag_registry=rag_registry,
+        dedupe_index=JobDedupeIndex.from_env(),
+    )
+
+
+def main():
+    """Run the worker pool until interrupted."""
+    concurrency = int(os.getenv("JOB_WORKERS", 4)) or 4
+    queue = SQLiteJobQueue.from_env()
+    pool = WorkerPool(queue, build_pipeline().run_job, concurrency=concurrency)
+
+    print(f"🚀 Job worker started ({concurrency} concurrent jobs, queue: {queue.path})")
+    try:
+        asyncio.run(pool.run_forever())
+    except KeyboardInterrupt:
+        print("\n🛑 Job worker stopped")
+
+
+if __name__ == "__main__":
+    main()